@@ -0,0 +1,15 @@
+"""
+Benchmarks de throughput da auditoria ICMS
+
+Catálogos sintéticos de 1k/10k/100k produtos medidos de ponta a ponta:
+upload no import-service, ingestão do banco da empresa, agentes baseados em
+regras, recuperação (GTIN e Golden Set), execução de workflows em lote e
+listagem de resultados. Cada caso informa throughput, latência p50/p95/p99
+e pico de RSS; as execuções ficam em um histórico JSON comparado a cada
+rodada para apontar regressões.
+
+Uso:
+    python -m benchmarks --sizes 1k,10k
+    python -m benchmarks --cases retrieval,workflow --fail-on-regression
+    python -m benchmarks --list
+"""
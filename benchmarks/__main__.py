@@ -0,0 +1,129 @@
+"""
+Execução dos benchmarks pela linha de comando
+
+Uso:
+    python -m benchmarks
+    python -m benchmarks --sizes 1k --cases agents.rules,results
+    python -m benchmarks --no-history --json
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import asdict
+
+from .catalog import parse_size, size_label
+from .cases import CASES, select_cases
+from .harness import (
+    DEFAULT_HISTORY_PATH,
+    ROOT,
+    BenchmarkOptions,
+    compare_with_history,
+    format_results,
+    load_history,
+    run_case,
+    run_isolated,
+    run_metadata,
+    save_run,
+)
+
+
+def _split(value: str):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks de throughput com catálogos sintéticos",
+    )
+    parser.add_argument(
+        "--sizes", default="1k,10k,100k", help="Tamanhos dos catálogos (ex.: 1k,10k)"
+    )
+    parser.add_argument(
+        "--cases", default="", help="Casos ou grupos separados por vírgula"
+    )
+    parser.add_argument("--list", action="store_true", help="Lista os casos")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--max-items", type=int, default=2000, help="Amostra dos casos por item"
+    )
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--history", default=str(ROOT / DEFAULT_HISTORY_PATH))
+    parser.add_argument(
+        "--no-history", action="store_true", help="Não grava a execução"
+    )
+    parser.add_argument(
+        "--window", type=int, default=5, help="Execuções anteriores na comparação"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.10, help="Piora tolerada (0.10 = 10%%)"
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Código de saída 1 se houver regressão",
+    )
+    parser.add_argument(
+        "--no-isolate",
+        action="store_true",
+        help="Executa no mesmo processo (RSS acumulado entre casos)",
+    )
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+
+    if args.list:
+        for case in CASES.values():
+            print(f"{case.name:<30} {case.latency_unit:<10} {case.description}")
+        return 0
+
+    cases = select_cases(_split(args.cases))
+    if not cases:
+        print(f"Nenhum caso corresponde a '{args.cases}'")
+        return 2
+
+    options = BenchmarkOptions(
+        repeat=args.repeat,
+        max_items=args.max_items,
+        batch_size=args.batch_size,
+        seed=args.seed,
+    )
+    sizes = [parse_size(size) for size in _split(args.sizes)]
+    runner = run_case if args.no_isolate else run_isolated
+
+    results = []
+    for size in sizes:
+        for case in cases:
+            if not args.json:
+                print(f"⏱️  {case.name} @ {size_label(size)}", file=sys.stderr)
+            results.append(runner(case, size, options))
+
+    history = load_history(args.history)
+    regressions = compare_with_history(
+        results, history, window=args.window, tolerance=args.tolerance
+    )
+
+    if args.json:
+        payload = {
+            "results": [asdict(result) for result in results],
+            "regressions": [asdict(regression) for regression in regressions],
+        }
+        print(json.dumps(payload, indent=2, ensure_ascii=False))
+    else:
+        print(format_results(results))
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} regressão(ões) contra o histórico:")
+            for regression in regressions:
+                print(f"  - {regression.describe()}")
+        elif history:
+            print("\n✅ Sem regressões contra o histórico")
+
+    if not args.no_history:
+        save_run(args.history, run_metadata(options), results)
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
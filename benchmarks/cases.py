@@ -0,0 +1,527 @@
+"""
+Casos de benchmark
+
+Cada caso recebe o catálogo sintético, o Recorder e as opções; a preparação
+(bancos temporários, índices, aquecimento de tabelas) fica fora de
+`recorder.measure`. Dependências opcionais são importadas dentro do caso:
+sem elas o caso é marcado como `skipped`.
+"""
+
+import importlib.util
+import io
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import func, select
+
+from .catalog import catalog_to_csv, sample, to_workflow_input, write_tenant_database
+from .harness import (
+    ROOT,
+    BenchmarkCase,
+    BenchmarkOptions,
+    BenchmarkSkipped,
+    Recorder,
+)
+
+CASES: Dict[str, BenchmarkCase] = {}
+
+Catalog = List[Dict[str, Any]]
+
+
+def benchmark(name: str, group: str, latency_unit: str = "item") -> Callable:
+    """Registra um caso; a primeira linha da docstring é a descrição."""
+
+    def register(func: Callable) -> Callable:
+        description = (func.__doc__ or "").strip().splitlines()[0]
+        CASES[name] = BenchmarkCase(name, group, func, latency_unit, description)
+        return func
+
+    return register
+
+
+def select_cases(patterns: List[str]) -> List[BenchmarkCase]:
+    """Casos pelo nome exato ou pelo grupo/prefixo (ex.: 'retrieval')."""
+    if not patterns:
+        return list(CASES.values())
+
+    selected = []
+    for case in CASES.values():
+        if any(
+            case.name == pattern
+            or case.group == pattern
+            or case.name.startswith(f"{pattern}.")
+            for pattern in patterns
+        ):
+            selected.append(case)
+    return selected
+
+
+# Import-service
+
+
+def _load_import_service():
+    """Carrega microservices/import-service/main.py (diretório com hífen)."""
+    path = ROOT / "microservices" / "import-service" / "main.py"
+    spec = importlib.util.spec_from_file_location("import_service_main", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@benchmark("import_service.upload", "import", latency_unit="operation")
+async def import_service_upload(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions
+):
+    """Upload de CSV no import-service (parse, validação e registro do job)"""
+    from fastapi import UploadFile
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    service = _load_import_service()
+    engine = create_engine(
+        f"sqlite:///{Path(options.workdir) / 'import_service.sqlite'}",
+        connect_args={"check_same_thread": False},
+    )
+    service.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    content = catalog_to_csv(catalog)
+
+    for _ in range(options.repeat):
+        upload = UploadFile(file=io.BytesIO(content), filename="catalogo.csv")
+        db = session_factory()
+        try:
+            with recorder.measure(len(catalog)):
+                await service.upload_file(
+                    file=upload,
+                    settings="{}",
+                    db=db,
+                    current_user={"id": "benchmark"},
+                    tenant_id="benchmark",
+                )
+        finally:
+            db.close()
+
+    engine.dispose()
+
+
+# Ingestão
+
+
+def _tenant_ingestion(catalog: Catalog, options: BenchmarkOptions):
+    from src.auditoria_icms.data_processing.empresa_data_ingestion import (
+        EmpresaDataIngestion,
+    )
+    from src.auditoria_icms.data_processing.engine_registry import (
+        TenantEngineRegistry,
+    )
+
+    path = write_tenant_database(catalog, Path(options.workdir) / "empresa.sqlite")
+    db_config = {
+        "db_type": "sqlite",
+        "host": "",
+        "port": 0,
+        "database": str(path),
+        "username": "",
+        "password": "",
+    }
+    return EmpresaDataIngestion(1, db_config, engine_registry=TenantEngineRegistry())
+
+
+@benchmark("ingestion.extract", "ingestion", latency_unit="operation")
+def ingestion_extract(catalog: Catalog, recorder: Recorder, options: BenchmarkOptions):
+    """Extração completa da tabela produto da empresa (com agregados)"""
+    ingestion = _tenant_ingestion(catalog, options)
+    # Aquecimento: cria o engine da empresa no registro
+    ingestion.extract_produtos(limit=1)
+
+    for _ in range(options.repeat):
+        with recorder.measure(len(catalog)):
+            produtos = ingestion.extract_produtos()
+        if len(produtos) != len(catalog):
+            raise RuntimeError(f"Extraídos {len(produtos)} de {len(catalog)}")
+
+    ingestion.connector.registry.close()
+
+
+@benchmark("ingestion.write_back", "ingestion", latency_unit="operation")
+def ingestion_write_back(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions
+):
+    """Gravação em lote dos resultados na tabela produto da empresa"""
+    ingestion = _tenant_ingestion(catalog, options)
+    resultados = [
+        {
+            "produto_id": produto["produto_id"],
+            "ncm_sugerido": produto["ncm"] or "30049099",
+            "cest_sugerido": produto["cest"],
+            "confianca_ncm": 0.9,
+            "justificativa_ncm": "benchmark",
+        }
+        for produto in catalog
+    ]
+    ingestion.update_produtos_processados(resultados[:1])
+
+    for _ in range(options.repeat):
+        with recorder.measure(len(resultados)):
+            ok = ingestion.update_produtos_processados(resultados)
+        if not ok:
+            raise RuntimeError("Falha na gravação dos resultados")
+
+    ingestion.connector.registry.close()
+
+
+# Agentes baseados em regras
+
+
+@benchmark("agents.rules", "agents")
+def agents_rules(catalog: Catalog, recorder: Recorder, options: BenchmarkOptions):
+    """Validação/determinação NCM e determinação CEST pelos agentes de regras"""
+    from src.auditoria_icms.agents.real_agents import CESTAgent, NCMAgent
+
+    ncm_agent = NCMAgent()
+    cest_agent = CESTAgent()
+
+    def classify(produto):
+        descricao = produto["descricao"]
+        ncm = produto["ncm"]
+        if ncm:
+            ncm_agent.validate_ncm(ncm, descricao)
+        else:
+            ncm = ncm_agent.determine_ncm(descricao).get("ncm_determinado")
+        if ncm:
+            cest_agent.determine_cest(ncm, descricao)
+
+    # Sem as tabelas (data/raw) os agentes só medem o retorno "não encontrado"
+    if not ncm_agent.ncm_data or not cest_agent.cest_data:
+        raise BenchmarkSkipped("tabelas NCM/CEST ausentes em data/raw")
+
+    # Aquecimento fora da medição
+    classify(catalog[0])
+
+    for produto in sample(catalog, options.max_items):
+        with recorder.measure():
+            classify(produto)
+
+
+@benchmark("agents.enrichment", "agents")
+def agents_enrichment(catalog: Catalog, recorder: Recorder, options: BenchmarkOptions):
+    """Enriquecimento por regras (campos obrigatórios, NCM, CEST, metadados)"""
+    from src.auditoria_icms.agents.data_agents import EnrichmentAgent
+
+    agent = EnrichmentAgent()
+
+    def product_data(produto):
+        return {
+            "codigo_produto": produto["codigo_produto"],
+            "descricao": produto["descricao"],
+            "ncm": produto["ncm"],
+            "cest": produto["cest"],
+            "preco": produto["valor_unitario"],
+            "unidade": produto["unidade"],
+            "empresa_id": 1,
+        }
+
+    agent.enrich_product_data(product_data(catalog[0]))
+
+    for produto in sample(catalog, options.max_items):
+        data = product_data(produto)
+        with recorder.measure():
+            agent.enrich_product_data(data)
+
+
+@benchmark("agents.duplicates", "agents", latency_unit="operation")
+async def agents_duplicates(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions
+):
+    """Detecção e fusão de duplicatas do catálogo inteiro (ReconcilerAgent)"""
+    from src.agents.base_agent import AgentTask
+    from src.agents.reconciler_agent import ReconcilerAgent
+
+    agent = ReconcilerAgent()
+    # Aquecimento (imports tardios e caches) fora da medição
+    await agent.process_task(
+        AgentTask(type="merge_duplicate_records", data={"dataset": catalog[:10]})
+    )
+
+    for _ in range(options.repeat):
+        task = AgentTask(type="merge_duplicate_records", data={"dataset": catalog})
+        with recorder.measure(len(catalog)):
+            await agent.process_task(task)
+
+
+@benchmark("agents.aggregation", "agents", latency_unit="operation")
+async def agents_aggregation(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions
+):
+    """Estatísticas agrupadas por NCM do catálogo inteiro (AggregationAgent)"""
+    from src.agents.aggregation_agent import AggregationAgent
+    from src.agents.base_agent import AgentTask
+
+    agent = AggregationAgent()
+    await agent.process_task(
+        AgentTask(
+            type="aggregate_statistics",
+            data={"dataset": catalog[:10], "group_by": "ncm"},
+        )
+    )
+
+    for _ in range(options.repeat):
+        task = AgentTask(
+            type="aggregate_statistics",
+            data={"dataset": catalog, "group_by": "ncm"},
+        )
+        with recorder.measure(len(catalog)):
+            await agent.process_task(task)
+
+
+# Recuperação
+
+
+def _gtin_index(catalog: Catalog):
+    from src.auditoria_icms.tools.gtin_index import GTINIndexBuilder
+
+    builder = GTINIndexBuilder()
+    for produto in catalog:
+        if produto["gtin"] and produto["ncm"]:
+            builder.add(produto["gtin"], produto["ncm"], produto["cest"])
+    return builder.build()
+
+
+@benchmark("retrieval.gtin_lookup", "retrieval")
+def retrieval_gtin_lookup(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions
+):
+    """Consulta exata no índice compacto de GTIN, um produto por vez"""
+    index = _gtin_index(catalog)
+    gtins = [produto["gtin"] for produto in sample(catalog, options.max_items)]
+
+    for gtin in gtins:
+        with recorder.measure():
+            index.lookup(gtin)
+
+
+@benchmark("retrieval.gtin_lookup_many", "retrieval", latency_unit="operation")
+def retrieval_gtin_lookup_many(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions
+):
+    """Consulta vetorizada de todos os GTINs do catálogo no índice compacto"""
+    index = _gtin_index(catalog)
+    gtins = [produto["gtin"] for produto in catalog]
+
+    for _ in range(options.repeat):
+        with recorder.measure(len(gtins)):
+            index.lookup_many(gtins)
+
+
+@benchmark("retrieval.golden_set_search", "retrieval")
+def retrieval_golden_set_search(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions
+):
+    """Busca ranqueada no Golden Set (FTS5) com o catálogo como base"""
+    from src.auditoria_icms.database.text_search import GOLDEN_SET_INDEX
+
+    conn = sqlite3.connect(Path(options.workdir) / "golden_set.sqlite")
+    try:
+        conn.execute(
+            """
+            CREATE TABLE golden_set (
+                id INTEGER PRIMARY KEY,
+                descricao_produto TEXT,
+                descricao_enriquecida TEXT,
+                ncm_correto VARCHAR(8),
+                cest_correto VARCHAR(9)
+            )
+            """
+        )
+        conn.executemany(
+            "INSERT INTO golden_set VALUES (?, ?, ?, ?, ?)",
+            (
+                (p["produto_id"], p["descricao"], p["descricao"], p["ncm"], p["cest"])
+                for p in catalog
+                if p["ncm"]
+            ),
+        )
+        conn.commit()
+        GOLDEN_SET_INDEX.setup(conn)
+
+        # Consultas sem o fabricante, como chegam das notas fiscais
+        queries = [
+            produto["descricao"].rsplit(" ", 1)[0]
+            for produto in sample(catalog, options.max_items)
+        ]
+        for query in queries:
+            with recorder.measure():
+                GOLDEN_SET_INDEX.search(conn, query, limit=5)
+    finally:
+        conn.close()
+
+
+# Workflows
+
+
+async def _workflow_batch(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions, staged: bool
+):
+    from src.auditoria_icms.core.config import WorkflowConfig
+    from src.auditoria_icms.workflows.workflow_manager import WorkflowManager
+
+    # Sem o caminho por GTIN: mede os workflows de agentes
+    manager = WorkflowManager(WorkflowConfig(gtin_fast_path=False))
+    produtos = [to_workflow_input(p) for p in sample(catalog, options.max_items)]
+    # Compilação dos grafos e carga dos agentes fora da medição
+    await manager.process_batch(produtos[:1], empresa_id="benchmark", staged=staged)
+
+    for start in range(0, len(produtos), options.batch_size):
+        lote = produtos[start : start + options.batch_size]
+        with recorder.measure(len(lote)):
+            await manager.process_batch(lote, empresa_id="benchmark", staged=staged)
+
+
+@benchmark("workflow.batch", "workflow", latency_unit="operation")
+async def workflow_batch(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions
+):
+    """WorkflowManager.process_batch com um grafo por produto"""
+    await _workflow_batch(catalog, recorder, options, staged=False)
+
+
+@benchmark("workflow.batch_staged", "workflow", latency_unit="operation")
+async def workflow_batch_staged(
+    catalog: Catalog, recorder: Recorder, options: BenchmarkOptions
+):
+    """WorkflowManager.process_batch executado estágio a estágio"""
+    await _workflow_batch(catalog, recorder, options, staged=True)
+
+
+# Listagem de resultados
+
+
+def _listing_columns():
+    from src.auditoria_icms.database.models import ProdutoEmpresa
+
+    # Colunas selecionadas por GET /results
+    return ProdutoEmpresa, [
+        ProdutoEmpresa.produto_id,
+        ProdutoEmpresa.descricao_produto,
+        ProdutoEmpresa.descricao_enriquecida,
+        ProdutoEmpresa.ncm,
+        ProdutoEmpresa.cest,
+        ProdutoEmpresa.ncm_sugerido,
+        ProdutoEmpresa.cest_sugerido,
+        ProdutoEmpresa.confianca_ncm,
+        ProdutoEmpresa.confianca_cest,
+        ProdutoEmpresa.justificativa_ncm,
+        ProdutoEmpresa.justificativa_cest,
+        ProdutoEmpresa.status_processamento,
+        ProdutoEmpresa.data_processamento,
+    ]
+
+
+def _results_database(catalog: Catalog, options: BenchmarkOptions):
+    """
+    Banco com a tabela produtos_empresa (com os resultados da classificação)
+    e os índices de listagem e de busca textual da API
+    """
+    from sqlalchemy import create_engine
+
+    from src.auditoria_icms.database.models import GoldenSet, ProdutoEmpresa
+    from src.auditoria_icms.database.text_search import setup_search_indexes
+
+    engine = create_engine(f"sqlite:///{Path(options.workdir) / 'results.sqlite'}")
+    ProdutoEmpresa.__table__.create(engine)
+    GoldenSet.__table__.create(engine)
+
+    agora = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(
+            ProdutoEmpresa.__table__.insert(),
+            [
+                {
+                    "produto_id": p["codigo_produto"],
+                    "empresa_id": 1,
+                    "codigo_produto": p["codigo_produto"],
+                    "descricao_produto": p["descricao"],
+                    "codigo_barra": p["gtin"],
+                    "ncm": p["ncm"],
+                    "cest": p["cest"],
+                    "descricao_enriquecida": p["descricao"].lower(),
+                    "ncm_sugerido": p["ncm"],
+                    "cest_sugerido": p["cest"],
+                    "confianca_ncm": 0.9 if p["ncm"] else None,
+                    "status_processamento": (
+                        "PROCESSADO" if p["ncm"] else "REVISAO_PENDENTE"
+                    ),
+                    "data_criacao": agora,
+                    "data_atualizacao": agora,
+                    "data_processamento": agora,
+                }
+                for p in catalog
+            ],
+        )
+
+    setup_search_indexes(engine)
+    return engine
+
+
+def _listing_page(conn, cursor=None, search_clause=None, page_size: int = 50):
+    """Página da listagem como em GET /results (cursor por produto_id)"""
+    produto, columns = _listing_columns()
+    query = select(*columns).where(produto.empresa_id == 1)
+    if cursor is not None:
+        query = query.where(produto.produto_id < cursor)
+    if search_clause is not None:
+        query = query.where(search_clause)
+    rows = conn.execute(
+        query.order_by(produto.produto_id.desc()).limit(page_size + 1)
+    ).fetchall()
+    return rows[:page_size], len(rows) > page_size
+
+
+@benchmark("results.listing", "results", latency_unit="operation")
+def results_listing(catalog: Catalog, recorder: Recorder, options: BenchmarkOptions):
+    """Percurso da listagem de resultados página a página (cursor por id)"""
+    produto, _ = _listing_columns()
+    engine = _results_database(catalog, options)
+
+    with engine.connect() as conn:
+        for _ in range(options.repeat):
+            # Total calculado uma vez por listagem, como na API
+            with recorder.measure(0):
+                conn.execute(
+                    select(func.count(produto.produto_id)).where(
+                        produto.empresa_id == 1
+                    )
+                ).scalar()
+
+            cursor, has_more = None, True
+            while has_more:
+                start = time.perf_counter()
+                page, has_more = _listing_page(conn, cursor)
+                recorder.record(time.perf_counter() - start, len(page))
+                cursor = page[-1].produto_id if page else None
+
+    engine.dispose()
+
+
+@benchmark("results.search", "results", latency_unit="operation")
+def results_search(catalog: Catalog, recorder: Recorder, options: BenchmarkOptions):
+    """Primeira página da listagem filtrada por termo de busca (FTS5)"""
+    from src.auditoria_icms.database.text_search import PRODUTO_DESCRICAO_INDEX
+
+    engine = _results_database(catalog, options)
+    terms = [
+        " ".join(produto["descricao"].split()[:2]).lower()
+        for produto in sample(catalog, options.max_items)
+    ]
+
+    with engine.connect() as conn:
+        for term in terms:
+            start = time.perf_counter()
+            clause = PRODUTO_DESCRICAO_INDEX.match_clause(engine, term)
+            page, _ = _listing_page(conn, search_clause=clause)
+            recorder.record(time.perf_counter() - start, len(page))
+
+    engine.dispose()
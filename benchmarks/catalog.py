@@ -0,0 +1,249 @@
+"""
+Catálogos sintéticos para os benchmarks
+
+Gera produtos determinísticos (semente fixa) com descrição, GTIN válido,
+NCM/CEST, unidade, preço e fabricante, em proporções próximas das bases das
+empresas: parte dos itens sem NCM ou sem GTIN e descrições repetidas entre
+lojas. Inclui conversores para os formatos consumidos pelos pontos medidos
+(CSV do import-service, tabela `produto` da empresa e entrada dos workflows).
+"""
+
+import csv
+import io
+import random
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Tamanhos padrão dos catálogos
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+# Categoria -> (NCMs, CESTs, unidades)
+CATEGORIAS = {
+    "medicamento": (
+        ["30049099", "30049069", "30042099", "30049045", "30039099"],
+        ["1300100", "1300200", "1300300", None],
+        ["CX", "FR", "UN"],
+    ),
+    "alimento": (
+        ["19053100", "04012010", "17049020", "19021900", "21069090"],
+        ["1704900", "1705000", "1706100", None],
+        ["UN", "PCT", "KG"],
+    ),
+    "bebida": (
+        ["22021000", "22030000", "22011000", "20091100"],
+        ["0300700", "0301000", "0301100", None],
+        ["UN", "FD", "L"],
+    ),
+    "higiene": (
+        ["33051000", "34011190", "33061000", "96032100", "33072010"],
+        ["2003700", "2001600", "2002800", None],
+        ["UN", "CX"],
+    ),
+}
+
+TERMOS = {
+    "medicamento": (
+        [
+            "DIPIRONA",
+            "PARACETAMOL",
+            "IBUPROFENO",
+            "AMOXICILINA",
+            "LOSARTANA",
+            "OMEPRAZOL",
+            "SINVASTATINA",
+            "METFORMINA",
+            "AZITROMICINA",
+            "LORATADINA",
+        ],
+        ["500MG", "250MG", "20MG", "50MG", "850MG", "10MG", "1G"],
+        ["COMPRIMIDO", "CAPSULA", "XAROPE 100ML", "GOTAS 20ML", "SUSPENSAO 60ML"],
+    ),
+    "alimento": (
+        ["BISCOITO", "LEITE", "CHOCOLATE", "MACARRAO", "BARRA CEREAL"],
+        ["RECHEADO", "INTEGRAL", "AO LEITE", "ESPAGUETE", "MORANGO", "ZERO"],
+        ["140G", "1L", "90G", "500G", "25G", "200G"],
+    ),
+    "bebida": (
+        ["REFRIGERANTE", "CERVEJA", "AGUA MINERAL", "SUCO"],
+        ["COLA", "PILSEN", "SEM GAS", "LARANJA", "UVA", "LIMAO"],
+        ["350ML", "2L", "600ML", "1L", "269ML"],
+    ),
+    "higiene": (
+        ["XAMPU", "SABONETE", "CREME DENTAL", "ESCOVA DENTAL", "DESODORANTE"],
+        ["ANTICASPA", "HIDRATANTE", "MENTA", "MACIA", "AEROSOL", "NEUTRO"],
+        ["350ML", "90G", "70G", "UN", "150ML"],
+    ),
+}
+
+FABRICANTES = [
+    "EMS",
+    "MEDLEY",
+    "EUROFARMA",
+    "NESTLE",
+    "AMBEV",
+    "UNILEVER",
+    "COLGATE",
+    "PEPSICO",
+    "BRF",
+    "HYPERA",
+]
+
+# Colunas do CSV enviado ao import-service (código do produto primeiro,
+# pois o mapeamento automático busca por substring)
+CSV_COLUMNS = [
+    "codigo_produto",
+    "descricao",
+    "ncm",
+    "cest",
+    "unidade",
+    "valor_unitario",
+    "gtin",
+]
+
+
+def parse_size(value: str) -> int:
+    """Converte '1k', '10k', '100k' ou um número em quantidade de produtos."""
+    value = value.strip().lower()
+    if value in SIZES:
+        return SIZES[value]
+    if value.endswith("k"):
+        return int(float(value[:-1]) * 1_000)
+    return int(value)
+
+
+def size_label(size: int) -> str:
+    """Rótulo curto do tamanho (1000 -> '1k')."""
+    if size % 1_000 == 0:
+        return f"{size // 1_000}k"
+    return str(size)
+
+
+def gtin13(rng: random.Random) -> str:
+    """EAN-13 com prefixo brasileiro (789) e dígito verificador GS1."""
+    body = "789" + "".join(str(rng.randrange(10)) for _ in range(9))
+    total = sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def _descricao(rng: random.Random, categoria: str, fabricante: str) -> str:
+    base, meio, fim = TERMOS[categoria]
+    return f"{rng.choice(base)} {rng.choice(meio)} {rng.choice(fim)} {fabricante}"
+
+
+def generate_catalog(
+    size: int,
+    seed: int = 42,
+    duplicate_rate: float = 0.2,
+    missing_ncm_rate: float = 0.1,
+    missing_gtin_rate: float = 0.15,
+) -> List[Dict[str, Any]]:
+    """
+    Gera `size` produtos sintéticos, sempre iguais para a mesma semente.
+
+    `duplicate_rate` é a fração de itens que repetem a descrição, o GTIN e a
+    classificação de um item anterior (mesmo produto em outra loja ou código).
+    """
+    rng = random.Random(seed)
+    catalog: List[Dict[str, Any]] = []
+
+    for index in range(size):
+        produto_id = index + 1
+        codigo = f"P{produto_id:07d}"
+
+        if catalog and rng.random() < duplicate_rate:
+            original = catalog[rng.randrange(len(catalog))]
+            catalog.append(
+                {**original, "produto_id": produto_id, "codigo_produto": codigo}
+            )
+            continue
+
+        categoria = rng.choice(list(CATEGORIAS))
+        ncms, cests, unidades = CATEGORIAS[categoria]
+        fabricante = rng.choice(FABRICANTES)
+        ncm: Optional[str] = rng.choice(ncms)
+        cest = rng.choice(cests)
+        if rng.random() < missing_ncm_rate:
+            ncm, cest = None, None
+
+        catalog.append(
+            {
+                "produto_id": produto_id,
+                "codigo_produto": codigo,
+                "descricao": _descricao(rng, categoria, fabricante),
+                "gtin": None if rng.random() < missing_gtin_rate else gtin13(rng),
+                "ncm": ncm,
+                "cest": cest,
+                "unidade": rng.choice(unidades),
+                "valor_unitario": round(rng.uniform(1.5, 250.0), 2),
+                "fabricante": fabricante,
+                "categoria": categoria,
+            }
+        )
+
+    return catalog
+
+
+def catalog_to_csv(catalog: List[Dict[str, Any]]) -> bytes:
+    """Planilha CSV no formato aceito pelo upload do import-service."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(catalog)
+    return buffer.getvalue().encode("utf-8")
+
+
+def write_tenant_database(catalog: List[Dict[str, Any]], path: Path) -> Path:
+    """Cria o banco SQLite de uma empresa com a tabela `produto` da ingestão."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(
+            """
+            CREATE TABLE produto (
+                produto_id INTEGER PRIMARY KEY,
+                descricao_produto TEXT,
+                codigo_produto VARCHAR(50),
+                codigo_barra VARCHAR(20),
+                ncm VARCHAR(8),
+                cest VARCHAR(9)
+            )
+            """
+        )
+        conn.executemany(
+            "INSERT INTO produto VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    produto["produto_id"],
+                    produto["descricao"],
+                    produto["codigo_produto"],
+                    produto["gtin"],
+                    produto["ncm"],
+                    produto["cest"],
+                )
+                for produto in catalog
+            ),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def to_workflow_input(produto: Dict[str, Any]) -> Dict[str, Any]:
+    """Dados de produto no formato do WorkflowManager."""
+    return {
+        "produto_id": produto["produto_id"],
+        "descricao_original": produto["descricao"],
+        "ncm_informado": produto["ncm"],
+        "cest_informado": produto["cest"],
+        "gtin": produto["gtin"],
+        "fabricante": produto["fabricante"],
+    }
+
+
+def sample(catalog: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Amostra espaçada (determinística) de até `limit` produtos."""
+    if limit <= 0 or limit >= len(catalog):
+        return catalog
+    step = len(catalog) / limit
+    return [catalog[int(i * step)] for i in range(limit)]
@@ -0,0 +1,332 @@
+"""
+Infraestrutura dos benchmarks
+
+- Recorder: cronometra as operações medidas (latência em StreamingStats)
+- run_case / run_isolated: executa um caso, em processo próprio por padrão,
+  para que o pico de RSS seja o do caso e não o da execução inteira
+- Histórico JSON com comparação contra a mediana das execuções anteriores
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.auditoria_icms.core.telemetry import StreamingStats
+
+from .catalog import generate_catalog, size_label
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_HISTORY_PATH = "data/benchmarks/history.json"
+
+# Métricas comparadas com o histórico: (campo, maior é melhor)
+TRACKED_METRICS = [
+    ("throughput", True),
+    ("p95_ms", False),
+    ("peak_rss_mb", False),
+]
+
+
+class BenchmarkSkipped(Exception):
+    """Caso sem os dados necessários para uma medição representativa"""
+
+
+@dataclass(frozen=True)
+class BenchmarkOptions:
+    """Parâmetros comuns a todos os casos"""
+
+    repeat: int = 3  # repetições das operações em lote
+    max_items: int = 2000  # amostra dos casos medidos por item
+    batch_size: int = 100  # produtos por lote nos workflows
+    seed: int = 42
+    workdir: str = ""  # diretório temporário do caso (preenchido na execução)
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    """Caso registrado: função (catálogo, recorder, opções), síncrona ou async"""
+
+    name: str
+    group: str
+    func: Callable
+    latency_unit: str  # "item" ou "operation"
+    description: str
+
+
+@dataclass
+class CaseResult:
+    """Resultado de um caso em um tamanho de catálogo"""
+
+    case: str
+    size: int
+    status: str  # ok, skipped, error
+    latency_unit: str = "item"
+    items: int = 0
+    operations: int = 0
+    elapsed_s: float = 0.0
+    throughput: float = 0.0  # itens/s
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    p99_ms: float = 0.0
+    mean_ms: float = 0.0
+    max_ms: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    setup_rss_mb: Optional[float] = None
+    detail: str = ""
+
+    @property
+    def key(self) -> str:
+        return f"{self.case}@{size_label(self.size)}"
+
+
+@dataclass
+class Regression:
+    """Variação de uma métrica além da tolerância"""
+
+    key: str
+    metric: str
+    baseline: float
+    current: float
+    change: float  # relativa; positiva = pior
+
+    def describe(self) -> str:
+        return (
+            f"{self.key} {self.metric}: {self.baseline:.4g} → {self.current:.4g} "
+            f"({self.change:+.1%})"
+        )
+
+
+class Recorder:
+    """Cronometra as operações de um caso (apenas o que está em `measure`)"""
+
+    def __init__(self):
+        self.latency = StreamingStats()
+        self.items = 0
+        self.elapsed = 0.0
+
+    @contextmanager
+    def measure(self, items: int = 1) -> Iterator[None]:
+        start = time.perf_counter()
+        yield
+        self.record(time.perf_counter() - start, items)
+
+    def record(self, duration: float, items: int = 1) -> None:
+        self.latency.add(duration)
+        self.items += items
+        self.elapsed += duration
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memória residente do processo (MB), se o sistema informar."""
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss em bytes no macOS e em KB no Linux
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 2**20
+    except ImportError:
+        return None
+
+
+def run_case(case: BenchmarkCase, size: int, options: BenchmarkOptions) -> CaseResult:
+    """Executa um caso no processo atual."""
+    # Logs por item distorcem as medições (e inundam a saída)
+    logging.disable(logging.INFO)
+
+    result = CaseResult(
+        case=case.name, size=size, status="ok", latency_unit=case.latency_unit
+    )
+    catalog = generate_catalog(size, seed=options.seed)
+    recorder = Recorder()
+    result.setup_rss_mb = peak_rss_mb()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+            outcome = case.func(catalog, recorder, replace(options, workdir=workdir))
+            if inspect.isawaitable(outcome):
+                asyncio.run(outcome)
+    except ImportError as e:
+        result.status = "skipped"
+        result.detail = f"dependência ausente: {e}"
+    except BenchmarkSkipped as e:
+        result.status = "skipped"
+        result.detail = str(e)
+    except Exception as e:
+        result.status = "error"
+        result.detail = f"{type(e).__name__}: {e}"
+        logging.getLogger(__name__).debug(traceback.format_exc())
+
+    stats = recorder.latency
+    result.items = recorder.items
+    result.operations = stats.count
+    result.elapsed_s = recorder.elapsed
+    result.throughput = recorder.items / recorder.elapsed if recorder.elapsed else 0.0
+    result.p50_ms = stats.percentile(50) * 1000
+    result.p95_ms = stats.percentile(95) * 1000
+    result.p99_ms = stats.percentile(99) * 1000
+    result.mean_ms = stats.mean * 1000
+    result.max_ms = (stats.max or 0.0) * 1000
+    result.peak_rss_mb = peak_rss_mb()
+    return result
+
+
+def run_isolated(
+    case: BenchmarkCase, size: int, options: BenchmarkOptions
+) -> CaseResult:
+    """Executa o caso em um processo novo (pico de RSS só do caso)."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        try:
+            return pool.submit(run_case, case, size, options).result()
+        except Exception as e:
+            # Processo filho encerrado (ex.: falta de memória)
+            return CaseResult(
+                case=case.name,
+                size=size,
+                status="error",
+                latency_unit=case.latency_unit,
+                detail=f"{type(e).__name__}: {e}",
+            )
+
+
+# Histórico
+
+
+def run_metadata(options: BenchmarkOptions) -> Dict[str, Any]:
+    """Identificação da execução (commit, máquina e parâmetros)."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": {k: v for k, v in asdict(options).items() if k != "workdir"},
+    }
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    history_path = Path(path)
+    if not history_path.exists():
+        return []
+    with open(history_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("runs", [])
+
+
+def save_run(
+    path: str,
+    metadata: Dict[str, Any],
+    results: List[CaseResult],
+    keep: int = 200,
+) -> Dict[str, Any]:
+    """Acrescenta a execução ao histórico (mantém as `keep` mais recentes)."""
+    run = {
+        **metadata,
+        "results": {result.key: asdict(result) for result in results},
+    }
+    runs = (load_history(path) + [run])[-keep:]
+
+    history_path = Path(path)
+    history_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = history_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"runs": runs}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, history_path)
+    return run
+
+
+def compare_with_history(
+    results: List[CaseResult],
+    history: List[Dict[str, Any]],
+    window: int = 5,
+    tolerance: float = 0.10,
+) -> List[Regression]:
+    """
+    Compara cada caso com a mediana das últimas `window` execuções bem
+    sucedidas do mesmo caso e tamanho; retorna as métricas que pioraram
+    mais que `tolerance`.
+    """
+    regressions = []
+    for result in results:
+        if result.status != "ok":
+            continue
+
+        previous = [
+            run["results"][result.key]
+            for run in history
+            if run.get("results", {}).get(result.key, {}).get("status") == "ok"
+        ][-window:]
+        if not previous:
+            continue
+
+        for metric, higher_is_better in TRACKED_METRICS:
+            current = getattr(result, metric)
+            values = [entry[metric] for entry in previous if entry.get(metric)]
+            if current is None or not values:
+                continue
+
+            baseline = statistics.median(values)
+            change = (current - baseline) / baseline
+            if higher_is_better:
+                change = -change
+            if change > tolerance:
+                regressions.append(
+                    Regression(result.key, metric, baseline, current, change)
+                )
+
+    return regressions
+
+
+def format_results(results: List[CaseResult]) -> str:
+    """Tabela de texto com as métricas de cada caso."""
+    header = (
+        f"{'caso':<30} {'tam':>5} {'itens/s':>11} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9} {'RSS MB':>8}  unidade"
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        label = size_label(result.size)
+        if result.status != "ok":
+            lines.append(
+                f"{result.case:<30} {label:>5}  [{result.status}] {result.detail}"
+            )
+            continue
+        rss = f"{result.peak_rss_mb:.0f}" if result.peak_rss_mb else "-"
+        lines.append(
+            f"{result.case:<30} {label:>5} {result.throughput:>11.1f} "
+            f"{result.p50_ms:>9.3f} {result.p95_ms:>9.3f} {result.p99_ms:>9.3f} "
+            f"{rss:>8}  {result.latency_unit}"
+        )
+    return "\n".join(lines)
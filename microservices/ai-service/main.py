@@ -24,6 +24,7 @@ microservices_dir = os.path.dirname(current_dir)
 sys.path.insert(0, microservices_dir)
 
 # Local Application Imports
+from shared.audit_sink import AuditSink, SQLAlchemyAuditWriter  # noqa: E402
 from shared.auth import get_current_tenant, get_current_user  # noqa: E402
 from shared.database import Base, db_config, get_db  # noqa: E402
 from shared.logging_config import setup_logger  # noqa: E402
@@ -55,6 +56,13 @@ class AIInteraction(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+# Interactions are written in batches off the request path
+audit_sink = AuditSink(
+    SQLAlchemyAuditWriter(db_config, AIInteraction.__table__),
+    name="ai_interactions",
+)
+
+
 # Pydantic Models
 class AIRequest(BaseModel):
     prompt: str
@@ -93,9 +101,10 @@ async def lifespan(app: FastAPI):
     """Initialize on startup"""
     engine = db_config.initialize()
     Base.metadata.create_all(bind=engine)
+    await audit_sink.start()
     logger.info("AI service started")
     yield
-    # Cleanup code (if needed) would go here
+    await audit_sink.close()
 
 
 # FastAPI App
@@ -164,7 +173,6 @@ async def get_available_providers():
 @app.post("/generate", response_model=BaseResponse)
 async def generate_text(
     request: AIRequest,
-    db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
     tenant_id: str = Depends(get_current_tenant),
 ):
@@ -178,18 +186,15 @@ async def generate_text(
             request.provider, request.model
         )
 
-        # Create interaction record
-        interaction = AIInteraction(
-            tenant_id=tenant_id,
-            interaction_id=interaction_id,
-            provider=provider,
-            model=model,
-            prompt=request.prompt,
-            status="pending",
-        )
-
-        db.add(interaction)
-        db.commit()
+        # Interaction record, queued once the call finishes
+        interaction = {
+            "tenant_id": tenant_id,
+            "interaction_id": interaction_id,
+            "provider": provider,
+            "model": model,
+            "prompt": request.prompt,
+            "created_at": start_time,
+        }
 
         try:
             # Generate response
@@ -204,15 +209,15 @@ async def generate_text(
 
             processing_time = (datetime.utcnow() - start_time).total_seconds()
 
-            # Update interaction
-            interaction.response = response_data["text"]
-            interaction.tokens_used = response_data.get("tokens_used", 0)
-            interaction.processing_time = processing_time
-            interaction.cost = response_data.get("cost", 0.0)
-            interaction.status = "completed"
-            interaction.metadata = response_data.get("metadata", {})
-
-            db.commit()
+            interaction.update(
+                response=response_data["text"],
+                tokens_used=response_data.get("tokens_used", 0),
+                processing_time=processing_time,
+                cost=response_data.get("cost", 0.0),
+                status="completed",
+                interaction_metadata=response_data.get("metadata", {}),
+            )
+            await audit_sink.record(interaction)
 
             logger.info(
                 f"Text generated for tenant {tenant_id} using {provider}/{model}"
@@ -231,10 +236,8 @@ async def generate_text(
             )
 
         except Exception as ai_error:
-            # Update interaction with error
-            interaction.status = "failed"
-            interaction.error_message = str(ai_error)
-            db.commit()
+            interaction.update(status="failed", error_message=str(ai_error))
+            await audit_sink.record(interaction)
 
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -254,7 +257,6 @@ async def generate_text(
 @app.post("/chat", response_model=BaseResponse)
 async def chat_completion(
     request: ChatRequest,
-    db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
     tenant_id: str = Depends(get_current_tenant),
 ):
@@ -271,18 +273,15 @@ async def chat_completion(
         # Format messages for logging
         messages_text = json.dumps(request.messages, ensure_ascii=False)
 
-        # Create interaction record
-        interaction = AIInteraction(
-            tenant_id=tenant_id,
-            interaction_id=interaction_id,
-            provider=provider,
-            model=model,
-            prompt=messages_text,
-            status="pending",
-        )
-
-        db.add(interaction)
-        db.commit()
+        # Interaction record, queued once the call finishes
+        interaction = {
+            "tenant_id": tenant_id,
+            "interaction_id": interaction_id,
+            "provider": provider,
+            "model": model,
+            "prompt": messages_text,
+            "created_at": start_time,
+        }
 
         try:
             # Generate chat response
@@ -296,15 +295,15 @@ async def chat_completion(
 
             processing_time = (datetime.utcnow() - start_time).total_seconds()
 
-            # Update interaction
-            interaction.response = response_data["text"]
-            interaction.tokens_used = response_data.get("tokens_used", 0)
-            interaction.processing_time = processing_time
-            interaction.cost = response_data.get("cost", 0.0)
-            interaction.status = "completed"
-            interaction.metadata = response_data.get("metadata", {})
-
-            db.commit()
+            interaction.update(
+                response=response_data["text"],
+                tokens_used=response_data.get("tokens_used", 0),
+                processing_time=processing_time,
+                cost=response_data.get("cost", 0.0),
+                status="completed",
+                interaction_metadata=response_data.get("metadata", {}),
+            )
+            await audit_sink.record(interaction)
 
             logger.info(
                 f"Chat completion for tenant {tenant_id} using {provider}/{model}"
@@ -323,10 +322,8 @@ async def chat_completion(
             )
 
         except Exception as ai_error:
-            # Update interaction with error
-            interaction.status = "failed"
-            interaction.error_message = str(ai_error)
-            db.commit()
+            interaction.update(status="failed", error_message=str(ai_error))
+            await audit_sink.record(interaction)
 
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
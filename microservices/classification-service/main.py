@@ -22,6 +22,7 @@ microservices_dir = os.path.dirname(current_dir)
 sys.path.insert(0, microservices_dir)
 
 # Local Application Imports
+from shared.audit_sink import AuditSink, SQLAlchemyAuditWriter  # noqa: E402
 from shared.auth import get_current_tenant, get_current_user  # noqa: E402
 from shared.database import Base, db_config, get_db  # noqa: E402
 from shared.logging_config import setup_logger  # noqa: E402
@@ -48,6 +49,13 @@ class ClassificationHistory(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+# History rows are written in batches off the request path
+history_sink = AuditSink(
+    SQLAlchemyAuditWriter(db_config, ClassificationHistory.__table__),
+    name="classification_history",
+)
+
+
 # Pydantic Models
 class ClassificationRequest(BaseModel):
     product_id: int
@@ -84,10 +92,11 @@ async def lifespan(app: FastAPI):
     """Initialize database on startup"""
     engine = db_config.initialize()
     Base.metadata.create_all(bind=engine)
+    await history_sink.start()
     logger.info("Classification service started")
     yield
-    # Cleanup code (if needed) would go here
     logger.info("Classification service shutting down")
+    await history_sink.close()
 
 
 # FastAPI App
@@ -115,7 +124,6 @@ async def get_available_strategies():
 @app.post("/classify", response_model=BaseResponse)
 async def classify_product(
     request: ClassificationRequest,
-    db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
     tenant_id: str = Depends(get_current_tenant),
 ):
@@ -139,21 +147,21 @@ async def classify_product(
         processing_time = (datetime.utcnow() - start_time).total_seconds()
 
         # Save classification history
-        history_record = ClassificationHistory(
-            tenant_id=tenant_id,
-            product_id=request.product_id,
-            descricao_produto=request.descricao,
-            estrategia_usada=classification_result["strategy"],
-            classificacao_resultado=classification_result["classification"],
-            confianca=classification_result["confidence"],
-            tempo_processamento=processing_time,
-            detalhes_classificacao=classification_result.get("details", {}),
-            status="completed",
+        await history_sink.record(
+            {
+                "tenant_id": tenant_id,
+                "product_id": request.product_id,
+                "descricao_produto": request.descricao,
+                "estrategia_usada": classification_result["strategy"],
+                "classificacao_resultado": classification_result["classification"],
+                "confianca": classification_result["confidence"],
+                "tempo_processamento": processing_time,
+                "detalhes_classificacao": classification_result.get("details", {}),
+                "status": "completed",
+                "created_at": start_time,
+            }
         )
 
-        db.add(history_record)
-        db.commit()
-
         # Update product with classification
         await update_product_classification(
             request.product_id,
@@ -186,16 +194,17 @@ async def classify_product(
     except Exception as e:
         logger.error(f"Error classifying product: {str(e)}")
         # Save error in history
-        history_record = ClassificationHistory(
-            tenant_id=tenant_id,
-            product_id=request.product_id,
-            descricao_produto=request.descricao,
-            estrategia_usada=request.estrategia,
-            status="error",
-            detalhes_classificacao={"error": str(e)},
+        await history_sink.record(
+            {
+                "tenant_id": tenant_id,
+                "product_id": request.product_id,
+                "descricao_produto": request.descricao,
+                "estrategia_usada": request.estrategia,
+                "status": "error",
+                "detalhes_classificacao": {"error": str(e)},
+                "created_at": datetime.utcnow(),
+            }
         )
-        db.add(history_record)
-        db.commit()
 
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -206,7 +215,6 @@ async def classify_product(
 @app.post("/classify/batch", response_model=BaseResponse)
 async def classify_products_batch(
     request: ClassificationBatchRequest,
-    db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user),
     tenant_id: str = Depends(get_current_tenant),
 ):
@@ -226,20 +234,25 @@ async def classify_products_batch(
                 processing_time = (datetime.utcnow() - start_time).total_seconds()
 
                 # Save classification history
-                history_record = ClassificationHistory(
-                    tenant_id=tenant_id,
-                    product_id=product_data["product_id"],
-                    descricao_produto=product_data["descricao"],
-                    estrategia_usada=classification_result["strategy"],
-                    classificacao_resultado=classification_result["classification"],
-                    confianca=classification_result["confidence"],
-                    tempo_processamento=processing_time,
-                    detalhes_classificacao=classification_result.get("details", {}),
-                    status="completed",
+                await history_sink.record(
+                    {
+                        "tenant_id": tenant_id,
+                        "product_id": product_data["product_id"],
+                        "descricao_produto": product_data["descricao"],
+                        "estrategia_usada": classification_result["strategy"],
+                        "classificacao_resultado": classification_result[
+                            "classification"
+                        ],
+                        "confianca": classification_result["confidence"],
+                        "tempo_processamento": processing_time,
+                        "detalhes_classificacao": classification_result.get(
+                            "details", {}
+                        ),
+                        "status": "completed",
+                        "created_at": start_time,
+                    }
                 )
 
-                db.add(history_record)
-
                 # Update product
                 await update_product_classification(
                     product_data["product_id"],
@@ -270,8 +283,6 @@ async def classify_products_batch(
                     }
                 )
 
-        db.commit()
-
         successful = len([r for r in results if r.get("status") == "success"])
         failed = len(results) - successful
 
@@ -289,7 +300,6 @@ async def classify_products_batch(
 
     except Exception as e:
         logger.error(f"Error in batch classification: {str(e)}")
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Batch classification error",
@@ -0,0 +1,259 @@
+"""
+Asynchronous batched audit writes for microservices
+
+Records are queued in memory (bounded queue with backpressure) and written
+by a background task in batches, one transaction per batch, off the event
+loop. Call `close()` on shutdown to flush pending records; as a last
+resort they are flushed at process exit.
+
+This is the only AuditSink implementation: the main application imports
+it from here (src/auditoria_icms/core/audit_sink.py).
+"""
+
+import asyncio
+import atexit
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.sql.schema import Table
+
+logger = logging.getLogger(__name__)
+
+AuditRecord = Dict[str, Any]
+AuditWriter = Callable[[List[AuditRecord]], None]
+
+
+class SQLAlchemyAuditWriter:
+    """Insert batches into a table with a single executemany per transaction"""
+
+    def __init__(self, db_config, table: Table):
+        self.db_config = db_config
+        self.table = table
+        self._engine = None
+
+    def _get_engine(self):
+        engine = self.db_config.engine or self.db_config.initialize()
+        if engine is not self._engine:
+            if engine.dialect.name == "sqlite":
+                self._enable_wal(engine)
+            self._engine = engine
+        return engine
+
+    @staticmethod
+    def _enable_wal(engine) -> None:
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
+
+        # Connections already in the pool were opened before the listener
+        engine.dispose()
+
+    def __call__(self, records: List[AuditRecord]) -> None:
+        with self._get_engine().begin() as conn:
+            conn.execute(self.table.insert(), self._normalize(records))
+
+    def _normalize(self, records: List[AuditRecord]) -> List[AuditRecord]:
+        """
+        Give every record the same keys: executemany compiles the INSERT
+        from the first record, so records with different key sets (e.g.
+        completed vs failed) would otherwise fail as a batch.
+
+        Columns present in any record, plus plain columns without defaults,
+        are included. A missing value takes the column default, or None.
+        """
+        present = set().union(*records)
+        columns = [
+            column
+            for column in self.table.columns
+            if column.key in present
+            or not (
+                column.primary_key
+                or column.default is not None
+                or column.server_default is not None
+            )
+        ]
+        return [
+            {
+                column.key: (
+                    record[column.key]
+                    if column.key in record
+                    else _column_default(column)
+                )
+                for column in columns
+            }
+            for record in records
+        ]
+
+
+def _column_default(column) -> Any:
+    """Python-side default of a column (scalar or zero-argument callable)"""
+    default = column.default
+    if default is None:
+        return None
+    if default.is_scalar:
+        return default.arg
+    if default.is_callable:
+        return default.arg(None)
+    return None
+
+
+class AuditSink:
+    """
+    Bounded audit queue flushed in batches by a background task.
+
+    `record` waits while the queue is full (backpressure); with `timeout`
+    the record is dropped once it expires. The task starts on the first
+    record and is recreated if the event loop changes. Records still
+    queued at interpreter exit are written synchronously.
+    """
+
+    def __init__(
+        self,
+        writer: AuditWriter,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        name: str = "audit",
+    ):
+        self.writer = writer
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.name = name
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Batch being assembled, not yet handed to the writer
+        self._inflight: List[AuditRecord] = []
+        self._closed = False
+        atexit.register(self._flush_at_exit)
+
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            pending = self._drain_nowait()
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            for record in pending:
+                self._queue.put_nowait(record)
+            self._loop = loop
+            self._task = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def start(self) -> None:
+        """Start the background flush task (optional; `record` starts it)"""
+        self._closed = False
+        self._ensure_started()
+
+    async def record(
+        self, record: AuditRecord, timeout: Optional[float] = None
+    ) -> bool:
+        """Queue a record; returns False if it was dropped"""
+        if self._closed:
+            await asyncio.to_thread(self._write, [record])
+            return True
+
+        queue = self._ensure_started()
+        try:
+            if timeout is None:
+                await queue.put(record)
+            else:
+                await asyncio.wait_for(queue.put(record), timeout)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            logger.warning(f"Audit queue '{self.name}' is full; record dropped")
+            return False
+        return True
+
+    async def flush(self) -> None:
+        """Wait until every queued record has been written"""
+        if (
+            self._task is not None
+            and not self._task.done()
+            and self._loop is asyncio.get_running_loop()
+        ):
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Flush pending records and stop the background task"""
+        await self.flush()
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        remaining = self._drain_nowait()
+        if remaining:
+            await asyncio.to_thread(self._write, remaining)
+        logger.info(
+            f"Audit sink '{self.name}' closed: {self.written} written, "
+            f"{self.dropped} dropped"
+        )
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._inflight
+            batch.append(await queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self._inflight = []
+            try:
+                await asyncio.to_thread(self._write, batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _write(self, batch: List[AuditRecord]) -> None:
+        try:
+            self.writer(batch)
+            self.written += len(batch)
+            self.batches += 1
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self.dropped += 1
+                logger.error(f"Error writing audit record '{self.name}': {e}")
+                return
+            logger.warning(
+                f"Audit batch '{self.name}' failed ({e}); writing records one by one"
+            )
+
+        # One invalid record must not drop the whole batch
+        for record in batch:
+            self._write([record])
+
+    def _drain_nowait(self) -> List[AuditRecord]:
+        records, self._inflight = self._inflight, []
+        if self._queue is None:
+            return records
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return records
+            self._queue.task_done()
+
+    def _flush_at_exit(self) -> None:
+        remaining = self._drain_nowait()
+        if remaining:
+            self._write(remaining)
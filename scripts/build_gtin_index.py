@@ -0,0 +1,79 @@
+"""
+Construção do índice compacto de GTIN
+
+Reúne Golden Set e classificações aprovadas do banco principal, produtos de
+exemplo da base de conhecimento SQLite e a tabela ABC Farma em um único
+arquivo .npz consultado antes dos workflows de classificação.
+
+Uso:
+    python scripts/build_gtin_index.py
+    python scripts/build_gtin_index.py --database-url postgresql://... \
+        --abc-farma data/raw/Tabela_ABC_Farma_V2.xlsx
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.auditoria_icms.tools.gtin_index import (  # noqa: E402
+    DEFAULT_INDEX_PATH,
+    build_gtin_index,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", help="URL SQLAlchemy do banco principal")
+    parser.add_argument(
+        "--knowledge-base",
+        default="data/processed/knowledge_base.sqlite",
+        help="Base de conhecimento SQLite",
+    )
+    parser.add_argument("--abc-farma", help="Planilha ABC Farma V2")
+    parser.add_argument("--output", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    engine = None
+    if args.database_url:
+        from sqlalchemy import create_engine
+
+        engine = create_engine(args.database_url)
+
+    knowledge_base = None
+    if Path(args.knowledge_base).exists():
+        knowledge_base = sqlite3.connect(args.knowledge_base)
+
+    processor = None
+    if args.abc_farma:
+        from src.auditoria_icms.data_processing.abc_farma_v2_processor import (
+            ABCFarmaV2Processor,
+        )
+
+        processor = ABCFarmaV2Processor(args.abc_farma)
+        if not processor.carregar_dados():
+            print(f"Falha ao carregar {args.abc_farma}")
+            return 1
+
+    try:
+        if engine is not None:
+            with engine.connect() as conn:
+                index = build_gtin_index(conn, knowledge_base, processor)
+        else:
+            index = build_gtin_index(None, knowledge_base, processor)
+    finally:
+        if knowledge_base is not None:
+            knowledge_base.close()
+
+    path = index.save(args.output)
+    print(f"Índice salvo em {path}")
+    print(json.dumps(index.get_stats(), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Verificação do custo de importação dos pacotes de agentes
+
+Executa `python -X importtime -c "import <módulo>"` em um processo novo para
+cada pacote, compara o tempo cumulativo com o orçamento e garante que
+dependências pesadas (pandas, numpy, langchain, ...) não são importadas
+apenas por importar o pacote.
+
+Uso:
+    python scripts/check_import_time.py
+    python scripts/check_import_time.py --budget-ms 300 --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Módulo -> orçamento de importação (ms)
+DEFAULT_BUDGETS = {
+    "src.agents": 250,
+    "src.auditoria_icms.agents": 250,
+}
+
+# Dependências que não podem ser carregadas apenas pela importação do pacote
+HEAVY_MODULES = [
+    "pandas",
+    "numpy",
+    "langchain",
+    "langgraph",
+    "sentence_transformers",
+    "torch",
+    "faiss",
+]
+
+
+def measure_import(module: str) -> List[Tuple[str, int, int]]:
+    """Retorna (módulo, self_us, cumulativo_us) de cada import realizado."""
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{completed.stderr[-2000:]}")
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def check_module(module: str, budget_ms: float, top: int) -> bool:
+    entries = measure_import(module)
+    cumulative: Dict[str, int] = {name: cum for name, _, cum in entries}
+    total_ms = cumulative.get(module, 0) / 1000
+
+    heavy = sorted({name.split(".")[0] for name in cumulative} & set(HEAVY_MODULES))
+
+    ok = total_ms <= budget_ms and not heavy
+    status = "OK" if ok else "FALHOU"
+    print(f"[{status}] {module}: {total_ms:.1f} ms (orçamento {budget_ms:.0f} ms)")
+
+    if heavy:
+        print(f"    dependências pesadas importadas: {', '.join(heavy)}")
+
+    if not ok or top:
+        slowest = sorted(entries, key=lambda entry: entry[1], reverse=True)
+        for name, self_us, cum_us in slowest[: top or 10]:
+            print(
+                f"    {self_us / 1000:8.1f} ms self "
+                f"{cum_us / 1000:8.1f} ms cum  {name}"
+            )
+
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("modules", nargs="*", help="Módulos a verificar")
+    parser.add_argument(
+        "--budget-ms", type=float, default=None, help="Orçamento para todos os módulos"
+    )
+    parser.add_argument(
+        "--top", type=int, default=0, help="Mostrar os N imports mais lentos"
+    )
+    args = parser.parse_args()
+
+    modules = args.modules or list(DEFAULT_BUDGETS)
+    results = [
+        check_module(
+            module,
+            args.budget_ms or DEFAULT_BUDGETS.get(module, 250),
+            args.top,
+        )
+        for module in modules
+    ]
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,25 +27,68 @@ Classes de Dados:
 - WorkflowStep: Representa um step de workflow
 """
 
-# Importações das classes base
-from .base_agent import BaseAgent, AgentTask, AgentMessage, AgentStatus, TaskPriority
-
-# Importações dos agentes especializados
-from .expansion_agent import ExpansionAgent
-from .aggregation_agent import AggregationAgent
-from .ncm_agent import NCMAgent
-from .cest_agent import CESTAgent
-from .reconciler_agent import ReconcilerAgent
-
-# Importações dos componentes de gerenciamento
-from .agent_manager import AgentManager
-from .agent_coordinator import (
-    AgentCoordinator,
-    Workflow,
-    WorkflowStep,
-    WorkflowStatus,
-    StepStatus,
-)
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# Carregamento preguiçoso (PEP 562): cada módulo de agente só é importado
+# quando o nome é acessado pela primeira vez
+_LAZY_EXPORTS = {
+    # Classes base
+    "BaseAgent": ".base_agent",
+    "AgentTask": ".base_agent",
+    "AgentMessage": ".base_agent",
+    "AgentStatus": ".base_agent",
+    "TaskPriority": ".base_agent",
+    # Agentes especializados
+    "ExpansionAgent": ".expansion_agent",
+    "AggregationAgent": ".aggregation_agent",
+    "NCMAgent": ".ncm_agent",
+    "CESTAgent": ".cest_agent",
+    "ReconcilerAgent": ".reconciler_agent",
+    # Componentes de gerenciamento
+    "AgentManager": ".agent_manager",
+    "AgentCoordinator": ".agent_coordinator",
+    "Workflow": ".agent_coordinator",
+    "WorkflowStep": ".agent_coordinator",
+    "WorkflowStatus": ".agent_coordinator",
+    "StepStatus": ".agent_coordinator",
+}
+
+if TYPE_CHECKING:
+    from .base_agent import (
+        BaseAgent,
+        AgentTask,
+        AgentMessage,
+        AgentStatus,
+        TaskPriority,
+    )
+    from .expansion_agent import ExpansionAgent
+    from .aggregation_agent import AggregationAgent
+    from .ncm_agent import NCMAgent
+    from .cest_agent import CESTAgent
+    from .reconciler_agent import ReconcilerAgent
+    from .agent_manager import AgentManager
+    from .agent_coordinator import (
+        AgentCoordinator,
+        Workflow,
+        WorkflowStep,
+        WorkflowStatus,
+        StepStatus,
+    )
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 
 # Lista de exportações públicas
 __all__ = [
@@ -83,6 +126,8 @@ DEFAULT_AGENT_CONFIG = {
     "max_retries": 3,
     "cache_size": 1000,
     "enable_metrics": True,
+    "history_size": 1000,
+    "message_history_size": 500,
 }
 
 # Configurações padrão para o gerenciador
@@ -90,6 +135,7 @@ DEFAULT_MANAGER_CONFIG = {
     "health_check_interval": 30,
     "max_retry_attempts": 3,
     "task_timeout": 300,
+    "performance_history_size": 5000,
 }
 
 # Configurações padrão para o coordenador
@@ -97,6 +143,7 @@ DEFAULT_COORDINATOR_CONFIG = {
     "max_concurrent_workflows": 10,
     "default_step_timeout": 300,
     "monitoring_interval": 5,
+    "max_concurrent_steps": 20,
 }
 
 
@@ -110,6 +157,14 @@ def create_audit_agent_system(config: dict = None) -> tuple:
     Returns:
         Tupla contendo (agent_manager, agent_coordinator, agents_dict)
     """
+    from .agent_manager import AgentManager
+    from .agent_coordinator import AgentCoordinator
+    from .expansion_agent import ExpansionAgent
+    from .aggregation_agent import AggregationAgent
+    from .ncm_agent import NCMAgent
+    from .cest_agent import CESTAgent
+    from .reconciler_agent import ReconcilerAgent
+
     config = config or {}
 
     # Criar gerenciador de agentes
@@ -133,7 +188,7 @@ def create_audit_agent_system(config: dict = None) -> tuple:
     return agent_manager, agent_coordinator
 
 
-def _register_default_workflow_templates(coordinator: AgentCoordinator) -> None:
+def _register_default_workflow_templates(coordinator: "AgentCoordinator") -> None:
     """Registra templates de workflow padrão."""
 
     # Template para classificação completa de produto
@@ -272,6 +327,11 @@ async def quick_classify_product(product_description: str, state: str = None) ->
     Returns:
         Resultado da classificação
     """
+    from .base_agent import AgentTask
+    from .expansion_agent import ExpansionAgent
+    from .ncm_agent import NCMAgent
+    from .cest_agent import CESTAgent
+
     # Criar agentes temporários
     expansion_agent = ExpansionAgent()
     ncm_agent = NCMAgent()
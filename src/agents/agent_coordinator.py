@@ -16,7 +16,7 @@ from typing import Any, Dict, List, Optional, Callable
 from datetime import datetime
 from enum import Enum
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import defaultdict, deque
 
 from .base_agent import AgentTask, TaskPriority
 from .agent_manager import AgentManager
@@ -125,9 +125,16 @@ class AgentCoordinator:
         self.max_concurrent_workflows = self.config.get("max_concurrent_workflows", 10)
         self.default_step_timeout = self.config.get("default_step_timeout", 300)
         self.monitoring_interval = self.config.get("monitoring_interval", 5)
+        self.max_concurrent_steps = self.config.get("max_concurrent_steps", 20)
 
         # Estado de execução
         self.running_workflows: Dict[str, asyncio.Task] = {}
+        self.resume_events: Dict[str, asyncio.Event] = {}
+        self.active_steps = 0
+
+        # Orçamento global de steps simultâneos (somando todos os workflows)
+        self.step_budget = asyncio.Semaphore(self.max_concurrent_steps)
+
         self.workflow_metrics = defaultdict(lambda: defaultdict(int))
 
         # Tasks de gerenciamento
@@ -349,6 +356,7 @@ class AgentCoordinator:
 
         workflow = self.workflows[workflow_id]
         workflow.status = WorkflowStatus.PAUSED
+        self._get_resume_event(workflow_id).clear()
 
         self.logger.info(f"Workflow pausado: {workflow_id}")
 
@@ -368,6 +376,7 @@ class AgentCoordinator:
             raise RuntimeError(f"Workflow não está pausado: {workflow_id}")
 
         workflow.status = WorkflowStatus.RUNNING
+        self._get_resume_event(workflow_id).set()
 
         self.logger.info(f"Workflow resumido: {workflow_id}")
 
@@ -509,6 +518,8 @@ class AgentCoordinator:
                 "current_usage": running_workflows,
                 "usage_percentage": (running_workflows / self.max_concurrent_workflows)
                 * 100,
+                "concurrent_steps_limit": self.max_concurrent_steps,
+                "active_steps": self.active_steps,
             },
         }
 
@@ -517,7 +528,8 @@ class AgentCoordinator:
     async def _execute_workflow_internal(self, workflow: Workflow) -> None:
         """Execução interna de um workflow."""
         try:
-            workflow.status = WorkflowStatus.RUNNING
+            if workflow.status != WorkflowStatus.PAUSED:
+                workflow.status = WorkflowStatus.RUNNING
             workflow.started_at = datetime.now()
 
             self.logger.info(f"Iniciando execução do workflow: {workflow.id}")
@@ -558,85 +570,159 @@ class AgentCoordinator:
             # Remover do registry de execução
             if workflow.id in self.running_workflows:
                 del self.running_workflows[workflow.id]
+            self.resume_events.pop(workflow.id, None)
 
     async def _execute_workflow_steps(self, workflow: Workflow) -> None:
-        """Executa os steps do workflow."""
-        completed_steps = set()
+        """
+        Executa os steps do workflow com escalonamento orientado a eventos.
+
+        Cada step mantém um contador de dependências pendentes. Quando um step
+        termina, os contadores dos dependentes são decrementados e os que
+        chegam a zero são disparados imediatamente, sem aguardar os demais
+        steps em execução.
+        """
+        steps_by_id = {step.id: step for step in workflow.steps}
+        pending_counts, dependents = self._build_dependency_graph(workflow)
+        resume_event = self._get_resume_event(workflow.id)
         semaphore = asyncio.Semaphore(workflow.max_parallel_steps)
+        finished: asyncio.Queue = asyncio.Queue()
+        in_flight: Dict[str, asyncio.Task] = {}
 
-        while True:
-            # Verificar se workflow foi pausado
-            if workflow.status == WorkflowStatus.PAUSED:
-                await asyncio.sleep(1)
-                continue
+        ready = deque(
+            step_id for step_id, count in pending_counts.items() if count == 0
+        )
 
-            # Encontrar steps prontos para execução
-            ready_steps = self._find_ready_steps(workflow, completed_steps)
-
-            if not ready_steps:
-                # Verificar se todos os steps foram processados
-                pending_steps = [
-                    s
-                    for s in workflow.steps
-                    if s.status in [StepStatus.WAITING, StepStatus.RUNNING]
-                ]
-                if not pending_steps:
-                    break
+        try:
+            while True:
+                while ready:
+                    step = steps_by_id[ready.popleft()]
+
+                    # Verificar condição se especificada
+                    if step.condition and not step.condition(workflow.context):
+                        step.status = StepStatus.SKIPPED
+                        ready.extend(
+                            self._release_dependents(
+                                step.id, pending_counts, dependents
+                            )
+                        )
+                        continue
 
-                # Aguardar um pouco antes de verificar novamente
-                await asyncio.sleep(0.1)
-                continue
+                    in_flight[step.id] = asyncio.create_task(
+                        self._run_scheduled_step(
+                            semaphore, resume_event, workflow, step, finished
+                        )
+                    )
 
-            # Executar steps em paralelo
-            tasks = []
-            for step in ready_steps:
-                task = asyncio.create_task(
-                    self._execute_step_with_semaphore(semaphore, workflow, step)
+                if not in_flight:
+                    break
+
+                # Aguardar o próximo step concluído (qualquer um)
+                step_id = await finished.get()
+                in_flight.pop(step_id, None)
+                ready.extend(
+                    self._release_dependents(step_id, pending_counts, dependents)
                 )
-                tasks.append(task)
-
-            # Aguardar conclusão dos steps
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Atualizar lista de steps completados
-            for step in workflow.steps:
-                if step.status in [
-                    StepStatus.COMPLETED,
-                    StepStatus.FAILED,
-                    StepStatus.SKIPPED,
-                ]:
-                    completed_steps.add(step.id)
-
-    def _find_ready_steps(
-        self, workflow: Workflow, completed_steps: set
-    ) -> List[WorkflowStep]:
-        """Encontra steps prontos para execução."""
-        ready_steps = []
+
+        finally:
+            for task in in_flight.values():
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight.values(), return_exceptions=True)
+
+        # Steps que nunca ficaram prontos: ciclo ou dependência inexistente
+        for step in workflow.steps:
+            if step.status == StepStatus.WAITING:
+                step.status = StepStatus.FAILED
+                step.error = "Dependências não resolvidas (ciclo ou step inexistente)"
+                step.completed_at = datetime.now()
+                self.logger.error(f"Step {step.id} não pôde ser agendado: {step.error}")
+
+    def _build_dependency_graph(self, workflow: Workflow) -> tuple:
+        """
+        Monta os contadores de dependências pendentes e o mapa de dependentes.
+
+        Steps que já estão em estado terminal não são reagendados e não contam
+        como dependência pendente. Dependências para steps inexistentes nunca
+        são liberadas.
+        """
+        steps_by_id = {step.id: step for step in workflow.steps}
+        pending_counts: Dict[str, int] = {}
+        dependents: Dict[str, List[str]] = defaultdict(list)
 
         for step in workflow.steps:
             if step.status != StepStatus.WAITING:
                 continue
 
-            # Verificar se todas as dependências foram completadas
-            dependencies_met = all(dep in completed_steps for dep in step.dependencies)
+            count = 0
+            for dep in step.dependencies:
+                dep_step = steps_by_id.get(dep)
+                if dep_step is None:
+                    count += 1
+                elif dep_step.status in [StepStatus.WAITING, StepStatus.RUNNING]:
+                    count += 1
+                    dependents[dep].append(step.id)
+
+            pending_counts[step.id] = count
 
-            if dependencies_met:
-                # Verificar condição se especificada
-                if step.condition and not step.condition(workflow.context):
-                    step.status = StepStatus.SKIPPED
-                    continue
+        return pending_counts, dependents
+
+    def _release_dependents(
+        self,
+        step_id: str,
+        pending_counts: Dict[str, int],
+        dependents: Dict[str, List[str]],
+    ) -> List[str]:
+        """Decrementa os dependentes de um step e retorna os que ficaram prontos."""
+        newly_ready = []
 
-                ready_steps.append(step)
+        for dependent_id in dependents.pop(step_id, []):
+            pending_counts[dependent_id] -= 1
+            if pending_counts[dependent_id] == 0:
+                newly_ready.append(dependent_id)
 
-        return ready_steps
+        return newly_ready
 
-    async def _execute_step_with_semaphore(
-        self, semaphore: asyncio.Semaphore, workflow: Workflow, step: WorkflowStep
+    async def _run_scheduled_step(
+        self,
+        semaphore: asyncio.Semaphore,
+        resume_event: asyncio.Event,
+        workflow: Workflow,
+        step: WorkflowStep,
+        finished: asyncio.Queue,
     ) -> None:
-        """Executa um step com controle de concorrência."""
-        async with semaphore:
-            await self._execute_step(workflow, step)
+        """Executa um step respeitando pausa, limite do workflow e orçamento global."""
+        try:
+            async with semaphore:
+                await resume_event.wait()
+                async with self.step_budget:
+                    self.active_steps += 1
+                    try:
+                        await self._execute_step(workflow, step)
+                    finally:
+                        self.active_steps -= 1
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            step.status = StepStatus.FAILED
+            step.error = f"Erro no agendamento do step {step.id}: {str(e)}"
+            step.completed_at = datetime.now()
+            self.logger.error(step.error)
+
+        finally:
+            finished.put_nowait(step.id)
+
+    def _get_resume_event(self, workflow_id: str) -> asyncio.Event:
+        """Obtém o evento de continuação do workflow (setado = não pausado)."""
+        event = self.resume_events.get(workflow_id)
+        if event is None:
+            event = asyncio.Event()
+            workflow = self.workflows.get(workflow_id)
+            if workflow is None or workflow.status != WorkflowStatus.PAUSED:
+                event.set()
+            self.resume_events[workflow_id] = event
+        return event
 
     async def _execute_step(self, workflow: Workflow, step: WorkflowStep) -> None:
         """Executa um step individual."""
@@ -654,7 +740,7 @@ class AgentCoordinator:
 
                 # Criar tarefa
                 task = AgentTask(
-                    type=step.task_type, data=task_data, priority=TaskPriority.NORMAL
+                    type=step.task_type, data=task_data, priority=TaskPriority.MEDIUM
                 )
 
                 # Executar tarefa no agente
@@ -17,6 +17,11 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 
 from .base_agent import BaseAgent, AgentTask, AgentStatus
+from ..auditoria_icms.core.telemetry import (
+    PerformanceRecord,
+    RingBuffer,
+    StreamingStats,
+)
 
 
 class AgentManager:
@@ -48,10 +53,18 @@ class AgentManager:
         self.health_check_interval = self.config.get("health_check_interval", 30)
         self.max_retry_attempts = self.config.get("max_retry_attempts", 3)
         self.task_timeout = self.config.get("task_timeout", 300)
+        self.performance_history_size = self.config.get(
+            "performance_history_size", 5000
+        )
 
         # Métricas e monitoramento
         self.metrics = defaultdict(lambda: defaultdict(int))
-        self.performance_history = defaultdict(list)
+        self.performance_history: Dict[str, RingBuffer] = defaultdict(
+            lambda: RingBuffer(self.performance_history_size)
+        )
+        self.response_time_stats: Dict[str, StreamingStats] = defaultdict(
+            StreamingStats
+        )
         self.health_status = {}
 
         # Tasks de gerenciamento
@@ -146,7 +159,8 @@ class AgentManager:
 
         # Inicializar métricas
         self.metrics[agent_name] = defaultdict(int)
-        self.performance_history[agent_name] = []
+        self.performance_history[agent_name] = RingBuffer(self.performance_history_size)
+        self.response_time_stats[agent_name] = StreamingStats()
 
         self.logger.info(f"Agente criado: {agent_name} (tipo: {agent_type})")
         return agent_name
@@ -214,6 +228,7 @@ class AgentManager:
         del self.health_status[agent_name]
         del self.metrics[agent_name]
         del self.performance_history[agent_name]
+        self.response_time_stats.pop(agent_name, None)
 
         self.logger.info(f"Agente removido: {agent_name}")
 
@@ -395,16 +410,11 @@ class AgentManager:
             else 0
         )
 
-        # Calcular tempo médio de resposta
-        all_response_times = []
-        for agent_name in self.performance_history:
-            all_response_times.extend(
-                [p["execution_time"] for p in self.performance_history[agent_name]]
-            )
-
+        # Calcular tempo médio de resposta (agregados em fluxo)
+        response_count = sum(s.count for s in self.response_time_stats.values())
         avg_response_time = (
-            sum(all_response_times) / len(all_response_times)
-            if all_response_times
+            sum(s.total for s in self.response_time_stats.values()) / response_count
+            if response_count
             else 0
         )
 
@@ -624,16 +634,11 @@ class AgentManager:
 
     async def _cleanup_old_data(self) -> None:
         """Remove dados antigos para evitar uso excessivo de memória."""
-        cutoff_time = datetime.now() - timedelta(hours=24)
+        cutoff = (datetime.now() - timedelta(hours=24)).timestamp()
 
-        # Limpar histórico de performance antigo
-        for agent_name in self.performance_history:
-            history = self.performance_history[agent_name]
-            self.performance_history[agent_name] = [
-                entry
-                for entry in history
-                if datetime.fromisoformat(entry["timestamp"]) > cutoff_time
-            ]
+        # Limpar histórico de performance antigo (registros em ordem cronológica)
+        for history in self.performance_history.values():
+            history.drop_while(lambda record: record.timestamp <= cutoff)
 
     async def _record_task_success(
         self, agent_name: str, task_type: str, execution_time: float
@@ -644,13 +649,9 @@ class AgentManager:
 
         # Adicionar ao histórico de performance
         self.performance_history[agent_name].append(
-            {
-                "timestamp": datetime.now().isoformat(),
-                "task_type": task_type,
-                "execution_time": execution_time,
-                "status": "success",
-            }
+            PerformanceRecord(task_type, execution_time, success=True)
         )
+        self.response_time_stats[agent_name].add(execution_time)
 
     async def _record_task_failure(
         self, agent_name: str, task_type: str, execution_time: float, error: str
@@ -661,14 +662,9 @@ class AgentManager:
 
         # Adicionar ao histórico de performance
         self.performance_history[agent_name].append(
-            {
-                "timestamp": datetime.now().isoformat(),
-                "task_type": task_type,
-                "execution_time": execution_time,
-                "status": "failed",
-                "error": error,
-            }
+            PerformanceRecord(task_type, execution_time, success=False, error=error)
         )
+        self.response_time_stats[agent_name].add(execution_time)
 
     async def _record_task_timeout(self, agent_name: str, task_type: str) -> None:
         """Registra timeout de uma tarefa."""
@@ -682,20 +678,14 @@ class AgentManager:
         if not history:
             return {"status": "no_data"}
 
-        recent_history = [
-            entry
-            for entry in history
-            if datetime.fromisoformat(entry["timestamp"])
-            > datetime.now() - timedelta(hours=1)
-        ]
+        cutoff = (datetime.now() - timedelta(hours=1)).timestamp()
+        recent_history = [record for record in history if record.timestamp > cutoff]
 
         if not recent_history:
             return {"status": "no_recent_data"}
 
-        execution_times = [entry["execution_time"] for entry in recent_history]
-        success_count = len(
-            [entry for entry in recent_history if entry["status"] == "success"]
-        )
+        execution_times = [record.execution_time for record in recent_history]
+        success_count = len([record for record in recent_history if record.success])
 
         return {
             "recent_tasks": len(recent_history),
@@ -703,6 +693,7 @@ class AgentManager:
             "avg_execution_time": sum(execution_times) / len(execution_times),
             "min_execution_time": min(execution_times),
             "max_execution_time": max(execution_times),
+            "all_time": self.response_time_stats[agent_name].to_dict(),
         }
 
     def _get_health_summary(self) -> Dict[str, Any]:
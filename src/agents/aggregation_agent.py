@@ -10,13 +10,20 @@ Este agente é responsável por:
 - Detectar padrões em conjuntos de dados
 """
 
-import statistics
+from __future__ import annotations
+
 from collections import defaultdict, Counter
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from datetime import datetime
 
 from .base_agent import BaseAgent, AgentTask
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# numpy/pandas são importados nos métodos que os usam: importar o pacote de
+# agentes não deve pagar o custo dessas bibliotecas
+
 
 class AggregationAgent(BaseAgent):
     """
@@ -165,12 +172,15 @@ class AggregationAgent(BaseAgent):
         )
         return result
 
-    async def _aggregate_statistics(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _aggregate_statistics(
+        self, data: Dict[str, Any], frame: Optional[pd.DataFrame] = None
+    ) -> Dict[str, Any]:
         """
         Agrega estatísticas de um conjunto de dados.
 
         Args:
             data: Dados para agregação estatística
+            frame: Dataset já convertido para formato colunar (opcional)
 
         Returns:
             Estatísticas agregadas
@@ -181,10 +191,13 @@ class AggregationAgent(BaseAgent):
 
         self.logger.info(f"Agregando estatísticas para {len(dataset)} registros")
 
+        if frame is None:
+            frame = self._to_frame(dataset)
+
         if group_by:
-            stats = await self._grouped_statistics(dataset, metrics, group_by)
+            stats = await self._grouped_statistics(dataset, frame, metrics, group_by)
         else:
-            stats = await self._overall_statistics(dataset, metrics)
+            stats = await self._overall_statistics(dataset, frame, metrics)
 
         # Calcular métricas adicionais
         additional_metrics = self._calculate_additional_metrics(dataset)
@@ -194,7 +207,7 @@ class AggregationAgent(BaseAgent):
             "additional_metrics": additional_metrics,
             "dataset_summary": {
                 "total_records": len(dataset),
-                "data_types": self._analyze_data_types(dataset),
+                "data_types": self._analyze_data_types(frame),
                 "completeness": self._calculate_completeness(dataset),
             },
             "confidence_level": self.config["statistical_confidence"],
@@ -202,12 +215,15 @@ class AggregationAgent(BaseAgent):
 
         return result
 
-    async def _detect_patterns(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _detect_patterns(
+        self, data: Dict[str, Any], frame: Optional[pd.DataFrame] = None
+    ) -> Dict[str, Any]:
         """
         Detecta padrões nos dados.
 
         Args:
             data: Dados para detecção de padrões
+            frame: Dataset já convertido para formato colunar (opcional)
 
         Returns:
             Padrões detectados
@@ -227,7 +243,9 @@ class AggregationAgent(BaseAgent):
             elif pattern_type == "sequence":
                 patterns = self._detect_sequence_patterns(dataset)
             elif pattern_type == "correlation":
-                patterns = self._detect_correlation_patterns(dataset)
+                if frame is None:
+                    frame = self._to_frame(dataset)
+                patterns = self._detect_correlation_patterns(dataset, frame)
             else:
                 continue
 
@@ -268,6 +286,9 @@ class AggregationAgent(BaseAgent):
         # Componentes do relatório
         report_sections = {}
 
+        # Conversão colunar única, compartilhada pelas seções abaixo
+        frame = self._to_frame(dataset)
+
         # Seção de resumo executivo
         report_sections["executive_summary"] = self._generate_executive_summary(dataset)
 
@@ -276,22 +297,25 @@ class AggregationAgent(BaseAgent):
             {
                 "dataset": dataset,
                 "metrics": ["count", "mean", "median", "std", "min", "max"],
-            }
+            },
+            frame,
         )
 
         # Padrões detectados
         report_sections["patterns"] = await self._detect_patterns(
-            {"dataset": dataset, "pattern_types": ["frequency", "correlation"]}
+            {"dataset": dataset, "pattern_types": ["frequency", "correlation"]}, frame
         )
 
         # Análise de tendências (se habilitada)
         if self.config["enable_trend_analysis"]:
-            report_sections["trends"] = await self._analyze_trends({"dataset": dataset})
+            report_sections["trends"] = await self._analyze_trends(
+                {"dataset": dataset}, frame
+            )
 
         # Detecção de anomalias (se habilitada)
         if self.config["enable_anomaly_detection"]:
             report_sections["anomalies"] = await self._detect_anomalies(
-                {"dataset": dataset}
+                {"dataset": dataset}, frame
             )
 
         # Recomendações
@@ -314,12 +338,15 @@ class AggregationAgent(BaseAgent):
 
         return result
 
-    async def _analyze_trends(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _analyze_trends(
+        self, data: Dict[str, Any], frame: Optional[pd.DataFrame] = None
+    ) -> Dict[str, Any]:
         """
         Analisa tendências nos dados.
 
         Args:
             data: Dados para análise de tendências
+            frame: Dataset já convertido para formato colunar (opcional)
 
         Returns:
             Análise de tendências
@@ -335,7 +362,9 @@ class AggregationAgent(BaseAgent):
         trends = {}
 
         # Agrupar dados por período
-        time_series = self._create_time_series(dataset, time_field, value_fields)
+        if frame is None:
+            frame = self._to_frame(dataset)
+        time_series = self._create_time_series(dataset, frame, time_field, value_fields)
 
         for field, series in time_series.items():
             trend_analysis = self._calculate_trend(series)
@@ -362,12 +391,15 @@ class AggregationAgent(BaseAgent):
 
         return result
 
-    async def _detect_anomalies(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _detect_anomalies(
+        self, data: Dict[str, Any], frame: Optional[pd.DataFrame] = None
+    ) -> Dict[str, Any]:
         """
         Detecta anomalias nos dados.
 
         Args:
             data: Dados para detecção de anomalias
+            frame: Dataset já convertido para formato colunar (opcional)
 
         Returns:
             Anomalias detectadas
@@ -380,19 +412,23 @@ class AggregationAgent(BaseAgent):
         anomalies = []
 
         # Detectar anomalias numéricas
-        numeric_anomalies = self._detect_numeric_anomalies(dataset, threshold)
+        if frame is None:
+            frame = self._to_frame(dataset)
+        numeric_anomalies = self._detect_numeric_anomalies(dataset, frame, threshold)
         anomalies.extend(numeric_anomalies)
 
         # Detectar anomalias categóricas
-        categorical_anomalies = self._detect_categorical_anomalies(dataset)
+        categorical_anomalies = self._detect_categorical_anomalies(dataset, frame)
         anomalies.extend(categorical_anomalies)
 
         # Detectar anomalias temporais
-        temporal_anomalies = self._detect_temporal_anomalies(dataset)
+        temporal_anomalies = self._detect_temporal_anomalies(
+            frame, data.get("time_field", "timestamp")
+        )
         anomalies.extend(temporal_anomalies)
 
         # Classificar anomalias por severidade
-        classified_anomalies = self._classify_anomalies(anomalies)
+        classified_anomalies = self._classify_anomalies(anomalies, threshold)
 
         result = {
             "anomalies": classified_anomalies,
@@ -571,28 +607,55 @@ class AggregationAgent(BaseAgent):
         }
 
     async def _grouped_statistics(
-        self, dataset: List[Dict[str, Any]], metrics: List[str], group_by: str
+        self,
+        dataset: List[Dict[str, Any]],
+        frame: pd.DataFrame,
+        metrics: List[str],
+        group_by: str,
     ) -> Dict[str, Any]:
-        """Calcula estatísticas agrupadas."""
-        groups = defaultdict(list)
+        """Calcula estatísticas agrupadas (groupby vetorizado)."""
+        import numpy as np
 
-        # Agrupar dados
-        for item in dataset:
-            group_value = item.get(group_by)
-            if group_value is not None:
-                groups[group_value].append(item)
+        if frame.empty or group_by not in frame.columns:
+            return {}
+
+        numeric_fields = [
+            f for f in self._find_numeric_fields(dataset) if f != group_by
+        ]
+        numeric = self._numeric_columns(frame, numeric_fields)
+        numeric[group_by] = frame[group_by]
+
+        grouped = numeric.groupby(group_by, sort=False, dropna=True)
+        group_sizes = grouped.size()
+        aggregations = (
+            grouped[numeric_fields].agg(
+                ["count", "mean", "median", "std", "min", "max"]
+            )
+            if numeric_fields
+            else None
+        )
 
-        # Calcular estatísticas para cada grupo
         grouped_stats = {}
-        for group, items in groups.items():
-            grouped_stats[group] = await self._overall_statistics(items, metrics)
+        for group, size in group_sizes.items():
+            group_key = group.item() if isinstance(group, np.generic) else group
+            stats = {}
+            if "count" in metrics:
+                stats["count"] = int(size)
+
+            for field in numeric_fields:
+                row = aggregations.loc[group, field]
+                field_stats = self._field_stats_from_aggregates(row, metrics)
+                if field_stats is not None:
+                    stats[field] = field_stats
+
+            grouped_stats[group_key] = stats
 
         return grouped_stats
 
     async def _overall_statistics(
-        self, dataset: List[Dict[str, Any]], metrics: List[str]
+        self, dataset: List[Dict[str, Any]], frame: pd.DataFrame, metrics: List[str]
     ) -> Dict[str, Any]:
-        """Calcula estatísticas gerais."""
+        """Calcula estatísticas gerais (colunar)."""
         stats = {}
 
         if "count" in metrics:
@@ -600,31 +663,70 @@ class AggregationAgent(BaseAgent):
 
         # Encontrar campos numéricos
         numeric_fields = self._find_numeric_fields(dataset)
+        if not numeric_fields:
+            return stats
+
+        numeric = self._numeric_columns(frame, numeric_fields)
+        aggregations = numeric.agg(["count", "mean", "median", "std", "min", "max"])
 
         for field in numeric_fields:
-            values = [
-                item.get(field) for item in dataset if item.get(field) is not None
-            ]
+            field_stats = self._field_stats_from_aggregates(
+                aggregations[field], metrics
+            )
+            if field_stats is not None:
+                stats[field] = field_stats
 
-            if not values:
-                continue
+        return stats
 
-            field_stats = {}
+    def _field_stats_from_aggregates(
+        self, aggregates: pd.Series, metrics: List[str]
+    ) -> Optional[Dict[str, float]]:
+        """Converte agregados de uma coluna no formato de saída do agente."""
+        count = int(aggregates["count"])
+        if count == 0:
+            return None
+
+        field_stats = {}
+        if "mean" in metrics:
+            field_stats["mean"] = float(aggregates["mean"])
+        if "median" in metrics:
+            field_stats["median"] = float(aggregates["median"])
+        if "std" in metrics and count > 1:
+            field_stats["std"] = float(aggregates["std"])
+        if "min" in metrics:
+            field_stats["min"] = float(aggregates["min"])
+        if "max" in metrics:
+            field_stats["max"] = float(aggregates["max"])
+
+        return field_stats
+
+    def _to_frame(self, dataset: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Converte o dataset para formato colunar.
 
-            if "mean" in metrics:
-                field_stats["mean"] = statistics.mean(values)
-            if "median" in metrics:
-                field_stats["median"] = statistics.median(values)
-            if "std" in metrics and len(values) > 1:
-                field_stats["std"] = statistics.stdev(values)
-            if "min" in metrics:
-                field_stats["min"] = min(values)
-            if "max" in metrics:
-                field_stats["max"] = max(values)
+        Chamado uma vez por tarefa; o frame é repassado explicitamente às
+        análises que o utilizam.
+        """
+        import pandas as pd
 
-            stats[field] = field_stats
+        return pd.DataFrame.from_records(dataset) if dataset else pd.DataFrame()
 
-        return stats
+    def _numeric_columns(self, frame: pd.DataFrame, fields: List[str]) -> pd.DataFrame:
+        """Seleciona colunas numéricas como float (valores inválidos viram NaN)."""
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                field: pd.to_numeric(frame[field], errors="coerce").astype(float)
+                for field in fields
+                if field in frame.columns
+            },
+            index=frame.index,
+        )
+
+    def _analyze_data_types(self, frame: pd.DataFrame) -> Dict[str, str]:
+        """Identifica o tipo predominante de cada campo."""
+        return {str(column): str(dtype) for column, dtype in frame.dtypes.items()}
 
     def _find_numeric_fields(self, dataset: List[Dict[str, Any]]) -> List[str]:
         """Encontra campos numéricos no dataset."""
@@ -644,10 +746,11 @@ class AggregationAgent(BaseAgent):
         self, dataset: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """Calcula métricas adicionais."""
+        unique_records = len(set(str(item) for item in dataset))
+
         return {
-            "unique_records": len(set(str(item) for item in dataset)),
-            "duplicate_rate": 1
-            - (len(set(str(item) for item in dataset)) / max(1, len(dataset))),
+            "unique_records": unique_records,
+            "duplicate_rate": 1 - (unique_records / max(1, len(dataset))),
             "field_coverage": self._calculate_field_coverage(dataset),
             "data_freshness": self._calculate_data_freshness(dataset),
         }
@@ -781,57 +884,328 @@ class AggregationAgent(BaseAgent):
         return patterns
 
     def _detect_correlation_patterns(
-        self, dataset: List[Dict[str, Any]]
+        self, dataset: List[Dict[str, Any]], frame: pd.DataFrame
     ) -> List[Dict[str, Any]]:
-        """Detecta padrões de correlação."""
+        """Detecta padrões de correlação a partir da matriz de correlação."""
+        import pandas as pd
+
         patterns = []
         numeric_fields = self._find_numeric_fields(dataset)
+        if len(numeric_fields) < 2:
+            return patterns
+
+        matrix = self._calculate_correlation_matrix(frame, numeric_fields)
 
-        # Verificar correlações entre campos numéricos
+        # Verificar correlações entre campos numéricos (triângulo superior)
         for i, field1 in enumerate(numeric_fields):
             for field2 in numeric_fields[i + 1 :]:
-                values1 = [
-                    item.get(field1) for item in dataset if item.get(field1) is not None
-                ]
-                values2 = [
-                    item.get(field2) for item in dataset if item.get(field2) is not None
-                ]
+                correlation = matrix.at[field1, field2]
+                if pd.isna(correlation):
+                    continue
 
-                if len(values1) > 2 and len(values2) > 2:
-                    correlation = self._calculate_correlation(values1, values2)
-
-                    if abs(correlation) > 0.7:  # Correlação forte
-                        pattern = {
-                            "field1": field1,
-                            "field2": field2,
-                            "type": "correlation",
-                            "correlation_coefficient": correlation,
-                            "strength": (
-                                "strong" if abs(correlation) > 0.8 else "moderate"
-                            ),
-                        }
-                        patterns.append(pattern)
+                correlation = float(correlation)
+                if abs(correlation) > 0.7:  # Correlação forte
+                    pattern = {
+                        "field1": field1,
+                        "field2": field2,
+                        "type": "correlation",
+                        "correlation_coefficient": correlation,
+                        "strength": (
+                            "strong" if abs(correlation) > 0.8 else "moderate"
+                        ),
+                    }
+                    patterns.append(pattern)
 
         return patterns
 
-    def _calculate_correlation(
-        self, values1: List[float], values2: List[float]
-    ) -> float:
-        """Calcula correlação simples entre duas listas."""
-        if len(values1) != len(values2) or len(values1) < 2:
-            return 0.0
+    def _calculate_correlation_matrix(
+        self, frame: pd.DataFrame, fields: List[str]
+    ) -> pd.DataFrame:
+        """Calcula a matriz de correlação de Pearson (pares completos, mín. 3)."""
+        numeric = self._numeric_columns(frame, fields)
+        return numeric.corr(method="pearson", min_periods=3)
 
-        mean1 = sum(values1) / len(values1)
-        mean2 = sum(values2) / len(values2)
+    def _detect_numeric_anomalies(
+        self, dataset: List[Dict[str, Any]], frame: pd.DataFrame, threshold: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Detecta outliers numéricos por z-score e por IQR (vetorizado).
 
-        numerator = sum((x - mean1) * (y - mean2) for x, y in zip(values1, values2))
+        Um valor é anômalo se |z| > threshold ou se está fora das cercas
+        [Q1 - 1.5*IQR, Q3 + 1.5*IQR].
+        """
+        import numpy as np
+        import pandas as pd
 
-        sum_sq1 = sum((x - mean1) ** 2 for x in values1)
-        sum_sq2 = sum((y - mean2) ** 2 for y in values2)
+        numeric_fields = self._find_numeric_fields(dataset)
+        if not numeric_fields:
+            return []
 
-        denominator = (sum_sq1 * sum_sq2) ** 0.5
+        numeric = self._numeric_columns(frame, numeric_fields)
+
+        std = numeric.std()
+        z_scores = (numeric - numeric.mean()) / std.where(std > 0)
+        z_mask = z_scores.abs() > threshold
+
+        q1 = numeric.quantile(0.25)
+        q3 = numeric.quantile(0.75)
+        iqr = q3 - q1
+        iqr_mask = (numeric < q1 - 1.5 * iqr) | (numeric > q3 + 1.5 * iqr)
+
+        anomalies = []
+        for field in numeric.columns:
+            flagged = z_mask[field] | iqr_mask[field]
+            for position in np.flatnonzero(flagged.to_numpy()):
+                by_z = bool(z_mask[field].iat[position])
+                by_iqr = bool(iqr_mask[field].iat[position])
+                z_value = z_scores[field].iat[position]
+                anomalies.append(
+                    {
+                        "type": "numeric_outlier",
+                        "field": field,
+                        "record_index": int(position),
+                        "value": float(numeric[field].iat[position]),
+                        "z_score": None if pd.isna(z_value) else float(z_value),
+                        "method": (
+                            "zscore+iqr"
+                            if by_z and by_iqr
+                            else "zscore" if by_z else "iqr"
+                        ),
+                    }
+                )
+
+        return anomalies
+
+    def _detect_categorical_anomalies(
+        self,
+        dataset: List[Dict[str, Any]],
+        frame: pd.DataFrame,
+        rare_threshold: float = 0.01,
+    ) -> List[Dict[str, Any]]:
+        """
+        Detecta categorias raras (frequência relativa < rare_threshold).
+
+        Campos com cardinalidade alta (identificadores, descrições) são
+        ignorados: neles todo valor é raro.
+        """
+        import numpy as np
+
+        anomalies = []
+        for field in self._find_categorical_fields(dataset):
+            if field not in frame.columns:
+                continue
+
+            column = frame[field]
+            counts = column.value_counts(dropna=True)
+            total = int(counts.sum())
+            if total == 0 or len(counts) > total * 0.5:
+                continue
+
+            frequencies = counts / total
+            rare = frequencies[frequencies < rare_threshold]
+            if rare.empty:
+                continue
+
+            flagged = column.isin(rare.index).to_numpy()
+            for position in np.flatnonzero(flagged):
+                value = column.iat[position]
+                anomalies.append(
+                    {
+                        "type": "rare_category",
+                        "field": field,
+                        "record_index": int(position),
+                        "value": value,
+                        "frequency": float(frequencies[value]),
+                    }
+                )
+
+        return anomalies
+
+    def _detect_temporal_anomalies(
+        self, frame: pd.DataFrame, time_field: str = "timestamp"
+    ) -> List[Dict[str, Any]]:
+        """
+        Detecta datas no futuro e intervalos atípicos entre registros
+        consecutivos (acima da cerca superior do IQR dos intervalos).
+        """
+        import numpy as np
+        import pandas as pd
+
+        if time_field not in frame.columns:
+            return []
+
+        times = pd.to_datetime(frame[time_field], errors="coerce", utc=True)
+        valid = times.dropna()
+        if valid.empty:
+            return []
+
+        anomalies = []
+
+        future = np.flatnonzero((times > pd.Timestamp.now(tz="UTC")).to_numpy())
+        for position in future:
+            anomalies.append(
+                {
+                    "type": "future_timestamp",
+                    "field": time_field,
+                    "record_index": int(position),
+                    "value": times.iat[position].isoformat(),
+                }
+            )
+
+        if len(valid) >= 4:
+            ordered = valid.sort_values()
+            gaps = ordered.diff().dt.total_seconds().iloc[1:]
+            q1, q3 = gaps.quantile(0.25), gaps.quantile(0.75)
+            upper = q3 + 1.5 * (q3 - q1)
+            for label, gap in gaps[gaps > upper].items():
+                anomalies.append(
+                    {
+                        "type": "time_gap",
+                        "field": time_field,
+                        "record_index": int(frame.index.get_loc(label)),
+                        "value": ordered.loc[label].isoformat(),
+                        "gap_seconds": float(gap),
+                    }
+                )
+
+        return anomalies
+
+    def _classify_anomalies(
+        self, anomalies: List[Dict[str, Any]], threshold: float
+    ) -> List[Dict[str, Any]]:
+        """Atribui severidade e ordena (high → medium → low)."""
+        order = {"high": 0, "medium": 1, "low": 2}
+        classified = []
+
+        for anomaly in anomalies:
+            anomaly_type = anomaly.get("type")
+            if anomaly_type == "numeric_outlier":
+                z_score = abs(anomaly.get("z_score") or 0.0)
+                if z_score >= 2 * threshold:
+                    severity = "high"
+                elif anomaly.get("method") == "zscore+iqr":
+                    severity = "medium"
+                else:
+                    severity = "low"
+            elif anomaly_type == "future_timestamp":
+                severity = "high"
+            elif anomaly_type == "time_gap":
+                severity = "medium"
+            else:
+                severity = "low"
+
+            classified.append({**anomaly, "severity": severity})
+
+        classified.sort(key=lambda a: order[a["severity"]])
+        return classified
+
+    def _create_time_series(
+        self,
+        dataset: List[Dict[str, Any]],
+        frame: pd.DataFrame,
+        time_field: str,
+        value_fields: List[str],
+    ) -> Dict[str, pd.Series]:
+        """Séries temporais (ordenadas por data) dos campos numéricos."""
+        import pandas as pd
+
+        if time_field not in frame.columns:
+            return {}
+
+        fields = value_fields or [
+            f for f in self._find_numeric_fields(dataset) if f != time_field
+        ]
+        numeric = self._numeric_columns(frame, fields)
+        numeric.index = pd.to_datetime(frame[time_field], errors="coerce", utc=True)
+        numeric = numeric[numeric.index.notna()].sort_index()
+
+        return {field: numeric[field].dropna() for field in numeric.columns}
+
+    def _calculate_trend(self, series: pd.Series) -> Dict[str, Any]:
+        """Tendência linear (mínimos quadrados) sobre o tempo decorrido."""
+        import numpy as np
+
+        points = len(series)
+        if points < 3:
+            return {"direction": "insufficient_data", "points": points}
+
+        elapsed_days = (
+            series.index - series.index[0]
+        ).total_seconds().to_numpy() / 86400
+        values = series.to_numpy()
+        if np.ptp(elapsed_days) == 0:
+            return {"direction": "insufficient_data", "points": points}
+
+        slope, _ = np.polyfit(elapsed_days, values, 1)
+        mean = float(np.mean(values))
+        relative_change = (
+            float(slope * np.ptp(elapsed_days) / abs(mean)) if mean else 0.0
+        )
+
+        if relative_change > 0.05:
+            direction = "up"
+        elif relative_change < -0.05:
+            direction = "down"
+        else:
+            direction = "stable"
+
+        return {
+            "direction": direction,
+            "slope_per_day": float(slope),
+            "relative_change": relative_change,
+            "points": points,
+        }
+
+    def _identify_global_trends(
+        self, trends: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Resume a direção predominante entre os campos analisados."""
+        directions = Counter(
+            t["direction"]
+            for t in trends.values()
+            if t.get("direction") != "insufficient_data"
+        )
+        if not directions:
+            return {"dominant_direction": None, "fields_analyzed": 0}
+
+        dominant, count = directions.most_common(1)[0]
+        return {
+            "dominant_direction": dominant,
+            "agreement": count / sum(directions.values()),
+            "fields_analyzed": sum(directions.values()),
+        }
+
+    def _generate_recommendations(self, dataset: List[Dict[str, Any]]) -> List[str]:
+        """Recomendações a partir da qualidade dos dados."""
+        if not dataset:
+            return ["Nenhum dado disponível para análise"]
+
+        recommendations = []
+
+        completeness = self._calculate_completeness(dataset)
+        if completeness < 0.9:
+            recommendations.append(
+                f"Completude de {completeness:.0%}: preencher campos ausentes"
+            )
+
+        consistency = self._calculate_consistency_metrics(dataset)
+        mixed_fields = [
+            field
+            for field, score in consistency.items()
+            if field != "overall" and score < 1.0
+        ]
+        if mixed_fields:
+            recommendations.append(
+                "Padronizar tipos dos campos: " + ", ".join(sorted(mixed_fields))
+            )
+
+        duplicate_rate = self._calculate_additional_metrics(dataset)["duplicate_rate"]
+        if duplicate_rate > 0.05:
+            recommendations.append(
+                f"Remover registros duplicados ({duplicate_rate:.0%} do total)"
+            )
 
-        return numerator / denominator if denominator != 0 else 0
+        return recommendations
 
     def _calculate_pattern_confidence(
         self, patterns: Dict[str, List[Dict[str, Any]]]
@@ -15,6 +15,8 @@ from enum import Enum
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, field
 
+from ..auditoria_icms.core.telemetry import RingBuffer, StreamingStats, TaskRecord
+
 
 class AgentStatus(Enum):
     """Status possíveis de um agente"""
@@ -85,9 +87,13 @@ class BaseAgent(ABC):
         self.status = AgentStatus.IDLE
         self.tasks_queue: List[AgentTask] = []
         self.current_task: Optional[AgentTask] = None
-        self.completed_tasks: List[AgentTask] = []
-        self.messages_inbox: List[AgentMessage] = []
-        self.messages_outbox: List[AgentMessage] = []
+
+        # Históricos com capacidade fixa (processos de longa duração)
+        history_size = self.config.get("history_size", 1000)
+        message_history_size = self.config.get("message_history_size", 500)
+        self.completed_tasks = RingBuffer(history_size)  # TaskRecord
+        self.messages_inbox = RingBuffer(message_history_size)
+        self.messages_outbox = RingBuffer(message_history_size)
 
         # Configurar logging
         self.logger = logging.getLogger(f"agents.{self.name}")
@@ -101,6 +107,7 @@ class BaseAgent(ABC):
             "last_activity": None,
             "uptime_start": datetime.now(),
         }
+        self.processing_time_stats = StreamingStats()
 
         self.logger.info(f"Agente {self.name} inicializado com ID {self.id}")
 
@@ -179,9 +186,10 @@ class BaseAgent(ABC):
             self.stats["tasks_completed"] += 1
             self.stats["total_processing_time"] += processing_time
             self.stats["last_activity"] = datetime.now()
+            self.processing_time_stats.add(processing_time)
 
-            # Mover para concluídas
-            self.completed_tasks.append(task)
+            # Mover para concluídas (registro compacto, sem payload)
+            self.completed_tasks.append(TaskRecord.from_task(task))
 
             self.logger.info(f"Tarefa {task.id} concluída em {processing_time:.2f}s")
 
@@ -205,7 +213,7 @@ class BaseAgent(ABC):
                     f"Tarefa {task.id} falhou após {task.max_retries} tentativas"
                 )
                 self.stats["tasks_failed"] += 1
-                self.completed_tasks.append(task)
+                self.completed_tasks.append(TaskRecord.from_task(task))
 
             self.status = AgentStatus.ERROR
             raise
@@ -285,6 +293,7 @@ class BaseAgent(ABC):
                     self.stats["total_processing_time"]
                     / max(1, self.stats["tasks_completed"])
                 ),
+                "processing_time": self.processing_time_stats.to_dict(),
             },
         }
 
@@ -298,31 +307,7 @@ class BaseAgent(ABC):
         Returns:
             Lista de tarefas completadas
         """
-        recent_tasks = (
-            self.completed_tasks[-limit:] if limit > 0 else self.completed_tasks
-        )
-
-        return [
-            {
-                "id": task.id,
-                "type": task.type,
-                "priority": task.priority.name,
-                "created_at": task.created_at.isoformat(),
-                "started_at": task.started_at.isoformat() if task.started_at else None,
-                "completed_at": (
-                    task.completed_at.isoformat() if task.completed_at else None
-                ),
-                "processing_time": (
-                    (task.completed_at - task.started_at).total_seconds()
-                    if task.completed_at and task.started_at
-                    else None
-                ),
-                "success": task.error is None,
-                "error": task.error,
-                "retries": task.retries,
-            }
-            for task in recent_tasks
-        ]
+        return [record.to_dict() for record in self.completed_tasks.recent(limit)]
 
     async def start(self):
         """
@@ -10,14 +10,104 @@ Este agente é responsável por:
 - Auditoria de qualidade de dados
 """
 
+import asyncio
 import json
-from typing import Any, Dict, List, Optional, Set
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
 from difflib import SequenceMatcher
 from collections import defaultdict
 import statistics
 
 from .base_agent import BaseAgent, AgentTask
+from .reconciliation_engine import HashJoinReconciler
+
+
+# Campos usados para gerar chaves de blocagem na detecção de duplicatas
+DEFAULT_BLOCKING_FIELDS = {
+    "gtin": ["gtin", "ean", "codigo_barras", "cod_barras", "gtin_ean"],
+    "code": ["codigo", "code", "codigo_produto", "cod_produto", "sku"],
+    "description": ["descricao", "description", "descricao_produto", "nome", "name"],
+}
+
+
+def _record_similarity(
+    record1: Dict, record2: Dict, threshold: Optional[float] = None
+) -> float:
+    """
+    Similaridade média campo a campo (SequenceMatcher) entre dois registros.
+
+    Com `threshold`, interrompe o cálculo assim que o limiar se torna
+    inatingível; o valor retornado nesse caso é apenas um limite superior
+    abaixo do limiar.
+    """
+    pairs = []
+    for field in set(record1.keys()) | set(record2.keys()):
+        value1 = str(record1.get(field, "")).strip().lower()
+        value2 = str(record2.get(field, "")).strip().lower()
+
+        if value1 == "" and value2 == "":
+            continue  # Não considerar campos vazios
+        pairs.append((value1, value2))
+
+    if not pairs:
+        return 0.0
+
+    total = len(pairs)
+    accumulated = 0.0
+
+    for position, (value1, value2) in enumerate(pairs):
+        if value1 == value2:
+            accumulated += 1.0
+        else:
+            accumulated += SequenceMatcher(None, value1, value2).ratio()
+
+        if threshold is not None:
+            remaining = total - position - 1
+            if (accumulated + remaining) / total < threshold:
+                return (accumulated + remaining) / total
+
+    return accumulated / total
+
+
+def _score_candidate_pairs(
+    records: Dict[int, Dict], pairs: List[Tuple[int, int]], threshold: float
+) -> List[Tuple[int, int]]:
+    """Pontua um lote de pares candidatos (executável em processo separado)."""
+    return [
+        (i, j)
+        for i, j in pairs
+        if _record_similarity(records[i], records[j], threshold) >= threshold
+    ]
+
+
+class _UnionFind:
+    """Estrutura union-find (com compressão de caminho) para agrupar duplicatas."""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.rank = [0] * size
+
+    def find(self, item: int) -> int:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.rank[root_a] < self.rank[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        if self.rank[root_a] == self.rank[root_b]:
+            self.rank[root_a] += 1
 
 
 class ReconcilerAgent(BaseAgent):
@@ -46,6 +136,15 @@ class ReconcilerAgent(BaseAgent):
             "validation_strictness": "high",
             "batch_size": 1000,
             "confidence_threshold": 0.8,
+            "duplicate_blocking_fields": DEFAULT_BLOCKING_FIELDS,
+            "duplicate_max_block_size": 500,
+            "duplicate_window_size": 20,
+            "duplicate_workers": os.cpu_count() or 1,
+            "duplicate_parallel_min_pairs": 20000,
+            "reconciliation_memory_budget_rows": 500_000,
+            "reconciliation_partitions": 64,
+            "reconciliation_max_discrepancies": 10000,
+            "reconciliation_spill_dir": None,
             "data_quality_weights": {
                 "completeness": 0.25,
                 "accuracy": 0.30,
@@ -133,6 +232,11 @@ class ReconcilerAgent(BaseAgent):
         """
         Reconcilia múltiplos datasets identificando correspondências e divergências.
 
+        Os datasets podem ser listas ou iteráveis (ex.: cursores, leitores de
+        arquivo); cada um é lido uma única vez pelo hash join. Discrepâncias
+        são emitidas incrementalmente para `on_discrepancy` (se informado) e
+        a lista retornada é limitada por `max_discrepancies`.
+
         Args:
             data: Datasets para reconciliação
 
@@ -142,31 +246,65 @@ class ReconcilerAgent(BaseAgent):
         datasets = data.get("datasets", [])
         reconciliation_keys = data.get("keys", ["id"])
         comparison_fields = data.get("fields", [])
+        on_discrepancy = data.get("on_discrepancy")
+        include_matches = data.get("include_matches", True)
+        max_discrepancies = data.get(
+            "max_discrepancies", self.config["reconciliation_max_discrepancies"]
+        )
 
         self.logger.info(f"Reconciliando {len(datasets)} datasets")
 
         if len(datasets) < 2:
             return {"error": "Pelo menos 2 datasets são necessários para reconciliação"}
 
-        # 1. Preparar dados para reconciliação
-        prepared_datasets = self._prepare_datasets_for_reconciliation(
-            datasets, reconciliation_keys
+        # 1. Hash join em fluxo pela chave composta
+        engine = HashJoinReconciler(
+            keys=reconciliation_keys,
+            fields=comparison_fields,
+            memory_budget_rows=self.config["reconciliation_memory_budget_rows"],
+            partitions=self.config["reconciliation_partitions"],
+            batch_size=self.config["batch_size"],
+            spill_dir=self.config["reconciliation_spill_dir"],
         )
 
-        # 2. Identificar registros correspondentes
-        matches = self._find_record_matches(prepared_datasets, reconciliation_keys)
+        # 2/3. Correspondências e discrepâncias emitidas incrementalmente
+        matches = []
+        discrepancies = []
+        match_count = 0
+        discrepancy_count = 0
 
-        # 3. Detectar discrepâncias
-        discrepancies = self._detect_field_discrepancies(matches, comparison_fields)
+        for match, group_discrepancies in engine.iter_discrepancies(
+            engine.iter_matches(datasets)
+        ):
+            match_count += 1
+            if include_matches:
+                matches.append(match)
+
+            for discrepancy in group_discrepancies:
+                discrepancy_count += 1
+                if on_discrepancy is not None:
+                    on_discrepancy(discrepancy)
+                if max_discrepancies is None or len(discrepancies) < max_discrepancies:
+                    discrepancies.append(discrepancy)
+
+            # Ceder o event loop periodicamente em reconciliações longas
+            if match_count % engine.batch_size == 0:
+                await asyncio.sleep(0)
+
+        dataset_summaries = [
+            {"id": dataset_id, "record_count": count}
+            for dataset_id, count in engine.record_counts.items()
+        ]
 
         # 4. Calcular estatísticas de reconciliação
         reconciliation_stats = self._calculate_reconciliation_statistics(
-            prepared_datasets, matches, discrepancies
+            dataset_summaries, match_count, discrepancy_count
         )
+        reconciliation_stats["spilled_to_disk"] = engine.spilled
 
         # 5. Gerar relatório de reconciliação
         reconciliation_report = self._generate_reconciliation_report(
-            prepared_datasets, matches, discrepancies, reconciliation_stats
+            dataset_summaries, matches, discrepancies, reconciliation_stats
         )
 
         # 6. Sugerir ações corretivas
@@ -183,6 +321,7 @@ class ReconcilerAgent(BaseAgent):
             },
             "matches": matches,
             "discrepancies": discrepancies,
+            "discrepancies_truncated": discrepancy_count > len(discrepancies),
             "statistics": reconciliation_stats,
             "report": reconciliation_report,
             "corrective_actions": corrective_actions,
@@ -192,7 +331,7 @@ class ReconcilerAgent(BaseAgent):
         }
 
         self.logger.info(
-            f"Reconciliação concluída: {len(matches)} correspondências, {len(discrepancies)} discrepâncias"
+            f"Reconciliação concluída: {match_count} correspondências, {discrepancy_count} discrepâncias"
         )
         return result
 
@@ -594,74 +733,6 @@ class ReconcilerAgent(BaseAgent):
 
     # Métodos auxiliares principais
 
-    def _prepare_datasets_for_reconciliation(
-        self, datasets: List[List[Dict]], keys: List[str]
-    ) -> List[Dict]:
-        """Prepara datasets para reconciliação."""
-        prepared = []
-
-        for i, dataset in enumerate(datasets):
-            prepared.append(
-                {
-                    "id": f"dataset_{i}",
-                    "data": dataset,
-                    "indexed_data": self._create_index(dataset, keys),
-                    "record_count": len(dataset),
-                }
-            )
-
-        return prepared
-
-    def _create_index(self, dataset: List[Dict], keys: List[str]) -> Dict:
-        """Cria índice para otimizar comparações."""
-        index = {}
-
-        for record in dataset:
-            # Criar chave composta
-            key_values = []
-            for key in keys:
-                value = record.get(key, "")
-                key_values.append(str(value).strip().lower())
-
-            composite_key = "|".join(key_values)
-
-            if composite_key not in index:
-                index[composite_key] = []
-            index[composite_key].append(record)
-
-        return index
-
-    def _find_record_matches(
-        self, prepared_datasets: List[Dict], keys: List[str]
-    ) -> List[Dict]:
-        """Encontra correspondências entre registros."""
-        matches = []
-
-        if len(prepared_datasets) < 2:
-            return matches
-
-        # Comparar primeiro dataset com os demais
-        base_dataset = prepared_datasets[0]
-
-        for base_key, base_records in base_dataset["indexed_data"].items():
-            match_group = {
-                "key": base_key,
-                "records": {base_dataset["id"]: base_records},
-            }
-
-            # Procurar correspondências nos outros datasets
-            for other_dataset in prepared_datasets[1:]:
-                if base_key in other_dataset["indexed_data"]:
-                    match_group["records"][other_dataset["id"]] = other_dataset[
-                        "indexed_data"
-                    ][base_key]
-
-            # Só adicionar se há correspondência em pelo menos 2 datasets
-            if len(match_group["records"]) >= 2:
-                matches.append(match_group)
-
-        return matches
-
     def _detect_format_inconsistencies(self, dataset: List[Dict]) -> List[Dict]:
         """Detecta inconsistências de formato."""
         inconsistencies = []
@@ -1192,54 +1263,185 @@ class ReconcilerAgent(BaseAgent):
     def _detect_duplicate_groups(
         self, dataset: List[Dict], threshold: float
     ) -> List[List[Dict]]:
-        """Detecta grupos de registros duplicados."""
-        duplicate_groups = []
-        processed_indices = set()
-
-        for i, record1 in enumerate(dataset):
-            if i in processed_indices:
-                continue
+        """
+        Detecta grupos de registros duplicados.
 
-            group = [record1]
-            processed_indices.add(i)
+        Em vez de comparar todos os pares, gera pares candidatos dentro de
+        blocos (GTIN, código normalizado e assinatura de tokens da descrição),
+        pontua os candidatos (em paralelo para volumes grandes) e agrupa os
+        pares aprovados com union-find.
+        """
+        if len(dataset) < 2:
+            return []
 
-            for j, record2 in enumerate(dataset[i + 1 :], i + 1):
-                if j in processed_indices:
-                    continue
+        blocks = self._build_blocking_index(dataset)
 
-                similarity = self._calculate_record_similarity(record1, record2)
+        if blocks:
+            candidate_pairs = self._generate_candidate_pairs(dataset, blocks)
+        else:
+            # Sem campos de blocagem: comparação exaustiva
+            self.logger.warning(
+                "Nenhum campo de blocagem encontrado; usando comparação exaustiva"
+            )
+            candidate_pairs = {
+                (i, j) for i in range(len(dataset)) for j in range(i + 1, len(dataset))
+            }
 
-                if similarity >= threshold:
-                    group.append(record2)
-                    processed_indices.add(j)
+        matched_pairs = self._score_candidate_pairs(
+            dataset, sorted(candidate_pairs), threshold
+        )
 
-            # Só adicionar se há duplicatas
-            if len(group) > 1:
-                duplicate_groups.append(group)
+        # Agrupar pares aprovados (fechamento transitivo)
+        union_find = _UnionFind(len(dataset))
+        for i, j in matched_pairs:
+            union_find.union(i, j)
 
-        return duplicate_groups
+        members = defaultdict(list)
+        for index in range(len(dataset)):
+            members[union_find.find(index)].append(index)
 
-    def _calculate_record_similarity(self, record1: Dict, record2: Dict) -> float:
-        """Calcula similaridade entre dois registros."""
-        all_fields = set(record1.keys()) | set(record2.keys())
+        duplicate_groups = [
+            [dataset[index] for index in indices]
+            for indices in sorted(members.values(), key=lambda group: group[0])
+            if len(indices) > 1
+        ]
 
-        if not all_fields:
-            return 0.0
+        self.logger.info(
+            f"Deduplicação: {len(candidate_pairs)} pares candidatos, "
+            f"{len(matched_pairs)} pares aprovados, {len(duplicate_groups)} grupos"
+        )
+        return duplicate_groups
 
-        similarity_scores = []
+    def _build_blocking_index(self, dataset: List[Dict]) -> Dict[str, List[int]]:
+        """Agrupa índices de registros por chave de blocagem."""
+        blocking_fields = self.config.get(
+            "duplicate_blocking_fields", DEFAULT_BLOCKING_FIELDS
+        )
+        blocks = defaultdict(list)
+
+        for index, record in enumerate(dataset):
+            for key in self._blocking_keys(record, blocking_fields):
+                blocks[key].append(index)
+
+        # Blocos unitários não geram pares
+        return {key: indices for key, indices in blocks.items() if len(indices) > 1}
+
+    def _blocking_keys(
+        self, record: Dict, blocking_fields: Dict[str, List[str]]
+    ) -> Iterable[str]:
+        """Gera as chaves de blocagem de um registro."""
+        for field in blocking_fields.get("gtin", []):
+            digits = re.sub(r"\D", "", str(record.get(field) or ""))
+            if len(digits) in (8, 12, 13, 14):
+                yield f"gtin:{digits.lstrip('0')}"
+                break
+
+        for field in blocking_fields.get("code", []):
+            code = re.sub(r"[^0-9A-Za-z]", "", str(record.get(field) or "")).upper()
+            code = code.lstrip("0")
+            if code:
+                yield f"code:{code}"
+                break
+
+        for field in blocking_fields.get("description", []):
+            signature = self._description_signature(record.get(field))
+            if signature:
+                yield f"desc:{signature}"
+                break
+
+    def _description_signature(self, value: Any) -> str:
+        """Assinatura da descrição: tokens normalizados, únicos e ordenados."""
+        if not value:
+            return ""
+
+        text = unicodedata.normalize("NFKD", str(value).lower())
+        text = "".join(char for char in text if not unicodedata.combining(char))
+        tokens = re.findall(r"[a-z0-9]+", text)
+
+        return " ".join(sorted(set(tokens)))
+
+    def _generate_candidate_pairs(
+        self, dataset: List[Dict], blocks: Dict[str, List[int]]
+    ) -> Set[Tuple[int, int]]:
+        """
+        Gera pares candidatos dentro de cada bloco.
 
-        for field in all_fields:
-            value1 = str(record1.get(field, "")).strip().lower()
-            value2 = str(record2.get(field, "")).strip().lower()
+        Blocos maiores que `duplicate_max_block_size` usam vizinhança ordenada
+        (cada registro é comparado apenas com os próximos `duplicate_window_size`
+        registros ordenados pela descrição) para evitar custo quadrático.
+        """
+        max_block_size = self.config.get("duplicate_max_block_size", 500)
+        window_size = self.config.get("duplicate_window_size", 20)
+        description_fields = self.config.get(
+            "duplicate_blocking_fields", DEFAULT_BLOCKING_FIELDS
+        ).get("description", [])
+
+        pairs = set()
+
+        for indices in blocks.values():
+            if len(indices) <= max_block_size:
+                for position, i in enumerate(indices):
+                    for j in indices[position + 1 :]:
+                        pairs.add((i, j) if i < j else (j, i))
+                continue
 
-            if value1 == "" and value2 == "":
-                continue  # Não considerar campos vazios
+            ordered = sorted(
+                indices,
+                key=lambda index: next(
+                    (
+                        self._description_signature(dataset[index].get(field))
+                        for field in description_fields
+                        if dataset[index].get(field)
+                    ),
+                    "",
+                ),
+            )
+            for position, i in enumerate(ordered):
+                for j in ordered[position + 1 : position + 1 + window_size]:
+                    pairs.add((i, j) if i < j else (j, i))
+
+        return pairs
+
+    def _score_candidate_pairs(
+        self, dataset: List[Dict], pairs: List[Tuple[int, int]], threshold: float
+    ) -> List[Tuple[int, int]]:
+        """Pontua pares candidatos, distribuindo em processos quando vale a pena."""
+        workers = self.config.get("duplicate_workers", 1)
+        min_pairs = self.config.get("duplicate_parallel_min_pairs", 20000)
+
+        if workers <= 1 or len(pairs) < min_pairs:
+            records = dict(enumerate(dataset))
+            return _score_candidate_pairs(records, pairs, threshold)
+
+        # Cada lote leva apenas os registros que referencia
+        chunk_size = max(1000, len(pairs) // (workers * 4))
+        chunks = [pairs[i : i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        payloads = []
+        for chunk in chunks:
+            referenced = {index for pair in chunk for index in pair}
+            payloads.append({index: dataset[index] for index in referenced})
+
+        matched = []
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for result in executor.map(
+                    _score_candidate_pairs,
+                    payloads,
+                    chunks,
+                    [threshold] * len(chunks),
+                ):
+                    matched.extend(result)
+        except Exception as e:
+            self.logger.warning(
+                f"Pool de processos indisponível ({e}); pontuando sequencialmente"
+            )
+            return _score_candidate_pairs(dict(enumerate(dataset)), pairs, threshold)
 
-            # Usar SequenceMatcher para calcular similaridade
-            similarity = SequenceMatcher(None, value1, value2).ratio()
-            similarity_scores.append(similarity)
+        return matched
 
-        return statistics.mean(similarity_scores) if similarity_scores else 0.0
+    def _calculate_record_similarity(self, record1: Dict, record2: Dict) -> float:
+        """Calcula similaridade entre dois registros."""
+        return _record_similarity(record1, record2)
 
     def _conservative_merge(self, group: List[Dict]) -> Dict[str, Any]:
         """Estratégia conservadora de fusão - preserva dados existentes."""
@@ -1566,18 +1768,22 @@ class ReconcilerAgent(BaseAgent):
         self, matches: List[Dict], fields: List[str]
     ) -> List[Dict]:
         """Detecta discrepâncias entre campos correspondentes."""
-        discrepancies = []
-        # Implementação simplificada
-        return discrepancies
+        engine = HashJoinReconciler(keys=[], fields=fields)
+        return [
+            discrepancy
+            for _, group_discrepancies in engine.iter_discrepancies(matches)
+            for discrepancy in group_discrepancies
+        ]
 
     def _calculate_reconciliation_statistics(
-        self, datasets: List[Dict], matches: List[Dict], discrepancies: List[Dict]
+        self, datasets: List[Dict], match_count: int, discrepancy_count: int
     ) -> Dict:
         """Calcula estatísticas de reconciliação."""
         return {
-            "total_matches": len(matches),
-            "total_discrepancies": len(discrepancies),
-            "match_rate": len(matches)
+            "total_matches": match_count,
+            "total_discrepancies": discrepancy_count,
+            "records_per_dataset": {d["id"]: d["record_count"] for d in datasets},
+            "match_rate": match_count
             / max(sum(d["record_count"] for d in datasets), 1),
         }
 
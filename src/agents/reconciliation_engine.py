@@ -0,0 +1,302 @@
+"""
+Reconciliation Engine - Motor de Reconciliação por Hash Join
+============================================================
+
+Motor de reconciliação em fluxo usado pelo ReconcilerAgent:
+- Hash join pela chave composta, lendo cada dataset uma única vez
+- Particionamento em disco (spill) quando o lado de construção excede o
+  orçamento de memória, processando uma partição por vez
+- Comparação de campos coluna a coluna por lote de correspondências
+- Emissão incremental de correspondências e discrepâncias (geradores)
+"""
+
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class HashJoinReconciler:
+    """
+    Reconcilia um dataset base com N outros datasets pela chave composta.
+
+    O primeiro dataset é o lado de construção (tabela hash); os demais são
+    lidos em fluxo e apenas sondam a tabela. Se o dataset base ultrapassar
+    `memory_budget_rows`, todos os lados são particionados em disco por hash
+    da chave e a junção é feita partição a partição.
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        fields: Optional[List[str]] = None,
+        memory_budget_rows: int = 500_000,
+        partitions: int = 64,
+        batch_size: int = 1000,
+        numeric_tolerance: float = 1e-9,
+        spill_dir: Optional[str] = None,
+    ):
+        self.keys = keys
+        self.fields = fields or []
+        self.memory_budget_rows = memory_budget_rows
+        self.partitions = partitions
+        self.batch_size = batch_size
+        self.numeric_tolerance = numeric_tolerance
+        self.spill_dir = spill_dir
+
+        # Estatísticas preenchidas durante a execução
+        self.record_counts: Dict[str, int] = {}
+        self.spilled = False
+
+        self.logger = logging.getLogger(__name__)
+
+    def composite_key(self, record: Dict[str, Any]) -> str:
+        """Chave composta normalizada do registro."""
+        return "|".join(str(record.get(key, "")).strip().lower() for key in self.keys)
+
+    # Correspondências
+
+    def iter_matches(self, datasets: List[Iterable[Dict]]) -> Iterator[Dict[str, Any]]:
+        """
+        Gera grupos de correspondência no formato do ReconcilerAgent:
+        {"key": chave, "records": {dataset_id: [registros]}}.
+
+        Só são emitidos grupos presentes em pelo menos 2 datasets.
+        """
+        dataset_ids = [f"dataset_{i}" for i in range(len(datasets))]
+        self.record_counts = {dataset_id: 0 for dataset_id in dataset_ids}
+        self.spilled = False
+
+        base_id = dataset_ids[0]
+        base_iter = iter(datasets[0])
+        build_table: Dict[str, List[Dict]] = {}
+
+        for record in base_iter:
+            self.record_counts[base_id] += 1
+            build_table.setdefault(self.composite_key(record), []).append(record)
+
+            if self.record_counts[base_id] > self.memory_budget_rows:
+                self.logger.info(
+                    "Dataset base excedeu o orçamento de memória; "
+                    "usando hash join particionado em disco"
+                )
+                self.spilled = True
+                yield from self._partitioned_join(
+                    dataset_ids, build_table, base_iter, datasets[1:]
+                )
+                return
+
+        yield from self._in_memory_join(dataset_ids, build_table, datasets[1:])
+
+    def _in_memory_join(
+        self,
+        dataset_ids: List[str],
+        build_table: Dict[str, List[Dict]],
+        probe_datasets: List[Iterable[Dict]],
+    ) -> Iterator[Dict[str, Any]]:
+        """Sonda a tabela hash com os demais datasets, lidos em fluxo."""
+        probed: Dict[str, Dict[str, List[Dict]]] = {}
+
+        for dataset_id, dataset in zip(dataset_ids[1:], probe_datasets):
+            for record in dataset:
+                self.record_counts[dataset_id] += 1
+                key = self.composite_key(record)
+                if key in build_table:
+                    probed.setdefault(key, {}).setdefault(dataset_id, []).append(record)
+
+        # Emitir na ordem de inserção do dataset base
+        base_id = dataset_ids[0]
+        for key, base_records in build_table.items():
+            others = probed.pop(key, None)
+            if others:
+                yield {"key": key, "records": {base_id: base_records, **others}}
+
+    def _partitioned_join(
+        self,
+        dataset_ids: List[str],
+        build_table: Dict[str, List[Dict]],
+        base_remaining: Iterator[Dict],
+        probe_datasets: List[Iterable[Dict]],
+    ) -> Iterator[Dict[str, Any]]:
+        """Particiona todos os lados em disco e junta uma partição por vez."""
+        spill_root = tempfile.mkdtemp(prefix="reconcile_", dir=self.spill_dir)
+
+        try:
+            base_id = dataset_ids[0]
+            writer = _PartitionWriter(spill_root, base_id, self.partitions)
+            try:
+                for key, records in build_table.items():
+                    for record in records:
+                        writer.write(self._partition_of(key), key, record)
+                build_table.clear()
+
+                for record in base_remaining:
+                    self.record_counts[base_id] += 1
+                    key = self.composite_key(record)
+                    writer.write(self._partition_of(key), key, record)
+            finally:
+                writer.close()
+
+            for dataset_id, dataset in zip(dataset_ids[1:], probe_datasets):
+                writer = _PartitionWriter(spill_root, dataset_id, self.partitions)
+                try:
+                    for record in dataset:
+                        self.record_counts[dataset_id] += 1
+                        key = self.composite_key(record)
+                        writer.write(self._partition_of(key), key, record)
+                finally:
+                    writer.close()
+
+            for partition in range(self.partitions):
+                partition_table: Dict[str, List[Dict]] = {}
+                for key, record in _read_partition(spill_root, base_id, partition):
+                    partition_table.setdefault(key, []).append(record)
+
+                if not partition_table:
+                    continue
+
+                probed: Dict[str, Dict[str, List[Dict]]] = {}
+                for dataset_id in dataset_ids[1:]:
+                    for key, record in _read_partition(
+                        spill_root, dataset_id, partition
+                    ):
+                        if key in partition_table:
+                            probed.setdefault(key, {}).setdefault(
+                                dataset_id, []
+                            ).append(record)
+
+                for key, base_records in partition_table.items():
+                    others = probed.pop(key, None)
+                    if others:
+                        yield {
+                            "key": key,
+                            "records": {base_id: base_records, **others},
+                        }
+
+        finally:
+            shutil.rmtree(spill_root, ignore_errors=True)
+
+    def _partition_of(self, key: str) -> int:
+        # crc32 é estável entre processos (hash() de str é aleatorizado)
+        return zlib.crc32(key.encode("utf-8")) % self.partitions
+
+    # Discrepâncias
+
+    def iter_discrepancies(
+        self, matches: Iterable[Dict[str, Any]]
+    ) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Gera (grupo, discrepâncias do grupo) comparando os campos em lotes.
+
+        Para cada lote de grupos, cada campo é comparado de uma vez entre
+        todos os grupos (coluna a coluna), usando o primeiro registro de cada
+        dataset no grupo.
+        """
+        batch: List[Dict[str, Any]] = []
+
+        for match in matches:
+            batch.append(match)
+            if len(batch) >= self.batch_size:
+                yield from self._compare_batch(batch)
+                batch = []
+
+        if batch:
+            yield from self._compare_batch(batch)
+
+    def _compare_batch(
+        self, batch: List[Dict[str, Any]]
+    ) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        # Representante de cada dataset por grupo
+        representatives = [
+            {dataset_id: records[0] for dataset_id, records in match["records"].items()}
+            for match in batch
+        ]
+
+        fields = self.fields or self._shared_fields(representatives)
+        per_group: List[List[Dict[str, Any]]] = [[] for _ in batch]
+
+        for field in fields:
+            column = [
+                {dataset_id: record.get(field) for dataset_id, record in rep.items()}
+                for rep in representatives
+            ]
+            for position, values in enumerate(column):
+                if not self._values_agree(list(values.values())):
+                    per_group[position].append(
+                        {
+                            "key": batch[position]["key"],
+                            "field": field,
+                            "values": values,
+                            "type": "value_mismatch",
+                        }
+                    )
+
+        for match, discrepancies in zip(batch, per_group):
+            yield match, discrepancies
+
+    def _shared_fields(self, representatives: List[Dict[str, Dict]]) -> List[str]:
+        """Campos presentes em todos os datasets do lote, exceto as chaves."""
+        shared = None
+        for rep in representatives:
+            for record in rep.values():
+                fields = set(record.keys())
+                shared = fields if shared is None else shared & fields
+        return sorted((shared or set()) - set(self.keys))
+
+    def _values_agree(self, values: List[Any]) -> bool:
+        first = values[0]
+        for other in values[1:]:
+            if not self._value_equal(first, other):
+                return False
+        return True
+
+    def _value_equal(self, a: Any, b: Any) -> bool:
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            return abs(a - b) <= self.numeric_tolerance
+        if a is None or b is None:
+            return a is None and b is None
+        return str(a).strip().lower() == str(b).strip().lower()
+
+
+class _PartitionWriter:
+    """Escreve registros (chave, registro) em arquivos de partição."""
+
+    def __init__(self, root: str, dataset_id: str, partitions: int):
+        self.root = root
+        self.dataset_id = dataset_id
+        self.partitions = partitions
+        self.handles: Dict[int, Any] = {}
+
+    def write(self, partition: int, key: str, record: Dict[str, Any]) -> None:
+        handle = self.handles.get(partition)
+        if handle is None:
+            handle = open(_partition_path(self.root, self.dataset_id, partition), "ab")
+            self.handles[partition] = handle
+        pickle.dump((key, record), handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def close(self) -> None:
+        for handle in self.handles.values():
+            handle.close()
+        self.handles.clear()
+
+
+def _partition_path(root: str, dataset_id: str, partition: int) -> str:
+    return os.path.join(root, f"{dataset_id}.{partition:04d}.part")
+
+
+def _read_partition(
+    root: str, dataset_id: str, partition: int
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    path = _partition_path(root, dataset_id, partition)
+    if not os.path.exists(path):
+        return
+
+    with open(path, "rb") as handle:
+        while True:
+            try:
+                yield pickle.load(handle)
+            except EOFError:
+                break
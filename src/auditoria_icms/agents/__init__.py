@@ -1,14 +1,30 @@
 """
 __init__.py para o módulo de agentes
 Facilita a importação dos agentes do sistema.
+Os módulos são carregados sob demanda (PEP 562) no primeiro acesso.
 """
 
-from .base_agent import BaseAgent, AgentDecision, AuditTrail
-from .manager_agent import ManagerAgent
-from .enrichment_agent import EnrichmentAgent
-from .ncm_agent import NCMAgent
-from .cest_agent import CESTAgent
-from .reconciliation_agent import ReconciliationAgent
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+_LAZY_EXPORTS = {
+    "BaseAgent": ".base_agent",
+    "AgentDecision": ".base_agent",
+    "AuditTrail": ".base_agent",
+    "ManagerAgent": ".manager_agent",
+    "EnrichmentAgent": ".enrichment_agent",
+    "NCMAgent": ".ncm_agent",
+    "CESTAgent": ".cest_agent",
+    "ReconciliationAgent": ".reconciliation_agent",
+}
+
+if TYPE_CHECKING:
+    from .base_agent import BaseAgent, AgentDecision, AuditTrail
+    from .manager_agent import ManagerAgent
+    from .enrichment_agent import EnrichmentAgent
+    from .ncm_agent import NCMAgent
+    from .cest_agent import CESTAgent
+    from .reconciliation_agent import ReconciliationAgent
 
 __all__ = [
     "BaseAgent",
@@ -20,3 +36,16 @@ __all__ = [
     "CESTAgent",
     "ReconciliationAgent",
 ]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -4,13 +4,15 @@ Classe abstrata que define a interface comum para todos os agentes especializado
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 from datetime import datetime
 from dataclasses import dataclass
 import uuid
 import logging
 
-from langchain.llms.base import BaseLLM
+if TYPE_CHECKING:
+    # Apenas para tipagem: importar langchain custa segundos na inicialização
+    from langchain.llms.base import BaseLLM
 
 
 @dataclass
@@ -50,7 +52,7 @@ class BaseAgent(ABC):
     def __init__(
         self,
         name: str,
-        llm: BaseLLM,
+        llm: "BaseLLM",
         config: Dict[str, Any],
         logger: Optional[logging.Logger] = None,
     ):
@@ -19,6 +19,7 @@ class ManagerAgent(BaseAgent):
     def __init__(self, llm, config: Dict[str, Any], logger=None):
         super().__init__("ManagerAgent", llm, config, logger)
         self.specialist_agents = {}
+        self.gtin_index = None
         self.workflow_patterns = {
             "confirmation": [
                 "enrichment",
@@ -59,9 +60,6 @@ class ManagerAgent(BaseAgent):
         if not self.validate_input(input_data):
             raise ValueError("Dados de entrada inválidos para o ManagerAgent")
 
-        # Determinar tipo de workflow baseado no contexto
-        workflow_type = self._determine_workflow_type(input_data, context)
-
         # Inicializar trilha de auditoria
         audit_trail = AuditTrail(
             session_id=context.get("session_id", "unknown"),
@@ -73,13 +71,30 @@ class ManagerAgent(BaseAgent):
             created_at=datetime.now(),
         )
 
-        # Executar workflow de agentes
-        workflow_result = await self._execute_workflow(
-            workflow_type, input_data, context, audit_trail
-        )
+        # Resolução exata por GTIN antes de acionar os agentes
+        gtin_match = self._resolve_gtin(input_data)
+        if gtin_match is not None:
+            workflow_type = "gtin"
+            workflow_result = {
+                "gtin_index": {
+                    "success": True,
+                    "summary": f"GTIN {gtin_match.gtin} ({gtin_match.source})",
+                }
+            }
+            final_decision = self._gtin_decision(gtin_match, input_data)
+        else:
+            # Determinar tipo de workflow baseado no contexto
+            workflow_type = self._determine_workflow_type(input_data, context)
+
+            # Executar workflow de agentes
+            workflow_result = await self._execute_workflow(
+                workflow_type, input_data, context, audit_trail
+            )
 
-        # Análise de consenso e decisão final
-        final_decision = await self._make_final_decision(workflow_result, audit_trail)
+            # Análise de consenso e decisão final
+            final_decision = await self._make_final_decision(
+                workflow_result, audit_trail
+            )
 
         # Determinar se requer revisão humana
         requires_review = self._requires_human_review(final_decision, audit_trail)
@@ -119,6 +134,42 @@ class ManagerAgent(BaseAgent):
 
         return True
 
+    def _resolve_gtin(self, input_data: Dict[str, Any]):
+        """Consulta o índice GTIN; None se ausente, inválido ou pouco confiável."""
+        gtin = input_data.get("gtin")
+        if not gtin or not self.config.get("gtin_fast_path", True):
+            return None
+
+        if self.gtin_index is None:
+            from ..tools.gtin_index import get_gtin_index
+
+            self.gtin_index = get_gtin_index()
+
+        match = self.gtin_index.lookup(gtin)
+        if match is None or match.confidence < self.config.get(
+            "gtin_min_confidence", 0.9
+        ):
+            return None
+        return match
+
+    def _gtin_decision(self, match, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Decisão final a partir de uma correspondência exata de GTIN."""
+        justificativa = f"GTIN {match.gtin} com correspondência exata ({match.source})"
+        ncm_informado = "".join(
+            ch for ch in str(input_data.get("ncm_atual") or "") if ch.isdigit()
+        )
+        return {
+            "ncm_final": match.ncm,
+            "cest_final": match.cest,
+            "justificativa_ncm": justificativa,
+            "justificativa_cest": justificativa if match.cest else None,
+            "confidence_score": match.confidence,
+            "sources": [match.source],
+            "method": "gtin_index",
+            "ncm_informado_divergente": bool(ncm_informado)
+            and ncm_informado != match.ncm,
+        }
+
     def _determine_workflow_type(
         self, input_data: Dict[str, Any], context: Optional[Dict[str, Any]]
     ) -> str:
@@ -219,6 +270,10 @@ class ManagerAgent(BaseAgent):
     ) -> bool:
         """Determina se a classificação requer revisão humana."""
 
+        # NCM informado contradiz a correspondência exata de GTIN
+        if final_decision.get("ncm_informado_divergente"):
+            return True
+
         # Verifica limiar de confiança
         confidence = final_decision.get("confidence_score", 0.0)
         if confidence < self.get_confidence_threshold():
@@ -4,16 +4,20 @@ Orquestra o fluxo de trabalho multi-tenant com auditoria completa
 """
 
 import logging
-from typing import Dict, List, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from types import SimpleNamespace
 import uuid
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 
 from .base_agent import BaseAgent
 from .enrichment_agent import EnrichmentAgent
 from .ncm_agent import NCMAgent
 from .cest_agent import CESTAgent
 from .reconciliation_agent import ReconciliationAgent
+from ..core.batch_dedup import DedupGroup, dedup_key, group_batch
 from ..database.models import ProdutoEmpresa
 from ..data_processing.empresa_data_ingestion import EmpresaDataIngestion
 
@@ -21,6 +25,20 @@ from ..data_processing.empresa_data_ingestion import EmpresaDataIngestion
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Campos de classificação replicados do representante para os membros do grupo
+CAMPOS_CLASSIFICACAO = [
+    "descricao_enriquecida",
+    "ncm_sugerido",
+    "confianca_ncm",
+    "justificativa_ncm",
+    "cest_sugerido",
+    "confianca_cest",
+    "justificativa_cest",
+    "status_processamento",
+    "revisao_manual",
+    "data_processamento",
+]
+
 
 @dataclass
 class ProcessingResult:
@@ -52,6 +70,7 @@ class BatchProcessingResult:
     produtos_pendente_revisao: int
     tempo_total: float
     resultados_individuais: List[ProcessingResult]
+    deduplicacao: Optional[Dict[str, Any]] = None
 
     def to_dict(self):
         """Converte para dicionário"""
@@ -67,6 +86,7 @@ class BatchProcessingResult:
             "resultados_individuais": [
                 r.to_dict() for r in self.resultados_individuais
             ],
+            "deduplicacao": self.deduplicacao,
         }
 
 
@@ -81,25 +101,23 @@ class ManagerAgent(BaseAgent):
         empresa_id: int,
         data_ingestion: EmpresaDataIngestion,
         config: Optional[Dict[str, Any]] = None,
+        llm=None,
     ):
-        super().__init__(
-            name="ManagerAgent",
-            description="Orquestra fluxo de classificação fiscal multi-tenant",
-            config=config,
-        )
+        super().__init__("ManagerAgent", llm, config or {})
 
         self.empresa_id = empresa_id
         self.data_ingestion = data_ingestion
 
         # Inicializa agentes especialistas
-        self.enrichment_agent = EnrichmentAgent(config=config)
-        self.ncm_agent = NCMAgent(config=config)
-        self.cest_agent = CESTAgent(config=config)
-        self.reconciliation_agent = ReconciliationAgent(config=config)
+        self.enrichment_agent = EnrichmentAgent(llm, self.config)
+        self.ncm_agent = NCMAgent(llm, self.config)
+        self.cest_agent = CESTAgent(llm, self.config)
+        self.reconciliation_agent = ReconciliationAgent(llm, self.config)
 
         # Estados do workflow
         self.estados_validos = [
             "PENDENTE",
+            "CONSULTANDO_GTIN",
             "ENRIQUECENDO",
             "ENRIQUECIDO",
             "CLASSIFICANDO_NCM",
@@ -121,17 +139,55 @@ class ManagerAgent(BaseAgent):
             "max_retries": config.get("max_retries", 3) if config else 3,
             "timeout_agente": config.get("timeout_agente", 300) if config else 300,
             "batch_size": config.get("batch_size", 100) if config else 100,
+            "deduplicar_lote": (
+                config.get("deduplicar_lote", False) if config else False
+            ),
+            # Threads só sobrepõem espera de I/O dos agentes (LLM, RAG); com as
+            # etapas simuladas (Python puro, sob o GIL) não há ganho acima de 1
+            "max_workers": config.get("max_workers", 1) if config else 1,
+            # Segundos entre atualizações de progresso do lote
+            "intervalo_progresso": (
+                config.get("intervalo_progresso", 5.0) if config else 5.0
+            ),
+            "gtin_fast_path": config.get("gtin_fast_path", True) if config else True,
+            "gtin_min_confidence": (
+                config.get("gtin_min_confidence", 0.9) if config else 0.9
+            ),
         }
+        self._gtin_index = None
+
+    async def process(
+        self, input_data: Dict[str, Any], context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Classifica um único produto recebido como dicionário"""
+        if not self.validate_input(input_data):
+            raise ValueError("Entrada inválida: descricao_produto é obrigatória")
+
+        produto = SimpleNamespace(**input_data)
+        produto.produto_id = input_data.get("produto_id") or str(uuid.uuid4())
+        resultado = self._processar_produto_individual(produto)
+        return resultado.to_dict()
+
+    def validate_input(self, input_data: Dict[str, Any]) -> bool:
+        """Exige ao menos a descrição do produto"""
+        return bool(input_data and input_data.get("descricao_produto"))
 
     def processar_lote(
-        self, produtos: List[ProdutoEmpresa], batch_size: Optional[int] = None
+        self,
+        produtos: List[ProdutoEmpresa],
+        batch_size: Optional[int] = None,
+        deduplicar: Optional[bool] = None,
     ) -> BatchProcessingResult:
         """
         Processa um lote de produtos da empresa seguindo o workflow definido
 
         Args:
             produtos: Lista de produtos para processar
-            batch_size: Tamanho do lote (se None, processa todos)
+            batch_size: Produtos por gravação no banco da empresa
+                (padrão: config `batch_size`)
+            deduplicar: Classifica uma vez cada descrição normalizada (+ GTIN,
+                NCM e CEST informados) e replica o resultado para os demais
+                produtos do grupo (padrão: config `deduplicar_lote`)
 
         Returns:
             Resultado do processamento em lote
@@ -146,52 +202,104 @@ class ManagerAgent(BaseAgent):
         # Registra início do processamento
         self._registrar_status_processamento(task_id, len(produtos), "iniciado")
 
-        resultados_individuais = []
+        if deduplicar is None:
+            deduplicar = self.config_processamento["deduplicar_lote"]
+
+        grupos: Optional[List[DedupGroup]] = None
+        relatorio_dedup = None
+        a_processar = produtos
+        if deduplicar:
+            grupos, relatorio_dedup = group_batch(
+                produtos,
+                self._chave_deduplicacao,
+                lambda produto: getattr(produto, "id_agregados", None),
+            )
+            a_processar = [produtos[grupo.representante] for grupo in grupos]
+            logger.info(relatorio_dedup.resumo())
+
+        total_trabalho = len(a_processar)
+        max_workers = max(
+            1, min(self.config_processamento["max_workers"], total_trabalho or 1)
+        )
+        intervalo_progresso = self.config_processamento["intervalo_progresso"]
+        lote_gravacao = max(1, batch_size or self.config_processamento["batch_size"])
+
+        resultados_por_indice: Dict[int, ProcessingResult] = {}
+        pendentes_gravacao: List[ProcessingResult] = []
         produtos_processados = 0
         produtos_com_sucesso = 0
         produtos_com_erro = 0
         produtos_pendente_revisao = 0
+        ultimo_progresso = time.monotonic()
 
         try:
-            # Processa produtos individualmente
-            for i, produto in enumerate(produtos):
-                try:
-                    logger.info(
-                        f"Processando produto {i+1}/{len(produtos)}: {produto.produto_id}"
-                    )
-
-                    resultado = self._processar_produto_individual(produto)
-                    resultados_individuais.append(resultado)
-
-                    produtos_processados += 1
-
-                    if resultado.status == "sucesso":
-                        produtos_com_sucesso += 1
-                    elif resultado.status == "erro":
-                        produtos_com_erro += 1
-                    elif resultado.status == "pendente_revisao":
-                        produtos_pendente_revisao += 1
+            # Agentes síncronos em pool de threads (um representante por grupo).
+            # O pool só rende com agentes limitados por I/O; o trabalho de CPU
+            # continua serializado pelo GIL.
+            with ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="manager-lote"
+            ) as executor:
+                futures = {
+                    executor.submit(self._processar_produto_individual, produto): i
+                    for i, produto in enumerate(a_processar)
+                }
 
-                    # Atualiza status do processamento
-                    self._atualizar_status_processamento(
-                        task_id, produtos_processados, "em_progresso"
-                    )
+                for future in as_completed(futures):
+                    i = futures[future]
+                    produto = a_processar[i]
+                    try:
+                        resultado = future.result()
+                        processado = True
+                    except Exception as e:
+                        logger.error(
+                            f"Erro ao processar produto {produto.produto_id}: {str(e)}"
+                        )
+                        resultado = ProcessingResult(
+                            produto_id=produto.produto_id,
+                            status="erro",
+                            erro_detalhes=str(e),
+                        )
+                        processado = False
 
-                except Exception as e:
-                    logger.error(
-                        f"Erro ao processar produto {produto.produto_id}: {str(e)}"
-                    )
+                    if grupos:
+                        concluidos = self._replicar_grupo(
+                            produtos, grupos[i], resultado
+                        )
+                    else:
+                        concluidos = [(i, resultado)]
+
+                    for indice, item in concluidos:
+                        resultados_por_indice[indice] = item
+                        produtos_processados += processado
+                        if item.status == "sucesso":
+                            produtos_com_sucesso += 1
+                        elif item.status == "erro":
+                            produtos_com_erro += 1
+                        elif item.status == "pendente_revisao":
+                            produtos_pendente_revisao += 1
+
+                    # Grava no banco da empresa em blocos, conforme concluem
+                    pendentes_gravacao.extend(item for _, item in concluidos)
+                    if len(pendentes_gravacao) >= lote_gravacao:
+                        self._atualizar_produtos_empresa(pendentes_gravacao)
+                        pendentes_gravacao = []
+
+                    # Progresso por tempo, não por item
+                    agora = time.monotonic()
+                    if agora - ultimo_progresso >= intervalo_progresso:
+                        self._atualizar_status_processamento(
+                            task_id, produtos_processados, "em_progresso"
+                        )
+                        ultimo_progresso = agora
 
-                    resultado_erro = ProcessingResult(
-                        produto_id=produto.produto_id,
-                        status="erro",
-                        erro_detalhes=str(e),
-                    )
-                    resultados_individuais.append(resultado_erro)
-                    produtos_com_erro += 1
+            self._atualizar_produtos_empresa(pendentes_gravacao)
+            self._atualizar_status_processamento(
+                task_id, produtos_processados, "em_progresso"
+            )
 
-            # Atualiza produtos no banco da empresa
-            self._atualizar_produtos_empresa(resultados_individuais)
+            resultados_individuais = [
+                resultados_por_indice[indice] for indice in range(len(produtos))
+            ]
 
             fim = datetime.utcnow()
             tempo_total = (fim - inicio).total_seconds()
@@ -209,6 +317,7 @@ class ManagerAgent(BaseAgent):
                 produtos_pendente_revisao=produtos_pendente_revisao,
                 tempo_total=tempo_total,
                 resultados_individuais=resultados_individuais,
+                deduplicacao=relatorio_dedup.to_dict() if relatorio_dedup else None,
             )
 
             logger.info(
@@ -223,6 +332,71 @@ class ManagerAgent(BaseAgent):
             self._finalizar_status_processamento(task_id, "erro")
             raise
 
+    @staticmethod
+    def _chave_deduplicacao(produto: ProdutoEmpresa):
+        return dedup_key(
+            getattr(produto, "descricao_produto", None),
+            getattr(produto, "codigo_barra", None),
+            getattr(produto, "ncm", None),
+            getattr(produto, "cest", None),
+        )
+
+    def _replicar_grupo(
+        self,
+        produtos: List[ProdutoEmpresa],
+        grupo: DedupGroup,
+        resultado: ProcessingResult,
+    ) -> List[Tuple[int, ProcessingResult]]:
+        """
+        Replica o resultado do representante para os membros do grupo, com
+        logs de auditoria próprios por produto
+        """
+        representante = produtos[grupo.representante]
+        replicados = [(grupo.representante, resultado)]
+
+        for indice in grupo.membros:
+            membro = produtos[indice]
+            atualizado = None
+            if resultado.produto_atualizado is not None:
+                atualizado = membro.copy() if hasattr(membro, "copy") else membro
+                for campo in CAMPOS_CLASSIFICACAO:
+                    if hasattr(resultado.produto_atualizado, campo):
+                        setattr(
+                            atualizado,
+                            campo,
+                            getattr(resultado.produto_atualizado, campo),
+                        )
+
+            logs = [
+                {
+                    **log,
+                    "produto_id_origem": membro.produto_id,
+                    "dados_entrada": {
+                        **(log.get("dados_entrada") or {}),
+                        "produto_id": membro.produto_id,
+                    },
+                    "reaproveitado_de": representante.produto_id,
+                    "grupo_deduplicacao": grupo.group_id,
+                    "tempo_execucao": 0.0,
+                }
+                for log in resultado.logs_agentes or []
+            ]
+
+            replicados.append(
+                (
+                    indice,
+                    replace(
+                        resultado,
+                        produto_id=membro.produto_id,
+                        produto_atualizado=atualizado,
+                        tempo_execucao=0.0,
+                        logs_agentes=logs,
+                    ),
+                )
+            )
+
+        return replicados
+
     def _processar_produto_individual(
         self, produto: ProdutoEmpresa
     ) -> ProcessingResult:
@@ -247,7 +421,39 @@ class ManagerAgent(BaseAgent):
             # Workflow de processamento
             while estado_atual not in ["CONCLUIDO", "ERRO", "REVISAO_MANUAL"]:
                 if estado_atual == "PENDENTE":
-                    estado_atual = "ENRIQUECENDO"
+                    estado_atual = "CONSULTANDO_GTIN"
+
+                elif estado_atual == "CONSULTANDO_GTIN":
+                    # Etapa 0: GTIN com correspondência exata dispensa os agentes
+                    match = self._consultar_gtin(produto_processado, logs_agentes)
+
+                    if match is None:
+                        estado_atual = "ENRIQUECENDO"
+                    else:
+                        justificativa = (
+                            f"GTIN {match.gtin} com correspondência exata "
+                            f"({match.source})"
+                        )
+                        produto_processado.ncm_sugerido = match.ncm
+                        produto_processado.confianca_ncm = match.confidence
+                        produto_processado.justificativa_ncm = justificativa
+                        if match.cest:
+                            produto_processado.cest_sugerido = match.cest
+                            produto_processado.confianca_cest = match.confidence
+                            produto_processado.justificativa_cest = justificativa
+
+                        ncm_informado = "".join(
+                            ch
+                            for ch in str(getattr(produto_processado, "ncm", "") or "")
+                            if ch.isdigit()
+                        )
+                        # NCM declarado contradiz o índice: decide pelo GTIN,
+                        # mas revisa
+                        if ncm_informado and ncm_informado != match.ncm:
+                            estado_atual = "REVISAO_MANUAL"
+                        else:
+                            produto_processado.status_processamento = "PROCESSADO"
+                            estado_atual = "CONCLUIDO"
 
                 elif estado_atual == "ENRIQUECENDO":
                     # Etapa 1: Enriquecimento da descrição
@@ -424,6 +630,59 @@ class ManagerAgent(BaseAgent):
                 logs_agentes=logs_agentes,
             )
 
+    @property
+    def gtin_index(self):
+        """Índice GTIN compartilhado (carregado na primeira consulta)"""
+        if self._gtin_index is None:
+            from ..tools.gtin_index import get_gtin_index
+
+            self._gtin_index = get_gtin_index()
+        return self._gtin_index
+
+    def _consultar_gtin(
+        self, produto: ProdutoEmpresa, logs_agentes: List[Dict[str, Any]]
+    ):
+        """
+        Consulta o índice GTIN; None se o código estiver ausente, sem
+        correspondência ou abaixo da confiança mínima
+        """
+        gtin = getattr(produto, "codigo_barra", None)
+        if not gtin or not self.config_processamento["gtin_fast_path"]:
+            return None
+
+        inicio = datetime.utcnow()
+        try:
+            match = self.gtin_index.lookup(gtin)
+        except Exception as e:
+            # Índice indisponível não impede o fluxo normal dos agentes
+            logger.warning(f"⚠️ Consulta ao índice GTIN falhou: {e}")
+            return None
+
+        if (
+            match is None
+            or match.confidence < self.config_processamento["gtin_min_confidence"]
+        ):
+            return None
+
+        logs_agentes.append(
+            {
+                "empresa_id": self.empresa_id,
+                "produto_id_origem": produto.produto_id,
+                "agente_nome": "GTINIndex",
+                "timestamp": inicio,
+                "acao_realizada": "consultar_gtin",
+                "dados_entrada": {"codigo_barra": gtin},
+                "dados_saida": match.to_dict(),
+                "justificativa_rag": "",
+                "query_rag": "",
+                "contexto_rag": {},
+                "confianca": match.confidence,
+                "status": "sucesso",
+                "tempo_execucao": (datetime.utcnow() - inicio).total_seconds(),
+            }
+        )
+        return match
+
     def _executar_agente(
         self,
         agente: BaseAgent,
@@ -558,6 +817,8 @@ class ManagerAgent(BaseAgent):
 
     def _atualizar_produtos_empresa(self, resultados: List[ProcessingResult]):
         """Atualiza produtos no banco da empresa com os resultados"""
+        if not resultados:
+            return
 
         produtos_para_atualizar = []
 
@@ -4,14 +4,77 @@ Implementa agentes reais conectados aos dados estruturados NCM/CEST
 """
 
 import json
-import pandas as pd
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 import re
 from pathlib import Path
 
 from ..core.config import get_settings
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _load_ncm_tables() -> Tuple[Optional[List[Dict]], Optional[Dict]]:
+    """Carrega dados NCM estruturados (uma vez por processo)"""
+    ncm_data = None
+    ncm_descriptions = None
+    try:
+        # Carregar Tabela NCM
+        data_path = Path("data/raw")
+
+        # Carregar Excel NCM
+        if (data_path / "Tabela_NCM.xlsx").exists():
+            import pandas as pd
+
+            ncm_df = pd.read_excel(data_path / "Tabela_NCM.xlsx")
+            ncm_data = ncm_df.to_dict("records")
+            logger.info(f"Carregados {len(ncm_data)} códigos NCM")
+
+        # Carregar descrições hierárquicas
+        if (data_path / "descricoes_ncm.json").exists():
+            with open(data_path / "descricoes_ncm.json", "r", encoding="utf-8") as f:
+                ncm_descriptions = json.load(f)
+            logger.info("Descrições NCM hierárquicas carregadas")
+
+    except Exception as e:
+        logger.error(f"Erro ao carregar dados NCM: {e}")
+        return [], {}
+
+    return ncm_data, ncm_descriptions
+
+
+@lru_cache(maxsize=1)
+def _load_cest_tables() -> Tuple[Optional[List[Dict]], Optional[List[Dict]]]:
+    """Carrega dados CEST estruturados (uma vez por processo)"""
+    cest_data = None
+    cest_ro_data = None
+    try:
+        data_path = Path("data/raw")
+
+        # Carregar Convênio 142
+        if (data_path / "conv_142_formatado.json").exists():
+            with open(
+                data_path / "conv_142_formatado.json", "r", encoding="utf-8"
+            ) as f:
+                cest_data = json.load(f)
+            logger.info(f"Carregados {len(cest_data)} itens CEST do Convênio 142")
+
+        # Carregar CEST RO
+        if (data_path / "CEST_RO.xlsx").exists():
+            import pandas as pd
+
+            cest_ro_df = pd.read_excel(data_path / "CEST_RO.xlsx")
+            cest_ro_data = cest_ro_df.to_dict("records")
+            logger.info(f"Carregados {len(cest_ro_data)} itens CEST RO")
+
+    except Exception as e:
+        logger.error(f"Erro ao carregar dados CEST: {e}")
+        return [], []
+
+    return cest_data, cest_ro_data
+
 
 class NCMAgent:
     """Agente real para classificação NCM baseado em dados estruturados"""
@@ -19,34 +82,15 @@ class NCMAgent:
     def __init__(self):
         self.settings = get_settings()
         self.logger = logging.getLogger(__name__)
-        self.ncm_data = None
-        self.ncm_descriptions = None
-        self._load_ncm_data()
 
-    def _load_ncm_data(self):
-        """Carrega dados NCM estruturados"""
-        try:
-            # Carregar Tabela NCM
-            data_path = Path("data/raw")
-
-            # Carregar Excel NCM
-            if (data_path / "Tabela_NCM.xlsx").exists():
-                ncm_df = pd.read_excel(data_path / "Tabela_NCM.xlsx")
-                self.ncm_data = ncm_df.to_dict("records")
-                self.logger.info(f"Carregados {len(self.ncm_data)} códigos NCM")
-
-            # Carregar descrições hierárquicas
-            if (data_path / "descricoes_ncm.json").exists():
-                with open(
-                    data_path / "descricoes_ncm.json", "r", encoding="utf-8"
-                ) as f:
-                    self.ncm_descriptions = json.load(f)
-                self.logger.info("Descrições NCM hierárquicas carregadas")
+    # Tabelas carregadas no primeiro uso e compartilhadas entre instâncias
+    @property
+    def ncm_data(self) -> Optional[List[Dict]]:
+        return _load_ncm_tables()[0]
 
-        except Exception as e:
-            self.logger.error(f"Erro ao carregar dados NCM: {e}")
-            self.ncm_data = []
-            self.ncm_descriptions = {}
+    @property
+    def ncm_descriptions(self) -> Optional[Dict]:
+        return _load_ncm_tables()[1]
 
     def validate_ncm(
         self, ncm_code: str, description: str, empresa_atividade: str = None
@@ -316,35 +360,15 @@ class CESTAgent:
     def __init__(self):
         self.settings = get_settings()
         self.logger = logging.getLogger(__name__)
-        self.cest_data = None
-        self.cest_ro_data = None
-        self._load_cest_data()
 
-    def _load_cest_data(self):
-        """Carrega dados CEST estruturados"""
-        try:
-            data_path = Path("data/raw")
-
-            # Carregar Convênio 142
-            if (data_path / "conv_142_formatado.json").exists():
-                with open(
-                    data_path / "conv_142_formatado.json", "r", encoding="utf-8"
-                ) as f:
-                    self.cest_data = json.load(f)
-                self.logger.info(
-                    f"Carregados {len(self.cest_data)} itens CEST do Convênio 142"
-                )
+    # Tabelas carregadas no primeiro uso e compartilhadas entre instâncias
+    @property
+    def cest_data(self) -> Optional[List[Dict]]:
+        return _load_cest_tables()[0]
 
-            # Carregar CEST RO
-            if (data_path / "CEST_RO.xlsx").exists():
-                cest_ro_df = pd.read_excel(data_path / "CEST_RO.xlsx")
-                self.cest_ro_data = cest_ro_df.to_dict("records")
-                self.logger.info(f"Carregados {len(self.cest_ro_data)} itens CEST RO")
-
-        except Exception as e:
-            self.logger.error(f"Erro ao carregar dados CEST: {e}")
-            self.cest_data = []
-            self.cest_ro_data = []
+    @property
+    def cest_ro_data(self) -> Optional[List[Dict]]:
+        return _load_cest_tables()[1]
 
     def validate_cest(
         self,
@@ -24,21 +24,50 @@ import json
 import asyncio
 import logging
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import pandas as pd
 from datetime import datetime
 import hashlib
 import sqlite3
+from collections import OrderedDict
 from pathlib import Path
 
+from .core.audit_sink import AuditSink, SQLiteAuditWriter
+from .core.telemetry import StreamingStats
+
 # Configurações de logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# Níveis da classificação hierárquica: (nível, dígitos, complexidade)
+HIERARCHICAL_LEVELS = [
+    ("capitulo", 2, "low"),
+    ("posicao", 4, "medium"),
+    ("item", 8, "high"),
+]
+
+# NCM devolvido quando a resposta não contém um código (extração por regex)
+PLACEHOLDER_NCM = "00000000"
+
+# Colunas gravadas em classification_audit
+AUDIT_COLUMNS = [
+    "produto_id",
+    "timestamp",
+    "strategy",
+    "models_used",
+    "ncm_result",
+    "cest_result",
+    "confidence_score",
+    "processing_time",
+    "cost",
+    "user_id",
+    "metadata",
+]
+
 
 class LLMProvider(Enum):
     """Provedores de LLM disponíveis"""
@@ -58,6 +87,7 @@ class ClassificationStrategy(Enum):
     HIERARCHICAL = "hierarchical"  # Classificação hierárquica
     ENSEMBLE = "ensemble"  # Ensemble de múltiplas estratégias
     HYBRID = "hybrid"  # Híbrido adaptativo
+    CASCADE = "cascade"  # Camadas por custo até atingir a confiança
 
 
 @dataclass
@@ -124,6 +154,8 @@ class EnhancedNCMCESTKnowledgeBase:
         self.ncm_data = {}
         self.cest_data = {}
         self.ncm_hierarchy = {}
+        self.ncm_children: Dict[str, List[str]] = {}
+        self.ncm_level_descriptions: Dict[str, str] = {}
         self.cest_patterns = {}
 
         # Índices para busca rápida
@@ -160,6 +192,10 @@ class EnhancedNCMCESTKnowledgeBase:
                             "subposicao": codigo[:6],
                             "item": codigo,
                         }
+                    elif len(codigo) in (2, 4):
+                        self.ncm_level_descriptions[codigo] = item.get(
+                            "Descricao_Completa", ""
+                        )
 
                 logger.info(f"Carregados {len(self.ncm_data)} códigos NCM")
 
@@ -213,8 +249,49 @@ class EnhancedNCMCESTKnowledgeBase:
                         self.keyword_index[word] = {"ncm": [], "cest": []}
                     self.keyword_index[word]["cest"].append(codigo)
 
+        # Árvore NCM: raiz → capítulos → posições → itens
+        children: Dict[str, set] = {}
+        for codigo in self.ncm_data:
+            children.setdefault("", set()).add(codigo[:2])
+            children.setdefault(codigo[:2], set()).add(codigo[:4])
+            children.setdefault(codigo[:4], set()).add(codigo)
+        self.ncm_children = {
+            parent: sorted(codes) for parent, codes in children.items()
+        }
+
         logger.info(f"Índice construído com {len(self.keyword_index)} palavras-chave")
 
+    def describe_ncm(self, codigo: str) -> str:
+        """Descrição de um item, posição ou capítulo NCM (vazia se ausente)"""
+        if codigo in self.ncm_data:
+            return self.ncm_data[codigo]["descricao"]
+        return self.ncm_level_descriptions.get(codigo, "")
+
+    def rank_ncm_prefixes(
+        self, matches: List[Dict], length: int, parent: str = ""
+    ) -> List[Tuple[str, float]]:
+        """
+        Agrupa resultados da busca por prefixo NCM de `length` dígitos dentro
+        de `parent`. Confiança do grupo: maior score (limitado a 1) vezes a
+        fração do score total que o grupo concentra.
+        """
+        groups: Dict[str, List[float]] = {}
+        for match in matches:
+            codigo = match["codigo"]
+            if codigo.startswith(parent):
+                groups.setdefault(codigo[:length], []).append(match["score"])
+
+        total = sum(sum(scores) for scores in groups.values())
+        if total <= 0:
+            return []
+
+        ranking = [
+            (prefix, min(1.0, max(scores)) * sum(scores) / total)
+            for prefix, scores in groups.items()
+        ]
+        ranking.sort(key=lambda x: x[1], reverse=True)
+        return ranking
+
     def search_ncm_semantic(self, query: str, top_k: int = 10) -> List[Dict]:
         """Busca NCM por similaridade semântica"""
         query_lower = query.lower()
@@ -331,7 +408,9 @@ class LLMManager:
         self.config = config
         self.providers = {}
         self.cost_tracker = {}
-        self.response_cache = {}
+        self.latency_stats: Dict[str, StreamingStats] = {}
+        self.response_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.response_cache_size = config.get("response_cache_size", 1000)
 
         self.initialize_providers()
 
@@ -377,6 +456,7 @@ class LLMManager:
         cache_key = self._generate_cache_key(prompt, provider, kwargs)
         if cache_key in self.response_cache:
             logger.debug(f"Cache hit para {provider}")
+            self.response_cache.move_to_end(cache_key)
             return self.response_cache[cache_key]
 
         start_time = time.time()
@@ -393,8 +473,10 @@ class LLMManager:
                 }
             )
 
-            # Atualizar cache
+            # Atualizar cache (LRU com tamanho limitado)
             self.response_cache[cache_key] = result
+            if len(self.response_cache) > self.response_cache_size:
+                self.response_cache.popitem(last=False)
 
             # Rastreamento de custos
             self._track_usage(provider, result)
@@ -436,6 +518,24 @@ class LLMManager:
         self.cost_tracker[provider]["tokens"] += result.get("tokens_used", 0)
         self.cost_tracker[provider]["cost"] += result.get("cost", 0.0)
 
+        if provider not in self.latency_stats:
+            self.latency_stats[provider] = StreamingStats()
+        self.latency_stats[provider].add(result.get("processing_time", 0.0))
+
+    def get_usage_summary(self) -> Dict[str, Any]:
+        """Resumo de uso, custo e latência (p50/p95/p99) por provedor"""
+        return {
+            provider: {
+                **usage,
+                "latency": (
+                    self.latency_stats[provider].to_dict()
+                    if provider in self.latency_stats
+                    else StreamingStats().to_dict()
+                ),
+            }
+            for provider, usage in self.cost_tracker.items()
+        }
+
 
 class BaseProvider:
     """Classe base para provedores LLM"""
@@ -695,10 +795,21 @@ class AdvancedNCMCESTClassifier:
         # Cache de resultados
         self.result_cache = {}
         self.performance_metrics = {}
+        self.cascade = None
 
         # Auditoria
         self.audit_db_path = "data/cache/audit_trail.sqlite"
         self.init_audit_database()
+        audit_config = self.config.get("audit", {})
+        self.audit_sink = AuditSink(
+            SQLiteAuditWriter(
+                self.audit_db_path, "classification_audit", AUDIT_COLUMNS
+            ),
+            max_queue=audit_config.get("max_queue", 10000),
+            batch_size=audit_config.get("batch_size", 200),
+            flush_interval=audit_config.get("flush_interval", 0.5),
+            name="classification_audit",
+        )
 
     def load_config(self, config_path: str) -> Dict[str, Any]:
         """Carrega configurações do sistema"""
@@ -723,9 +834,18 @@ class AdvancedNCMCESTClassifier:
                 "default_strategy": "hybrid",
                 "confidence_threshold": 0.8,
                 "ensemble_models": ["openai", "ollama"],
+                "ensemble_timeout": 30.0,  # segundos por provedor
+                "ensemble_quorum": 2,  # provedores concordando no NCM (0 = todos)
+                "ensemble_straggler_grace": 0.2,  # segundos após o quórum
+                "hierarchical_skip_threshold": 0.85,  # dispensa o LLM no nível
+                "hierarchical_max_candidates": 25,  # opções por prompt
+                "hierarchical_retrieval_top_k": 50,
+                "cascade_enabled": False,  # regras/recuperação antes dos LLMs
+                "cascade_thresholds": {},  # limiar calibrado por camada
                 "fallback_strategy": "rag",
             },
             "caching": {"enabled": True, "ttl_hours": 24, "max_size": 10000},
+            "audit": {"batch_size": 200, "flush_interval": 0.5, "max_queue": 10000},
         }
 
         try:
@@ -794,16 +914,7 @@ class AdvancedNCMCESTClassifier:
             strategy = self._select_classification_strategy(request)
 
             # Executar classificação
-            if strategy == ClassificationStrategy.ENSEMBLE:
-                result = await self._classify_ensemble(request)
-            elif strategy == ClassificationStrategy.RAG:
-                result = await self._classify_rag(request)
-            elif strategy == ClassificationStrategy.HIERARCHICAL:
-                result = await self._classify_hierarchical(request)
-            elif strategy == ClassificationStrategy.HYBRID:
-                result = await self._classify_hybrid(request)
-            else:
-                result = await self._classify_direct(request)
+            result = await self._run_strategy(strategy, request)
 
             # Finalizar resultado
             result.tempo_processamento = time.time() - start_time
@@ -824,10 +935,62 @@ class AdvancedNCMCESTClassifier:
             logger.error(f"Erro na classificação: {e}")
             return self._create_error_result(request, str(e))
 
+    async def _run_strategy(
+        self, strategy: ClassificationStrategy, request: ClassificationRequest
+    ) -> ClassificationResult:
+        """Executa a estratégia de classificação informada"""
+        if strategy == ClassificationStrategy.CASCADE:
+            return await self.get_cascade().classify(request)
+        elif strategy == ClassificationStrategy.ENSEMBLE:
+            return await self._classify_ensemble(request)
+        elif strategy == ClassificationStrategy.RAG:
+            return await self._classify_rag(request)
+        elif strategy == ClassificationStrategy.HIERARCHICAL:
+            return await self._classify_hierarchical(request)
+        elif strategy == ClassificationStrategy.HYBRID:
+            return await self._classify_hybrid(request)
+        return await self._classify_direct(request)
+
+    def get_cascade(self, retrieval_tools=None, nesh_processor=None):
+        """
+        Cascata regras → recuperação → LLMs, criada uma única vez
+
+        Componentes informados depois são trocados nas camadas existentes,
+        preservando calibração e estatísticas acumuladas
+        """
+        if self.cascade is None:
+            from .classification_cascade import build_default_cascade
+
+            self.cascade = build_default_cascade(
+                self,
+                retrieval_tools=retrieval_tools,
+                thresholds=self.config["classification"].get("cascade_thresholds"),
+                nesh_processor=nesh_processor,
+            )
+            return self.cascade
+
+        if retrieval_tools is not None:
+            tier = self.cascade.get_tier("recuperacao")
+            if tier is not None:
+                tier.retrieval_tools = retrieval_tools
+        if nesh_processor is not None:
+            tier = self.cascade.get_tier("regras")
+            if tier is not None:
+                tier.nesh_processor = nesh_processor
+        return self.cascade
+
     def _select_classification_strategy(
         self, request: ClassificationRequest
     ) -> ClassificationStrategy:
         """Seleciona estratégia ótima baseada no contexto"""
+        if self.config["classification"].get("cascade_enabled", False):
+            return ClassificationStrategy.CASCADE
+        return self._select_llm_strategy(request)
+
+    def _select_llm_strategy(
+        self, request: ClassificationRequest
+    ) -> ClassificationStrategy:
+        """Seleciona a estratégia de LLM pela complexidade do produto"""
         # Análise da complexidade do produto
         desc_complexity = len(request.descricao_produto.split())
         has_context = bool(request.contexto_adicional)
@@ -890,39 +1053,245 @@ class AdvancedNCMCESTClassifier:
     async def _classify_ensemble(
         self, request: ClassificationRequest
     ) -> ClassificationResult:
-        """Classificação usando ensemble de modelos"""
-        models = self.config["classification"]["ensemble_models"]
-        results = []
+        """
+        Classificação usando ensemble de modelos
+
+        Os provedores são consultados em paralelo, cada um com seu timeout.
+        Quando `ensemble_quorum` provedores concordam no mesmo NCM de 8
+        dígitos, os demais são cancelados; respostas que chegarem dentro de
+        `ensemble_straggler_grace` segundos entram como alternativas.
+        """
+        classification_config = self.config["classification"]
+        models = [
+            model
+            for model in classification_config["ensemble_models"]
+            if model in self.llm_manager.providers
+        ]
+        timeout = classification_config.get("ensemble_timeout", 30.0)
+        quorum = classification_config.get("ensemble_quorum", 0) or len(models)
+        grace = classification_config.get("ensemble_straggler_grace", 0.2)
 
         prompt = self._build_ensemble_prompt(request)
 
         # Executar em paralelo
-        tasks = []
-        for model in models:
-            if model in self.llm_manager.providers:
-                task = self.llm_manager.generate_response(
-                    prompt, provider=model, complexity="medium"
+        pending = {
+            asyncio.create_task(
+                asyncio.wait_for(
+                    self.llm_manager.generate_response(
+                        prompt, provider=model, complexity="medium"
+                    ),
+                    timeout=timeout,
                 )
-                tasks.append((model, task))
+            ): model
+            for model in models
+        }
+
+        results: List[ClassificationResult] = []
+        votes: Dict[str, int] = {}
+        failed: List[str] = []
 
-        # Coletar resultados
-        for model, task in tasks:
+        def collect(task: asyncio.Task) -> Optional[ClassificationResult]:
+            model = pending.pop(task)
             try:
-                response = await task
                 parsed = self._parse_llm_response(
-                    request, response, f"ensemble-{model}"
+                    request, task.result(), f"ensemble-{model}"
                 )
-                results.append(parsed)
+                # Resposta sem NCM válido (ex.: placeholder da extração por
+                # regex) não vota: conta como falha do provedor
+                if _ncm_vote_key(parsed.ncm_sugerido) is not None:
+                    return parsed
+                logger.warning(
+                    f"Modelo {model} sem NCM válido: {parsed.ncm_sugerido!r}"
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Timeout no modelo {model} ({timeout}s)")
             except Exception as e:
                 logger.warning(f"Erro no modelo {model}: {e}")
+            failed.append(model)
+            return None
+
+        # Coletar resultados conforme chegam, até o quórum
+        quorum_reached = False
+        while pending and not quorum_reached:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                parsed = collect(task)
+                if parsed is None:
+                    continue
+                results.append(parsed)
+                key = _ncm_vote_key(parsed.ncm_sugerido)
+                votes[key] = votes.get(key, 0) + 1
+                quorum_reached = quorum_reached or votes[key] >= quorum
+
+        # Retardatários: breve tolerância, depois cancelamento
+        stragglers: List[ClassificationResult] = []
+        if pending:
+            done, _ = await asyncio.wait(pending, timeout=grace)
+            for task in done:
+                parsed = collect(task)
+                if parsed is not None:
+                    stragglers.append(parsed)
+        cancelled = list(pending.values())
+        for task in pending:
+            task.cancel()
 
         # Consolidar resultados
-        return self._consolidate_ensemble_results(request, results)
+        result = self._consolidate_ensemble_results(request, results)
+        for straggler in stragglers:
+            result.modelos_usados = sorted(
+                set(result.modelos_usados) | set(straggler.modelos_usados)
+            )
+            result.alternative_suggestions.append(
+                {
+                    "ncm": straggler.ncm_sugerido,
+                    "confidence": straggler.ncm_confianca,
+                    "votes": 1,
+                    "source": "ensemble-straggler",
+                }
+            )
+
+        result.metadata["ensemble"] = {
+            "quorum": quorum,
+            "early_exit": quorum_reached and bool(cancelled or stragglers),
+            "cancelled": cancelled,
+            "failed": failed,
+        }
+        return result
 
     async def _classify_hierarchical(
         self, request: ClassificationRequest
     ) -> ClassificationResult:
-        """Classificação hierárquica (capítulo → posição → subposição → item)"""
+        """
+        Classificação hierárquica (capítulo → posição → item) guiada pela
+        árvore NCM: cada etapa escolhe apenas entre os filhos válidos do nível
+        anterior. A busca na base roda em paralelo com a escolha do capítulo
+        e, quando sua confiança no nível atinge o limiar, a chamada ao LLM
+        daquele nível é dispensada.
+        """
+        kb = self.knowledge_base
+        if not kb.ncm_children:
+            return await self._classify_hierarchical_free(request)
+
+        config = self.config.get("classification", {})
+        threshold = config.get("hierarchical_skip_threshold", 0.85)
+        max_candidates = config.get("hierarchical_max_candidates", 25)
+        top_k = config.get("hierarchical_retrieval_top_k", 50)
+
+        trace: Dict[str, Any] = {"llm_calls": 0, "skipped": [], "levels": {}}
+        responses: List[Dict[str, Any]] = []
+
+        # Especulação: busca na base em paralelo com o prompt de capítulo
+        retrieval = asyncio.create_task(
+            asyncio.to_thread(kb.search_ncm_semantic, request.descricao_produto, top_k)
+        )
+        chapter_call = asyncio.create_task(
+            self.llm_manager.generate_response(
+                self._build_hierarchical_prompt(
+                    request, "capitulo", candidates=self._level_candidates("", [])
+                ),
+                complexity="low",
+            )
+        )
+
+        try:
+            try:
+                matches = await retrieval
+            except Exception as e:
+                logger.warning(f"Busca especulativa falhou: {e}")
+                matches = []
+
+            code, response = "", None
+            confidences: List[float] = []
+            for level, length, complexity in HIERARCHICAL_LEVELS:
+                children = kb.ncm_children.get(code, [])
+                if not children:
+                    break
+
+                ranking = kb.rank_ncm_prefixes(matches, length, parent=code)
+                best, best_confidence = ranking[0] if ranking else (None, 0.0)
+
+                if len(children) == 1:
+                    chosen, confidence, source = children[0], 1.0, "arvore"
+                elif best and best_confidence >= threshold:
+                    chosen, confidence, source = best, best_confidence, "recuperacao"
+                else:
+                    if level == "capitulo":
+                        response = await chapter_call
+                    else:
+                        prompt = self._build_hierarchical_prompt(
+                            request,
+                            level,
+                            candidates=self._level_candidates(
+                                code, ranking, max_candidates
+                            ),
+                            parent=code,
+                        )
+                        response = await self.llm_manager.generate_response(
+                            prompt, complexity=complexity
+                        )
+                    trace["llm_calls"] += 1
+                    responses.append(response)
+
+                    chosen = _pick_ncm_code(response.get("content", ""), children)
+                    confidence, source = best_confidence, "llm"
+                    if chosen is None:
+                        chosen, source = best, "recuperacao-fallback"
+                    if chosen is None:
+                        break
+
+                if source != "llm":
+                    trace["skipped"].append(level)
+                    confidences.append(confidence)
+                    response = None
+                trace["levels"][level] = {
+                    "codigo": chosen,
+                    "origem": source,
+                    "confianca_recuperacao": round(best_confidence, 3),
+                    "candidatos": len(children),
+                }
+                code = chosen
+        finally:
+            if not chapter_call.done():
+                chapter_call.cancel()
+
+        if len(code) < 8:
+            # Árvore incompleta para o produto: etapa final sem restrição
+            response = await self.llm_manager.generate_response(
+                self._build_hierarchical_prompt(request, "item", parent=code),
+                complexity="high",
+            )
+            trace["llm_calls"] += 1
+            responses.append(response)
+            result = self._parse_llm_response(request, response, "hierarchical")
+        elif response is not None:
+            result = self._parse_llm_response(request, response, "hierarchical")
+            result.ncm_sugerido = code
+        else:
+            result = ClassificationResult(
+                produto_id=request.produto_id,
+                ncm_sugerido=code,
+                ncm_descricao=kb.describe_ncm(code),
+                ncm_confianca=min(confidences),
+                justificativa=(
+                    "Código selecionado na árvore NCM pela busca na base de "
+                    "conhecimento"
+                ),
+                estrategia_usada="hierarchical",
+            )
+
+        if not result.ncm_descricao or result.ncm_descricao == "Extraído por regex":
+            result.ncm_descricao = kb.describe_ncm(result.ncm_sugerido)
+        result.modelos_usados = sorted(
+            {r.get("provider", "unknown") for r in responses}
+        ) or ["knowledge-base"]
+        result.custo_estimado = sum(r.get("cost", 0.0) for r in responses)
+        result.metadata["hierarchical"] = trace
+        return result
+
+    async def _classify_hierarchical_free(
+        self, request: ClassificationRequest
+    ) -> ClassificationResult:
+        """Classificação hierárquica sem árvore NCM carregada (prompts livres)"""
         # Etapa 1: Identificar capítulo
         capitulo_prompt = self._build_hierarchical_prompt(request, "capitulo")
         capitulo_response = await self.llm_manager.generate_response(
@@ -945,6 +1314,25 @@ class AdvancedNCMCESTClassifier:
 
         return self._parse_llm_response(request, item_response, "hierarchical")
 
+    def _level_candidates(
+        self,
+        parent: str,
+        ranking: List[Tuple[str, float]],
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, str]]:
+        """Filhos válidos de `parent`, os mais bem ranqueados pela busca primeiro"""
+        children = self.knowledge_base.ncm_children.get(parent, [])
+        valid = set(children)
+        ordered = [code for code, _ in ranking if code in valid]
+        seen = set(ordered)
+        ordered.extend(code for code in children if code not in seen)
+        if limit:
+            ordered = ordered[:limit]
+        return [
+            {"codigo": code, "descricao": self.knowledge_base.describe_ncm(code)}
+            for code in ordered
+        ]
+
     async def _classify_hybrid(
         self, request: ClassificationRequest
     ) -> ClassificationResult:
@@ -1063,9 +1451,22 @@ Justificativa: [explicação detalhada]
 """
 
     def _build_hierarchical_prompt(
-        self, request: ClassificationRequest, level: str, previous_response: Dict = None
+        self,
+        request: ClassificationRequest,
+        level: str,
+        previous_response: Dict = None,
+        candidates: Optional[List[Dict[str, str]]] = None,
+        parent: str = "",
     ) -> str:
         """Constrói prompt para classificação hierárquica"""
+        if candidates:
+            return self._build_constrained_prompt(request, level, candidates, parent)
+
+        if parent:
+            previous = f"Prefixo NCM já definido: {parent}"
+        else:
+            previous = previous_response.get("content", "") if previous_response else ""
+
         if level == "capitulo":
             return f"""
 Identifique o CAPÍTULO NCM (2 dígitos) mais apropriado para:
@@ -1078,7 +1479,7 @@ Responda apenas o número do capítulo e uma breve justificativa.
             return f"""
 Dentro do capítulo identificado, determine a POSIÇÃO NCM (4 dígitos) para:
 Produto: {request.descricao_produto}
-Capítulo anterior: {previous_response.get('content', '') if previous_response else ''}
+Capítulo anterior: {previous}
 
 Responda a posição de 4 dígitos mais específica.
 """
@@ -1086,9 +1487,49 @@ Responda a posição de 4 dígitos mais específica.
             return f"""
 Determine o código NCM completo (8 dígitos) final para:
 Produto: {request.descricao_produto}
-Análise anterior: {previous_response.get('content', '') if previous_response else ''}
+Análise anterior: {previous}
 
 Forneça o código NCM de 8 dígitos mais preciso e sua justificativa.
+"""
+
+    def _build_constrained_prompt(
+        self,
+        request: ClassificationRequest,
+        level: str,
+        candidates: List[Dict[str, str]],
+        parent: str,
+    ) -> str:
+        """Prompt de um nível hierárquico restrito aos códigos filhos válidos"""
+        options = "\n".join(
+            f"- {c['codigo']}: {c['descricao'][:120]}".rstrip(": ") for c in candidates
+        )
+        nome = {"capitulo": "CAPÍTULO", "posicao": "POSIÇÃO", "item": "ITEM"}[level]
+        dentro = f" dentro de {parent}" if parent else ""
+
+        if level != "item":
+            return f"""
+Escolha o {nome} NCM{dentro} para:
+Produto: {request.descricao_produto}
+
+Opções válidas:
+{options}
+
+Responda apenas com um dos códigos listados.
+"""
+        return f"""
+Escolha o código NCM (8 dígitos){dentro} para:
+Produto: {request.descricao_produto}
+
+Opções válidas:
+{options}
+
+Responda no formato JSON, usando um dos códigos listados:
+{{
+    "ncm": "00000000",
+    "ncm_descricao": "Descrição do NCM",
+    "ncm_confianca": 0.95,
+    "justificativa": "Explicação breve"
+}}
 """
 
     def _parse_llm_response(
@@ -1142,7 +1583,7 @@ Forneça o código NCM de 8 dígitos mais preciso e sua justificativa.
         # Procurar padrões NCM
         ncm_pattern = r"NCM:?\s*(\d{8}|\d{4}\.\d{2}\.\d{2})"
         ncm_match = re.search(ncm_pattern, content)
-        ncm = ncm_match.group(1).replace(".", "") if ncm_match else "00000000"
+        ncm = ncm_match.group(1).replace(".", "") if ncm_match else PLACEHOLDER_NCM
 
         # Procurar confiança
         conf_pattern = r"[Cc]onfiança:?\s*(\d+\.?\d*)"
@@ -1168,10 +1609,10 @@ Forneça o código NCM de 8 dígitos mais preciso e sua justificativa.
         if not results:
             return self._create_error_result(request, "Nenhum resultado do ensemble")
 
-        # Agrupar por NCM sugerido
+        # Agrupar por NCM sugerido (8 dígitos, sem pontuação)
         ncm_votes = {}
         for result in results:
-            ncm = result.ncm_sugerido
+            ncm = _ncm_key(result.ncm_sugerido)
             if ncm not in ncm_votes:
                 ncm_votes[ncm] = []
             ncm_votes[ncm].append(result)
@@ -1258,33 +1699,57 @@ Forneça o código NCM de 8 dígitos mais preciso e sua justificativa.
     async def _log_classification(
         self, request: ClassificationRequest, result: ClassificationResult
     ):
-        """Registra classificação na auditoria"""
+        """Enfileira a classificação para gravação em lote na auditoria"""
         try:
-            with sqlite3.connect(self.audit_db_path) as conn:
-                conn.execute(
-                    """
-                    INSERT INTO classification_audit
-                    (produto_id, timestamp, strategy, models_used, ncm_result, cest_result,
-                     confidence_score, processing_time, cost, user_id, metadata)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        request.produto_id,
-                        request.timestamp,
-                        result.estrategia_usada,
-                        ",".join(result.modelos_usados),
-                        result.ncm_sugerido,
-                        result.cest_sugerido,
-                        result.ncm_confianca,
-                        result.tempo_processamento,
-                        result.custo_estimado,
-                        request.user_id,
-                        json.dumps(result.metadata),
-                    ),
-                )
+            await self.audit_sink.record(
+                {
+                    "produto_id": request.produto_id,
+                    "timestamp": request.timestamp,
+                    "strategy": result.estrategia_usada,
+                    "models_used": ",".join(result.modelos_usados),
+                    "ncm_result": result.ncm_sugerido,
+                    "cest_result": result.cest_sugerido,
+                    "confidence_score": result.ncm_confianca,
+                    "processing_time": result.tempo_processamento,
+                    "cost": result.custo_estimado,
+                    "user_id": request.user_id,
+                    "metadata": json.dumps(result.metadata),
+                }
+            )
         except Exception as e:
             logger.error(f"Erro ao registrar auditoria: {e}")
 
+    async def close(self):
+        """Grava a auditoria pendente e libera recursos"""
+        await self.audit_sink.close()
+        self.audit_sink.writer.close()
+
+
+def _ncm_key(ncm: Optional[str]) -> str:
+    """NCM normalizado para votação (apenas dígitos)"""
+    return "".join(ch for ch in (ncm or "") if ch.isdigit())
+
+
+def _ncm_vote_key(ncm: Optional[str]) -> Optional[str]:
+    """Chave de voto do ensemble: só NCMs de 8 dígitos que não o placeholder"""
+    key = _ncm_key(ncm)
+    if len(key) != 8 or key == PLACEHOLDER_NCM:
+        return None
+    return key
+
+
+def _pick_ncm_code(content: str, valid: List[str]) -> Optional[str]:
+    """Primeiro código da resposta que corresponde a um dos códigos válidos"""
+    import re
+
+    valid_set = set(valid)
+    length = len(valid[0]) if valid else 0
+    for token in re.findall(r"\d[\d.\-]*", content):
+        code = _ncm_key(token)[:length]
+        if code in valid_set:
+            return code
+    return None
+
 
 # Exemplo de uso
 async def main():
@@ -1321,6 +1786,8 @@ async def main():
     if result.validation_flags:
         print(f"Alertas: {', '.join(result.validation_flags)}")
 
+    await classifier.close()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -12,6 +12,7 @@ import logging
 
 from ...database.connection import get_db_session
 from ...database.models import Usuario, GoldenSet
+from ...database.text_search import GOLDEN_SET_INDEX
 from ..schemas import GoldenSetCreate, GoldenSetResponse, MessageResponse
 from .auth import get_current_user
 from ..middleware.error_handler import APIError, BusinessLogicError
@@ -377,43 +378,34 @@ async def search_similar_in_golden_set(
     """
     logger.info(f"🔍 Buscando similaridade no Golden Set para: {description[:50]}...")
 
-    # Busca simples por palavras-chave (em produção, usar embeddings)
-    search_terms = description.lower().split()
+    # Ranking feito no banco pelo índice de busca (tsvector/pg_trgm ou FTS5)
+    ranked = GOLDEN_SET_INDEX.search(db, description, limit=limit)
+    ranked = [row for row in ranked if row["score"] >= threshold]
 
-    # Query que busca por termos na descrição
-    query = db.query(GoldenSet)
-
-    for term in search_terms[:5]:  # Limitar a 5 termos principais
-        if len(term) > 3:  # Ignorar palavras muito pequenas
-            query = query.filter(
-                or_(
-                    GoldenSet.descricao_produto.ilike(f"%{term}%"),
-                    GoldenSet.descricao_enriquecida.ilike(f"%{term}%"),
-                )
+    entries = {}
+    if ranked:
+        entries = {
+            entry.id: entry
+            for entry in db.query(GoldenSet).filter(
+                GoldenSet.id.in_([row["id"] for row in ranked])
             )
+        }
 
-    # Buscar e limitar resultados
-    similar_entries = query.limit(limit).all()
-
-    # Em uma implementação completa, calcular similaridade semântica real
+    search_terms = set(description.lower().split())
     results = []
-    for entry in similar_entries:
-        # Simulação de score de similaridade baseado em palavras comuns
-        entry_terms = (entry.descricao_produto or "").lower().split()
-        common_terms = set(search_terms) & set(entry_terms)
-        similarity_score = len(common_terms) / max(len(search_terms), len(entry_terms))
-
-        if similarity_score >= threshold:
-            results.append(
-                {
-                    "golden_set_entry": entry,
-                    "similarity_score": similarity_score,
-                    "matching_terms": list(common_terms),
-                }
-            )
+    for row in ranked:
+        entry = entries.get(row["id"])
+        if entry is None:
+            continue
 
-    # Ordenar por similaridade
-    results.sort(key=lambda x: x["similarity_score"], reverse=True)
+        entry_terms = set((entry.descricao_produto or "").lower().split())
+        results.append(
+            {
+                "golden_set_entry": entry,
+                "similarity_score": row["score"],
+                "matching_terms": list(search_terms & entry_terms),
+            }
+        )
 
     logger.info(f"✅ Encontradas {len(results)} entradas similares")
 
@@ -6,16 +6,19 @@ Permite consultar e revisar classificações realizadas
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, and_, desc
+from sqlalchemy import or_, and_, case, desc, func
+import base64
+import json
 import logging
 
 from ...database.connection import get_db_session
 from ...database.models import (
     Usuario,
     ProdutoEmpresa as MercadoriaAClassificar,
-    Classificacao,
     UsuarioEmpresaAcesso,
 )
+from ...database.text_search import PRODUTO_DESCRICAO_INDEX
+from ...core.cache import TTLCache
 from ..schemas import (
     ProductClassificationResult,
     ClassificationDetailResponse,
@@ -28,6 +31,24 @@ from ..middleware.error_handler import APIError
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Totais da listagem por (empresa, filtros); expiram em 60s ou na escrita
+_results_total_cache = TTLCache(maxsize=2048, ttl=60)
+
+# Estatísticas do dashboard por empresa, guardadas com a versão dos dados no
+# banco (os workers gravam em outros processos)
+_classification_stats_cache = TTLCache(maxsize=1024, ttl=300)
+
+STATUS_LIST = ["PENDENTE", "PROCESSANDO", "CONCLUIDA", "REVISAO_MANUAL", "ERRO"]
+
+# status_processamento gravado pela ingestão -> status da API
+STATUS_FROM_PRODUTO = {"PROCESSADO": "CONCLUIDA", "REVISAO_PENDENTE": "REVISAO_MANUAL"}
+
+# Status da API -> valores equivalentes em status_processamento
+STATUS_ALIASES = {
+    "CONCLUIDA": ["CONCLUIDA", "PROCESSADO"],
+    "REVISAO_MANUAL": ["REVISAO_MANUAL", "REVISAO_PENDENTE"],
+}
+
 
 @router.get(
     "/",
@@ -41,11 +62,14 @@ async def list_classification_results(
     status_filter: Optional[str] = Query(None, description="Filtrar por status"),
     ncm_filter: Optional[str] = Query(None, description="Filtrar por NCM"),
     search_term: Optional[str] = Query(None, description="Buscar na descrição"),
+    cursor: Optional[str] = Query(
+        None, description="Cursor retornado em next_cursor (substitui page)"
+    ),
     db: Session = Depends(get_db_session),
     current_user: Usuario = Depends(get_current_user),
 ):
     """
-    Lista resultados de classificação com filtros e paginação
+    Lista resultados de classificação com filtros e paginação por cursor
     """
     logger.info(
         f"📋 Listando resultados da empresa {empresa_id} - Usuário: {current_user.email}"
@@ -66,80 +90,96 @@ async def list_classification_results(
             status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado à empresa"
         )
 
-    # Query base com join
-    query = (
-        db.query(MercadoriaAClassificar)
-        .outerjoin(
-            Classificacao, MercadoriaAClassificar.id == Classificacao.mercadoria_id
-        )
-        .filter(MercadoriaAClassificar.empresa_id == empresa_id)
-        .options(joinedload(MercadoriaAClassificar.classificacao))
-    )
+    # Filtros da listagem (o cursor é aplicado à parte para não afetar o total)
+    filters = [MercadoriaAClassificar.empresa_id == empresa_id]
 
-    # Aplicar filtros
     if status_filter:
-        query = query.filter(MercadoriaAClassificar.status == status_filter)
+        status_column = MercadoriaAClassificar.status_processamento
+        status_condition = status_column.in_(
+            STATUS_ALIASES.get(status_filter, [status_filter])
+        )
+        if status_filter == "PENDENTE":
+            status_condition = or_(status_condition, status_column.is_(None))
+        filters.append(status_condition)
 
     if ncm_filter:
-        query = query.filter(
+        # NCM é hierárquico: busca por prefixo usa os índices B-tree
+        ncm_prefix = f"{ncm_filter.replace('.', '').strip()}%"
+        filters.append(
             or_(
-                MercadoriaAClassificar.ncm_informado.ilike(f"%{ncm_filter}%"),
-                Classificacao.ncm_determinado.ilike(f"%{ncm_filter}%"),
+                MercadoriaAClassificar.ncm.like(ncm_prefix),
+                MercadoriaAClassificar.ncm_sugerido.like(ncm_prefix),
             )
         )
 
     if search_term:
-        search_pattern = f"%{search_term}%"
-        query = query.filter(
-            or_(
-                MercadoriaAClassificar.descricao_original.ilike(search_pattern),
-                MercadoriaAClassificar.descricao_enriquecida.ilike(search_pattern),
-            )
-        )
-
-    # Ordenar por mais recentes
-    query = query.order_by(desc(MercadoriaAClassificar.id))
-
-    # Contar total
-    total = query.count()
-
-    # Aplicar paginação
-    offset = (page - 1) * page_size
-    mercadorias = query.offset(offset).limit(page_size).all()
+        filters.append(PRODUTO_DESCRICAO_INDEX.match_clause(db.get_bind(), search_term))
+
+    # Apenas as colunas exibidas na listagem (resultados ficam no próprio produto)
+    query = db.query(
+        MercadoriaAClassificar.produto_id,
+        MercadoriaAClassificar.descricao_produto,
+        MercadoriaAClassificar.descricao_enriquecida,
+        MercadoriaAClassificar.ncm,
+        MercadoriaAClassificar.cest,
+        MercadoriaAClassificar.ncm_sugerido,
+        MercadoriaAClassificar.cest_sugerido,
+        MercadoriaAClassificar.confianca_ncm,
+        MercadoriaAClassificar.confianca_cest,
+        MercadoriaAClassificar.justificativa_ncm,
+        MercadoriaAClassificar.justificativa_cest,
+        MercadoriaAClassificar.status_processamento,
+        MercadoriaAClassificar.data_processamento,
+    ).filter(*filters)
+
+    # Paginação por keyset em (empresa_id, produto_id); offset por compatibilidade
+    if cursor:
+        query = query.filter(MercadoriaAClassificar.produto_id < _decode_cursor(cursor))
+    elif page > 1:
+        query = query.offset((page - 1) * page_size)
+
+    # Ordem decrescente de produto_id (uma linha extra indica se há próxima página)
+    rows = (
+        query.order_by(desc(MercadoriaAClassificar.produto_id))
+        .limit(page_size + 1)
+        .all()
+    )
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    # Total em cache por empresa/filtros (evita COUNT exato a cada página)
+    total = _results_total_cache.get_or_set(
+        (empresa_id, status_filter, ncm_filter, search_term),
+        lambda: db.query(func.count(MercadoriaAClassificar.produto_id))
+        .filter(*filters)
+        .scalar(),
+    )
 
     # Converter para schema de resposta
-    items = []
-    for mercadoria in mercadorias:
-        classificacao = (
-            mercadoria.classificacao[0] if mercadoria.classificacao else None
-        )
-
-        item = ProductClassificationResult(
-            mercadoria_id=mercadoria.id,
-            produto_id=mercadoria.produto_id_origem,
-            descricao_original=mercadoria.descricao_original,
-            descricao_enriquecida=mercadoria.descricao_enriquecida,
-            ncm_informado=mercadoria.ncm_informado,
-            cest_informado=mercadoria.cest_informado,
-            ncm_determinado=classificacao.ncm_determinado if classificacao else None,
-            cest_determinado=classificacao.cest_determinado if classificacao else None,
-            confianca_ncm=classificacao.confianca_ncm if classificacao else None,
-            confianca_cest=classificacao.confianca_cest if classificacao else None,
-            status=mercadoria.status,
-            justificativa_ncm=(
-                classificacao.justificativa_ncm if classificacao else None
-            ),
-            contexto_ncm=classificacao.contexto_ncm if classificacao else None,
-            justificativa_cest=(
-                classificacao.justificativa_cest if classificacao else None
-            ),
-            contexto_cest=classificacao.contexto_cest if classificacao else None,
-            processado_em=classificacao.processado_em if classificacao else None,
+    items = [
+        ProductClassificationResult(
+            produto_id=produto.produto_id,
+            descricao_original=produto.descricao_produto,
+            descricao_enriquecida=produto.descricao_enriquecida,
+            ncm_informado=produto.ncm,
+            cest_informado=produto.cest,
+            ncm_determinado=produto.ncm_sugerido,
+            cest_determinado=produto.cest_sugerido,
+            confianca_ncm=produto.confianca_ncm,
+            confianca_cest=produto.confianca_cest,
+            status=_listing_status(produto.status_processamento),
+            justificativa_ncm=produto.justificativa_ncm,
+            contexto_ncm=None,
+            justificativa_cest=produto.justificativa_cest,
+            contexto_cest=None,
+            processado_em=produto.data_processamento,
         )
-        items.append(item)
+        for produto in rows
+    ]
 
     # Calcular total de páginas
     total_pages = (total + page_size - 1) // page_size
+    next_cursor = _encode_cursor(rows[-1].produto_id) if has_more else None
 
     logger.info(f"✅ Retornando {len(items)} resultados de {total} total")
 
@@ -149,9 +189,41 @@ async def list_classification_results(
         page=page,
         page_size=page_size,
         total_pages=total_pages,
+        next_cursor=next_cursor,
+        has_more=has_more,
     )
 
 
+def _listing_status(status_processamento: Optional[str]) -> str:
+    """Status do produto no vocabulário da API (nulo = pendente)."""
+    if not status_processamento:
+        return "PENDENTE"
+    return STATUS_FROM_PRODUTO.get(status_processamento, status_processamento)
+
+
+def _encode_cursor(last_id: str) -> str:
+    """Codifica o último produto_id da página como cursor opaco."""
+    payload = json.dumps({"id": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> str:
+    """Decodifica o cursor recebido do cliente."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido"
+        )
+
+
+def invalidate_results_cache(empresa_id: int) -> None:
+    """Descarta totais e estatísticas em cache da empresa após escritas."""
+    _results_total_cache.invalidate_where(lambda key: key[0] == empresa_id)
+    _classification_stats_cache.invalidate(empresa_id)
+
+
 @router.get(
     "/details/{mercadoria_id}",
     response_model=ClassificationDetailResponse,
@@ -394,6 +466,7 @@ async def update_classification_status(
 
     try:
         db.commit()
+        invalidate_results_cache(mercadoria.empresa_id)
         logger.info(f"✅ Status atualizado: {old_status} → {new_status}")
 
         return MessageResponse(
@@ -438,76 +511,84 @@ async def get_classification_stats(
             status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado à empresa"
         )
 
-    # Estatísticas básicas
-    total_produtos = (
-        db.query(MercadoriaAClassificar)
+    # Recalcula só quando a versão no banco mudou desde o último cálculo
+    version = _classification_stats_version(db, empresa_id)
+    cached = _classification_stats_cache.get(empresa_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    stats = _compute_classification_stats(db, empresa_id)
+    _classification_stats_cache.set(empresa_id, (version, stats))
+    return stats
+
+
+def _classification_stats_version(db: Session, empresa_id: int):
+    """
+    Versão dos produtos da empresa: max(data_atualizacao), resolvido por
+    uma busca em idx_produtos_empresa_atualizacao. Toda escrita (inclusive
+    a reimportação, que apaga e reinsere) grava data_atualizacao.
+    """
+    return (
+        db.query(func.max(MercadoriaAClassificar.data_atualizacao))
         .filter(MercadoriaAClassificar.empresa_id == empresa_id)
-        .count()
+        .scalar()
     )
 
-    # Por status
-    stats_by_status = {}
-    status_list = ["PENDENTE", "PROCESSANDO", "CONCLUIDA", "REVISAO_MANUAL", "ERRO"]
 
-    for status_code in status_list:
-        count = (
-            db.query(MercadoriaAClassificar)
-            .filter(
-                MercadoriaAClassificar.empresa_id == empresa_id,
-                MercadoriaAClassificar.status == status_code,
-            )
-            .count()
+def _compute_classification_stats(db: Session, empresa_id: int) -> dict:
+    """Calcula as estatísticas da empresa com duas consultas agregadas."""
+    # Contagem por status em uma única consulta agrupada
+    status_counts = (
+        db.query(
+            MercadoriaAClassificar.status_processamento,
+            func.count(MercadoriaAClassificar.produto_id),
         )
-        stats_by_status[status_code] = count
-
-    # Estatísticas de confiança (apenas produtos classificados)
-    classificacoes = (
-        db.query(Classificacao)
-        .join(
-            MercadoriaAClassificar,
-            Classificacao.mercadoria_id == MercadoriaAClassificar.id,
+        .filter(MercadoriaAClassificar.empresa_id == empresa_id)
+        .group_by(MercadoriaAClassificar.status_processamento)
+        .all()
+    )
+
+    stats_by_status = {status_code: 0 for status_code in STATUS_LIST}
+    for status_processamento, count in status_counts:
+        status_code = _listing_status(status_processamento)
+        stats_by_status[status_code] = stats_by_status.get(status_code, 0) + count
+    total_produtos = sum(stats_by_status.values())
+
+    # Estatísticas de confiança (apenas produtos classificados) agregadas no banco
+    confianca = MercadoriaAClassificar.confianca_ncm
+    (
+        total_classified,
+        avg_confidence_ncm,
+        avg_confidence_cest,
+        high_confidence,
+        medium_confidence,
+        low_confidence,
+    ) = (
+        db.query(
+            func.count(MercadoriaAClassificar.produto_id),
+            func.avg(confianca),
+            func.avg(MercadoriaAClassificar.confianca_cest),
+            func.sum(case((confianca > 0.8, 1), else_=0)),
+            func.sum(case((and_(confianca >= 0.6, confianca <= 0.8), 1), else_=0)),
+            func.sum(case((confianca < 0.6, 1), else_=0)),
         )
         .filter(
             MercadoriaAClassificar.empresa_id == empresa_id,
-            Classificacao.confianca_ncm.isnot(None),
+            confianca.isnot(None),
         )
-        .all()
+        .one()
     )
 
     confidence_stats = {
-        "total_classified": len(classificacoes),
-        "avg_confidence_ncm": 0,
-        "avg_confidence_cest": 0,
-        "high_confidence": 0,  # > 0.8
-        "medium_confidence": 0,  # 0.6 - 0.8
-        "low_confidence": 0,  # < 0.6
+        "total_classified": total_classified or 0,
+        "avg_confidence_ncm": float(avg_confidence_ncm or 0),
+        "avg_confidence_cest": float(avg_confidence_cest or 0),
+        "high_confidence": int(high_confidence or 0),  # > 0.8
+        "medium_confidence": int(medium_confidence or 0),  # 0.6 - 0.8
+        "low_confidence": int(low_confidence or 0),  # < 0.6
+        "percentiles_ncm": _confidence_percentiles(db, empresa_id),
     }
 
-    if classificacoes:
-        ncm_confidences = [c.confianca_ncm for c in classificacoes if c.confianca_ncm]
-        cest_confidences = [
-            c.confianca_cest for c in classificacoes if c.confianca_cest
-        ]
-
-        if ncm_confidences:
-            confidence_stats["avg_confidence_ncm"] = sum(ncm_confidences) / len(
-                ncm_confidences
-            )
-
-        if cest_confidences:
-            confidence_stats["avg_confidence_cest"] = sum(cest_confidences) / len(
-                cest_confidences
-            )
-
-        # Categorizar por confiança (usando NCM como referência)
-        for confidence in ncm_confidences:
-            if confidence > 0.8:
-                confidence_stats["high_confidence"] += 1
-            elif confidence >= 0.6:
-                confidence_stats["medium_confidence"] += 1
-            else:
-                confidence_stats["low_confidence"] += 1
-
     return {
         "empresa_id": empresa_id,
         "total_produtos": total_produtos,
@@ -524,3 +605,30 @@ async def get_classification_stats(
             ),
         },
     }
+
+
+def _confidence_percentiles(db: Session, empresa_id: int) -> dict:
+    """Percentis de confiança NCM (calculados no banco apenas no PostgreSQL)."""
+    percentiles = {"p25": None, "p50": None, "p75": None, "p90": None}
+
+    if db.get_bind().dialect.name != "postgresql":
+        return percentiles
+
+    confianca = MercadoriaAClassificar.confianca_ncm
+    values = (
+        db.query(
+            *[
+                func.percentile_cont(fraction).within_group(confianca)
+                for fraction in (0.25, 0.5, 0.75, 0.9)
+            ]
+        )
+        .filter(
+            MercadoriaAClassificar.empresa_id == empresa_id,
+            confianca.isnot(None),
+        )
+        .one()
+    )
+
+    for key, value in zip(percentiles, values):
+        percentiles[key] = float(value) if value is not None else None
+    return percentiles
@@ -10,7 +10,7 @@ from contextlib import asynccontextmanager
 import logging
 import uvicorn
 
-from ..core.config import load_config
+from ..core.config import get_settings, load_config
 from .endpoints import (
     auth,
     companies,
@@ -38,6 +38,7 @@ config = load_config()
 async def lifespan(app: FastAPI):
     """Gerenciar ciclo de vida da aplicação"""
     logger.info("🚀 Iniciando Sistema de Auditoria Fiscal ICMS v16.0")
+    job_workers = []
 
     # Inicialização
     try:
@@ -50,6 +51,15 @@ async def lifespan(app: FastAPI):
         # Verificar estrutura de dados
         logger.info("📊 Verificando estrutura de dados...")
 
+        # Workers da fila de jobs (importação, classificação em lote)
+        processing = get_settings().processing
+        if processing.job_workers_embedded and processing.job_workers > 0:
+            from ..jobs import start_workers
+
+            job_workers = start_workers(
+                processing.job_workers, processing.job_concurrency
+            )
+
         logger.info("🎯 Sistema iniciado com sucesso!")
         yield
 
@@ -57,6 +67,10 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Erro na inicialização: {e}")
         raise
     finally:
+        if job_workers:
+            from ..jobs import stop_workers
+
+            stop_workers(job_workers)
         logger.info("🛑 Finalizando Sistema de Auditoria Fiscal")
 
 
@@ -251,7 +251,7 @@ class ClassificationJobStatus(BaseModel):
 class ProductClassificationResult(BaseModel):
     """Schema para resultado de classificação de produto"""
 
-    mercadoria_id: int
+    mercadoria_id: Optional[int] = None
     produto_id: str
     descricao_original: str
     descricao_enriquecida: Optional[str]
@@ -306,6 +306,10 @@ class ResultsListResponse(BaseModel):
     page: int = Field(..., description="Página atual")
     page_size: int = Field(..., description="Itens por página")
     total_pages: int = Field(..., description="Total de páginas")
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor para a próxima página (paginação por keyset)"
+    )
+    has_more: bool = Field(False, description="Indica se há mais registros")
 
 
 # =============================================================================
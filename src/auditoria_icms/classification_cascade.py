@@ -0,0 +1,592 @@
+"""
+Cascata de classificação por custo
+Regras → recuperação → LLM pequeno → LLM grande
+
+Cada camada devolve um palpite com confiança bruta, calibrada por camada
+(tabela por faixas ajustada em dados rotulados). A cascata para na primeira
+camada cuja confiança calibrada atinge o limiar dela e acumula, por camada,
+taxa de aceite e latência. O modo de simulação executa todas as camadas
+sobre um conjunto rotulado uma única vez e reavalia calibração e limiares
+sobre as saídas gravadas, sem novas chamadas.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .ai_classification_advanced import (
+    ClassificationRequest,
+    ClassificationResult,
+    ClassificationStrategy,
+    _ncm_key,
+)
+from .core.telemetry import StreamingStats
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TierDecision:
+    """Palpite de uma camada"""
+
+    ncm: str
+    confidence: float
+    cest: Optional[str] = None
+    ncm_descricao: str = ""
+    justificativa: str = ""
+    modelos: List[str] = field(default_factory=list)
+    custo: float = 0.0
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+class CascadeTier(ABC):
+    """Camada da cascata; `classify` retorna None quando não há palpite"""
+
+    name = "tier"
+
+    @abstractmethod
+    async def classify(self, request: ClassificationRequest) -> Optional[TierDecision]:
+        """Palpite da camada para o produto, com confiança bruta"""
+
+
+class RulesTier(CascadeTier):
+    """Regras determinísticas: agentes NCM/CEST reais e regras gerais NESH"""
+
+    name = "regras"
+
+    def __init__(self, ncm_agent=None, cest_agent=None, nesh_processor=None):
+        if ncm_agent is None or cest_agent is None:
+            from .agents.real_agents import CESTAgent, NCMAgent
+
+            ncm_agent = ncm_agent or NCMAgent()
+            cest_agent = cest_agent or CESTAgent()
+        self.ncm_agent = ncm_agent
+        self.cest_agent = cest_agent
+        self.nesh_processor = nesh_processor
+
+    async def classify(self, request: ClassificationRequest) -> Optional[TierDecision]:
+        return await asyncio.to_thread(self._classify_sync, request)
+
+    def _classify_sync(self, request: ClassificationRequest) -> Optional[TierDecision]:
+        descricao = request.descricao_produto
+        decision = None
+
+        ncm_atual = _ncm_key(request.ncm_atual)
+        if ncm_atual:
+            validation = self.ncm_agent.validate_ncm(ncm_atual, descricao)
+            if validation.get("valid"):
+                decision = TierDecision(
+                    ncm=ncm_atual,
+                    confidence=validation["confidence"],
+                    justificativa=validation.get("justificativa", ""),
+                    details={"regra": "validacao_ncm_atual"},
+                )
+        else:
+            determination = self.ncm_agent.determine_ncm(descricao)
+            if determination.get("success"):
+                decision = TierDecision(
+                    ncm=determination["ncm_determinado"],
+                    confidence=determination["confidence"],
+                    justificativa=determination.get("justificativa", ""),
+                    details={"regra": "determinacao_ncm"},
+                )
+
+        if self.nesh_processor is not None:
+            nesh = self.nesh_processor.aplicar_regras_sequenciais(
+                {"descricao": descricao, "ncm": ncm_atual}
+            )
+            ncm_nesh = _ncm_key(nesh.get("ncm_sugerido"))
+            confianca = nesh.get("confianca", 0.0)
+            if len(ncm_nesh) == 8 and (
+                decision is None or confianca > decision.confidence
+            ):
+                decision = TierDecision(
+                    ncm=ncm_nesh,
+                    confidence=confianca,
+                    justificativa="; ".join(nesh.get("justificativas", [])),
+                    details={"regra": "nesh"},
+                )
+
+        if decision is not None:
+            cest = self.cest_agent.determine_cest(decision.ncm, descricao)
+            decision.cest = cest.get("cest_determinado")
+            decision.modelos = ["regras"]
+        return decision
+
+
+class RetrievalTier(CascadeTier):
+    """Exemplos conhecidos: GTIN exato e golden set por similaridade"""
+
+    name = "recuperacao"
+
+    def __init__(self, retrieval_tools, gtin_confidence: float = 0.99):
+        self.retrieval_tools = retrieval_tools
+        self.gtin_confidence = gtin_confidence
+
+    async def classify(self, request: ClassificationRequest) -> Optional[TierDecision]:
+        if request.gtin:
+            match = await self.retrieval_tools.search_by_gtin(request.gtin)
+            if match and match.get("ncm"):
+                return TierDecision(
+                    ncm=_ncm_key(match["ncm"]),
+                    confidence=match.get("confianca") or self.gtin_confidence,
+                    cest=match.get("cest"),
+                    ncm_descricao=match.get("descricao") or "",
+                    justificativa=f"GTIN {request.gtin} encontrado em exemplos",
+                    modelos=["gtin"],
+                    details={"fonte": match.get("fonte", "gtin")},
+                )
+
+        matches = await self.retrieval_tools.search_golden_set(
+            request.descricao_produto, top_k=1
+        )
+        if matches and matches[0].get("ncm"):
+            best = matches[0]
+            return TierDecision(
+                ncm=_ncm_key(best["ncm"]),
+                confidence=float(best.get("score", 0.0)),
+                cest=best.get("cest"),
+                justificativa=f"Golden set: '{best.get('descricao_original', '')}'",
+                modelos=["golden-set"],
+                details={"fonte": "golden_set"},
+            )
+        return None
+
+
+class StrategyTier(CascadeTier):
+    """Estratégia do classificador avançado (LLM)"""
+
+    def __init__(
+        self,
+        name: str,
+        classifier,
+        strategy: Optional[ClassificationStrategy] = None,
+    ):
+        self.name = name
+        self.classifier = classifier
+        self.strategy = strategy
+
+    async def classify(self, request: ClassificationRequest) -> Optional[TierDecision]:
+        strategy = self.strategy or self.classifier._select_llm_strategy(request)
+        result = await self.classifier._run_strategy(strategy, request)
+        if not result.ncm_sugerido or "error" in result.validation_flags:
+            return None
+        return TierDecision(
+            ncm=_ncm_key(result.ncm_sugerido),
+            confidence=result.ncm_confianca,
+            cest=result.cest_sugerido,
+            ncm_descricao=result.ncm_descricao,
+            justificativa=result.justificativa,
+            modelos=list(result.modelos_usados),
+            custo=result.custo_estimado,
+            details={"estrategia": strategy.value},
+        )
+
+
+class LocalLLMTier(CascadeTier):
+    """LLM local via Ollama (`LocalLLMClassifier`, síncrono)"""
+
+    name = "llm_local"
+
+    def __init__(self, local_classifier):
+        self.local_classifier = local_classifier
+
+    async def classify(self, request: ClassificationRequest) -> Optional[TierDecision]:
+        result = await asyncio.to_thread(
+            self.local_classifier.classify_product,
+            request.produto_id,
+            request.descricao_produto,
+        )
+        if not result.ncm_sugerido:
+            return None
+        return TierDecision(
+            ncm=_ncm_key(result.ncm_sugerido),
+            confidence=result.ncm_confianca,
+            cest=result.cest_sugerido,
+            justificativa=result.justificativa,
+            modelos=[result.modelo_usado],
+        )
+
+
+class ConfidenceCalibrator:
+    """
+    Confiança bruta → probabilidade de acerto, por faixas de largura fixa.
+
+    Sem ajuste, é a identidade. `fit` calcula a taxa de acerto de cada faixa
+    (suavizada pelo centro da faixa) e força monotonicidade com PAV.
+    """
+
+    def __init__(self, bins: int = 10, prior_weight: float = 2.0):
+        self.bins = bins
+        self.prior_weight = prior_weight
+        self.table: Optional[List[float]] = None
+
+    def _bin(self, raw: float) -> int:
+        return min(self.bins - 1, max(0, int(raw * self.bins)))
+
+    def __call__(self, raw: float) -> float:
+        raw = min(1.0, max(0.0, raw))
+        return raw if self.table is None else self.table[self._bin(raw)]
+
+    def fit(self, samples: Iterable[Tuple[float, bool]]) -> None:
+        hits = [0.0] * self.bins
+        counts = [0.0] * self.bins
+        for raw, correct in samples:
+            index = self._bin(min(1.0, max(0.0, raw)))
+            counts[index] += 1
+            hits[index] += 1.0 if correct else 0.0
+
+        if not any(counts):
+            self.table = None
+            return
+
+        # Suavização: cada faixa começa com o centro da faixa como prior
+        blocks = []
+        for index in range(self.bins):
+            center = (index + 0.5) / self.bins
+            weight = counts[index] + self.prior_weight
+            value = (hits[index] + center * self.prior_weight) / weight
+            blocks.append([value, weight, 1])
+
+        # Pool adjacent violators (não decrescente)
+        merged: List[List[float]] = []
+        for block in blocks:
+            merged.append(block)
+            while len(merged) > 1 and merged[-2][0] > merged[-1][0]:
+                value2, weight2, size2 = merged.pop()
+                value1, weight1, size1 = merged.pop()
+                weight = weight1 + weight2
+                value = (value1 * weight1 + value2 * weight2) / weight
+                merged.append([value, weight, size1 + size2])
+
+        self.table = [value for value, _, size in merged for _ in range(int(size))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"bins": self.bins, "table": self.table}
+
+
+@dataclass
+class TierStats:
+    """Estatísticas acumuladas de uma camada"""
+
+    attempts: int = 0
+    accepted: int = 0
+    no_answer: int = 0
+    errors: int = 0
+    latency: StreamingStats = field(default_factory=StreamingStats)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "accepted": self.accepted,
+            "hit_rate": self.accepted / self.attempts if self.attempts else 0.0,
+            "no_answer": self.no_answer,
+            "errors": self.errors,
+            "latency": self.latency.to_dict(),
+        }
+
+
+@dataclass
+class CascadeSample:
+    """Saída gravada de uma camada para um exemplo rotulado"""
+
+    tier: str
+    ncm: Optional[str]
+    raw_confidence: float
+    latency: float
+    custo: float
+    correct: bool
+
+
+class ClassificationCascade:
+    """Executa as camadas em ordem de custo até uma atingir seu limiar"""
+
+    def __init__(
+        self,
+        tiers: Sequence[CascadeTier],
+        thresholds: Optional[Dict[str, float]] = None,
+        default_threshold: float = 0.85,
+    ):
+        self.tiers = list(tiers)
+        self.thresholds = dict(thresholds or {})
+        self.default_threshold = default_threshold
+        self.calibrators: Dict[str, ConfidenceCalibrator] = {
+            tier.name: ConfidenceCalibrator() for tier in self.tiers
+        }
+        self.stats: Dict[str, TierStats] = {
+            tier.name: TierStats() for tier in self.tiers
+        }
+        self.total_requests = 0
+
+    def get_tier(self, name: str) -> Optional[CascadeTier]:
+        return next((tier for tier in self.tiers if tier.name == name), None)
+
+    def threshold_for(self, tier_name: str) -> float:
+        return self.thresholds.get(tier_name, self.default_threshold)
+
+    async def _run_tier(
+        self, tier: CascadeTier, request: ClassificationRequest
+    ) -> Tuple[Optional[TierDecision], float]:
+        start = time.perf_counter()
+        try:
+            decision = await tier.classify(request)
+        except Exception as e:
+            logger.warning(f"Camada {tier.name} falhou: {e}")
+            self.stats[tier.name].errors += 1
+            decision = None
+        return decision, time.perf_counter() - start
+
+    async def classify(self, request: ClassificationRequest) -> ClassificationResult:
+        """Classifica pela primeira camada aceita; senão, pelo melhor palpite."""
+        self.total_requests += 1
+        trace = []
+        best: Optional[Tuple[float, CascadeTier, TierDecision]] = None
+        custo = 0.0
+
+        for tier in self.tiers:
+            stats = self.stats[tier.name]
+            stats.attempts += 1
+            decision, elapsed = await self._run_tier(tier, request)
+            stats.latency.add(elapsed)
+
+            if decision is None or not decision.ncm:
+                stats.no_answer += 1
+                trace.append({"camada": tier.name, "latencia": round(elapsed, 4)})
+                continue
+
+            custo += decision.custo
+            calibrated = self.calibrators[tier.name](decision.confidence)
+            accepted = calibrated >= self.threshold_for(tier.name)
+            trace.append(
+                {
+                    "camada": tier.name,
+                    "ncm": decision.ncm,
+                    "confianca_bruta": decision.confidence,
+                    "confianca": round(calibrated, 4),
+                    "aceita": accepted,
+                    "latencia": round(elapsed, 4),
+                }
+            )
+
+            if best is None or calibrated > best[0]:
+                best = (calibrated, tier, decision)
+            if accepted:
+                stats.accepted += 1
+                break
+
+        if best is None:
+            return ClassificationResult(
+                produto_id=request.produto_id,
+                ncm_sugerido="00000000",
+                ncm_descricao="Nenhuma camada da cascata retornou classificação",
+                ncm_confianca=0.0,
+                estrategia_usada="cascade",
+                validation_flags=["cascade_no_answer"],
+                requires_human_review=True,
+                metadata={"cascade": trace},
+            )
+
+        confidence, tier, decision = best
+        accepted = trace[-1].get("aceita", False)
+        return ClassificationResult(
+            produto_id=request.produto_id,
+            ncm_sugerido=decision.ncm,
+            ncm_descricao=decision.ncm_descricao,
+            ncm_confianca=confidence,
+            cest_sugerido=decision.cest,
+            justificativa=decision.justificativa,
+            modelos_usados=decision.modelos,
+            custo_estimado=custo,
+            estrategia_usada="cascade",
+            validation_flags=[] if accepted else ["cascade_below_threshold"],
+            requires_human_review=not accepted,
+            metadata={"cascade": trace, "camada": tier.name, **decision.details},
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Taxa de aceite e latência por camada"""
+        return {
+            "total_requests": self.total_requests,
+            "tiers": {name: stats.to_dict() for name, stats in self.stats.items()},
+            "thresholds": {
+                tier.name: self.threshold_for(tier.name) for tier in self.tiers
+            },
+        }
+
+    # Simulação com conjunto rotulado
+
+    async def record_samples(
+        self,
+        labeled: Iterable[Tuple[ClassificationRequest, str]],
+        concurrency: int = 4,
+    ) -> List[List[CascadeSample]]:
+        """Executa todas as camadas sobre cada exemplo rotulado (request, ncm)."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def replay(request: ClassificationRequest, expected: str):
+            async with semaphore:
+                samples = []
+                for tier in self.tiers:
+                    decision, elapsed = await self._run_tier(tier, request)
+                    ncm = decision.ncm if decision else None
+                    samples.append(
+                        CascadeSample(
+                            tier=tier.name,
+                            ncm=ncm,
+                            raw_confidence=decision.confidence if decision else 0.0,
+                            latency=elapsed,
+                            custo=decision.custo if decision else 0.0,
+                            correct=bool(ncm) and ncm == _ncm_key(expected),
+                        )
+                    )
+                return samples
+
+        return await asyncio.gather(
+            *(replay(request, expected) for request, expected in labeled)
+        )
+
+    def fit_calibration(self, recorded: List[List[CascadeSample]]) -> None:
+        """Ajusta os calibradores com as saídas gravadas."""
+        for tier in self.tiers:
+            self.calibrators[tier.name].fit(
+                (sample.raw_confidence, sample.correct)
+                for samples in recorded
+                for sample in samples
+                if sample.tier == tier.name and sample.ncm
+            )
+
+    def evaluate(
+        self,
+        recorded: List[List[CascadeSample]],
+        thresholds: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        """Reproduz a cascata sobre as saídas gravadas com os limiares dados."""
+        thresholds = {**self.thresholds, **(thresholds or {})}
+        per_tier = {
+            tier.name: {"attempts": 0, "accepted": 0, "correct": 0}
+            for tier in self.tiers
+        }
+        correct = latency = custo = 0.0
+
+        for samples in recorded:
+            best: Optional[Tuple[float, CascadeSample]] = None
+            chosen = None
+            for sample in samples:
+                per_tier[sample.tier]["attempts"] += 1
+                latency += sample.latency
+                custo += sample.custo
+                if not sample.ncm:
+                    continue
+                calibrated = self.calibrators[sample.tier](sample.raw_confidence)
+                if best is None or calibrated > best[0]:
+                    best = (calibrated, sample)
+                if calibrated >= thresholds.get(sample.tier, self.default_threshold):
+                    chosen = sample
+                    per_tier[sample.tier]["accepted"] += 1
+                    per_tier[sample.tier]["correct"] += sample.correct
+                    break
+            final = chosen or (best[1] if best else None)
+            correct += bool(final and final.correct)
+
+        total = len(recorded) or 1
+        for values in per_tier.values():
+            attempts = values["attempts"]
+            values["hit_rate"] = values["accepted"] / attempts if attempts else 0.0
+        return {
+            "examples": len(recorded),
+            "accuracy": correct / total,
+            "mean_latency": latency / total,
+            "mean_cost": custo / total,
+            "tiers": per_tier,
+        }
+
+    def tune_thresholds(
+        self,
+        recorded: List[List[CascadeSample]],
+        target_accuracy: float = 0.95,
+        candidates: Optional[Sequence[float]] = None,
+    ) -> Dict[str, float]:
+        """
+        Menor limiar por camada cuja precisão entre os aceitos atinge
+        `target_accuracy`, percorrendo as camadas em ordem (cada camada só
+        vê os exemplos não aceitos pelas anteriores). A última camada
+        mantém o limiar atual: é o destino final de qualquer forma.
+        """
+        candidates = sorted(candidates or [i / 20 for i in range(1, 20)])
+        remaining = list(recorded)
+        tuned: Dict[str, float] = {}
+
+        for tier in self.tiers[:-1]:
+            calibrate = self.calibrators[tier.name]
+            outputs = [
+                (samples, next(s for s in samples if s.tier == tier.name))
+                for samples in remaining
+            ]
+            threshold = 1.01
+            for candidate in candidates:
+                accepted = [
+                    sample
+                    for _, sample in outputs
+                    if sample.ncm and calibrate(sample.raw_confidence) >= candidate
+                ]
+                hits = sum(sample.correct for sample in accepted)
+                if accepted and hits / len(accepted) >= target_accuracy:
+                    threshold = candidate
+                    break
+            tuned[tier.name] = threshold
+            remaining = [
+                samples
+                for samples, sample in outputs
+                if not (sample.ncm and calibrate(sample.raw_confidence) >= threshold)
+            ]
+
+        self.thresholds.update(tuned)
+        return tuned
+
+    async def simulate(
+        self,
+        labeled: Iterable[Tuple[ClassificationRequest, str]],
+        target_accuracy: float = 0.95,
+        calibrate: bool = True,
+        concurrency: int = 4,
+    ) -> Dict[str, Any]:
+        """Calibra, ajusta limiares e avalia a cascata em um conjunto rotulado."""
+        recorded = await self.record_samples(labeled, concurrency=concurrency)
+        before = self.evaluate(recorded)
+        if calibrate:
+            self.fit_calibration(recorded)
+        thresholds = self.tune_thresholds(recorded, target_accuracy)
+        return {
+            "thresholds": thresholds,
+            "before": before,
+            "after": self.evaluate(recorded),
+            "calibration": {
+                name: calibrator.to_dict()
+                for name, calibrator in self.calibrators.items()
+            },
+        }
+
+
+def build_default_cascade(
+    classifier,
+    retrieval_tools=None,
+    thresholds: Optional[Dict[str, float]] = None,
+    nesh_processor=None,
+) -> ClassificationCascade:
+    """Regras → recuperação → LLM pequeno → LLM grande."""
+    if retrieval_tools is None:
+        from .tools.retrieval_tools import RetrievalTools
+
+        # Sem initialize(): resolve pelo índice GTIN compartilhado; o golden
+        # set só entra com ferramentas já conectadas ao SQLite
+        retrieval_tools = RetrievalTools({})
+    tiers: List[CascadeTier] = [
+        RulesTier(nesh_processor=nesh_processor),
+        RetrievalTier(retrieval_tools),
+    ]
+    tiers.append(StrategyTier("llm_pequeno", classifier, ClassificationStrategy.DIRECT))
+    tiers.append(StrategyTier("llm_grande", classifier))
+    return ClassificationCascade(tiers, thresholds)
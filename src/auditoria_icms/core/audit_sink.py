@@ -0,0 +1,58 @@
+"""
+Gravação assíncrona e em lote de registros de auditoria
+
+Os registros são enfileirados em memória (fila limitada, com contrapressão
+quando cheia) e gravados por uma tarefa em segundo plano em lotes, numa
+única transação por lote, fora do event loop. A fila é descarregada no
+encerramento (`close`) e, como último recurso, na saída do processo.
+
+A fila (`AuditSink`) é a mesma dos microsserviços, importada de
+microservices/shared; aqui fica apenas o writer SQLite da aplicação.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from microservices.shared.audit_sink import AuditRecord, AuditSink, AuditWriter
+
+__all__ = ["AuditRecord", "AuditSink", "AuditWriter", "SQLiteAuditWriter"]
+
+
+class SQLiteAuditWriter:
+    """Grava lotes em uma tabela SQLite (modo WAL, executemany)."""
+
+    def __init__(self, path: str, table: str, columns: Sequence[str]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.columns = list(columns)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._sql = (
+            f"INSERT INTO {table} ({', '.join(self.columns)}) "
+            f"VALUES ({', '.join('?' * len(self.columns))})"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    def __call__(self, records: List[AuditRecord]) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    self._sql,
+                    [tuple(rec.get(col) for col in self.columns) for rec in records],
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,137 @@
+"""
+Deduplicação de lotes antes da classificação
+Agrupa itens pela descrição normalizada (mais GTIN e NCM/CEST informados,
+quando presentes), classifica um representante por grupo e replica o
+resultado para os demais membros
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_description(text: Optional[str]) -> str:
+    """Minúsculas, sem acentos e pontuação, espaços colapsados."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def _digits(value: Any) -> str:
+    return _NON_DIGITS.sub("", str(value or "")).lstrip("0")
+
+
+def dedup_key(
+    descricao: Optional[str],
+    gtin: Any = None,
+    ncm: Any = None,
+    cest: Any = None,
+) -> Tuple[str, str, str, str]:
+    """
+    Chave de deduplicação. GTIN, NCM e CEST informados entram na chave
+    porque alteram o fluxo (confirmação x determinação) e o resultado.
+    """
+    return (
+        normalize_description(descricao),
+        _digits(gtin),
+        _digits(ncm),
+        _digits(cest),
+    )
+
+
+@dataclass
+class DedupGroup:
+    """Itens do lote que compartilham a mesma chave"""
+
+    group_id: int
+    key: Hashable
+    indices: List[int] = field(default_factory=list)
+
+    @property
+    def representante(self) -> int:
+        return self.indices[0]
+
+    @property
+    def membros(self) -> List[int]:
+        return self.indices[1:]
+
+
+@dataclass
+class DedupReport:
+    """Resumo da deduplicação de um lote"""
+
+    total_itens: int
+    grupos: int
+    maior_grupo: int = 0
+    agregados_ingestao: Optional[int] = None
+
+    @property
+    def itens_reaproveitados(self) -> int:
+        return self.total_itens - self.grupos
+
+    @property
+    def fator_reducao(self) -> float:
+        return self.total_itens / self.grupos if self.grupos else 1.0
+
+    @property
+    def economia(self) -> float:
+        return self.itens_reaproveitados / self.total_itens if self.total_itens else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_itens": self.total_itens,
+            "grupos": self.grupos,
+            "itens_reaproveitados": self.itens_reaproveitados,
+            "fator_reducao": round(self.fator_reducao, 2),
+            "economia": round(self.economia, 4),
+            "maior_grupo": self.maior_grupo,
+            "agregados_ingestao": self.agregados_ingestao,
+        }
+
+    def resumo(self) -> str:
+        return (
+            f"🔁 Deduplicação: {self.total_itens} itens → {self.grupos} "
+            f"classificações ({self.fator_reducao:.1f}x, "
+            f"{self.economia:.0%} reaproveitado)"
+        )
+
+
+def group_batch(
+    items: Sequence[Any],
+    key_func: Callable[[Any], Hashable],
+    agregado_func: Optional[Callable[[Any], Any]] = None,
+) -> Tuple[List[DedupGroup], DedupReport]:
+    """
+    Agrupa itens pela chave, preservando a ordem da primeira ocorrência.
+
+    `agregado_func` (ex.: `id_agregados` da ingestão) só alimenta o
+    relatório, para comparar com o agrupamento por descrição exata.
+    """
+    groups: Dict[Hashable, DedupGroup] = {}
+    agregados = set()
+    for index, item in enumerate(items):
+        key = key_func(item)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = DedupGroup(group_id=len(groups), key=key)
+        group.indices.append(index)
+
+        if agregado_func is not None:
+            agregado = agregado_func(item)
+            if agregado is not None:
+                agregados.add(agregado)
+
+    ordered = list(groups.values())
+    report = DedupReport(
+        total_itens=len(items),
+        grupos=len(ordered),
+        maior_grupo=max((len(group.indices) for group in ordered), default=0),
+        agregados_ingestao=len(agregados) if agregados else None,
+    )
+    return ordered, report
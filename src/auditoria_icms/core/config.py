@@ -81,6 +81,19 @@ class WorkflowConfig:
     timeout_seconds: int = 600
     version: str = "1.0"
 
+    # Resolução exata por GTIN antes dos workflows de agentes
+    gtin_fast_path: bool = True
+    gtin_min_confidence: float = 0.9
+
+    # Checkpoints do grafo compilado: "memory", "sqlite" ou "none"
+    checkpointer: str = "memory"
+    checkpoint_path: str = "data/checkpoints/fiscal_workflow.sqlite"
+    max_checkpoint_threads: int = 256  # execuções mantidas antes da poda
+
+    # Lotes executados estágio a estágio (enriquecimento de N, NCM de N, ...)
+    staged_batch: bool = False
+    stage_batch_size: int = 64  # produtos por estágio
+
     # Configurações específicas por tipo de workflow
     confirmation_config: Dict[str, Any] = None
     determination_config: Dict[str, Any] = None
@@ -111,6 +124,26 @@ class ProcessingConfig:
     enable_async_processing: bool = True
     log_level: str = "INFO"
 
+    # Fila durável de jobs (workers dedicados)
+    job_workers: int = 2  # processos
+    job_concurrency: int = 2  # jobs simultâneos por processo
+    job_poll_interval: float = 1.0
+    job_stale_timeout: int = 300  # segundos sem heartbeat até devolver à fila
+    job_workers_embedded: bool = True  # API inicia os workers no lifespan
+
+    # Pools de conexão com os bancos das empresas
+    tenant_pool_size: int = 2
+    tenant_max_overflow: int = 2
+    tenant_pool_timeout: int = 30  # segundos aguardando conexão livre
+    tenant_idle_timeout: int = 600  # segundos sem uso até descartar o engine
+    tenant_max_connections: int = 64  # teto somado entre todas as empresas
+
+    # Extração paralela entre empresas
+    tenant_extraction_workers: int = 8
+    tenant_extraction_timeout: int = 1800  # segundos por empresa
+    tenant_source_concurrency: int = 2  # extrações simultâneas por host
+    tenant_source_min_interval: float = 0.0  # segundos entre inícios por host
+
 
 @dataclass
 class Settings:
@@ -207,6 +240,15 @@ def load_settings_from_env() -> Settings:
         max_retry_attempts=int(os.getenv("WORKFLOW_MAX_RETRIES", "3")),
         timeout_seconds=int(os.getenv("WORKFLOW_TIMEOUT", "600")),
         version=os.getenv("WORKFLOW_VERSION", "1.0"),
+        gtin_fast_path=os.getenv("WORKFLOW_GTIN_FAST_PATH", "true").lower() == "true",
+        gtin_min_confidence=float(os.getenv("WORKFLOW_GTIN_MIN_CONFIDENCE", "0.9")),
+        checkpointer=os.getenv("WORKFLOW_CHECKPOINTER", "memory"),
+        checkpoint_path=os.getenv(
+            "WORKFLOW_CHECKPOINT_PATH", "data/checkpoints/fiscal_workflow.sqlite"
+        ),
+        max_checkpoint_threads=int(os.getenv("WORKFLOW_MAX_CHECKPOINTS", "256")),
+        staged_batch=os.getenv("WORKFLOW_STAGED_BATCH", "false").lower() == "true",
+        stage_batch_size=int(os.getenv("WORKFLOW_STAGE_BATCH_SIZE", "64")),
     )
 
     # Processing
@@ -216,6 +258,23 @@ def load_settings_from_env() -> Settings:
         enable_async_processing=os.getenv("ENABLE_ASYNC_PROCESSING", "true").lower()
         == "true",
         log_level=os.getenv("LOG_LEVEL", "INFO"),
+        job_workers=int(os.getenv("JOB_WORKERS", "2")),
+        job_concurrency=int(os.getenv("JOB_CONCURRENCY", "2")),
+        job_poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "1.0")),
+        job_stale_timeout=int(os.getenv("JOB_STALE_TIMEOUT", "300")),
+        job_workers_embedded=os.getenv("JOB_WORKERS_EMBEDDED", "true").lower()
+        == "true",
+        tenant_pool_size=int(os.getenv("TENANT_POOL_SIZE", "2")),
+        tenant_max_overflow=int(os.getenv("TENANT_MAX_OVERFLOW", "2")),
+        tenant_pool_timeout=int(os.getenv("TENANT_POOL_TIMEOUT", "30")),
+        tenant_idle_timeout=int(os.getenv("TENANT_IDLE_TIMEOUT", "600")),
+        tenant_max_connections=int(os.getenv("TENANT_MAX_CONNECTIONS", "64")),
+        tenant_extraction_workers=int(os.getenv("TENANT_EXTRACTION_WORKERS", "8")),
+        tenant_extraction_timeout=int(os.getenv("TENANT_EXTRACTION_TIMEOUT", "1800")),
+        tenant_source_concurrency=int(os.getenv("TENANT_SOURCE_CONCURRENCY", "2")),
+        tenant_source_min_interval=float(
+            os.getenv("TENANT_SOURCE_MIN_INTERVAL", "0.0")
+        ),
     )
 
     return Settings(
@@ -0,0 +1,43 @@
+"""
+Cifragem de credenciais persistidas pela aplicação
+
+Configurações de conexão de empresas (com senha) gravadas em payloads de
+jobs são cifradas com Fernet, usando chave derivada do SECRET_KEY.
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict
+
+from .config import get_settings
+
+
+def _fernet():
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError as e:
+        raise RuntimeError(
+            "Pacote 'cryptography' necessário para cifrar credenciais"
+        ) from e
+
+    digest = hashlib.sha256(get_settings().secret_key.encode("utf-8")).digest()
+    return Fernet(base64.urlsafe_b64encode(digest))
+
+
+def encrypt_credentials(data: Dict[str, Any]) -> str:
+    """Cifra um dicionário de credenciais como token texto."""
+    payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return _fernet().encrypt(payload).decode("ascii")
+
+
+def decrypt_credentials(token: str) -> Dict[str, Any]:
+    """Decifra um token gerado por `encrypt_credentials`."""
+    fernet = _fernet()
+    from cryptography.fernet import InvalidToken
+
+    try:
+        payload = fernet.decrypt(token.encode("ascii"))
+    except InvalidToken as e:
+        raise ValueError("Credenciais cifradas inválidas (SECRET_KEY alterado?)") from e
+    return json.loads(payload)
@@ -0,0 +1,248 @@
+"""
+Telemetria compacta para agentes, workflows e provedores LLM
+
+Estruturas de memória limitada para histórico e métricas de processos de
+longa duração:
+- RingBuffer: buffer circular de capacidade fixa
+- TaskRecord / PerformanceRecord: registros compactos (__slots__)
+- StreamingStats: agregados em fluxo (contagem, média, mín/máx, percentis)
+  usando histograma logarítmico no estilo HDR, sem guardar as amostras
+"""
+
+import math
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class RingBuffer:
+    """Buffer circular de capacidade fixa (descarta os itens mais antigos)."""
+
+    __slots__ = ("_items", "total_appended")
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("Capacidade do RingBuffer deve ser positiva")
+        self._items = deque(maxlen=capacity)
+        self.total_appended = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._items.maxlen
+
+    @property
+    def dropped(self) -> int:
+        """Quantidade de itens descartados por estouro de capacidade."""
+        return self.total_appended - len(self._items)
+
+    def append(self, item: Any) -> None:
+        self._items.append(item)
+        self.total_appended += 1
+
+    def recent(self, limit: int = 0) -> List[Any]:
+        """Retorna os últimos `limit` itens (todos se limit <= 0)."""
+        if limit <= 0 or limit >= len(self._items):
+            return list(self._items)
+        return list(self._items)[-limit:]
+
+    def drop_while(self, predicate) -> int:
+        """Remove itens do início enquanto `predicate(item)` for verdadeiro."""
+        removed = 0
+        while self._items and predicate(self._items[0]):
+            self._items.popleft()
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._items)[index]
+        return self._items[index]
+
+
+class StreamingStats:
+    """
+    Agregados em fluxo com memória limitada.
+
+    Os percentis são estimados a partir de um histograma com buckets
+    logarítmicos (erro relativo ~ `precision`), independente do número de
+    amostras observadas.
+    """
+
+    __slots__ = ("count", "total", "min", "max", "_buckets", "_zero_count", "_log_base")
+
+    def __init__(self, precision: float = 0.02):
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self._log_base = math.log1p(precision)
+
+    def add(self, value: float) -> None:
+        value = float(value)
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        if value <= 0:
+            self._zero_count += 1
+            return
+
+        bucket = int(math.floor(math.log(value) / self._log_base))
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Estima o percentil `q` (0-100)."""
+        if not self.count:
+            return 0.0
+
+        rank = max(1, int(math.ceil(self.count * q / 100.0)))
+        seen = self._zero_count
+        if seen >= rank:
+            return 0.0
+
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                # Ponto médio geométrico do bucket, limitado ao intervalo observado
+                estimate = math.exp((bucket + 0.5) * self._log_base)
+                return min(max(estimate, self.min), self.max)
+
+        return self.max
+
+    def reset(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._buckets.clear()
+        self._zero_count = 0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min if self.min is not None else 0.0,
+            "max": self.max if self.max is not None else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class TaskRecord:
+    """Registro compacto de uma tarefa concluída (sem payload nem resultado)."""
+
+    __slots__ = (
+        "id",
+        "type",
+        "priority",
+        "created_at",
+        "started_at",
+        "completed_at",
+        "error",
+        "retries",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        type: str,
+        priority: str,
+        created_at: datetime,
+        started_at: Optional[datetime],
+        completed_at: Optional[datetime],
+        error: Optional[str],
+        retries: int,
+    ):
+        self.id = id
+        self.type = type
+        self.priority = priority
+        self.created_at = created_at
+        self.started_at = started_at
+        self.completed_at = completed_at
+        self.error = error
+        self.retries = retries
+
+    @classmethod
+    def from_task(cls, task: Any) -> "TaskRecord":
+        priority = getattr(task.priority, "name", str(task.priority))
+        return cls(
+            task.id,
+            task.type,
+            priority,
+            task.created_at,
+            task.started_at,
+            task.completed_at,
+            task.error,
+            task.retries,
+        )
+
+    @property
+    def processing_time(self) -> Optional[float]:
+        if self.completed_at and self.started_at:
+            return (self.completed_at - self.started_at).total_seconds()
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "priority": self.priority,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": (
+                self.completed_at.isoformat() if self.completed_at else None
+            ),
+            "processing_time": self.processing_time,
+            "success": self.error is None,
+            "error": self.error,
+            "retries": self.retries,
+        }
+
+
+class PerformanceRecord:
+    """Registro compacto de execução de tarefa para histórico de performance."""
+
+    __slots__ = ("timestamp", "task_type", "execution_time", "success", "error")
+
+    def __init__(
+        self,
+        task_type: str,
+        execution_time: float,
+        success: bool,
+        error: Optional[str] = None,
+        timestamp: Optional[float] = None,
+    ):
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.task_type = task_type
+        self.execution_time = execution_time
+        self.success = success
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        entry = {
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat(),
+            "task_type": self.task_type,
+            "execution_time": self.execution_time,
+            "status": "success" if self.success else "failed",
+        }
+        if self.error is not None:
+            entry["error"] = self.error
+        return entry
@@ -4,22 +4,66 @@ Adaptador flexível para conectar aos bancos de dados das empresas
 Suporta PostgreSQL, SQL Server e Oracle
 """
 
+import csv
+import io
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from functools import partial
+from typing import Callable, List, Dict, Any, Hashable, Iterator, Optional, Tuple
 from dataclasses import dataclass
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.engine import Engine
-from sqlalchemy.exc import SQLAlchemyError
 import os
 from datetime import datetime
 
 from ..database.models import ProdutoEmpresa
+from .engine_registry import TenantEngineRegistry, get_engine_registry
+from .incremental_sync import (
+    DEFAULT_WATERMARK_COLUMNS,
+    SYNC_HASH,
+    SYNC_MODES,
+    SYNC_ROWVERSION,
+    IncrementalSyncResult,
+    SyncStateStore,
+    apply_incremental_rows,
+    build_incremental_query,
+    commit_sync,
+)
+from .parallel_extraction import SourceRateLimiter, TenantTaskOutcome, run_per_tenant
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Colunas de resultado gravadas de volta na tabela produto da empresa
+RESULT_COLUMNS = [
+    ("descricao_enriquecida", "TEXT"),
+    ("ncm_sugerido", "VARCHAR(10)"),
+    ("cest_sugerido", "VARCHAR(10)"),
+    ("status_processamento", "VARCHAR(50) DEFAULT 'PENDENTE'"),
+    ("confianca_ncm", "FLOAT"),
+    ("confianca_cest", "FLOAT"),
+    ("justificativa_ncm", "TEXT"),
+    ("justificativa_cest", "TEXT"),
+    ("data_processamento", "TIMESTAMP"),
+    ("revisao_manual", "BOOLEAN DEFAULT FALSE"),
+]
+RESULT_FIELDS = [name for name, _ in RESULT_COLUMNS]
+
+# Tabela temporária usada na atualização em lote
+STAGING_TABLE = "stg_resultados_produto"
+
+# Linhas por INSERT multi-VALUES (MySQL)
+MULTI_VALUES_CHUNK = 500
+
+# Linhas lidas por vez na extração incremental
+INCREMENTAL_FETCH_SIZE = 5000
+
+# Bancos (URL + schema) cujas colunas de resultado já foram verificadas
+_checked_result_columns: set = set()
+_checked_result_columns_lock = threading.Lock()
+
 
 @dataclass
 class DatabaseConfig:
@@ -33,14 +77,23 @@ class DatabaseConfig:
     password: str
     schema: Optional[str] = None
     additional_params: Optional[Dict[str, Any]] = None
+    sync_mode: Optional[str] = None  # updated_at, rowversion, hash
+    watermark_column: Optional[str] = None
 
 
 class DatabaseConnector:
     """Conector genérico para diferentes tipos de banco de dados"""
 
-    def __init__(self, config: DatabaseConfig):
+    def __init__(
+        self,
+        config: DatabaseConfig,
+        registry: Optional[TenantEngineRegistry] = None,
+        registry_key: Optional[Hashable] = None,
+    ):
         self.config = config
         self.engine: Optional[Engine] = None
+        self.registry = registry
+        self.registry_key = registry_key
 
     def _build_connection_string(self) -> str:
         """Constrói string de conexão baseada no tipo de banco"""
@@ -57,6 +110,10 @@ class DatabaseConnector:
             # Oracle usando cx_oracle
             base_url = f"oracle+cx_oracle://{self.config.username}:{self.config.password}@{self.config.host}:{self.config.port}/{self.config.database}"
 
+        elif self.config.db_type.lower() == "sqlite":
+            # Arquivo local (desenvolvimento e benchmarks)
+            base_url = f"sqlite:///{self.config.database}"
+
         else:
             raise ValueError(f"Tipo de banco não suportado: {self.config.db_type}")
 
@@ -70,11 +127,30 @@ class DatabaseConnector:
         return base_url
 
     def connect(self) -> Engine:
-        """Estabelece conexão com o banco de dados"""
+        """
+        Estabelece conexão com o banco de dados. Com um registro de engines,
+        reutiliza o engine (e o pool) da empresa entre chamadas.
+        """
         try:
             connection_string = self._build_connection_string()
+            engine_kwargs: Dict[str, Any] = {}
+            if self.config.db_type.lower() == "sqlserver":
+                # Envia os parâmetros do executemany em blocos (pyodbc)
+                engine_kwargs["fast_executemany"] = True
+
+            if self.registry is not None:
+                # pool_pre_ping valida a conexão no checkout
+                self.engine = self.registry.get_engine(
+                    self.registry_key, connection_string, **engine_kwargs
+                )
+                return self.engine
+
             self.engine = create_engine(
-                connection_string, pool_pre_ping=True, pool_recycle=3600, echo=False
+                connection_string,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                echo=False,
+                **engine_kwargs,
             )
 
             # Testa a conexão
@@ -91,19 +167,29 @@ class DatabaseConnector:
             raise
 
     def disconnect(self):
-        """Fecha conexão com o banco"""
+        """Fecha conexão com o banco (engines do registro são mantidos no pool)"""
         if self.engine:
-            self.engine.dispose()
+            if self.registry is None:
+                self.engine.dispose()
             self.engine = None
 
 
 class EmpresaDataIngestion:
     """Classe principal para ingestão de dados de empresas"""
 
-    def __init__(self, empresa_id: int, db_config: Dict[str, Any]):
+    def __init__(
+        self,
+        empresa_id: int,
+        db_config: Dict[str, Any],
+        engine_registry: Optional[TenantEngineRegistry] = None,
+    ):
         self.empresa_id = empresa_id
         self.db_config = DatabaseConfig(**db_config)
-        self.connector = DatabaseConnector(self.db_config)
+        self.connector = DatabaseConnector(
+            self.db_config,
+            registry=engine_registry or get_engine_registry(),
+            registry_key=empresa_id,
+        )
 
     def extract_produtos(
         self,
@@ -142,19 +228,7 @@ class EmpresaDataIngestion:
             df = pd.read_sql(base_query, engine)
 
             # Converte para objetos ProdutoEmpresa
-            produtos = []
-            for _, row in df.iterrows():
-                produto = ProdutoEmpresa(
-                    produto_id=str(row["produto_id"]),
-                    descricao_produto=row["descricao_produto"],
-                    codigo_produto=row.get("codigo_produto"),
-                    codigo_barra=row.get("codigo_barra"),
-                    ncm=row.get("ncm"),
-                    cest=row.get("cest"),
-                    id_agregados=row.get("id_agregados"),
-                    qtd_mesma_desc=row.get("qtd_mesma_desc"),
-                )
-                produtos.append(produto)
+            produtos = self.to_produtos(df.to_dict("records"))
 
             logger.info(
                 f"Extraídos {len(produtos)} produtos da empresa {self.empresa_id}"
@@ -169,6 +243,124 @@ class EmpresaDataIngestion:
         finally:
             self.connector.disconnect()
 
+    def extract_produtos_incremental(
+        self,
+        sync_mode: Optional[str] = None,
+        watermark_column: Optional[str] = None,
+        state_dir: Optional[str] = None,
+    ) -> IncrementalSyncResult:
+        """
+        Extrai apenas produtos novos ou alterados desde a última sincronização
+
+        A primeira execução lê a tabela inteira e grava o estado local; as
+        seguintes filtram pela marca d'água (coluna de atualização ou
+        rowversion) ou comparam hashes de conteúdo (modo hash, que também
+        detecta remoções). `id_agregados`/`qtd_mesma_desc` são mantidos
+        localmente, sem funções de janela no banco da empresa.
+
+        A extração não grava o estado: depois de processar os produtos com
+        sucesso, confirme com `commit_sync(resultado)`. Sem confirmação, a
+        próxima extração devolve os mesmos produtos.
+
+        Args:
+            sync_mode: updated_at, rowversion ou hash (padrão: configuração
+                da empresa ou hash)
+            watermark_column: Coluna de marca d'água para updated_at/rowversion
+            state_dir: Diretório do estado de sincronização
+
+        Returns:
+            Resultado com os produtos alterados em `produtos` e o estado
+            pendente em `pending`
+        """
+        modo = sync_mode or self.db_config.sync_mode or SYNC_HASH
+        if modo not in SYNC_MODES:
+            raise ValueError(f"Modo de sincronização não suportado: {modo}")
+        if modo == SYNC_ROWVERSION and self.db_config.db_type.lower() != "sqlserver":
+            raise ValueError("Modo rowversion disponível apenas para SQL Server")
+
+        column = (
+            watermark_column
+            or self.db_config.watermark_column
+            or DEFAULT_WATERMARK_COLUMNS.get(modo)
+        )
+
+        state = SyncStateStore.for_empresa(self.empresa_id, state_dir)
+        try:
+            if state.get_meta("modo") not in (None, modo):
+                # Marca d'água de outro modo não é comparável
+                state.set_meta("watermark", None)
+
+            watermark = None if state.is_empty() else state.get_meta("watermark")
+            query, params = build_incremental_query(
+                f"{self._schema_prefix()}produto", modo, column, watermark
+            )
+
+            engine = self.connector.connect()
+            with engine.connect() as conn:
+                result = conn.execution_options(stream_results=True).execute(
+                    text(query), params
+                )
+                rows = (
+                    row._asdict()
+                    for chunk in iter(
+                        lambda: result.fetchmany(INCREMENTAL_FETCH_SIZE), []
+                    )
+                    for row in chunk
+                )
+                sync = apply_incremental_rows(state, modo, rows)
+
+            logger.info(
+                f"Sincronização {modo} da empresa {self.empresa_id}: "
+                f"{len(sync.produtos)} alterados, {len(sync.removidos)} removidos, "
+                f"{sync.inalterados} inalterados"
+            )
+            return sync
+
+        except Exception as e:
+            logger.error(
+                f"Erro na extração incremental da empresa {self.empresa_id}: {str(e)}"
+            )
+            raise
+        finally:
+            state.close()
+            self.connector.disconnect()
+
+    @staticmethod
+    def to_produtos(rows: List[Dict[str, Any]]) -> List[ProdutoEmpresa]:
+        """
+        Converte linhas extraídas em objetos ProdutoEmpresa. Colunas sem
+        correspondência no modelo (ex.: os agregados da consulta) são
+        descartadas.
+        """
+        columns = ProdutoEmpresa.__table__.columns.keys()
+        produtos = []
+        for row in rows:
+            values = {key: value for key, value in row.items() if key in columns}
+            values["produto_id"] = str(row["produto_id"])
+            produtos.append(ProdutoEmpresa(**values))
+        return produtos
+
+    def commit_sync(
+        self, sync: IncrementalSyncResult, state_dir: Optional[str] = None
+    ) -> bool:
+        """
+        Confirma uma extração incremental já processada: grava marca d'água,
+        snapshot e agregados. Retorna False se não havia estado pendente.
+        """
+        state = SyncStateStore.for_empresa(self.empresa_id, state_dir)
+        try:
+            return commit_sync(state, sync)
+        finally:
+            state.close()
+
+    def reset_sync_state(self, state_dir: Optional[str] = None):
+        """Descarta o estado de sincronização (próxima extração será completa)"""
+        state = SyncStateStore.for_empresa(self.empresa_id, state_dir)
+        try:
+            state.reset()
+        finally:
+            state.close()
+
     def _build_extraction_query(self) -> str:
         """Constrói a query de extração baseada no tipo de banco"""
 
@@ -197,48 +389,45 @@ class EmpresaDataIngestion:
         return base_query.format(schema_prefix=schema_prefix)
 
     def update_produtos_processados(
-        self, produtos_atualizados: List[Dict[str, Any]]
+        self, produtos_atualizados: List[Dict[str, Any]], bulk: bool = True
     ) -> bool:
         """
         Atualiza produtos no banco da empresa com os resultados do processamento
 
         Args:
             produtos_atualizados: Lista de produtos com campos atualizados
+            bulk: Carrega os resultados em uma tabela temporária e aplica um
+                único UPDATE baseado em conjunto (padrão). Se False, envia o
+                UPDATE por produto via executemany.
 
         Returns:
             True se sucesso, False caso contrário
         """
+        if not produtos_atualizados:
+            return True
+
         try:
             engine = self.connector.connect()
 
             # Verifica se as colunas de resultado existem, se não, cria
             self._ensure_result_columns(engine)
 
-            # Atualiza produtos em lote
+            data_processamento = datetime.utcnow()
+            rows = [
+                self._build_update_params(produto, data_processamento)
+                for produto in produtos_atualizados
+            ]
+
             with engine.begin() as conn:
-                for produto in produtos_atualizados:
-                    update_query = self._build_update_query()
-
-                    conn.execute(
-                        text(update_query),
-                        {
-                            "produto_id": produto["produto_id"],
-                            "descricao_enriquecida": produto.get(
-                                "descricao_enriquecida"
-                            ),
-                            "ncm_sugerido": produto.get("ncm_sugerido"),
-                            "cest_sugerido": produto.get("cest_sugerido"),
-                            "status_processamento": produto.get(
-                                "status_processamento", "PROCESSADO"
-                            ),
-                            "confianca_ncm": produto.get("confianca_ncm"),
-                            "confianca_cest": produto.get("confianca_cest"),
-                            "justificativa_ncm": produto.get("justificativa_ncm"),
-                            "justificativa_cest": produto.get("justificativa_cest"),
-                            "data_processamento": datetime.utcnow(),
-                            "revisao_manual": produto.get("revisao_manual", False),
-                        },
-                    )
+                if bulk and conn.dialect.name in (
+                    "postgresql",
+                    "mssql",
+                    "mysql",
+                    "sqlite",
+                ):
+                    self._bulk_update(conn, rows)
+                else:
+                    conn.execute(text(self._build_update_query()), rows)
 
             logger.info(
                 f"Atualizados {len(produtos_atualizados)} produtos no banco da empresa {self.empresa_id}"
@@ -253,51 +442,225 @@ class EmpresaDataIngestion:
         finally:
             self.connector.disconnect()
 
-    def _ensure_result_columns(self, engine: Engine):
-        """Garante que as colunas de resultado existem na tabela de produtos"""
-
-        schema_prefix = ""
+    @staticmethod
+    def _build_update_params(
+        produto: Dict[str, Any], data_processamento: datetime
+    ) -> Dict[str, Any]:
+        """Parâmetros de atualização de um produto"""
+        return {
+            "produto_id": produto["produto_id"],
+            "descricao_enriquecida": produto.get("descricao_enriquecida"),
+            "ncm_sugerido": produto.get("ncm_sugerido"),
+            "cest_sugerido": produto.get("cest_sugerido"),
+            "status_processamento": produto.get("status_processamento", "PROCESSADO"),
+            "confianca_ncm": produto.get("confianca_ncm"),
+            "confianca_cest": produto.get("confianca_cest"),
+            "justificativa_ncm": produto.get("justificativa_ncm"),
+            "justificativa_cest": produto.get("justificativa_cest"),
+            "data_processamento": data_processamento,
+            "revisao_manual": produto.get("revisao_manual", False),
+        }
+
+    def _schema_prefix(self) -> str:
         if self.db_config.schema:
-            schema_prefix = f"{self.db_config.schema}."
-        elif self.db_config.db_type.lower() == "sqlserver":
-            schema_prefix = "dbo."
+            return f"{self.db_config.schema}."
+        if self.db_config.db_type.lower() == "sqlserver":
+            return "dbo."
+        return ""
 
-        # Colunas que devem existir
-        columns_to_add = [
-            ("descricao_enriquecida", "TEXT"),
-            ("ncm_sugerido", "VARCHAR(10)"),
-            ("cest_sugerido", "VARCHAR(10)"),
-            ("status_processamento", "VARCHAR(50) DEFAULT 'PENDENTE'"),
-            ("confianca_ncm", "FLOAT"),
-            ("confianca_cest", "FLOAT"),
-            ("justificativa_ncm", "TEXT"),
-            ("justificativa_cest", "TEXT"),
-            ("data_processamento", "TIMESTAMP"),
-            ("revisao_manual", "BOOLEAN DEFAULT FALSE"),
-        ]
+    def _bulk_update(self, conn, rows: List[Dict[str, Any]]):
+        """
+        Carrega os resultados em uma tabela temporária e aplica um único
+        UPDATE ... FROM na tabela produto
+        """
+        dialect = conn.dialect.name
+        table = f"{self._schema_prefix()}produto"
+        staging = f"#{STAGING_TABLE}" if dialect == "mssql" else STAGING_TABLE
+        columns = ["produto_id"] + RESULT_FIELDS
+        column_list = ", ".join(columns)
+
+        # Staging com os mesmos tipos da tabela de destino (sem casts no join)
+        if dialect == "postgresql":
+            conn.execute(
+                text(
+                    f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                    f"SELECT {column_list} FROM {table} WITH NO DATA"
+                )
+            )
+        elif dialect == "mssql":
+            # produto_id dentro de uma expressão: SELECT INTO não copia a
+            # propriedade IDENTITY (o INSERT explícito falharia) e ISNULL
+            # mantém o tipo original da coluna
+            staging_columns = ", ".join(
+                ["ISNULL(produto_id, produto_id) AS produto_id"] + RESULT_FIELDS
+            )
+            conn.execute(
+                text(f"SELECT TOP 0 {staging_columns} INTO {staging} FROM {table}")
+            )
+        elif dialect == "mysql":
+            conn.execute(
+                text(
+                    f"CREATE TEMPORARY TABLE {staging} "
+                    f"SELECT {column_list} FROM {table} LIMIT 0"
+                )
+            )
+        else:
+            conn.execute(
+                text(
+                    f"CREATE TEMP TABLE {staging} AS "
+                    f"SELECT {column_list} FROM {table} WHERE 1 = 0"
+                )
+            )
+
+        try:
+            self._load_staging(conn, staging, columns, rows)
+
+            assignments = ", ".join(f"{col} = s.{col}" for col in RESULT_FIELDS)
+            if dialect == "postgresql":
+                conn.execute(text(f"ANALYZE {staging}"))
+                update_query = (
+                    f"UPDATE {table} AS p SET {assignments} "
+                    f"FROM {staging} AS s WHERE p.produto_id = s.produto_id"
+                )
+            elif dialect == "mssql":
+                assignments = ", ".join(f"p.{col} = s.{col}" for col in RESULT_FIELDS)
+                update_query = (
+                    f"UPDATE p SET {assignments} FROM {table} AS p "
+                    f"JOIN {staging} AS s ON p.produto_id = s.produto_id"
+                )
+            elif dialect == "mysql":
+                assignments = ", ".join(f"p.{col} = s.{col}" for col in RESULT_FIELDS)
+                update_query = (
+                    f"UPDATE {table} AS p JOIN {staging} AS s "
+                    f"ON p.produto_id = s.produto_id SET {assignments}"
+                )
+            else:
+                # SQLite >= 3.33 suporta UPDATE ... FROM
+                update_query = (
+                    f"UPDATE {table} SET {assignments} FROM {staging} AS s "
+                    f"WHERE {table}.produto_id = s.produto_id"
+                )
+
+            result = conn.execute(text(update_query))
+            logger.info(
+                f"UPDATE em lote aplicado a {result.rowcount} produtos "
+                f"({len(rows)} resultados carregados)"
+            )
+        finally:
+            if dialect != "postgresql":
+                conn.execute(text(f"DROP TABLE {staging}"))
+
+    def _load_staging(
+        self, conn, staging: str, columns: List[str], rows: List[Dict[str, Any]]
+    ):
+        """Carrega a tabela temporária pelo método mais rápido do banco"""
+        dialect = conn.dialect.name
+        column_list = ", ".join(columns)
+
+        if dialect == "postgresql" and self._copy_into(conn, staging, columns, rows):
+            return
+
+        if dialect == "mysql":
+            # INSERT com múltiplas linhas em VALUES
+            for start in range(0, len(rows), MULTI_VALUES_CHUNK):
+                chunk = rows[start : start + MULTI_VALUES_CHUNK]
+                params: Dict[str, Any] = {}
+                values = []
+                for i, row in enumerate(chunk):
+                    placeholders = []
+                    for col in columns:
+                        params[f"{col}_{i}"] = row[col]
+                        placeholders.append(f":{col}_{i}")
+                    values.append(f"({', '.join(placeholders)})")
+                conn.execute(
+                    text(
+                        f"INSERT INTO {staging} ({column_list}) "
+                        f"VALUES {', '.join(values)}"
+                    ),
+                    params,
+                )
+            return
+
+        # executemany (fast_executemany no SQL Server)
+        placeholders = ", ".join(f":{col}" for col in columns)
+        conn.execute(
+            text(f"INSERT INTO {staging} ({column_list}) VALUES ({placeholders})"),
+            rows,
+        )
+
+    @staticmethod
+    def _copy_into(
+        conn, staging: str, columns: List[str], rows: List[Dict[str, Any]]
+    ) -> bool:
+        """COPY FROM STDIN no PostgreSQL (psycopg2 ou psycopg 3)"""
+        dbapi_connection = conn.connection.driver_connection
+        column_list = ", ".join(columns)
+        copy_sql = (
+            f"COPY {staging} ({column_list}) FROM STDIN "
+            "WITH (FORMAT csv, NULL '\\N')"
+        )
+
+        cursor = dbapi_connection.cursor()
+        try:
+            if hasattr(cursor, "copy_expert"):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow(
+                        ["\\N" if row[col] is None else row[col] for col in columns]
+                    )
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+                return True
+
+            if hasattr(cursor, "copy"):
+                with cursor.copy(f"COPY {staging} ({column_list}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row([row[col] for col in columns])
+                return True
+
+            return False
+        finally:
+            cursor.close()
 
-        with engine.begin() as conn:
-            for column_name, column_type in columns_to_add:
-                try:
-                    # Tenta adicionar a coluna (falhará se já existir)
+    def _ensure_result_columns(self, engine: Engine):
+        """
+        Garante que as colunas de resultado existem na tabela de produtos.
+        A verificação é feita uma vez por banco (URL + schema).
+        """
+        cache_key = (str(engine.url), self.db_config.schema)
+        with _checked_result_columns_lock:
+            if cache_key in _checked_result_columns:
+                return
+
+        schema_prefix = self._schema_prefix()
+        existing = {
+            column["name"].lower()
+            for column in inspect(engine).get_columns(
+                "produto", schema=schema_prefix.rstrip(".") or None
+            )
+        }
+
+        missing = [
+            (name, column_type)
+            for name, column_type in RESULT_COLUMNS
+            if name not in existing
+        ]
+        if missing:
+            with engine.begin() as conn:
+                for column_name, column_type in missing:
                     alter_query = f"ALTER TABLE {schema_prefix}produto ADD COLUMN {column_name} {column_type}"
                     conn.execute(text(alter_query))
                     logger.info(f"Coluna {column_name} adicionada à tabela produto")
-                except SQLAlchemyError:
-                    # Coluna já existe, ignora o erro
-                    pass
+
+        with _checked_result_columns_lock:
+            _checked_result_columns.add(cache_key)
 
     def _build_update_query(self) -> str:
         """Constrói query de atualização baseada no tipo de banco"""
 
-        schema_prefix = ""
-        if self.db_config.schema:
-            schema_prefix = f"{self.db_config.schema}."
-        elif self.db_config.db_type.lower() == "sqlserver":
-            schema_prefix = "dbo."
-
         return f"""
-        UPDATE {schema_prefix}produto
+        UPDATE {self._schema_prefix()}produto
         SET
             descricao_enriquecida = :descricao_enriquecida,
             ncm_sugerido = :ncm_sugerido,
@@ -343,51 +706,203 @@ class EmpresaDataIngestion:
 class DataIngestionManager:
     """Gerenciador principal para ingestão de dados de múltiplas empresas"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        engine_registry: Optional[TenantEngineRegistry] = None,
+        source_limiter: Optional[SourceRateLimiter] = None,
+    ):
         self.active_connections: Dict[int, EmpresaDataIngestion] = {}
+        self.engine_registry = engine_registry or get_engine_registry()
+        self.source_limiter = source_limiter
+
+        # Extrações incrementais aguardando confirmação, por empresa, com o
+        # sinal de cancelamento da tarefa que as produziu
+        self.pending_syncs: Dict[int, Tuple[IncrementalSyncResult, threading.Event]] = (
+            {}
+        )
+        self._pending_lock = threading.Lock()
 
     def get_empresa_ingestion(
         self, empresa_id: int, db_config: Dict[str, Any]
     ) -> EmpresaDataIngestion:
         """Obtém ou cria uma instância de ingestão para uma empresa"""
 
-        if empresa_id not in self.active_connections:
+        ingestion = self.active_connections.get(empresa_id)
+        if ingestion is None or ingestion.db_config != DatabaseConfig(**db_config):
             self.active_connections[empresa_id] = EmpresaDataIngestion(
-                empresa_id, db_config
+                empresa_id, db_config, engine_registry=self.engine_registry
             )
 
         return self.active_connections[empresa_id]
 
-    def test_all_connections(self) -> Dict[int, Dict[str, Any]]:
-        """Testa conexões com todas as empresas ativas"""
-        results = {}
+    def get_pool_metrics(self) -> Dict[int, Dict[str, Any]]:
+        """Métricas dos pools de conexão por empresa"""
+        return self.engine_registry.metrics()
+
+    def close(self):
+        """Descarta os pools das empresas gerenciadas"""
+        for empresa_id in self.active_connections:
+            self.engine_registry.dispose(empresa_id)
+        self.active_connections.clear()
+
+    def _parallel_settings(self, max_workers, timeout) -> Dict[str, Any]:
+        from ..core.config import get_settings
+
+        processing = get_settings().processing
+        return {
+            "max_workers": max_workers or processing.tenant_extraction_workers,
+            "timeout": (
+                timeout if timeout is not None else processing.tenant_extraction_timeout
+            ),
+            "limiter": self.source_limiter
+            or SourceRateLimiter(
+                max_concurrent=processing.tenant_source_concurrency,
+                min_interval=processing.tenant_source_min_interval,
+            ),
+        }
+
+    def test_all_connections(
+        self, max_workers: Optional[int] = None, timeout: Optional[float] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """Testa conexões com todas as empresas ativas (em paralelo)"""
+        tasks = [
+            (empresa_id, ingestion.db_config.host, ingestion.test_connection)
+            for empresa_id, ingestion in self.active_connections.items()
+        ]
 
-        for empresa_id, ingestion in self.active_connections.items():
-            results[empresa_id] = ingestion.test_connection()
+        results = {}
+        for outcome in run_per_tenant(
+            tasks, **self._parallel_settings(max_workers, timeout)
+        ):
+            ingestion = self.active_connections[outcome.empresa_id]
+            results[outcome.empresa_id] = outcome.result or {
+                "status": "erro",
+                "mensagem": f"Erro na conexão: {outcome.error}",
+                "total_produtos": 0,
+                "tipo_banco": ingestion.db_config.db_type,
+            }
 
         return results
 
+    def iter_produtos_bulk(
+        self,
+        empresa_configs: List[Dict[str, Any]],
+        batch_size: int = 1000,
+        incremental: bool = False,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[TenantTaskOutcome]:
+        """
+        Extrai produtos de várias empresas em paralelo, produzindo o
+        resultado de cada empresa (lista de ProdutoEmpresa) assim que ela
+        termina. Com `incremental`, confirme cada empresa processada com
+        `commit_sync(empresa_id)`.
+        """
+        tasks = []
+        cancel_events: Dict[int, threading.Event] = {}
+        for config in empresa_configs:
+            empresa_id = config["empresa_id"]
+            ingestion = self.get_empresa_ingestion(empresa_id, config["db_config"])
+            cancel_events[empresa_id] = threading.Event()
+            tasks.append(
+                (
+                    empresa_id,
+                    ingestion.db_config.host,
+                    partial(
+                        self._extract_for_bulk,
+                        ingestion,
+                        batch_size,
+                        incremental,
+                        cancel_events[empresa_id],
+                    ),
+                )
+            )
+
+        yield from run_per_tenant(
+            tasks,
+            cancel_events=cancel_events,
+            **self._parallel_settings(max_workers, timeout),
+        )
+
+    def _extract_for_bulk(
+        self,
+        ingestion: EmpresaDataIngestion,
+        batch_size: int,
+        incremental: bool,
+        cancelled: threading.Event,
+    ) -> List[ProdutoEmpresa]:
+        if not incremental:
+            return ingestion.extract_produtos(limit=batch_size)
+
+        sync = ingestion.extract_produtos_incremental()
+        with self._pending_lock:
+            if cancelled.is_set():
+                # Tempo limite excedido: resultado descartado, estado intacto
+                logger.warning(
+                    f"Extração da empresa {ingestion.empresa_id} abandonada; "
+                    "estado de sincronização não confirmado"
+                )
+                return []
+            self.pending_syncs[ingestion.empresa_id] = (sync, cancelled)
+        return ingestion.to_produtos(sync.produtos)
+
+    def commit_sync(self, empresa_id: int) -> bool:
+        """
+        Confirma a última extração incremental da empresa depois que seus
+        produtos foram processados. Retorna False se não havia pendência ou
+        se a extração foi abandonada por tempo limite.
+        """
+        with self._pending_lock:
+            sync, cancelled = self.pending_syncs.pop(empresa_id, (None, None))
+            if sync is None or cancelled.is_set():
+                return False
+        return self.active_connections[empresa_id].commit_sync(sync)
+
     def extract_produtos_bulk(
-        self, empresa_configs: List[Dict[str, Any]], batch_size: int = 1000
+        self,
+        empresa_configs: List[Dict[str, Any]],
+        batch_size: int = 1000,
+        incremental: bool = False,
+        on_result: Optional[Callable[[int, List[ProdutoEmpresa]], None]] = None,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None,
     ) -> Dict[int, List[ProdutoEmpresa]]:
-        """Extrai produtos de múltiplas empresas em lote"""
+        """
+        Extrai produtos de múltiplas empresas em lote. Com `incremental`,
+        retorna apenas os produtos novos ou alterados de cada empresa.
+
+        `on_result(empresa_id, produtos)` é chamado à medida que cada empresa
+        termina (ex.: para enfileirar a classificação sem esperar as demais);
+        com `incremental`, o estado da empresa é confirmado quando ele
+        retorna sem erro. Sem `on_result`, o chamador confirma com
+        `commit_sync(empresa_id)` depois de processar os produtos.
+        """
 
         results = {}
 
-        for config in empresa_configs:
-            empresa_id = config["empresa_id"]
-            db_config = config["db_config"]
-
-            try:
-                ingestion = self.get_empresa_ingestion(empresa_id, db_config)
-                produtos = ingestion.extract_produtos(limit=batch_size)
-                results[empresa_id] = produtos
-
-            except Exception as e:
+        for outcome in self.iter_produtos_bulk(
+            empresa_configs,
+            batch_size=batch_size,
+            incremental=incremental,
+            max_workers=max_workers,
+            timeout=timeout,
+        ):
+            if not outcome.ok:
                 logger.error(
-                    f"Erro ao extrair produtos da empresa {empresa_id}: {str(e)}"
+                    f"Erro ao extrair produtos da empresa {outcome.empresa_id}: "
+                    f"{outcome.error}"
                 )
-                results[empresa_id] = []
+                results[outcome.empresa_id] = []
+                continue
+
+            results[outcome.empresa_id] = outcome.result
+            logger.info(
+                f"Empresa {outcome.empresa_id}: {len(outcome.result)} produtos "
+                f"em {outcome.elapsed:.1f}s"
+            )
+            if on_result is not None:
+                on_result(outcome.empresa_id, outcome.result)
+                self.commit_sync(outcome.empresa_id)
 
         return results
 
@@ -407,6 +922,8 @@ def create_database_config_from_env(empresa_id: int) -> Optional[DatabaseConfig]
             username=os.getenv(f"{prefix}_DB_USER"),
             password=os.getenv(f"{prefix}_DB_PASSWORD"),
             schema=os.getenv(f"{prefix}_DB_SCHEMA"),
+            sync_mode=os.getenv(f"{prefix}_SYNC_MODE"),
+            watermark_column=os.getenv(f"{prefix}_WATERMARK_COLUMN"),
         )
     except (TypeError, ValueError) as e:
         logger.error(f"Erro ao criar configuração para empresa {empresa_id}: {str(e)}")
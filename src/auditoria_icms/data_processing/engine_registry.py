@@ -0,0 +1,237 @@
+"""
+Registro de engines SQLAlchemy por empresa (tenant)
+Reaproveita engines e pools de conexão entre chamadas, com pools limitados,
+pre-ping, descarte de engines ociosos, teto global de conexões e métricas
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Hashable, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TenantPoolMetrics:
+    """Métricas acumuladas do pool de uma empresa"""
+
+    engines_created: int = 0
+    connections_opened: int = 0
+    checkouts: int = 0
+    invalidations: int = 0
+    checked_out: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _TenantEngine:
+    url: str
+    engine: Engine
+    capacity: int
+    metrics: TenantPoolMetrics
+
+
+class TenantEngineRegistry:
+    """
+    Mantém um engine por empresa com pool limitado.
+
+    A capacidade de cada pool (pool_size + max_overflow) é reservada no teto
+    global `max_connections`; quando não há capacidade, engines ociosos são
+    descartados (LRU) ou a chamada aguarda até `pool_timeout`.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 2,
+        max_overflow: int = 2,
+        pool_timeout: int = 30,
+        idle_timeout: int = 600,
+        max_connections: int = 64,
+        pool_recycle: int = 3600,
+    ):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.pool_recycle = pool_recycle
+
+        self._engines: Dict[Hashable, _TenantEngine] = {}
+        self._metrics: Dict[Hashable, TenantPoolMetrics] = {}
+        self._condition = threading.Condition()
+
+    @property
+    def reserved_connections(self) -> int:
+        return sum(entry.capacity for entry in self._engines.values())
+
+    def get_engine(self, key: Hashable, url: str, **engine_kwargs) -> Engine:
+        """Retorna o engine da empresa, criando-o se necessário."""
+        deadline = time.monotonic() + self.pool_timeout
+
+        with self._condition:
+            self._evict_idle_locked()
+
+            entry = self._engines.get(key)
+            if entry is not None and entry.url == url:
+                entry.metrics.last_used = time.monotonic()
+                return entry.engine
+            if entry is not None:
+                # Configuração da empresa mudou: descarta o engine antigo
+                self._dispose_locked(key)
+
+            capacity = self.pool_size + self.max_overflow
+            while self.reserved_connections + capacity > self.max_connections:
+                if self._evict_lru_locked():
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"Teto de {self.max_connections} conexões entre empresas "
+                        f"atingido; não foi possível abrir pool para {key}"
+                    )
+                self._condition.wait(remaining)
+
+            engine = self._create_engine(key, url, **engine_kwargs)
+            metrics = self._metrics.setdefault(key, TenantPoolMetrics())
+            metrics.engines_created += 1
+            metrics.last_used = time.monotonic()
+            self._engines[key] = _TenantEngine(url, engine, capacity, metrics)
+
+            logger.info(f"🔌 Pool criado para {key} ({capacity} conexões)")
+            return engine
+
+    def _create_engine(self, key: Hashable, url: str, **engine_kwargs) -> Engine:
+        options: Dict[str, Any] = {
+            "pool_pre_ping": True,
+            "pool_recycle": self.pool_recycle,
+            "echo": False,
+        }
+        if not url.startswith("sqlite"):
+            options.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+            )
+        options.update(engine_kwargs)
+        engine = create_engine(url, **options)
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            self._record(key, "connections_opened")
+
+        @event.listens_for(engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self._record(key, "checkouts", checked_out=1)
+
+        @event.listens_for(engine, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            self._record(key, checked_out=-1)
+
+        @event.listens_for(engine, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            self._record(key, "invalidations")
+
+        return engine
+
+    def _record(
+        self, key: Hashable, counter: Optional[str] = None, checked_out: int = 0
+    ) -> None:
+        with self._condition:
+            metrics = self._metrics.get(key)
+            if metrics is None:
+                return
+            if counter:
+                setattr(metrics, counter, getattr(metrics, counter) + 1)
+            if checked_out:
+                metrics.checked_out = max(0, metrics.checked_out + checked_out)
+                metrics.last_used = time.monotonic()
+                if metrics.checked_out == 0:
+                    self._condition.notify_all()
+
+    def _is_idle(self, entry: _TenantEngine) -> bool:
+        return entry.metrics.checked_out == 0
+
+    def _evict_idle_locked(self) -> None:
+        limit = time.monotonic() - self.idle_timeout
+        for key in [
+            key
+            for key, entry in self._engines.items()
+            if self._is_idle(entry) and entry.metrics.last_used < limit
+        ]:
+            logger.info(f"💤 Pool ocioso de {key} descartado")
+            self._dispose_locked(key)
+
+    def _evict_lru_locked(self) -> bool:
+        idle = [
+            (entry.metrics.last_used, key)
+            for key, entry in self._engines.items()
+            if self._is_idle(entry)
+        ]
+        if not idle:
+            return False
+        _, key = min(idle)
+        self._dispose_locked(key)
+        return True
+
+    def _dispose_locked(self, key: Hashable) -> None:
+        entry = self._engines.pop(key, None)
+        if entry is not None:
+            entry.engine.dispose()
+            self._condition.notify_all()
+
+    def dispose(self, key: Hashable) -> None:
+        """Descarta o engine de uma empresa."""
+        with self._condition:
+            self._dispose_locked(key)
+
+    def evict_idle(self) -> None:
+        """Descarta engines sem uso há mais de `idle_timeout` segundos."""
+        with self._condition:
+            self._evict_idle_locked()
+
+    def close(self) -> None:
+        """Descarta todos os engines."""
+        with self._condition:
+            for key in list(self._engines):
+                self._dispose_locked(key)
+
+    def metrics(self) -> Dict[Hashable, Dict[str, Any]]:
+        """Métricas por empresa, incluindo o estado atual do pool."""
+        now = time.monotonic()
+        with self._condition:
+            result = {}
+            for key, metrics in self._metrics.items():
+                entry = self._engines.get(key)
+                result[key] = {
+                    "active": entry is not None,
+                    "engines_created": metrics.engines_created,
+                    "connections_opened": metrics.connections_opened,
+                    "checkouts": metrics.checkouts,
+                    "invalidations": metrics.invalidations,
+                    "checked_out": metrics.checked_out,
+                    "pool_status": entry.engine.pool.status() if entry else None,
+                    "idle_seconds": round(now - metrics.last_used, 1),
+                }
+            return result
+
+
+@lru_cache()
+def get_engine_registry() -> TenantEngineRegistry:
+    """Registro compartilhado, configurado pelas settings de processamento."""
+    from ..core.config import get_settings
+
+    processing = get_settings().processing
+    return TenantEngineRegistry(
+        pool_size=processing.tenant_pool_size,
+        max_overflow=processing.tenant_max_overflow,
+        pool_timeout=processing.tenant_pool_timeout,
+        idle_timeout=processing.tenant_idle_timeout,
+        max_connections=processing.tenant_max_connections,
+    )
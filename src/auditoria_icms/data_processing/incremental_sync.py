@@ -0,0 +1,374 @@
+"""
+Sincronização incremental dos produtos das empresas
+Mantém, por empresa, a marca d'água da última extração (coluna de
+atualização, rowversion do SQL Server ou snapshot de hashes do conteúdo)
+e os agregados de descrição calculados localmente, de modo que apenas
+produtos novos ou alterados sejam extraídos e enviados à classificação
+"""
+
+import hashlib
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Modos de sincronização
+SYNC_UPDATED_AT = "updated_at"
+SYNC_ROWVERSION = "rowversion"
+SYNC_HASH = "hash"
+SYNC_MODES = (SYNC_UPDATED_AT, SYNC_ROWVERSION, SYNC_HASH)
+
+# Coluna de marca d'água padrão por modo
+DEFAULT_WATERMARK_COLUMNS = {
+    SYNC_UPDATED_AT: "updated_at",
+    SYNC_ROWVERSION: "rowversion",
+}
+
+# Colunas que compõem o hash de conteúdo do produto
+CONTENT_COLUMNS = [
+    "produto_id",
+    "descricao_produto",
+    "codigo_produto",
+    "codigo_barra",
+    "ncm",
+    "cest",
+]
+
+DEFAULT_STATE_DIR = Path("data/sync_state")
+
+_LOOKUP_CHUNK = 500
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """Hash curto e estável do conteúdo relevante do produto."""
+    payload = "\x1f".join(
+        "" if row.get(col) is None else str(row.get(col)) for col in CONTENT_COLUMNS
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@dataclass
+class PendingSyncState:
+    """Novo estado de sincronização, gravado só na confirmação (`commit_sync`)"""
+
+    modo: str
+    watermark: Optional[str]
+    snapshot: List[Tuple[str, str, str]]  # (produto_id, hash, descrição)
+    removidos: List[str]
+    agregados: Dict[str, Tuple[int, int]]
+
+
+@dataclass
+class IncrementalSyncResult:
+    """Resultado de uma extração incremental"""
+
+    modo: str
+    produtos: List[Dict[str, Any]] = field(default_factory=list)
+    removidos: List[str] = field(default_factory=list)
+    lidos: int = 0
+    inalterados: int = 0
+    sincronizacao_completa: bool = False
+    watermark: Optional[str] = None
+    pending: Optional[PendingSyncState] = None
+
+
+class SyncStateStore:
+    """
+    Estado de sincronização de uma empresa em um arquivo SQLite local:
+    marca d'água, snapshot de hashes e agregados por descrição.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sync_meta (
+                chave TEXT PRIMARY KEY,
+                valor TEXT
+            );
+            CREATE TABLE IF NOT EXISTS produto_snapshot (
+                produto_id TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                descricao TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS agregado (
+                descricao TEXT PRIMARY KEY,
+                id_agregados INTEGER NOT NULL,
+                qtd INTEGER NOT NULL
+            );
+            """
+        )
+
+    @classmethod
+    def for_empresa(
+        cls, empresa_id: int, state_dir: Optional[Path] = None
+    ) -> "SyncStateStore":
+        state_dir = Path(state_dir or DEFAULT_STATE_DIR)
+        return cls(state_dir / f"empresa_{empresa_id}.sqlite")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_meta(self, chave: str) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT valor FROM sync_meta WHERE chave = ?", (chave,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, chave: str, valor: Optional[str]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_meta (chave, valor) VALUES (?, ?)",
+            (chave, valor),
+        )
+
+    def is_empty(self) -> bool:
+        row = self.conn.execute("SELECT 1 FROM produto_snapshot LIMIT 1").fetchone()
+        return row is None
+
+    def reset(self) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM sync_meta")
+            self.conn.execute("DELETE FROM produto_snapshot")
+            self.conn.execute("DELETE FROM agregado")
+
+    def snapshot_for(self, produto_ids: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """Hash e descrição atuais dos produtos informados."""
+        ids = list(produto_ids)
+        snapshot = {}
+        for start in range(0, len(ids), _LOOKUP_CHUNK):
+            chunk = ids[start : start + _LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            snapshot.update(
+                (row[0], (row[1], row[2]))
+                for row in self.conn.execute(
+                    "SELECT produto_id, hash, descricao FROM produto_snapshot "
+                    f"WHERE produto_id IN ({placeholders})",
+                    chunk,
+                )
+            )
+        return snapshot
+
+    def all_snapshot(self) -> Dict[str, Tuple[str, str]]:
+        return {
+            row[0]: (row[1], row[2])
+            for row in self.conn.execute(
+                "SELECT produto_id, hash, descricao FROM produto_snapshot"
+            )
+        }
+
+    def plan_changes(
+        self,
+        changed: List[Dict[str, Any]],
+        removed: List[str],
+        previous: Dict[str, Tuple[str, str]],
+    ) -> Dict[str, Tuple[int, int]]:
+        """
+        Calcula os agregados resultantes das alterações (sem gravar) e
+        preenche `id_agregados` e `qtd_mesma_desc` nos produtos alterados.
+
+        Descrições novas recebem ids em ordem alfabética após o maior id
+        existente, de modo que os ids já atribuídos nunca mudam.
+        """
+        deltas: Dict[str, int] = {}
+        for produto_id in removed:
+            if produto_id in previous:
+                descricao = previous[produto_id][1]
+                deltas[descricao] = deltas.get(descricao, 0) - 1
+
+        for row in changed:
+            old = previous.get(row["produto_id"])
+            descricao = row["descricao_produto"]
+            if old is not None and old[1] == descricao:
+                continue
+            if old is not None:
+                deltas[old[1]] = deltas.get(old[1], 0) - 1
+            deltas[descricao] = deltas.get(descricao, 0) + 1
+
+        existing = self._agregados_for(
+            {row["descricao_produto"] for row in changed} | set(deltas)
+        )
+
+        next_id = (
+            self.conn.execute("SELECT MAX(id_agregados) FROM agregado").fetchone()[0]
+            or 0
+        )
+        for descricao in sorted(d for d in deltas if d not in existing):
+            next_id += 1
+            existing[descricao] = (next_id, 0)
+
+        agregados = {
+            descricao: (id_agregados, qtd + deltas.get(descricao, 0))
+            for descricao, (id_agregados, qtd) in existing.items()
+        }
+
+        for row in changed:
+            id_agregados, qtd = agregados[row["descricao_produto"]]
+            row["id_agregados"] = id_agregados
+            row["qtd_mesma_desc"] = qtd
+
+        return agregados
+
+    def commit(self, pending: PendingSyncState) -> None:
+        """Grava snapshot, agregados e marca d'água em uma única transação."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO agregado (descricao, id_agregados, qtd) "
+                "VALUES (?, ?, ?)",
+                [(d, i, q) for d, (i, q) in pending.agregados.items() if q > 0],
+            )
+            self.conn.executemany(
+                "DELETE FROM agregado WHERE descricao = ?",
+                [(d,) for d, (_, q) in pending.agregados.items() if q <= 0],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO produto_snapshot (produto_id, hash, descricao) "
+                "VALUES (?, ?, ?)",
+                pending.snapshot,
+            )
+            self.conn.executemany(
+                "DELETE FROM produto_snapshot WHERE produto_id = ?",
+                [(produto_id,) for produto_id in pending.removidos],
+            )
+            self.set_meta("modo", pending.modo)
+            self.set_meta("watermark", pending.watermark)
+
+    def _agregados_for(self, descricoes: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+        descricoes = list(descricoes)
+        agregados = {}
+        for start in range(0, len(descricoes), _LOOKUP_CHUNK):
+            chunk = descricoes[start : start + _LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            agregados.update(
+                (row[0], (row[1], row[2]))
+                for row in self.conn.execute(
+                    "SELECT descricao, id_agregados, qtd FROM agregado "
+                    f"WHERE descricao IN ({placeholders})",
+                    chunk,
+                )
+            )
+        return agregados
+
+
+def build_incremental_query(
+    table: str,
+    modo: str,
+    watermark_column: Optional[str],
+    watermark: Optional[str],
+) -> Tuple[str, Dict[str, Any]]:
+    """Query de extração (sem funções de janela) para o modo de sincronização."""
+    columns = ", ".join(CONTENT_COLUMNS)
+    query = f"SELECT {columns}"
+    params: Dict[str, Any] = {}
+
+    if modo == SYNC_UPDATED_AT:
+        query += f", {watermark_column} AS _watermark"
+    elif modo == SYNC_ROWVERSION:
+        query += f", CAST({watermark_column} AS BIGINT) AS _watermark"
+
+    query += f" FROM {table} WHERE descricao_produto IS NOT NULL"
+
+    if modo == SYNC_UPDATED_AT and watermark is not None:
+        # >= para não perder linhas com o mesmo instante; o hash descarta repetidas
+        query += f" AND {watermark_column} >= :watermark"
+        params["watermark"] = watermark
+    elif modo == SYNC_ROWVERSION:
+        # Ignora transações ainda abertas para não pular versões
+        query += f" AND {watermark_column} < MIN_ACTIVE_ROWVERSION()"
+        if watermark is not None:
+            query += f" AND {watermark_column} > CONVERT(BINARY(8), :watermark)"
+            params["watermark"] = int(watermark)
+
+    return query, params
+
+
+def apply_incremental_rows(
+    state: SyncStateStore, modo: str, rows: Iterable[Dict[str, Any]]
+) -> IncrementalSyncResult:
+    """
+    Compara as linhas lidas com o snapshot. Nada é gravado: o novo estado
+    fica em `result.pending` até `commit_sync`, chamado depois que os
+    produtos alterados foram processados com sucesso.
+    """
+    first_sync = state.is_empty()
+    full_scan = first_sync or modo == SYNC_HASH
+    result = IncrementalSyncResult(modo=modo, sincronizacao_completa=first_sync)
+
+    # Varredura completa: snapshot carregado antes e só as alteradas são mantidas
+    previous = state.all_snapshot() if full_scan else {}
+    candidates: Dict[str, Dict[str, Any]] = {}
+    seen = set()
+    watermark = state.get_meta("watermark")
+
+    for row in rows:
+        row = dict(row)
+        row["produto_id"] = str(row["produto_id"])
+        row["_hash"] = content_hash(row)
+        result.lidos += 1
+
+        row_watermark = row.pop("_watermark", None)
+        if row_watermark is not None:
+            row_watermark = str(row_watermark)
+            if watermark is None or _watermark_key(row_watermark) > _watermark_key(
+                watermark
+            ):
+                watermark = row_watermark
+
+        if full_scan:
+            seen.add(row["produto_id"])
+            if previous.get(row["produto_id"], (None,))[0] == row["_hash"]:
+                continue
+        candidates[row["produto_id"]] = row
+
+    if not full_scan:
+        previous = state.snapshot_for(candidates)
+
+    changed = [
+        row
+        for produto_id, row in candidates.items()
+        if previous.get(produto_id, (None,))[0] != row["_hash"]
+    ]
+    removed = (
+        [produto_id for produto_id in previous if produto_id not in seen]
+        if modo == SYNC_HASH
+        else []
+    )
+
+    agregados = state.plan_changes(changed, removed, previous)
+    result.pending = PendingSyncState(
+        modo=modo,
+        watermark=watermark,
+        snapshot=[
+            (row["produto_id"], row.pop("_hash"), row["descricao_produto"])
+            for row in changed
+        ],
+        removidos=removed,
+        agregados=agregados,
+    )
+
+    result.produtos = changed
+    result.removidos = removed
+    result.inalterados = result.lidos - len(changed)
+    result.watermark = watermark
+    return result
+
+
+def commit_sync(state: SyncStateStore, result: IncrementalSyncResult) -> bool:
+    """
+    Confirma uma extração: grava o estado pendente. Retorna False se não
+    havia estado pendente (já confirmado ou extração não incremental).
+    """
+    if result.pending is None:
+        return False
+    state.commit(result.pending)
+    result.pending = None
+    return True
+
+
+def _watermark_key(value: str):
+    """Ordenação de marcas d'água numéricas (rowversion) ou ISO (datas)."""
+    return (0, int(value), "") if value.isdigit() else (1, 0, value)
@@ -0,0 +1,142 @@
+"""
+Execução paralela de tarefas por empresa (extração, testes de conexão)
+Pool de threads com limite global de concorrência, limite e intervalo
+mínimo por origem (host do banco) e timeout por empresa; os resultados
+são entregues à medida que cada empresa termina
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TenantTaskOutcome:
+    """Resultado da tarefa de uma empresa"""
+
+    empresa_id: int
+    result: Any = None
+    error: Optional[str] = None
+    timed_out: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class SourceRateLimiter:
+    """
+    Limita, por origem, o número de tarefas simultâneas e o intervalo
+    mínimo entre inícios de tarefas.
+    """
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 0.0):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._semaphores: Dict[Hashable, threading.BoundedSemaphore] = {}
+        self._last_start: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, source: Hashable) -> threading.BoundedSemaphore:
+        with self._lock:
+            if source not in self._semaphores:
+                self._semaphores[source] = threading.BoundedSemaphore(
+                    self.max_concurrent
+                )
+            return self._semaphores[source]
+
+    def acquire(self, source: Hashable) -> None:
+        self._semaphore(source).acquire()
+        if self.min_interval <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait_for = self._last_start.get(source, 0.0) + self.min_interval - now
+                if wait_for <= 0:
+                    self._last_start[source] = now
+                    return
+            time.sleep(wait_for)
+
+    def release(self, source: Hashable) -> None:
+        self._semaphore(source).release()
+
+
+def run_per_tenant(
+    tasks: List[Tuple[int, Hashable, Callable[[], Any]]],
+    max_workers: int = 8,
+    timeout: Optional[float] = None,
+    limiter: Optional[SourceRateLimiter] = None,
+    cancel_events: Optional[Dict[int, threading.Event]] = None,
+) -> Iterator[TenantTaskOutcome]:
+    """
+    Executa `(empresa_id, origem, função)` em paralelo e produz os
+    resultados conforme as empresas terminam.
+
+    O timeout conta a partir do início da tarefa da empresa. Tarefas que o
+    excedem são reportadas como erro; a thread não pode ser interrompida e
+    seu resultado é descartado. O evento da empresa em `cancel_events` é
+    sinalizado, para que a tarefa abandonada não confirme efeitos colaterais.
+    """
+    cancel_events = cancel_events or {}
+    limiter = limiter or SourceRateLimiter()
+    started: Dict[int, float] = {}
+
+    def run(empresa_id: int, source: Hashable, func: Callable[[], Any]):
+        limiter.acquire(source)
+        started[empresa_id] = time.monotonic()
+        try:
+            return func()
+        finally:
+            limiter.release(source)
+
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, max_workers), thread_name_prefix="tenant-task"
+    )
+    pending: Dict[Future, int] = {}
+    try:
+        for empresa_id, source, func in tasks:
+            pending[executor.submit(run, empresa_id, source, func)] = empresa_id
+
+        while pending:
+            done, _ = wait(
+                pending,
+                timeout=1.0 if timeout else None,
+                return_when=FIRST_COMPLETED,
+            )
+
+            for future in done:
+                empresa_id = pending.pop(future)
+                elapsed = time.monotonic() - started.get(empresa_id, time.monotonic())
+                try:
+                    yield TenantTaskOutcome(
+                        empresa_id, result=future.result(), elapsed=elapsed
+                    )
+                except Exception as e:
+                    yield TenantTaskOutcome(empresa_id, error=str(e), elapsed=elapsed)
+
+            if not timeout:
+                continue
+
+            now = time.monotonic()
+            for future, empresa_id in list(pending.items()):
+                start = started.get(empresa_id)
+                if start is not None and now - start > timeout:
+                    pending.pop(future)
+                    if empresa_id in cancel_events:
+                        cancel_events[empresa_id].set()
+                    logger.warning(f"⏱️ Empresa {empresa_id} excedeu {timeout}s")
+                    yield TenantTaskOutcome(
+                        empresa_id,
+                        error=f"Tempo limite de {timeout}s excedido",
+                        timed_out=True,
+                        elapsed=now - start,
+                    )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
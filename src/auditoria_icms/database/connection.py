@@ -12,6 +12,7 @@ import logging
 
 from ..core.config import get_settings
 from ..database.models import Base
+from ..database.text_search import setup_search_indexes
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +79,9 @@ class DatabaseManager:
             logger.error(f"❌ Erro ao criar tabelas: {e}")
             raise
 
+        # Índices de listagem e busca; os que falharem recaem em LIKE
+        setup_search_indexes(self.engine)
+
     def get_session(self) -> Session:
         """Retorna nova sessão do banco"""
         if self.SessionLocal is None:
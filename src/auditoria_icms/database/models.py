@@ -288,6 +288,35 @@ class StatusProcessamento(Base):
     )
 
 
+class JobProcessamento(Base):
+    """Fila durável de jobs em background (classificação, importação)"""
+
+    __tablename__ = "fila_jobs"
+
+    id = Column(String(36), primary_key=True)
+    tipo = Column(String(50), nullable=False)  # batch_classification, data_import
+    empresa_id = Column(Integer, ForeignKey("empresas.id"))
+    status = Column(
+        String(20), default="queued", nullable=False
+    )  # queued, running, completed, error, cancelled
+    payload = Column(JSON)
+    progresso = Column(JSON)  # contadores e mensagem exibidos pela API
+    checkpoint = Column(JSON)  # posição para retomar após falha do worker
+    cancelamento_solicitado = Column(Boolean, default=False)
+    tentativas = Column(Integer, default=0)
+    worker_id = Column(String(100))
+    erro = Column(Text)
+    criado_em = Column(DateTime, default=func.now())
+    iniciado_em = Column(DateTime)
+    heartbeat_em = Column(DateTime)
+    finalizado_em = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_fila_jobs_status_criado", "status", "criado_em"),
+        Index("idx_fila_jobs_empresa", "empresa_id"),
+    )
+
+
 # =============================================================================
 # BASE DE CONHECIMENTO (Knowledge Base)
 # =============================================================================
@@ -0,0 +1,406 @@
+"""
+Busca textual indexada para descrições de produtos
+Implementa full-text (tsvector, configuração 'portuguese') e trigramas
+(pg_trgm) no PostgreSQL e FTS5 no SQLite, com fallback para LIKE
+"""
+
+import logging
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from ..core.batch_dedup import normalize_description
+
+logger = logging.getLogger(__name__)
+
+# Backends de busca suportados
+BACKEND_POSTGRES = "postgresql_fts"
+BACKEND_SQLITE = "sqlite_fts5"
+BACKEND_LIKE = "like"
+
+TEXT_SEARCH_CONFIG = "portuguese"
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+class TextSearchIndex:
+    """
+    Índice de busca textual sobre colunas de descrição de uma tabela.
+
+    No PostgreSQL cria um índice GIN de expressão sobre o tsvector das
+    colunas e índices GIN trigram por coluna; no SQLite cria uma tabela
+    virtual FTS5 de conteúdo externo mantida por triggers. Os filtros
+    gerados usam exatamente a mesma expressão do índice.
+
+    `rowid_column` é a coluna inteira que liga a tabela ao FTS5 no SQLite
+    (padrão: `id_column`); tabelas com chave textual usam "rowid".
+    """
+
+    def __init__(
+        self,
+        table: str,
+        id_column: str,
+        columns: List[str],
+        rowid_column: Optional[str] = None,
+    ):
+        self.table = table
+        self.id_column = id_column
+        self.rowid_column = rowid_column or id_column
+        self.columns = columns
+        self.fts_table = f"{table}_fts"
+        self._param = f"{table}_search"
+        self._backends: Dict[str, str] = {}
+
+    # Configuração
+
+    def setup(self, bind) -> str:
+        """
+        Cria as estruturas de índice para o dialeto do engine (ou de uma
+        conexão sqlite3 aberta diretamente). Se a criação falhar, as buscas
+        nesse banco usam LIKE.
+        """
+        dialect = _dialect_name(bind)
+        key = _bind_key(bind)
+
+        if dialect not in ("postgresql", "sqlite"):
+            logger.warning(
+                f"Busca textual indexada indisponível para {dialect}; usando LIKE"
+            )
+            self._backends[key] = BACKEND_LIKE
+            return BACKEND_LIKE
+
+        try:
+            if dialect == "postgresql":
+                statements = self._postgres_ddl()
+            else:
+                # O conteúdo só é reconstruído na criação; depois os triggers o
+                # mantêm
+                statements = self._sqlite_ddl(
+                    rebuild=not self._sqlite_index_exists(bind)
+                )
+
+            if isinstance(bind, sqlite3.Connection):
+                with bind:
+                    for statement in statements:
+                        bind.execute(statement)
+            else:
+                with bind.begin() as conn:
+                    for statement in statements:
+                        conn.execute(text(statement))
+        except Exception as e:
+            logger.warning(
+                f"⚠️ Índice de busca textual em {self.table} não criado "
+                f"({e}); usando LIKE"
+            )
+            self._backends[key] = BACKEND_LIKE
+            return BACKEND_LIKE
+
+        backend = BACKEND_POSTGRES if dialect == "postgresql" else BACKEND_SQLITE
+        self._backends[key] = backend
+        logger.info(f"✅ Índice de busca textual em {self.table} ({backend})")
+        return backend
+
+    def _postgres_ddl(self) -> List[str]:
+        statements = [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table}_fts "
+            f"ON {self.table} USING gin ({self._tsvector(qualified=False)})",
+        ]
+        for column in self.columns:
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_{column}_trgm "
+                f"ON {self.table} USING gin ({column} gin_trgm_ops)"
+            )
+        return statements
+
+    def _sqlite_ddl(self, rebuild: bool = True) -> List[str]:
+        columns = ", ".join(self.columns)
+        new_values = ", ".join(f"new.{column}" for column in self.columns)
+        old_values = ", ".join(f"old.{column}" for column in self.columns)
+        delete_row = (
+            f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) "
+            f"VALUES ('delete', old.{self.rowid_column}, {old_values});"
+        )
+        insert_row = (
+            f"INSERT INTO {self.fts_table}(rowid, {columns}) "
+            f"VALUES (new.{self.rowid_column}, {new_values});"
+        )
+
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+            f"{columns}, content='{self.table}', "
+            f"content_rowid='{self.rowid_column}', "
+            "tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai "
+            f"AFTER INSERT ON {self.table} BEGIN {insert_row} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad "
+            f"AFTER DELETE ON {self.table} BEGIN {delete_row} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au "
+            f"AFTER UPDATE ON {self.table} BEGIN {delete_row} {insert_row} END",
+        ]
+        if rebuild:
+            statements.append(
+                f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')"
+            )
+        return statements
+
+    # Consulta
+
+    def backend(self, bind) -> str:
+        """
+        Backend disponível para a conexão/engine (detectado uma vez): o
+        indexado só quando as estruturas de `setup` existem no banco.
+        """
+        key = _bind_key(bind)
+        if key in self._backends:
+            return self._backends[key]
+
+        dialect = _dialect_name(bind)
+        if dialect == "postgresql" and self._postgres_index_exists(bind):
+            backend = BACKEND_POSTGRES
+        elif dialect == "sqlite" and self._sqlite_index_exists(bind):
+            backend = BACKEND_SQLITE
+        else:
+            backend = BACKEND_LIKE
+
+        self._backends[key] = backend
+        return backend
+
+    def _postgres_index_exists(self, bind) -> bool:
+        # similarity() e o operador % dependem do pg_trgm
+        rows = _fetch_all(
+            bind,
+            "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm' "
+            "AND EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = :n)",
+            {"n": f"idx_{self.table}_fts"},
+        )
+        return bool(rows)
+
+    def _sqlite_index_exists(self, bind) -> bool:
+        # O último trigger criado: sem ele o FTS5 não acompanha a tabela
+        rows = _fetch_all(
+            bind,
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :n",
+            {"n": f"{self.fts_table}_au"},
+        )
+        return bool(rows)
+
+    def match_clause(self, bind, term: str):
+        """
+        Cláusula WHERE que seleciona as linhas cuja descrição contém os
+        termos de busca (todos os termos, com prefixo no último).
+        """
+        backend = self.backend(bind)
+
+        if backend == BACKEND_POSTGRES:
+            return text(
+                f"{self._tsvector()} @@ plainto_tsquery('{TEXT_SEARCH_CONFIG}', "
+                f":{self._param})"
+            ).bindparams(**{self._param: term})
+
+        if backend == BACKEND_SQLITE:
+            return text(
+                f"{self.table}.{self.rowid_column} IN (SELECT rowid FROM "
+                f"{self.fts_table} WHERE {self.fts_table} MATCH :{self._param})"
+            ).bindparams(**{self._param: fts5_query(term)})
+
+        conditions = " OR ".join(
+            f"lower({self.table}.{column}) LIKE :{self._param}"
+            for column in self.columns
+        )
+        return text(f"({conditions})").bindparams(**{self._param: f"%{term.lower()}%"})
+
+    def search(
+        self,
+        bind,
+        term: str,
+        limit: int = 10,
+        columns: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca ranqueada no banco pelas descrições mais parecidas com `term`.
+
+        Retorna até `limit` linhas (id, `columns` e `score` em [0, 1]) em
+        ordem de relevância. No PostgreSQL o candidato vem dos índices
+        tsvector/trigram e o score é a similaridade trigram; no SQLite a
+        ordem é dada pelo bm25 do FTS5 e o score é a sobreposição de termos.
+        """
+        tokens = _tokens(term)
+        if not tokens:
+            return []
+
+        # id e colunas de descrição sempre presentes (usadas no score)
+        selected = list(
+            dict.fromkeys([self.id_column, *self.columns, *(columns or [])])
+        )
+        backend = self.backend(bind)
+
+        if backend == BACKEND_POSTGRES:
+            similarity = ", ".join(
+                f"similarity({column}, :term)" for column in self.columns
+            )
+            trigram_match = " OR ".join(f"{column} % :term" for column in self.columns)
+            sql = (
+                f"SELECT {', '.join(selected)}, greatest({similarity}) AS score "
+                f"FROM {self.table} "
+                f"WHERE {self._tsvector(qualified=False)} @@ "
+                f"to_tsquery('{TEXT_SEARCH_CONFIG}', :tsquery) OR {trigram_match} "
+                "ORDER BY score DESC LIMIT :limit"
+            )
+            params = {"term": term, "tsquery": " | ".join(tokens), "limit": limit}
+            return [
+                {**row, "score": float(row["score"] or 0.0)}
+                for row in _fetch_all(bind, sql, params)
+            ]
+
+        if backend == BACKEND_SQLITE:
+            sql = (
+                f"SELECT {', '.join(f't.{column}' for column in selected)} "
+                f"FROM {self.fts_table} JOIN {self.table} t "
+                f"ON t.{self.rowid_column} = {self.fts_table}.rowid "
+                f"WHERE {self.fts_table} MATCH :query "
+                f"ORDER BY bm25({self.fts_table}) LIMIT :limit"
+            )
+            # Todos os termos primeiro (conjunto pequeno); completa com qualquer termo
+            rows = _fetch_all(
+                bind, sql, {"query": fts5_query(term, False), "limit": limit}
+            )
+            if len(rows) < limit:
+                seen = {row[self.id_column] for row in rows}
+                any_term = fts5_query(term, False, operator=" OR ")
+                for row in _fetch_all(bind, sql, {"query": any_term, "limit": limit}):
+                    if len(rows) < limit and row[self.id_column] not in seen:
+                        rows.append(row)
+            return self._with_overlap_score(tokens, rows)
+
+        conditions = " OR ".join(
+            f"lower({column}) LIKE :t{position}"
+            for position in range(len(tokens))
+            for column in self.columns
+        )
+        sql = (
+            f"SELECT {', '.join(selected)} FROM {self.table} "
+            f"WHERE {conditions} LIMIT :limit"
+        )
+        params = {f"t{i}": f"%{token}%" for i, token in enumerate(tokens)}
+        params["limit"] = limit
+        return self._with_overlap_score(tokens, _fetch_all(bind, sql, params))
+
+    def _with_overlap_score(
+        self, tokens: List[str], rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return [
+            {
+                **row,
+                "score": max(
+                    token_overlap(tokens, row[column]) for column in self.columns
+                ),
+            }
+            for row in rows
+        ]
+
+    def _tsvector(self, qualified: bool = True) -> str:
+        prefix = f"{self.table}." if qualified else ""
+        document = " || ' ' || ".join(
+            f"coalesce({prefix}{column}, '')" for column in self.columns
+        )
+        return f"to_tsvector('{TEXT_SEARCH_CONFIG}', {document})"
+
+
+def fts5_query(term: str, prefix_last: bool = True, operator: str = " ") -> str:
+    """Converte texto livre em consulta FTS5 segura (termos entre aspas)."""
+    tokens = _tokens(term)
+    if not tokens:
+        return '""'
+    quoted = [f'"{token}"' for token in tokens]
+    if prefix_last:
+        quoted[-1] += "*"
+    return operator.join(quoted)
+
+
+def token_overlap(tokens: List[str], value: Optional[str]) -> float:
+    """
+    Sobreposição de termos: |comuns| / max(|consulta|, |texto|).
+
+    Termos comparados sem acentos, como no FTS5 (remove_diacritics 2).
+    """
+    query_tokens = set(normalize_description(" ".join(tokens)).split())
+    value_tokens = set(normalize_description(value).split())
+    if not query_tokens or not value_tokens:
+        return 0.0
+    common = query_tokens & value_tokens
+    return len(common) / max(len(query_tokens), len(value_tokens))
+
+
+def _tokens(value: Optional[str]) -> List[str]:
+    return [token.lower() for token in _TOKEN_PATTERN.findall(value or "")]
+
+
+def _dialect_name(bind) -> str:
+    if isinstance(bind, sqlite3.Connection):
+        return "sqlite"
+    if hasattr(bind, "get_bind"):
+        bind = bind.get_bind()
+    return bind.dialect.name
+
+
+def _bind_key(bind) -> str:
+    if isinstance(bind, sqlite3.Connection):
+        return f"sqlite3:{id(bind)}"
+    if hasattr(bind, "get_bind"):
+        bind = bind.get_bind()
+    return str(getattr(bind, "engine", bind).url)
+
+
+def _fetch_all(bind, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Executa SQL com parâmetros nomeados em sqlite3, Session ou Engine."""
+    if isinstance(bind, sqlite3.Connection):
+        cursor = bind.execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    if isinstance(bind, Engine):
+        with bind.connect() as conn:
+            return [dict(row) for row in conn.execute(text(sql), params).mappings()]
+
+    return [dict(row) for row in bind.execute(text(sql), params).mappings()]
+
+
+# Índices usados pela API (produtos_empresa tem chave textual: FTS5 pelo rowid)
+PRODUTO_DESCRICAO_INDEX = TextSearchIndex(
+    "produtos_empresa",
+    "produto_id",
+    ["descricao_produto", "descricao_enriquecida"],
+    rowid_column="rowid",
+)
+GOLDEN_SET_INDEX = TextSearchIndex(
+    "golden_set", "id", ["descricao_produto", "descricao_enriquecida"]
+)
+
+# Índices compostos: paginação por cursor (keyset) em (empresa_id, produto_id)
+# e versão das estatísticas (max(data_atualizacao) por empresa em uma busca)
+LISTING_INDEXES_DDL = [
+    "CREATE INDEX IF NOT EXISTS idx_produtos_empresa_keyset "
+    "ON produtos_empresa (empresa_id, produto_id)",
+    "CREATE INDEX IF NOT EXISTS idx_produtos_empresa_atualizacao "
+    "ON produtos_empresa (empresa_id, data_atualizacao)",
+]
+
+
+def setup_search_indexes(engine: Engine) -> None:
+    """
+    Cria índices de listagem e de busca textual usados pela API. Cada
+    índice é criado de forma independente: uma falha não impede os demais.
+    """
+    for statement in LISTING_INDEXES_DDL:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(statement))
+        except Exception as e:
+            logger.warning(f"⚠️ Índice de listagem não criado: {e}")
+
+    PRODUTO_DESCRICAO_INDEX.setup(engine)
+    GOLDEN_SET_INDEX.setup(engine)
@@ -11,7 +11,8 @@ from enum import Enum
 from datetime import datetime
 import aiohttp
 import pandas as pd
-from sqlalchemy import create_engine
+
+from ..data_processing.engine_registry import get_engine_registry
 
 logger = logging.getLogger(__name__)
 
@@ -83,11 +84,17 @@ class DatabaseConnector:
         self.engine = None
         self.session_maker = None
 
+    def _get_engine(self):
+        """Engine compartilhado (com pool) desta conexão"""
+        self.engine = get_engine_registry().get_engine(
+            ("external", self.config.name), self._build_connection_string()
+        )
+        return self.engine
+
     async def test_connection(self) -> bool:
         """Testa conexão com o banco de dados"""
         try:
-            connection_string = self._build_connection_string()
-            engine = create_engine(connection_string)
+            engine = self._get_engine()
 
             # Testar conexão
             with engine.connect() as conn:
@@ -103,8 +110,7 @@ class DatabaseConnector:
     async def get_data(self, config: ImportConfig) -> List[Dict[str, Any]]:
         """Extrai dados do banco"""
         try:
-            connection_string = self._build_connection_string()
-            engine = create_engine(connection_string)
+            engine = self._get_engine()
 
             # Construir query
             if config.query:
@@ -136,8 +142,7 @@ class DatabaseConnector:
     async def get_schema(self) -> Dict[str, Any]:
         """Retorna esquema do banco"""
         try:
-            connection_string = self._build_connection_string()
-            engine = create_engine(connection_string)
+            engine = self._get_engine()
 
             with engine.connect() as conn:
                 # Query para listar tabelas (específica por DB type)
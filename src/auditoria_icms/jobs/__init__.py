@@ -0,0 +1,52 @@
+"""
+Fila durável de jobs em background
+Jobs persistidos no banco da aplicação e executados por workers dedicados
+"""
+
+from functools import lru_cache
+
+from .queue import (
+    JobQueue,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_COMPLETED,
+    JOB_ERROR,
+    JOB_CANCELLED,
+    JobOwnershipLost,
+)
+from .worker import (
+    JobWorker,
+    JobContext,
+    JobCancelled,
+    register_job_handler,
+    run_workers,
+    start_workers,
+    stop_workers,
+)
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    """Fila de jobs sobre o banco da aplicação (instância compartilhada)"""
+    from ..database.connection import db_manager
+
+    return JobQueue(db_manager.get_session)
+
+
+__all__ = [
+    "JobQueue",
+    "JobWorker",
+    "JobContext",
+    "JobCancelled",
+    "JobOwnershipLost",
+    "register_job_handler",
+    "run_workers",
+    "start_workers",
+    "stop_workers",
+    "get_job_queue",
+    "JOB_QUEUED",
+    "JOB_RUNNING",
+    "JOB_COMPLETED",
+    "JOB_ERROR",
+    "JOB_CANCELLED",
+]
@@ -0,0 +1,445 @@
+"""
+Handlers dos jobs em background
+Classificação em lote e importação de dados, executados pelos workers da
+fila durável com progresso, checkpoints e cancelamento
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..core.credentials import decrypt_credentials
+from ..database.connection import db_manager
+from ..database.models import ProdutoEmpresa
+from .worker import JobContext, register_job_handler
+
+logger = logging.getLogger(__name__)
+
+BATCH_CLASSIFICATION = "batch_classification"
+DATA_IMPORT = "data_import"
+
+
+@register_job_handler(BATCH_CLASSIFICATION)
+async def execute_batch_classification(context: JobContext) -> Dict[str, Any]:
+    """
+    Executa classificação em lote usando workflow LangGraph
+
+    Processa em chunks: cada chunk é reservado com um único UPDATE
+    (status PROCESSANDO), classificado concorrentemente e gravado em uma
+    única transação (sugestões + status finais). O checkpoint guarda o
+    último id, os contadores e o chunk em andamento, de modo que um job
+    retomado após falha do worker devolve esse chunk à fila e continua.
+    Cancelamento ou erro durante o chunk também o devolvem à fila.
+    """
+    from ..workflows.workflow_manager import workflow_manager
+
+    settings = get_settings().processing
+    empresa_id = context.empresa_id
+    product_ids = context.payload.get("product_ids")
+    limit = context.payload.get("limit")
+    force_reclassify = context.payload.get("force_reclassify", False)
+    chunk_size = context.payload.get("chunk_size") or settings.batch_size
+    concurrency = context.payload.get("concurrency") or settings.max_concurrent_tasks
+
+    checkpoint = context.checkpoint
+    last_id = checkpoint.get("last_id")
+    processed = checkpoint.get("processed", 0)
+    successful = checkpoint.get("successful", 0)
+    failed = checkpoint.get("failed", 0)
+
+    logger.info(
+        f"🎯 Iniciando classificação {context.job_id} para empresa {empresa_id}"
+    )
+
+    await context.progress(message="Preparando produtos para classificação...")
+
+    # Filtros de seleção dos produtos do job
+    filters = [ProdutoEmpresa.empresa_id == empresa_id]
+    if product_ids:
+        filters.append(ProdutoEmpresa.produto_id.in_([str(i) for i in product_ids]))
+    elif not force_reclassify:
+        # Se não força reclassificação, pegar apenas pendentes
+        filters.append(
+            or_(
+                ProdutoEmpresa.status_processamento == "PENDENTE",
+                ProdutoEmpresa.status_processamento.is_(None),
+            )
+        )
+    else:
+        filters.append(
+            or_(
+                ProdutoEmpresa.status_processamento != "PROCESSANDO",
+                ProdutoEmpresa.status_processamento.is_(None),
+            )
+        )
+
+    with db_manager.session_scope() as db:
+        # Retomada: chunk reservado por uma execução interrompida volta à fila
+        in_flight = checkpoint.get("in_flight") or []
+        if in_flight:
+            _set_status(db, in_flight, "PENDENTE", only_if="PROCESSANDO")
+            db.commit()
+
+        total_produtos = checkpoint.get("total")
+        if total_produtos is None:
+            remaining = (
+                db.query(func.count(ProdutoEmpresa.produto_id))
+                .filter(*filters)
+                .scalar()
+            )
+            total_produtos = min(remaining, limit) if limit else remaining
+
+    if not total_produtos:
+        return {
+            "total": 0,
+            "progress_percentage": 100.0,
+            "message": "Nenhum produto encontrado para classificação",
+        }
+
+    await context.progress(
+        total=total_produtos, message=f"Classificando {total_produtos} produtos..."
+    )
+
+    logger.info(f"🏷️ Classificando {total_produtos} produtos em chunks de {chunk_size}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def classify(produto) -> Dict[str, Any]:
+        # Preparar dados para o workflow
+        product_data = {
+            "produto_id": produto.produto_id,
+            "descricao_original": produto.descricao_produto,
+            "codigo_barra": produto.codigo_barra,
+            "codigo_produto": produto.codigo_produto,
+            "ncm_informado": produto.ncm,
+            "cest_informado": produto.cest,
+            "empresa_id": empresa_id,
+        }
+
+        async with semaphore:
+            result = await workflow_manager.process_product(product_data, empresa_id)
+
+        if result.error:
+            logger.error(
+                f"❌ Erro ao processar produto {produto.produto_id}: {result.error}"
+            )
+        return result
+
+    while processed < total_produtos:
+        size = min(chunk_size, total_produtos - processed)
+
+        with db_manager.session_scope() as db:
+            chunk = _claim_chunk(db, filters, last_id, size)
+        if not chunk:
+            break
+
+        chunk_ids = [produto.produto_id for produto in chunk]
+
+        try:
+            # Registrar o chunk em andamento antes de classificar (o cursor só
+            # avança depois da gravação, para que a retomada o reprocesse)
+            await context.progress(
+                checkpoint={
+                    "total": total_produtos,
+                    "last_id": last_id,
+                    "processed": processed,
+                    "successful": successful,
+                    "failed": failed,
+                    "in_flight": chunk_ids,
+                },
+                current_item=chunk[0].descricao_produto[:50] + "...",
+                message=f"Processando {len(chunk)} produtos...",
+            )
+
+            results = await asyncio.gather(*(classify(produto) for produto in chunk))
+
+            # Gravar sugestões e status finais do chunk em uma transação
+            rows = []
+            now = datetime.utcnow()
+
+            for produto, result in zip(chunk, results):
+                final = result.final_result or {}
+                if result.error is None:
+                    confianca_ncm = final.get("confidence") or result.confidence
+                    revisao = result.requires_review or confianca_ncm < 0.7
+                    final_status = "REVISAO_PENDENTE" if revisao else "PROCESSADO"
+                    successful += 1
+                else:
+                    # Classificação falhou: erro registrado na justificativa
+                    confianca_ncm = 0.0
+                    revisao = True
+                    final_status = "ERRO"
+                    failed += 1
+
+                rows.append(
+                    {
+                        "produto_id": produto.produto_id,
+                        "ncm_sugerido": final.get("ncm_final") or None,
+                        "cest_sugerido": final.get("cest_final") or None,
+                        "confianca_ncm": confianca_ncm,
+                        "confianca_cest": final.get("confianca_cest"),
+                        "justificativa_ncm": final.get("justificativa_ncm")
+                        or result.error,
+                        "justificativa_cest": final.get("justificativa_cest") or None,
+                        "status_processamento": final_status,
+                        "revisao_manual": revisao,
+                        "data_processamento": now,
+                        "data_atualizacao": now,
+                    }
+                )
+
+            with db_manager.session_scope() as db:
+                # UPDATE em lote pela chave primária (executemany)
+                db.execute(update(ProdutoEmpresa), rows)
+        except BaseException:
+            # Cancelamento, posse perdida ou erro: o chunk volta a PENDENTE
+            with db_manager.session_scope() as db:
+                _set_status(db, chunk_ids, "PENDENTE", only_if="PROCESSANDO")
+            raise
+
+        processed += len(chunk)
+        last_id = chunk_ids[-1]
+
+        # Checkpoint do chunk (também verifica cancelamento)
+        remaining_items = total_produtos - processed
+        await context.progress(
+            checkpoint={
+                "total": total_produtos,
+                "last_id": last_id,
+                "processed": processed,
+                "successful": successful,
+                "failed": failed,
+                "in_flight": [],
+            },
+            processed=processed,
+            successful=successful,
+            failed=failed,
+            progress_percentage=(processed / total_produtos) * 100,
+            estimated_remaining=remaining_items * 5,  # Estimativa de 5s por item
+            message=f"Processados {processed}/{total_produtos} produtos",
+        )
+
+    logger.info(
+        f"🎉 Classificação {context.job_id} concluída: "
+        f"{successful}/{total_produtos} sucessos"
+    )
+
+    return {
+        "processed": processed,
+        "successful": successful,
+        "failed": failed,
+        "progress_percentage": 100.0,
+        "estimated_remaining": 0,
+        "current_item": None,
+        "message": f"Classificação concluída! {successful} sucessos, {failed} falhas.",
+    }
+
+
+def _claim_chunk(db: Session, filters: List, last_id: Optional[str], size: int):
+    """
+    Reserva até `size` produtos (status PROCESSANDO) com um único UPDATE.
+
+    Usa UPDATE ... RETURNING quando o banco suporta (PostgreSQL, SQLite
+    3.35+); no PostgreSQL a seleção usa FOR UPDATE SKIP LOCKED para que
+    workers concorrentes não disputem as mesmas linhas.
+    """
+    criteria = list(filters)
+    if last_id is not None:
+        criteria.append(ProdutoEmpresa.produto_id > last_id)
+
+    candidates = (
+        select(ProdutoEmpresa.produto_id)
+        .where(*criteria)
+        .order_by(ProdutoEmpresa.produto_id)
+        .limit(size)
+    )
+
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    columns = (
+        ProdutoEmpresa.produto_id,
+        ProdutoEmpresa.descricao_produto,
+        ProdutoEmpresa.codigo_barra,
+        ProdutoEmpresa.codigo_produto,
+        ProdutoEmpresa.ncm,
+        ProdutoEmpresa.cest,
+    )
+
+    if getattr(dialect, "update_returning", False):
+        rows = db.execute(
+            update(ProdutoEmpresa)
+            .where(ProdutoEmpresa.produto_id.in_(candidates.scalar_subquery()))
+            .values(
+                status_processamento="PROCESSANDO",
+                data_atualizacao=datetime.utcnow(),
+            )
+            .returning(*columns)
+            .execution_options(synchronize_session=False)
+        ).all()
+    else:
+        ids = db.execute(candidates).scalars().all()
+        if not ids:
+            return []
+        _set_status(db, ids, "PROCESSANDO")
+        rows = db.execute(
+            select(*columns).where(ProdutoEmpresa.produto_id.in_(ids))
+        ).all()
+
+    return sorted(rows, key=lambda row: row.produto_id)
+
+
+def _set_status(
+    db: Session, ids: List[str], new_status: str, only_if: Optional[str] = None
+) -> None:
+    """Atualiza o status de um conjunto de produtos com um único UPDATE."""
+    statement = update(ProdutoEmpresa).where(ProdutoEmpresa.produto_id.in_(ids))
+    if only_if is not None:
+        statement = statement.where(ProdutoEmpresa.status_processamento == only_if)
+    db.execute(
+        statement.values(
+            status_processamento=new_status, data_atualizacao=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    )
+
+
+@register_job_handler(DATA_IMPORT)
+async def execute_data_import(context: JobContext) -> Dict[str, Any]:
+    """
+    Executa importação de dados do banco da empresa
+
+    O checkpoint guarda quantos registros já foram gravados; na retomada a
+    limpeza inicial não é repetida e os registros gravados são pulados.
+    """
+    from ..integrations.stock_analysis.stock_adapter import StockIntegrationManager
+
+    empresa_id = context.empresa_id
+    if "database_config_encrypted" in context.payload:
+        database_config = decrypt_credentials(
+            context.payload["database_config_encrypted"]
+        )
+    else:
+        # Jobs enfileirados antes da cifragem das credenciais
+        database_config = context.payload["database_config"]
+    table_name = context.payload.get("table_name", "produto")
+    limit = context.payload.get("limit")
+    filters = context.payload.get("filters")
+
+    inserted = context.checkpoint.get("inserted", 0)
+
+    logger.info(f"🔄 Iniciando importação {context.job_id} para empresa {empresa_id}")
+
+    await context.progress(message="Conectando ao banco de dados da empresa...")
+
+    # Inicializar adaptador de estoque
+    integration_manager = StockIntegrationManager(database_config)
+
+    # Construir query de importação
+    base_query = f"""
+    SELECT
+        produto_id,
+        descricao_produto,
+        codigo_barra,
+        codigo_produto,
+        ncm,
+        cest
+    FROM {table_name}
+    WHERE descricao_produto IS NOT NULL
+    AND TRIM(descricao_produto) != ''
+    """
+
+    # Aplicar filtros adicionais
+    if filters:
+        for field, value in filters.items():
+            if isinstance(value, str):
+                base_query += f" AND {field} ILIKE '%{value}%'"
+            else:
+                base_query += f" AND {field} = {value}"
+
+    # Ordem estável para que a retomada pule exatamente os já gravados
+    base_query += " ORDER BY produto_id"
+
+    # Aplicar limite
+    if limit:
+        base_query += f" LIMIT {limit}"
+
+    logger.info(f"📊 Executando query: {base_query}")
+
+    await context.progress(message="Executando consulta no banco da empresa...")
+
+    # Executar query através do adaptador
+    records = await integration_manager.execute_query(base_query)
+
+    if not records:
+        return {
+            "total_records": 0,
+            "progress": 100.0,
+            "message": "Nenhum registro encontrado para importar",
+        }
+
+    # Atualizar status com total encontrado
+    total_records = len(records)
+    await context.progress(
+        total_records=total_records, message=f"Importando {total_records} registros..."
+    )
+
+    logger.info(f"📦 Importando {total_records} registros para empresa {empresa_id}")
+
+    # Processar registros em lotes
+    batch_size = 100
+    processed = inserted
+
+    with db_manager.session_scope() as db:
+        if not inserted:
+            # Limpar dados existentes da empresa (apenas na primeira execução)
+            db.query(ProdutoEmpresa).filter(
+                ProdutoEmpresa.empresa_id == empresa_id
+            ).delete()
+
+        for i in range(inserted, total_records, batch_size):
+            batch = records[i : i + batch_size]
+            now = datetime.utcnow()
+
+            for record in batch:
+                produto = ProdutoEmpresa(
+                    produto_id=str(record.get("produto_id")),
+                    empresa_id=empresa_id,
+                    codigo_produto=record.get("codigo_produto"),
+                    descricao_produto=record.get("descricao_produto"),
+                    codigo_barra=record.get("codigo_barra"),
+                    ncm=record.get("ncm"),
+                    cest=record.get("cest"),
+                    status_processamento="PENDENTE",
+                    data_criacao=now,
+                    data_atualizacao=now,
+                )
+
+                db.add(produto)
+                processed += 1
+
+            # Commit do lote e checkpoint
+            db.commit()
+
+            progress = (processed / total_records) * 100
+            await context.progress(
+                checkpoint={"inserted": processed},
+                processed=processed,
+                progress=progress,
+                message=(
+                    f"Processado {processed}/{total_records} registros ({progress:.1f}%)"
+                ),
+            )
+
+    logger.info(f"✅ Importação {context.job_id} concluída: {processed} registros")
+
+    return {
+        "processed": processed,
+        "progress": 100.0,
+        "message": f"Importação concluída com sucesso! {processed} registros importados.",
+    }
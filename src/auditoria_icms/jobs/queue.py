@@ -0,0 +1,312 @@
+"""
+Fila durável de jobs armazenada no banco da aplicação
+Reserva com SELECT ... FOR UPDATE SKIP LOCKED no PostgreSQL e UPDATE
+condicional nos demais bancos (SQLite), com checkpoints, cancelamento e
+recuperação de jobs órfãos
+"""
+
+import uuid
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from ..database.models import JobProcessamento
+
+logger = logging.getLogger(__name__)
+
+# Status de job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_ERROR = "error"
+JOB_CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+# Chaves de payload com credenciais; removidas quando o job termina
+SENSITIVE_PAYLOAD_KEYS = ("database_config", "database_config_encrypted")
+
+
+class JobOwnershipLost(Exception):
+    """O job não está mais em execução por este worker (devolvido à fila)."""
+
+
+class JobQueue:
+    """Operações da fila de jobs sobre uma fábrica de sessões SQLAlchemy."""
+
+    def __init__(self, session_factory: Callable[[], Session], max_attempts: int = 3):
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+
+    def _session(self) -> Session:
+        return self.session_factory()
+
+    # Produtor (API)
+
+    def enqueue(
+        self,
+        tipo: str,
+        payload: Dict[str, Any],
+        empresa_id: Optional[int] = None,
+        progresso: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Insere um job na fila e retorna seu id."""
+        job_id = str(uuid.uuid4())
+        session = self._session()
+        try:
+            session.add(
+                JobProcessamento(
+                    id=job_id,
+                    tipo=tipo,
+                    empresa_id=empresa_id,
+                    status=JOB_QUEUED,
+                    payload=payload,
+                    progresso=progresso or {},
+                    checkpoint={},
+                    criado_em=datetime.utcnow(),
+                )
+            )
+            session.commit()
+        finally:
+            session.close()
+
+        logger.info(f"📥 Job {tipo} {job_id} enfileirado")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado do job no formato exposto pelos endpoints."""
+        session = self._session()
+        try:
+            job = session.get(JobProcessamento, job_id)
+            return _job_to_dict(job) if job else None
+        finally:
+            session.close()
+
+    def request_cancel(self, job_id: str) -> bool:
+        """
+        Solicita cancelamento. Jobs na fila são cancelados imediatamente;
+        jobs em execução param no próximo checkpoint do worker.
+        """
+        session = self._session()
+        try:
+            job = (
+                session.query(JobProcessamento)
+                .filter(
+                    JobProcessamento.id == job_id,
+                    JobProcessamento.status.in_(ACTIVE_STATUSES),
+                )
+                .with_for_update()
+                .first()
+            )
+            if job is None:
+                return False
+
+            job.cancelamento_solicitado = True
+            if job.status == JOB_QUEUED:
+                job.status = JOB_CANCELLED
+                job.finalizado_em = datetime.utcnow()
+                job.payload = _scrub_payload(job.payload)
+            session.commit()
+            return True
+        finally:
+            session.close()
+
+    # Consumidor (worker)
+
+    def claim(self, worker_id: str, tipos: Optional[list] = None) -> Optional[Dict]:
+        """Reserva o job mais antigo da fila para este worker."""
+        session = self._session()
+        try:
+            query = session.query(JobProcessamento).filter(
+                JobProcessamento.status == JOB_QUEUED
+            )
+            if tipos:
+                query = query.filter(JobProcessamento.tipo.in_(tipos))
+            query = query.order_by(JobProcessamento.criado_em)
+
+            now = datetime.utcnow()
+            if session.get_bind().dialect.name == "postgresql":
+                job = query.with_for_update(skip_locked=True).first()
+                if job is None:
+                    session.rollback()
+                    return None
+                job_id = job.id
+            else:
+                # Sem SKIP LOCKED: UPDATE condicional garante um único vencedor
+                candidate = query.with_entities(JobProcessamento.id).first()
+                if candidate is None:
+                    return None
+                job_id = candidate.id
+                updated = (
+                    session.query(JobProcessamento)
+                    .filter(
+                        JobProcessamento.id == job_id,
+                        JobProcessamento.status == JOB_QUEUED,
+                    )
+                    .update({"status": JOB_RUNNING}, synchronize_session=False)
+                )
+                if not updated:
+                    session.rollback()
+                    return None
+                job = session.get(JobProcessamento, job_id)
+
+            job.status = JOB_RUNNING
+            job.worker_id = worker_id
+            job.tentativas = (job.tentativas or 0) + 1
+            job.iniciado_em = job.iniciado_em or now
+            job.heartbeat_em = now
+            session.commit()
+
+            return _job_to_dict(job)
+        finally:
+            session.close()
+
+    def checkpoint(
+        self,
+        job_id: str,
+        worker_id: str,
+        progresso: Optional[Dict[str, Any]] = None,
+        checkpoint: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Grava progresso/checkpoint e heartbeat. Retorna True se o
+        cancelamento do job foi solicitado.
+
+        Levanta JobOwnershipLost se o job não está mais em execução por
+        `worker_id` (por exemplo, devolvido à fila por falta de heartbeat).
+        """
+        session = self._session()
+        try:
+            job = session.get(JobProcessamento, job_id)
+            if job is None:
+                raise JobOwnershipLost(job_id)
+
+            values: Dict[str, Any] = {"heartbeat_em": datetime.utcnow()}
+            if progresso:
+                values["progresso"] = {**(job.progresso or {}), **progresso}
+            if checkpoint is not None:
+                values["checkpoint"] = checkpoint
+            cancel_requested = bool(job.cancelamento_solicitado)
+
+            if not self._update_owned(session, job_id, worker_id, values):
+                session.rollback()
+                raise JobOwnershipLost(job_id)
+            session.commit()
+            return cancel_requested
+        finally:
+            session.close()
+
+    def finish(
+        self,
+        job_id: str,
+        worker_id: str,
+        status: str,
+        progresso: Optional[Dict[str, Any]] = None,
+        erro: Optional[str] = None,
+    ) -> bool:
+        """
+        Marca o job como concluído, com erro ou cancelado. Retorna False
+        (sem alterar o job) se ele não está mais em execução por `worker_id`.
+        """
+        session = self._session()
+        try:
+            job = session.get(JobProcessamento, job_id)
+            if job is None:
+                return False
+
+            values: Dict[str, Any] = {
+                "status": status,
+                "erro": erro,
+                "finalizado_em": datetime.utcnow(),
+                "payload": _scrub_payload(job.payload),
+            }
+            if progresso:
+                values["progresso"] = {**(job.progresso or {}), **progresso}
+
+            if not self._update_owned(session, job_id, worker_id, values):
+                session.rollback()
+                logger.warning(
+                    f"⚠️ Job {job_id} não pertence mais ao worker {worker_id}; "
+                    f"status {status} descartado"
+                )
+                return False
+            session.commit()
+            return True
+        finally:
+            session.close()
+
+    def _update_owned(
+        self, session: Session, job_id: str, worker_id: str, values: Dict[str, Any]
+    ) -> bool:
+        """UPDATE condicional à posse do job; zero linhas = posse perdida."""
+        updated = (
+            session.query(JobProcessamento)
+            .filter(
+                JobProcessamento.id == job_id,
+                JobProcessamento.worker_id == worker_id,
+                JobProcessamento.status == JOB_RUNNING,
+            )
+            .update(values, synchronize_session=False)
+        )
+        return updated > 0
+
+    def requeue_stale(self, timeout_seconds: int) -> int:
+        """
+        Devolve à fila jobs em execução sem heartbeat recente (worker morto).
+        Jobs que excederam `max_attempts` são marcados com erro.
+        """
+        limit = datetime.utcnow() - timedelta(seconds=timeout_seconds)
+        session = self._session()
+        try:
+            stale = (
+                session.query(JobProcessamento)
+                .filter(
+                    JobProcessamento.status == JOB_RUNNING,
+                    JobProcessamento.heartbeat_em < limit,
+                )
+                .with_for_update()
+                .all()
+            )
+            for job in stale:
+                if (job.tentativas or 0) >= self.max_attempts:
+                    job.status = JOB_ERROR
+                    job.erro = "Número máximo de tentativas excedido"
+                    job.finalizado_em = datetime.utcnow()
+                    job.payload = _scrub_payload(job.payload)
+                else:
+                    job.status = JOB_QUEUED
+                    job.worker_id = None
+                    logger.warning(f"♻️ Job {job.id} devolvido à fila (sem heartbeat)")
+            session.commit()
+            return len(stale)
+        finally:
+            session.close()
+
+
+def _scrub_payload(payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Payload sem credenciais (job em estado final não precisa delas)."""
+    return {
+        key: value
+        for key, value in (payload or {}).items()
+        if key not in SENSITIVE_PAYLOAD_KEYS
+    }
+
+
+def _job_to_dict(job: JobProcessamento) -> Dict[str, Any]:
+    return {
+        **(job.progresso or {}),
+        "job_id": job.id,
+        "tipo": job.tipo,
+        "empresa_id": job.empresa_id,
+        "status": job.status,
+        "payload": job.payload or {},
+        "checkpoint": job.checkpoint or {},
+        "cancel_requested": bool(job.cancelamento_solicitado),
+        "attempts": job.tentativas or 0,
+        "error": job.erro,
+        "created_at": job.criado_em.isoformat() if job.criado_em else None,
+        "started_at": job.iniciado_em.isoformat() if job.iniciado_em else None,
+        "finished_at": job.finalizado_em.isoformat() if job.finalizado_em else None,
+    }
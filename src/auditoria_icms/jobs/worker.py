@@ -0,0 +1,275 @@
+"""
+Workers da fila durável de jobs
+Executa os jobs em processos dedicados (fora do event loop da API), com
+concorrência configurável, heartbeat, checkpoints e cancelamento
+
+Por padrão a API inicia os workers no lifespan (JOB_WORKERS_EMBEDDED=true).
+Para executá-los em processo separado, defina JOB_WORKERS_EMBEDDED=false e:
+    python -m src.auditoria_icms.jobs.worker --processes 2 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .queue import (
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_ERROR,
+    JobOwnershipLost,
+    JobQueue,
+)
+
+logger = logging.getLogger(__name__)
+
+# Handlers registrados por tipo de job
+JOB_HANDLERS: Dict[str, Callable[["JobContext"], Awaitable[Dict[str, Any]]]] = {}
+
+
+def register_job_handler(tipo: str):
+    """Decorator que registra a corrotina que executa jobs do `tipo`."""
+
+    def decorator(func):
+        JOB_HANDLERS[tipo] = func
+        return func
+
+    return decorator
+
+
+class JobCancelled(Exception):
+    """Cancelamento solicitado para o job em execução."""
+
+
+class JobContext:
+    """Dados e operações de progresso disponíveis para um handler."""
+
+    def __init__(self, queue: JobQueue, job: Dict[str, Any], worker_id: str):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.job_id: str = job["job_id"]
+        self.empresa_id: Optional[int] = job.get("empresa_id")
+        self.payload: Dict[str, Any] = job.get("payload", {})
+        self.checkpoint: Dict[str, Any] = job.get("checkpoint", {})
+        self.attempts: int = job.get("attempts", 1)
+        self.cancel_requested = bool(job.get("cancel_requested"))
+        self.ownership_lost = False
+
+    async def progress(
+        self, checkpoint: Optional[Dict[str, Any]] = None, **progresso
+    ) -> None:
+        """
+        Grava progresso (e opcionalmente o checkpoint para retomada).
+        Levanta JobCancelled se o cancelamento foi solicitado e
+        JobOwnershipLost se o job foi devolvido à fila.
+        """
+        if self.ownership_lost:
+            raise JobOwnershipLost(self.job_id)
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+
+        cancel_requested = await asyncio.to_thread(
+            self.queue.checkpoint, self.job_id, self.worker_id, progresso, checkpoint
+        )
+        self.cancel_requested = self.cancel_requested or cancel_requested
+        self.raise_if_cancelled()
+
+    def raise_if_cancelled(self) -> None:
+        if self.ownership_lost:
+            raise JobOwnershipLost(self.job_id)
+        if self.cancel_requested:
+            raise JobCancelled(self.job_id)
+
+
+class JobWorker:
+    """Consome a fila executando até `concurrency` jobs simultâneos."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        stale_timeout: int = 300,
+        tipos: Optional[List[str]] = None,
+        worker_id: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_timeout = stale_timeout
+        self.tipos = tipos or list(JOB_HANDLERS)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.running: Dict[str, asyncio.Task] = {}
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None) -> None:
+        """Laço principal: recupera jobs órfãos, reserva e executa jobs."""
+        stop_event = stop_event or asyncio.Event()
+        logger.info(
+            f"👷 Worker {self.worker_id} iniciado "
+            f"(concorrência {self.concurrency}, tipos {self.tipos})"
+        )
+
+        loop = asyncio.get_running_loop()
+        next_recovery = 0.0
+
+        while not stop_event.is_set():
+            if loop.time() >= next_recovery:
+                await asyncio.to_thread(self.queue.requeue_stale, self.stale_timeout)
+                next_recovery = loop.time() + self.stale_timeout / 2
+
+            while len(self.running) < self.concurrency:
+                job = await asyncio.to_thread(
+                    self.queue.claim, self.worker_id, self.tipos
+                )
+                if job is None:
+                    break
+                self.running[job["job_id"]] = asyncio.create_task(self._execute(job))
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        if self.running:
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        context = JobContext(self.queue, job, self.worker_id)
+        heartbeat = asyncio.create_task(self._heartbeat(context))
+
+        try:
+            handler = JOB_HANDLERS.get(job["tipo"])
+            if handler is None:
+                raise ValueError(f"Tipo de job desconhecido: {job['tipo']}")
+
+            result = await handler(context)
+            await asyncio.to_thread(
+                self.queue.finish, job_id, self.worker_id, JOB_COMPLETED, result or {}
+            )
+
+        except JobOwnershipLost:
+            # Outro worker retomou o job a partir do último checkpoint
+            logger.warning(f"♻️ Job {job_id} perdido pelo worker {self.worker_id}")
+
+        except JobCancelled:
+            logger.info(f"🚫 Job {job_id} cancelado")
+            await asyncio.to_thread(
+                self.queue.finish,
+                job_id,
+                self.worker_id,
+                JOB_CANCELLED,
+                {"message": "Job cancelado pelo usuário"},
+            )
+
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} falhou: {e}")
+            await asyncio.to_thread(
+                self.queue.finish,
+                job_id,
+                self.worker_id,
+                JOB_ERROR,
+                {"message": f"Erro no job: {str(e)}"},
+                str(e),
+            )
+
+        finally:
+            heartbeat.cancel()
+            self.running.pop(job_id, None)
+
+    async def _heartbeat(self, context: JobContext) -> None:
+        """Mantém o job vivo durante etapas longas e lê pedidos de cancelamento."""
+        interval = max(1.0, self.stale_timeout / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                cancel_requested = await asyncio.to_thread(
+                    self.queue.checkpoint, context.job_id, self.worker_id
+                )
+            except JobOwnershipLost:
+                # O handler para no próximo progress()/raise_if_cancelled()
+                context.ownership_lost = True
+                return
+            context.cancel_requested = context.cancel_requested or cancel_requested
+
+
+def _worker_process(concurrency: int, tipos: Optional[List[str]]) -> None:
+    """Ponto de entrada de cada processo worker."""
+    from ..core.config import get_settings
+    from ..database.connection import db_manager
+    from . import handlers  # noqa: F401 - registra os handlers
+
+    settings = get_settings()
+    logging.basicConfig(level=settings.processing.log_level)
+
+    worker = JobWorker(
+        JobQueue(db_manager.get_session),
+        concurrency=concurrency,
+        poll_interval=settings.processing.job_poll_interval,
+        stale_timeout=settings.processing.job_stale_timeout,
+        tipos=tipos,
+    )
+    asyncio.run(worker.run())
+
+
+def start_workers(
+    processes: int, concurrency: int, tipos: Optional[List[str]] = None
+) -> List[multiprocessing.Process]:
+    """Inicia `processes` processos worker e os retorna sem aguardar."""
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=_worker_process,
+            args=(concurrency, tipos),
+            name=f"job-worker-{i}",
+        )
+        for i in range(processes)
+    ]
+
+    for process in workers:
+        process.start()
+
+    logger.info(f"👷 {processes} processo(s) worker iniciado(s)")
+    return workers
+
+
+def stop_workers(workers: List[multiprocessing.Process], timeout: float = 10.0) -> None:
+    """
+    Encerra os processos worker. Jobs interrompidos voltam à fila pelo
+    `requeue_stale` e são retomados a partir do último checkpoint.
+    """
+    for process in workers:
+        if process.is_alive():
+            process.terminate()
+    for process in workers:
+        process.join(timeout)
+
+
+def run_workers(
+    processes: int, concurrency: int, tipos: Optional[List[str]] = None
+) -> None:
+    """Inicia `processes` processos worker e aguarda seu término."""
+    workers = start_workers(processes, concurrency, tipos)
+
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        stop_workers(workers)
+
+
+if __name__ == "__main__":
+    from ..core.config import get_settings
+
+    processing = get_settings().processing
+
+    parser = argparse.ArgumentParser(description="Workers da fila de jobs")
+    parser.add_argument("--processes", type=int, default=processing.job_workers)
+    parser.add_argument("--concurrency", type=int, default=processing.job_concurrency)
+    parser.add_argument("--types", nargs="*", default=None)
+    args = parser.parse_args()
+
+    run_workers(args.processes, args.concurrency, args.types)
@@ -0,0 +1,373 @@
+"""
+Índice compacto de GTIN para resolução exata (NCM/CEST)
+Unifica Golden Set, classificações confirmadas, ABC Farma e produtos de
+exemplo em um vetor ordenado de chaves uint64 e um vetor paralelo de
+registros compactos (ncm, cest, fonte, confiança), consultado por busca
+binária após validação do dígito verificador GS1
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = "data/processed/gtin_index.npz"
+
+# Ordem de prioridade: em GTINs repetidos vence a fonte mais confiável
+SOURCES = ["golden_set", "classificacao_confirmada", "abc_farma", "produto_exemplo"]
+
+CONFIABILIDADE = {"alta": 0.99, "media": 0.9, "baixa": 0.75}
+
+RECORD_DTYPE = np.dtype(
+    [("ncm", "<u4"), ("cest", "<u4"), ("source", "u1"), ("confidence", "u1")]
+)
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_gtin(value: Any) -> Optional[int]:
+    """
+    Normaliza GTIN-8/12/13/14 para inteiro (equivalente ao GTIN-14 com
+    zeros à esquerda). Retorna None se o formato ou o dígito verificador
+    forem inválidos.
+    """
+    if value is None:
+        return None
+    digits = _NON_DIGITS.sub("", str(value))
+    if len(digits) not in (8, 12, 13, 14) or not digits.strip("0"):
+        return None
+
+    # Dígito verificador GS1: pesos 3 e 1 alternados a partir da direita
+    body = digits[:-1]
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(body[::-1]))
+    if (10 - total % 10) % 10 != int(digits[-1]):
+        return None
+    return int(digits)
+
+
+def _code_to_int(value: Any, length: int) -> int:
+    digits = _NON_DIGITS.sub("", str(value or ""))
+    return int(digits) if 0 < len(digits) <= length else 0
+
+
+@dataclass
+class GTINMatch:
+    """Resultado de uma resolução exata por GTIN"""
+
+    gtin: str
+    ncm: str
+    cest: Optional[str]
+    source: str
+    confidence: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class GTINIndex:
+    """
+    Vetor ordenado de GTINs (uint64) com registros compactos paralelos.
+
+    Cada entrada ocupa 18 bytes; a consulta é `np.searchsorted` sobre as
+    chaves. O índice é imutável depois de construído e pode ser
+    compartilhado entre threads.
+    """
+
+    def __init__(
+        self,
+        keys: Optional[np.ndarray] = None,
+        records: Optional[np.ndarray] = None,
+        conflicts: int = 0,
+    ):
+        self.keys = keys if keys is not None else np.empty(0, dtype=np.uint64)
+        self.records = (
+            records if records is not None else np.empty(0, dtype=RECORD_DTYPE)
+        )
+        self.conflicts = conflicts
+
+        self.lookups = 0
+        self.hits = 0
+        self.invalid = 0
+
+    def __len__(self) -> int:
+        return int(self.keys.size)
+
+    def _match(self, key: int, pos: int) -> GTINMatch:
+        record = self.records[pos]
+        cest = int(record["cest"])
+        return GTINMatch(
+            gtin=f"{key:014d}",
+            ncm=f"{int(record['ncm']):08d}",
+            cest=f"{cest:07d}" if cest else None,
+            source=SOURCES[int(record["source"])],
+            confidence=int(record["confidence"]) / 100,
+        )
+
+    def lookup(self, gtin: Any) -> Optional[GTINMatch]:
+        """Resolve um GTIN; None se inválido ou desconhecido."""
+        self.lookups += 1
+        key = normalize_gtin(gtin)
+        if key is None:
+            self.invalid += 1
+            return None
+        if not self.keys.size:
+            return None
+
+        pos = int(np.searchsorted(self.keys, np.uint64(key)))
+        if pos < self.keys.size and int(self.keys[pos]) == key:
+            self.hits += 1
+            return self._match(key, pos)
+        return None
+
+    def lookup_many(self, gtins: Iterable[Any]) -> List[Optional[GTINMatch]]:
+        """Resolve vários GTINs com uma única busca vetorizada."""
+        normalized = [normalize_gtin(gtin) for gtin in gtins]
+        self.lookups += len(normalized)
+        self.invalid += sum(1 for key in normalized if key is None)
+
+        results: List[Optional[GTINMatch]] = [None] * len(normalized)
+        valid = [(i, key) for i, key in enumerate(normalized) if key is not None]
+        if not valid or not self.keys.size:
+            return results
+
+        queries = np.fromiter((key for _, key in valid), dtype=np.uint64)
+        positions = np.searchsorted(self.keys, queries)
+        in_range = positions < self.keys.size
+        found = np.zeros(queries.size, dtype=bool)
+        found[in_range] = self.keys[positions[in_range]] == queries[in_range]
+
+        for (i, key), pos in zip(
+            (valid[j] for j in np.flatnonzero(found)), positions[found]
+        ):
+            results[i] = self._match(key, int(pos))
+        self.hits += int(found.sum())
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts = np.bincount(self.records["source"], minlength=len(SOURCES))
+        return {
+            "entries": len(self),
+            "memory_bytes": int(self.keys.nbytes + self.records.nbytes),
+            "by_source": {name: int(counts[i]) for i, name in enumerate(SOURCES)},
+            "conflicts": self.conflicts,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "invalid": self.invalid,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+        }
+
+    # Persistência
+
+    def save(self, path: str = DEFAULT_INDEX_PATH) -> Path:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as fh:
+            np.savez(
+                fh,
+                keys=self.keys,
+                records=self.records,
+                conflicts=np.array(self.conflicts),
+            )
+        return target
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH) -> "GTINIndex":
+        with np.load(path) as data:
+            return cls(
+                keys=data["keys"],
+                records=data["records"].astype(RECORD_DTYPE),
+                conflicts=int(data["conflicts"]),
+            )
+
+
+class GTINIndexBuilder:
+    """Acumula entradas de várias fontes e gera o índice deduplicado."""
+
+    def __init__(self):
+        self._rows: List[Tuple[int, int, int, int, int]] = []
+        self.rejected = 0
+
+    def add(
+        self,
+        gtin: Any,
+        ncm: Any,
+        cest: Any = None,
+        source: str = "produto_exemplo",
+        confidence: float = 0.95,
+    ) -> bool:
+        key = normalize_gtin(gtin)
+        ncm_value = _code_to_int(ncm, 8)
+        if key is None or not ncm_value:
+            self.rejected += 1
+            return False
+        self._rows.append(
+            (
+                key,
+                ncm_value,
+                _code_to_int(cest, 7),
+                SOURCES.index(source),
+                int(round(min(1.0, max(0.0, float(confidence))) * 100)),
+            )
+        )
+        return True
+
+    def add_golden_set(self, bind) -> int:
+        """Golden Set ativo (colunas gtin e codigo_barra)."""
+        rows = _fetch(
+            bind,
+            "SELECT gtin, codigo_barra, ncm_correto, cest_correto, confiabilidade "
+            "FROM golden_set WHERE ativo IS NULL OR ativo = TRUE",
+        )
+        added = 0
+        for gtin, codigo_barra, ncm, cest, confiabilidade in rows:
+            confidence = CONFIABILIDADE.get(str(confiabilidade or "alta"), 0.9)
+            for value in {gtin, codigo_barra} - {None, ""}:
+                added += self.add(value, ncm, cest, "golden_set", confidence)
+        return added
+
+    def add_confirmed_classifications(self, bind) -> int:
+        """Classificações aprovadas (ou revisadas) das mercadorias com GTIN."""
+        rows = _fetch(
+            bind,
+            "SELECT m.gtin, c.ncm_determinado, c.cest_determinado, c.confianca_ncm "
+            "FROM classificacoes c "
+            "JOIN mercadorias_a_classificar m ON m.id = c.mercadoria_id "
+            "WHERE c.aprovado = TRUE AND m.gtin IS NOT NULL",
+        )
+        return sum(
+            self.add(
+                gtin,
+                ncm,
+                cest,
+                "classificacao_confirmada",
+                max(float(confianca or 0), 0.95),
+            )
+            for gtin, ncm, cest, confianca in rows
+        )
+
+    def add_product_examples(self, bind) -> int:
+        rows = _fetch(
+            bind, "SELECT gtin, ncm, cest, confiabilidade FROM produtos_exemplos"
+        )
+        return sum(
+            self.add(
+                gtin,
+                ncm,
+                cest,
+                "produto_exemplo",
+                CONFIABILIDADE.get(str(confiabilidade or "alta"), 0.9),
+            )
+            for gtin, ncm, cest, confiabilidade in rows
+        )
+
+    def add_abc_farma(self, processor, confidence: float = 0.95) -> int:
+        """Índice de código de barras do ABCFarmaV2Processor (já carregado)."""
+        return sum(
+            self.add(
+                codigo, produto.get("ncm"), produto.get("cest"), "abc_farma", confidence
+            )
+            for codigo, produto in processor.codigo_barras_index.items()
+        )
+
+    def build(self) -> GTINIndex:
+        if not self._rows:
+            return GTINIndex()
+
+        data = np.array(self._rows, dtype=np.uint64)
+        keys = data[:, 0]
+        # Ordena por GTIN, depois prioridade da fonte e maior confiança
+        order = np.lexsort((-data[:, 4].astype(np.int64), data[:, 3], keys))
+        data = data[order]
+        keys = data[:, 0]
+
+        first = np.ones(keys.size, dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        group = np.cumsum(first) - 1
+        winner_ncm = data[first, 1][group]
+        conflicts = int(np.unique(keys[data[:, 1] != winner_ncm]).size)
+
+        best = data[first]
+        # CEST ausente na fonte vencedora: usa o da fonte seguinte com o mesmo NCM
+        has_cest = (data[:, 1] == winner_ncm) & (data[:, 2] > 0)
+        groups, pos = np.unique(group[has_cest], return_index=True)
+        missing = best[groups, 2] == 0
+        best[groups[missing], 2] = data[has_cest][pos[missing], 2]
+        records = np.empty(best.shape[0], dtype=RECORD_DTYPE)
+        records["ncm"] = best[:, 1]
+        records["cest"] = best[:, 2]
+        records["source"] = best[:, 3]
+        records["confidence"] = best[:, 4]
+
+        if conflicts:
+            logger.warning(f"⚠️ {conflicts} GTINs com NCM divergente entre fontes")
+        return GTINIndex(np.ascontiguousarray(best[:, 0]), records, conflicts)
+
+
+def _fetch(bind, sql: str) -> List[Tuple]:
+    """Executa a consulta em conexão sqlite3 ou SQLAlchemy; tabela ausente → []."""
+    try:
+        if isinstance(bind, sqlite3.Connection):
+            return bind.execute(sql).fetchall()
+
+        from sqlalchemy import text
+
+        return [tuple(row) for row in bind.execute(text(sql)).fetchall()]
+    except Exception as e:
+        logger.warning(f"Fonte de GTIN indisponível ({e})")
+        return []
+
+
+def build_gtin_index(
+    bind=None, knowledge_base=None, abc_farma_processor=None
+) -> GTINIndex:
+    """
+    Constrói o índice a partir do banco principal (SQLAlchemy: Golden Set e
+    classificações confirmadas), da base de conhecimento SQLite e do ABC Farma.
+    """
+    builder = GTINIndexBuilder()
+    for source in (bind, knowledge_base):
+        if source is not None:
+            builder.add_golden_set(source)
+            builder.add_confirmed_classifications(source)
+            builder.add_product_examples(source)
+    if abc_farma_processor is not None:
+        builder.add_abc_farma(abc_farma_processor)
+
+    index = builder.build()
+    logger.info(
+        f"✅ Índice GTIN: {len(index)} GTINs "
+        f"({builder.rejected} entradas inválidas ignoradas)"
+    )
+    return index
+
+
+_index: Optional[GTINIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_gtin_index(path: str = DEFAULT_INDEX_PATH) -> GTINIndex:
+    """Índice compartilhado do processo, carregado do disco na primeira chamada."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if Path(path).exists():
+                    _index = GTINIndex.load(path)
+                    logger.info(f"✅ Índice GTIN carregado: {len(_index)} GTINs")
+                else:
+                    _index = GTINIndex()
+    return _index
+
+
+def set_gtin_index(index: GTINIndex) -> None:
+    """Substitui o índice compartilhado (após reconstrução)."""
+    global _index
+    with _index_lock:
+        _index = index
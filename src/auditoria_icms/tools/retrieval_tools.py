@@ -8,6 +8,8 @@ from typing import Dict, List, Any, Optional
 from pathlib import Path
 import logging
 
+from ..database.text_search import GOLDEN_SET_INDEX
+
 
 class RetrievalTools:
     """
@@ -33,6 +35,7 @@ class RetrievalTools:
         self.faiss_index = None
         self.neo4j_driver = None
         self.embeddings_model = None
+        self.gtin_index = None
 
         # Cache de busca
         self._cache = {}
@@ -65,9 +68,23 @@ class RetrievalTools:
             self.sqlite_conn = sqlite3.connect(self.sqlite_path)
             self.sqlite_conn.row_factory = sqlite3.Row  # Para acessar colunas por nome
             self.logger.info("Conexão SQLite estabelecida")
+            self._init_golden_set_index()
         else:
             self.logger.warning(f"Base SQLite não encontrada em {self.sqlite_path}")
 
+    def _init_golden_set_index(self):
+        """Cria/atualiza o índice FTS5 do Golden Set na base SQLite."""
+        exists = self.sqlite_conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='golden_set'"
+        ).fetchone()
+        if not exists:
+            return
+
+        try:
+            GOLDEN_SET_INDEX.setup(self.sqlite_conn)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Índice FTS5 do Golden Set indisponível: {str(e)}")
+
     async def _init_embeddings(self):
         """Inicializa modelo de embeddings."""
         try:
@@ -131,7 +148,18 @@ class RetrievalTools:
     # Métodos de busca NCM
 
     async def search_by_gtin(self, gtin: str) -> Optional[Dict[str, Any]]:
-        """Busca produto por GTIN em exemplos conhecidos."""
+        """Busca produto por GTIN: índice compacto primeiro, SQLite como fallback."""
+        match = self._get_gtin_index().lookup(gtin)
+        if match:
+            return {
+                "gtin": match.gtin,
+                "descricao": None,
+                "ncm": match.ncm,
+                "cest": match.cest,
+                "fonte": match.source,
+                "confianca": match.confidence,
+            }
+
         if not self.sqlite_conn:
             return None
 
@@ -155,6 +183,15 @@ class RetrievalTools:
 
         return None
 
+    def _get_gtin_index(self):
+        if self.gtin_index is None:
+            from .gtin_index import DEFAULT_INDEX_PATH, get_gtin_index
+
+            self.gtin_index = get_gtin_index(
+                self.config.get("gtin_index", {}).get("path", DEFAULT_INDEX_PATH)
+            )
+        return self.gtin_index
+
     async def get_ncm_info(self, ncm: str) -> Optional[Dict[str, Any]]:
         """Busca informações de um NCM específico."""
         if not self.sqlite_conn:
@@ -506,8 +543,19 @@ class RetrievalTools:
         self, description: str, top_k: int = 5
     ) -> List[Dict[str, Any]]:
         """Busca semântica por produtos similares."""
-        if not self.embeddings_model or not self.sqlite_conn:
-            return []
+        results = await self.semantic_search_products_batch([description], top_k)
+        return results[0]
+
+    async def semantic_search_products_batch(
+        self, descriptions: List[str], top_k: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Busca semântica para várias descrições: as consultas são codificadas
+        em uma única chamada ao modelo e comparadas com a base de uma vez.
+        """
+        empty = [[] for _ in descriptions]
+        if not descriptions or not self.embeddings_model or not self.sqlite_conn:
+            return empty
 
         try:
             # Buscar produtos na base
@@ -523,38 +571,40 @@ class RetrievalTools:
 
             products = cursor.fetchall()
             if not products:
-                return []
+                return empty
 
-            # Gerar embeddings
-            descriptions = [p[0] for p in products]
-            query_embedding = self.embeddings_model.encode([description])
-            doc_embeddings = self.embeddings_model.encode(descriptions)
+            # Gerar embeddings (consultas em lote)
+            doc_descriptions = [p[0] for p in products]
+            query_embeddings = self.embeddings_model.encode(list(descriptions))
+            doc_embeddings = self.embeddings_model.encode(doc_descriptions)
 
-            # Calcular similaridades
+            # Calcular similaridades (consultas x documentos)
             from sklearn.metrics.pairwise import cosine_similarity
 
-            similarities = cosine_similarity(query_embedding, doc_embeddings)[0]
-
-            # Ordenar por similaridade
-            ranked_indices = similarities.argsort()[::-1][:top_k]
+            similarity_matrix = cosine_similarity(query_embeddings, doc_embeddings)
 
             results = []
-            for idx in ranked_indices:
-                if similarities[idx] > 0.3:  # Threshold mínimo
-                    results.append(
+            for similarities in similarity_matrix:
+                # Ordenar por similaridade
+                ranked_indices = similarities.argsort()[::-1][:top_k]
+                results.append(
+                    [
                         {
                             "descricao": products[idx][0],
                             "ncm": products[idx][1],
                             "cest": products[idx][2],
                             "score": float(similarities[idx]),
                         }
-                    )
+                        for idx in ranked_indices
+                        if similarities[idx] > 0.3  # Threshold mínimo
+                    ]
+                )
 
             return results
 
         except Exception as e:
             self.logger.error(f"Erro na busca semântica: {str(e)}")
-            return []
+            return empty
 
     async def semantic_search_cest(
         self, description: str, estado: str = "RO", top_k: int = 5
@@ -616,35 +666,26 @@ class RetrievalTools:
             if not cursor.fetchone():
                 return []
 
-            keywords = self._extract_keywords(description)
-
-            query = f"""
-                SELECT descricao_produto, descricao_enriquecida, gtin,
-                       ncm_correto, cest_correto, fonte_usuario
-                FROM golden_set
-                WHERE {' OR '.join(['descricao_produto LIKE ?' for _ in keywords])}
-                   OR {' OR '.join(['descricao_enriquecida LIKE ?' for _ in keywords])}
-                LIMIT ?
-            """
-
-            params = [f"%{keyword}%" for keyword in keywords] * 2 + [top_k]
-            cursor.execute(query, params)
-
-            results = []
-            for row in cursor.fetchall():
-                results.append(
-                    {
-                        "descricao_original": row[0],
-                        "descricao_enriquecida": row[1],
-                        "gtin": row[2],
-                        "ncm": row[3],
-                        "cest": row[4],
-                        "fonte": row[5],
-                        "score": 0.8,  # Score alto para Golden Set
-                    }
-                )
+            # Ranking no banco (FTS5 quando o índice existe; LIKE caso contrário)
+            rows = GOLDEN_SET_INDEX.search(
+                self.sqlite_conn,
+                description,
+                limit=top_k,
+                columns=["gtin", "ncm_correto", "cest_correto", "fonte_usuario"],
+            )
 
-            return results
+            return [
+                {
+                    "descricao_original": row["descricao_produto"],
+                    "descricao_enriquecida": row["descricao_enriquecida"],
+                    "gtin": row["gtin"],
+                    "ncm": row["ncm_correto"],
+                    "cest": row["cest_correto"],
+                    "fonte": row["fonte_usuario"],
+                    "score": row["score"],
+                }
+                for row in rows
+            ]
 
         except Exception as e:
             self.logger.error(f"Erro na busca no Golden Set: {str(e)}")
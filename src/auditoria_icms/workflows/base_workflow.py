@@ -4,14 +4,25 @@ Define estrutura base para workflows LangGraph no sistema de classificação NCM
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, TypedDict, Literal
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    TypedDict,
+    Union,
+)
 from dataclasses import dataclass
 from datetime import datetime
+import asyncio
+import inspect
 import logging
 
 try:
     from langgraph.graph import StateGraph, END, START
-    from langchain.schema import BaseMessage
 
     LANGGRAPH_AVAILABLE = True
 except ImportError:
@@ -20,6 +31,10 @@ except ImportError:
     StateGraph = None
     END = "END"
     START = "START"
+
+try:
+    from langchain.schema import BaseMessage
+except ImportError:
     BaseMessage = object
 
 logger = logging.getLogger(__name__)
@@ -116,6 +131,10 @@ class WorkflowConfig:
     context_window_size: int = 2000
     require_human_validation_threshold: float = 0.8
 
+    # Resolução exata por GTIN antes dos workflows de agentes
+    gtin_fast_path: bool = True
+    gtin_min_confidence: float = 0.9
+
 
 class BaseWorkflow(ABC):
     """
@@ -123,6 +142,9 @@ class BaseWorkflow(ABC):
     Implementa a estrutura comum para todos os workflows LangGraph.
     """
 
+    # Estágios do fluxo linear, na ordem do grafo (nó `_<estágio>_node`)
+    STAGES: Tuple[str, ...] = ()
+
     def __init__(
         self, name: str, config: WorkflowConfig, agents: Dict[str, Any], logger=None
     ):
@@ -131,6 +153,7 @@ class BaseWorkflow(ABC):
         self.agents = agents
         self.logger = logger
         self.graph = None
+        self.batch_hooks: Dict[str, List[Callable]] = {}
 
         # Construir o grafo do workflow
         self._build_graph()
@@ -145,6 +168,100 @@ class BaseWorkflow(ABC):
         """Inicializa o estado do workflow."""
         pass
 
+    def stage_node(self, stage: str) -> Callable:
+        """Função do nó correspondente ao estágio"""
+        return getattr(self, f"_{stage}_node")
+
+    def _build_linear_graph(self):
+        """Compila o grafo encadeando `STAGES` na ordem declarada"""
+        graph = StateGraph(dict)
+
+        for stage in self.STAGES:
+            graph.add_node(stage, self.stage_node(stage))
+
+        graph.set_entry_point(self.STAGES[0])
+        for origem, destino in zip(self.STAGES, self.STAGES[1:]):
+            graph.add_edge(origem, destino)
+        graph.add_edge(self.STAGES[-1], END)
+
+        return graph
+
+    def register_batch_hook(self, stage: str, hook: Callable):
+        """
+        Registra um gancho chamado uma vez por estágio com todos os estados do
+        lote, antes do nó (ex.: embeddings de N descrições em uma só chamada).
+        Aceita funções síncronas ou corrotinas.
+        """
+        if stage not in self.STAGES:
+            raise ValueError(f"Estágio desconhecido em {self.name}: {stage}")
+        self.batch_hooks.setdefault(stage, []).append(hook)
+
+    async def run_stage(
+        self, stage: str, states: List[Dict[str, Any]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Executa um estágio para todos os estados do lote.
+
+        Exceções de um produto não interrompem os demais: são devolvidas na
+        posição do estado, como em `asyncio.gather(return_exceptions=True)`.
+        """
+        for hook in self.batch_hooks.get(stage, []):
+            # Ganchos só antecipam trabalho: falha não interrompe o estágio
+            try:
+                retorno = hook(states)
+                if inspect.isawaitable(retorno):
+                    await retorno
+            except Exception as e:
+                logger.warning(f"⚠️ Gancho de lote em {self.name}.{stage}: {e}")
+
+        node = self.stage_node(stage)
+        if inspect.iscoroutinefunction(node):
+            return await asyncio.gather(
+                *(node(state) for state in states), return_exceptions=True
+            )
+
+        # Nós síncronos: um único salto de thread por estágio
+        return await asyncio.to_thread(
+            lambda: [self._call_node(node, state) for state in states]
+        )
+
+    @staticmethod
+    def _call_node(node: Callable, state: Dict[str, Any]):
+        try:
+            return node(state)
+        except Exception as e:
+            return e
+
+    @staticmethod
+    def _semantic_candidates(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Candidatos NCM a partir dos produtos semelhantes pré-buscados para o
+        lote (`state["semantic_matches"]`), ordenados pela similaridade somada
+        """
+        scores: Dict[str, float] = {}
+        best: Dict[str, float] = {}
+        for match in state.get("semantic_matches") or []:
+            ncm = "".join(ch for ch in str(match.get("ncm") or "") if ch.isdigit())
+            if len(ncm) != 8:
+                continue
+            score = float(match.get("score", 0.0))
+            scores[ncm] = scores.get(ncm, 0.0) + score
+            best[ncm] = max(best.get(ncm, 0.0), score)
+
+        total = sum(scores.values())
+        if not total:
+            return []
+
+        return [
+            {
+                "ncm": ncm,
+                # Participação no total ponderada pela melhor similaridade
+                "confidence": round(score / total * best[ncm], 4),
+                "justificativa": f"Produtos semelhantes (similaridade {best[ncm]:.2f})",
+            }
+            for ncm, score in sorted(scores.items(), key=lambda item: -item[1])
+        ]
+
     async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Executa o workflow completo.
@@ -4,7 +4,6 @@ Fluxo para confirmar classificações NCM/CEST já existentes
 """
 
 from typing import Dict, Any, List
-from langgraph.graph import StateGraph, END
 from datetime import datetime
 
 from .base_workflow import BaseWorkflow, WorkflowConfig
@@ -21,6 +20,14 @@ class ConfirmationFlow(BaseWorkflow):
     4. Reconciliação final
     """
 
+    STAGES = (
+        "enrichment",
+        "ncm_validation",
+        "cest_validation",
+        "reconciliation",
+        "completion",
+    )
+
     def __init__(self, config: WorkflowConfig):
         # Chamar o constructor da classe base
         super().__init__(
@@ -48,23 +55,8 @@ class ConfirmationFlow(BaseWorkflow):
     def build_graph(self):
         """Constrói o grafo de confirmação"""
 
-        # Criação do StateGraph
-        graph = StateGraph(dict)
-
-        # Adição dos nós
-        graph.add_node("enrichment", self._enrichment_node)
-        graph.add_node("ncm_validation", self._ncm_validation_node)
-        graph.add_node("cest_validation", self._cest_validation_node)
-        graph.add_node("reconciliation", self._reconciliation_node)
-        graph.add_node("completion", self._completion_node)
-
-        # Fluxo linear simplificado para primeiro teste
-        graph.set_entry_point("enrichment")
-        graph.add_edge("enrichment", "ncm_validation")
-        graph.add_edge("ncm_validation", "cest_validation")
-        graph.add_edge("cest_validation", "reconciliation")
-        graph.add_edge("reconciliation", "completion")
-        graph.add_edge("completion", END)
+        # Fluxo linear simplificado (mesma ordem da execução em estágios)
+        graph = self._build_linear_graph()
 
         return graph.compile()
 
@@ -118,6 +110,19 @@ class ConfirmationFlow(BaseWorkflow):
                 "justificativa": "NCM validado com sucesso (mock)",
             }
 
+            # Produtos semelhantes pré-buscados no lote: NCM informado sem
+            # respaldo entre eles reduz a confiança da validação
+            semantic = self._semantic_candidates(state)
+            if semantic:
+                ncm = "".join(ch for ch in str(ncm_informado) if ch.isdigit())
+                support = sum(c["confidence"] for c in semantic if c["ncm"] == ncm)
+                validation_result["semantic_support"] = support
+                if not support:
+                    validation_result["confidence"] = min(
+                        validation_result["confidence"], semantic[0]["confidence"]
+                    )
+                    validation_result["ncm_alternativo"] = semantic[0]["ncm"]
+
             state["ncm_validation_result"] = validation_result
 
             self._log_step(
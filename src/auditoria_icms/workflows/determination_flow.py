@@ -4,7 +4,7 @@ Fluxo para determinar classificações NCM/CEST quando não existem ou são inad
 """
 
 from typing import Dict, Any, List
-from langgraph.graph import StateGraph, END
+from langgraph.graph import END
 from datetime import datetime
 
 from .base_workflow import BaseWorkflow, WorkflowConfig
@@ -21,6 +21,15 @@ class DeterminationFlow(BaseWorkflow):
     4. Reconciliação final
     """
 
+    STAGES = (
+        "enrichment",
+        "ncm_determination",
+        "ncm_refinement",
+        "cest_determination",
+        "reconciliation",
+        "completion",
+    )
+
     def __init__(self, config: WorkflowConfig):
         # Chamar o constructor da classe base
         super().__init__(
@@ -48,30 +57,11 @@ class DeterminationFlow(BaseWorkflow):
     def build_graph(self):
         """Constrói o grafo de determinação"""
 
-        # Criação do StateGraph
-        graph = StateGraph(dict)
+        # Fluxo linear simplificado (mesma ordem da execução em estágios)
+        graph = self._build_linear_graph()
 
-        # Adição dos nós
-        graph.add_node("enrichment", self._enrichment_node)
-        graph.add_node("ncm_determination", self._ncm_determination_node)
-        graph.add_node("ncm_refinement", self._ncm_refinement_node)
-        graph.add_node("cest_determination", self._cest_determination_node)
-        graph.add_node("reconciliation", self._reconciliation_node)
         graph.add_node("manual_review", self._manual_review_node)
-        graph.add_node("completion", self._completion_node)
-
-        # Definição das arestas - fluxo linear simplificado
-        graph.set_entry_point("enrichment")
-
-        graph.add_edge("enrichment", "ncm_determination")
-        graph.add_edge("ncm_determination", "ncm_refinement")
-        graph.add_edge("ncm_refinement", "cest_determination")
-        graph.add_edge("cest_determination", "reconciliation")
-        graph.add_edge("reconciliation", "completion")
-        graph.add_edge("completion", END)
-
         graph.add_edge("manual_review", END)
-        graph.add_edge("completion", END)
 
         return graph.compile()
 
@@ -143,6 +133,22 @@ class DeterminationFlow(BaseWorkflow):
                 ],
             }
 
+            # Produtos semelhantes pré-buscados no lote têm precedência
+            semantic = self._semantic_candidates(state)
+            if semantic:
+                known = {candidate["ncm"] for candidate in semantic}
+                determination_result["candidates"] = semantic + [
+                    candidate
+                    for candidate in determination_result["candidates"]
+                    if candidate["ncm"] not in known
+                ]
+                determination_result.update(
+                    ncm_sugerido=semantic[0]["ncm"],
+                    confidence=semantic[0]["confidence"],
+                    justificativa=semantic[0]["justificativa"],
+                )
+                state["similar_products"] = state["semantic_matches"]
+
             state["ncm_determination_result"] = determination_result
             state["ncm_candidates"] = determination_result.get("candidates", [])
 
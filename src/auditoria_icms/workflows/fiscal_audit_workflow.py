@@ -5,8 +5,16 @@ Implementa grafo de estados para processamento multi-tenant de produtos
 
 from typing import Dict, Any, List, Optional, TypedDict
 from datetime import datetime
+import asyncio
 import logging
+import sqlite3
+import threading
+import uuid
+import weakref
+from collections import deque
+from dataclasses import dataclass
 from enum import Enum
+from pathlib import Path
 
 try:
     from langgraph.graph import StateGraph, END
@@ -22,6 +30,7 @@ from ..agents.enrichment_agent import EnrichmentAgent
 from ..agents.ncm_agent import NCMAgent
 from ..agents.cest_agent import CESTAgent
 from ..agents.reconciliation_agent import ReconciliationAgent
+from ..core.config import get_workflow_config
 from ..database.models import ProdutoEmpresa
 
 logger = logging.getLogger(__name__)
@@ -31,6 +40,7 @@ class ProcessingState(str, Enum):
     """Estados do workflow de processamento"""
 
     PENDENTE = "pendente"
+    GTIN_RESOLVIDO = "gtin_resolvido"
     ENRIQUECENDO = "enriquecendo"
     ENRIQUECIDO = "enriquecido"
     CLASSIFICANDO_NCM = "classificando_ncm"
@@ -64,9 +74,200 @@ class WorkflowState(TypedDict):
     auto_approve_threshold: float
 
 
+class CheckpointPruner:
+    """
+    Mantém apenas os checkpoints das últimas `max_threads` execuções;
+    as mais antigas são removidas do saver (memória ou SQLite).
+    """
+
+    def __init__(self, saver, max_threads: int = 256):
+        self.saver = saver
+        self.max_threads = max(0, max_threads)
+        self.pruned = 0
+        self._threads: deque = deque()
+        self._lock = threading.Lock()
+
+    def release(self, thread_id: str) -> None:
+        """Registra uma execução concluída e poda as excedentes."""
+        with self._lock:
+            self._threads.append(thread_id)
+            expired = [
+                self._threads.popleft()
+                for _ in range(len(self._threads) - self.max_threads)
+            ]
+        for expired_id in expired:
+            try:
+                self.saver.delete_thread(expired_id)
+                self.pruned += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao podar checkpoint {expired_id}: {e}")
+
+
+@dataclass
+class CompiledWorkflow:
+    """Grafo compilado e compartilhado pelo processo"""
+
+    graph: Any
+    pruner: Optional[CheckpointPruner]
+    # SqliteSaver só implementa a API síncrona
+    async_checkpoints: bool = True
+
+
+# Instâncias ativas, resolvidas pelos nós a partir do config da execução
+_workflow_instances: "weakref.WeakValueDictionary[str, FiscalAuditWorkflow]" = (
+    weakref.WeakValueDictionary()
+)
+_compiled: Optional[CompiledWorkflow] = None
+_compile_lock = threading.Lock()
+
+
+def _checkpoint_serde():
+    """Serializador com fallback para pickle (o estado contém o ProdutoEmpresa)."""
+    try:
+        from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+        return JsonPlusSerializer(pickle_fallback=True)
+    except (ImportError, TypeError):
+        return None
+
+
+def _create_checkpoint_saver():
+    """Saver configurado em `workflow.checkpointer` (memory, sqlite ou none)."""
+    config = get_workflow_config()
+    kind = getattr(config, "checkpointer", "memory").lower()
+
+    if kind == "none":
+        return None
+
+    serde = _checkpoint_serde()
+
+    if kind == "sqlite":
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+
+            path = Path(config.checkpoint_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            return SqliteSaver(conn, serde=serde)
+        except ImportError:
+            logger.warning(
+                "langgraph-checkpoint-sqlite não instalado; "
+                "usando checkpoints em memória"
+            )
+
+    return MemorySaver(serde=serde)
+
+
+def _delegate(method: str):
+    """Nó/roteador que delega ao FiscalAuditWorkflow da execução."""
+
+    def call(state: WorkflowState, config):
+        key = config["configurable"]["fiscal_workflow"]
+        return getattr(_workflow_instances[key], method)(state)
+
+    call.__name__ = method
+    return call
+
+
+def _build_workflow_graph() -> "StateGraph":
+    """Define o grafo do workflow (independente de instância)"""
+
+    # Define o grafo
+    workflow = StateGraph(WorkflowState)
+
+    # Adiciona nós do workflow
+    workflow.add_node("gtin", _delegate("_node_gtin"))
+    workflow.add_node("enriquecimento", _delegate("_node_enriquecimento"))
+    workflow.add_node("classificacao_ncm", _delegate("_node_classificacao_ncm"))
+    workflow.add_node("classificacao_cest", _delegate("_node_classificacao_cest"))
+    workflow.add_node("reconciliacao", _delegate("_node_reconciliacao"))
+    workflow.add_node("finalizacao", _delegate("_node_finalizacao"))
+    workflow.add_node("tratamento_erro", _delegate("_node_tratamento_erro"))
+
+    # Define ponto de entrada: GTIN com correspondência exata dispensa agentes
+    workflow.set_entry_point("gtin")
+
+    # Define transições condicionais
+    workflow.add_conditional_edges(
+        "gtin",
+        _delegate("_decide_after_gtin"),
+        {"enriquecimento": "enriquecimento", "finalizacao": "finalizacao"},
+    )
+
+    workflow.add_conditional_edges(
+        "enriquecimento",
+        _delegate("_decide_after_enrichment"),
+        {"ncm": "classificacao_ncm", "erro": "tratamento_erro"},
+    )
+
+    workflow.add_conditional_edges(
+        "classificacao_ncm",
+        _delegate("_decide_after_ncm"),
+        {
+            "cest": "classificacao_cest",
+            "revisao": "finalizacao",
+            "erro": "tratamento_erro",
+        },
+    )
+
+    workflow.add_conditional_edges(
+        "classificacao_cest",
+        _delegate("_decide_after_cest"),
+        {
+            "reconciliacao": "reconciliacao",
+            "finalizacao": "finalizacao",
+            "erro": "tratamento_erro",
+        },
+    )
+
+    workflow.add_conditional_edges(
+        "reconciliacao",
+        _delegate("_decide_after_reconciliation"),
+        {
+            "finalizacao": "finalizacao",
+            "revisao": "finalizacao",
+            "erro": "tratamento_erro",
+        },
+    )
+
+    # Nós finais
+    workflow.add_edge("finalizacao", END)
+    workflow.add_edge("tratamento_erro", END)
+
+    return workflow
+
+
+def get_compiled_workflow() -> Optional[CompiledWorkflow]:
+    """Compila o grafo uma única vez por processo (None sem LangGraph)."""
+    global _compiled
+    if not LANGGRAPH_AVAILABLE:
+        return None
+
+    if _compiled is None:
+        with _compile_lock:
+            if _compiled is None:
+                saver = _create_checkpoint_saver()
+                pruner = None
+                if saver is not None:
+                    pruner = CheckpointPruner(
+                        saver, get_workflow_config().max_checkpoint_threads
+                    )
+                _compiled = CompiledWorkflow(
+                    graph=_build_workflow_graph().compile(checkpointer=saver),
+                    pruner=pruner,
+                    async_checkpoints=type(saver).__name__ != "SqliteSaver",
+                )
+                logger.info("✅ Grafo do workflow fiscal compilado")
+    return _compiled
+
+
 class FiscalAuditWorkflow:
     """
     Orquestrador de workflow para auditoria fiscal usando LangGraph
+
+    O grafo é compilado uma vez por processo e compartilhado entre as
+    instâncias; cada execução identifica a instância pelo config.
     """
 
     def __init__(self, empresa_id: int, config: Optional[Dict[str, Any]] = None):
@@ -86,7 +287,10 @@ class FiscalAuditWorkflow:
                 "enable_cest_classification", True
             ),
             "enable_reconciliation": self.config.get("enable_reconciliation", True),
+            "gtin_fast_path": self.config.get("gtin_fast_path", True),
+            "gtin_min_confidence": self.config.get("gtin_min_confidence", 0.9),
         }
+        self._gtin_index = None
 
         # Inicializa agentes
         self.agents = {
@@ -96,74 +300,16 @@ class FiscalAuditWorkflow:
             "reconciliation": ReconciliationAgent(config=config),
         }
 
-        # Cria o grafo do workflow
-        if LANGGRAPH_AVAILABLE:
-            self.workflow = self._create_langgraph_workflow()
+        # Grafo compartilhado do processo
+        self._key = f"{empresa_id}:{uuid.uuid4().hex}"
+        _workflow_instances[self._key] = self
+        self._compiled = get_compiled_workflow()
+        if self._compiled is not None:
+            self.workflow = self._compiled.graph
         else:
             self.workflow = None
             logger.info("Usando implementação alternativa sem LangGraph")
 
-    def _create_langgraph_workflow(self) -> StateGraph:
-        """Cria o grafo do workflow usando LangGraph"""
-
-        # Define o grafo
-        workflow = StateGraph(WorkflowState)
-
-        # Adiciona nós do workflow
-        workflow.add_node("enriquecimento", self._node_enriquecimento)
-        workflow.add_node("classificacao_ncm", self._node_classificacao_ncm)
-        workflow.add_node("classificacao_cest", self._node_classificacao_cest)
-        workflow.add_node("reconciliacao", self._node_reconciliacao)
-        workflow.add_node("finalizacao", self._node_finalizacao)
-        workflow.add_node("tratamento_erro", self._node_tratamento_erro)
-
-        # Define ponto de entrada
-        workflow.set_entry_point("enriquecimento")
-
-        # Define transições condicionais
-        workflow.add_conditional_edges(
-            "enriquecimento",
-            self._decide_after_enrichment,
-            {"ncm": "classificacao_ncm", "erro": "tratamento_erro"},
-        )
-
-        workflow.add_conditional_edges(
-            "classificacao_ncm",
-            self._decide_after_ncm,
-            {
-                "cest": "classificacao_cest",
-                "revisao": "finalizacao",
-                "erro": "tratamento_erro",
-            },
-        )
-
-        workflow.add_conditional_edges(
-            "classificacao_cest",
-            self._decide_after_cest,
-            {
-                "reconciliacao": "reconciliacao",
-                "finalizacao": "finalizacao",
-                "erro": "tratamento_erro",
-            },
-        )
-
-        workflow.add_conditional_edges(
-            "reconciliacao",
-            self._decide_after_reconciliation,
-            {
-                "finalizacao": "finalizacao",
-                "revisao": "finalizacao",
-                "erro": "tratamento_erro",
-            },
-        )
-
-        # Nós finais
-        workflow.add_edge("finalizacao", END)
-        workflow.add_edge("tratamento_erro", END)
-
-        # Compila o workflow
-        return workflow.compile(checkpointer=MemorySaver())
-
     def processar_produto(self, produto: ProdutoEmpresa) -> Dict[str, Any]:
         """
         Processa um produto através do workflow completo
@@ -184,26 +330,116 @@ class FiscalAuditWorkflow:
                 return self._processar_alternativo(produto)
 
         except Exception as e:
-            logger.error(
-                f"Erro no processamento do produto {produto.produto_id}: {str(e)}"
-            )
+            return self._resultado_erro(produto, e, inicio)
 
-            fim = datetime.utcnow()
-            tempo_execucao = (fim - inicio).total_seconds()
+    async def aprocessar_produto(self, produto: ProdutoEmpresa) -> Dict[str, Any]:
+        """Versão assíncrona de `processar_produto` (ainvoke no grafo)"""
+        inicio = datetime.utcnow()
 
-            return {
-                "produto_id": produto.produto_id,
-                "status": "erro",
-                "erro_detalhes": str(e),
-                "tempo_execucao": tempo_execucao,
-                "timestamp": fim.isoformat(),
+        if not (LANGGRAPH_AVAILABLE and self.workflow):
+            return await asyncio.to_thread(self.processar_produto, produto)
+
+        config = self._config_execucao(produto)
+        try:
+            if self._compiled.async_checkpoints:
+                result = await self.workflow.ainvoke(
+                    self._estado_inicial(produto), config
+                )
+            else:
+                result = await asyncio.to_thread(
+                    self.workflow.invoke, self._estado_inicial(produto), config
+                )
+            return self._converter_resultado_langgraph(result)
+        except Exception as e:
+            return self._resultado_erro(produto, e, inicio)
+        finally:
+            self._liberar_checkpoints(config)
+
+    async def aprocessar_lote(
+        self, produtos: List[ProdutoEmpresa], max_concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Processa vários produtos no grafo compartilhado (abatch), com no
+        máximo `max_concurrency` execuções simultâneas
+        """
+        if not produtos:
+            return []
+
+        inicio = datetime.utcnow()
+        max_concurrency = max_concurrency or self.config.get("max_concurrency", 10)
+
+        if not (LANGGRAPH_AVAILABLE and self.workflow):
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def processar(produto):
+                async with semaphore:
+                    return await asyncio.to_thread(self.processar_produto, produto)
+
+            return list(await asyncio.gather(*(processar(p) for p in produtos)))
+
+        states = [self._estado_inicial(produto) for produto in produtos]
+        configs = [
+            {**self._config_execucao(produto), "max_concurrency": max_concurrency}
+            for produto in produtos
+        ]
+        try:
+            if self._compiled.async_checkpoints:
+                results = await self.workflow.abatch(
+                    states, configs, return_exceptions=True
+                )
+            else:
+                results = await asyncio.to_thread(
+                    self.workflow.batch, states, configs, return_exceptions=True
+                )
+        finally:
+            for config in configs:
+                self._liberar_checkpoints(config)
+
+        return [
+            (
+                self._resultado_erro(produto, result, inicio)
+                if isinstance(result, Exception)
+                else self._converter_resultado_langgraph(result)
+            )
+            for produto, result in zip(produtos, results)
+        ]
+
+    def _config_execucao(self, produto: ProdutoEmpresa) -> Dict[str, Any]:
+        """Config da execução: thread de checkpoint própria e a instância"""
+        return {
+            "configurable": {
+                "thread_id": (
+                    f"{self._key}:{produto.produto_id}:{uuid.uuid4().hex[:8]}"
+                ),
+                "fiscal_workflow": self._key,
             }
+        }
 
-    def _processar_com_langgraph(self, produto: ProdutoEmpresa) -> Dict[str, Any]:
-        """Processa produto usando LangGraph"""
+    def _liberar_checkpoints(self, config: Dict[str, Any]) -> None:
+        if self._compiled is not None and self._compiled.pruner is not None:
+            self._compiled.pruner.release(config["configurable"]["thread_id"])
+
+    def _resultado_erro(
+        self, produto: ProdutoEmpresa, erro: Exception, inicio: datetime
+    ) -> Dict[str, Any]:
+        logger.error(
+            f"Erro no processamento do produto {produto.produto_id}: {str(erro)}"
+        )
+
+        fim = datetime.utcnow()
+        tempo_execucao = (fim - inicio).total_seconds()
 
-        # Estado inicial
-        initial_state = WorkflowState(
+        return {
+            "produto_id": produto.produto_id,
+            "status": "erro",
+            "erro_detalhes": str(erro),
+            "tempo_execucao": tempo_execucao,
+            "timestamp": fim.isoformat(),
+        }
+
+    def _estado_inicial(self, produto: ProdutoEmpresa) -> WorkflowState:
+        """Estado inicial do grafo para um produto"""
+        return WorkflowState(
             produto=produto,
             empresa_id=self.empresa_id,
             estado_atual=ProcessingState.PENDENTE.value,
@@ -221,8 +457,15 @@ class FiscalAuditWorkflow:
             auto_approve_threshold=self.workflow_config["auto_approve_threshold"],
         )
 
+    def _processar_com_langgraph(self, produto: ProdutoEmpresa) -> Dict[str, Any]:
+        """Processa produto usando LangGraph"""
+
         # Executa o workflow
-        result = self.workflow.invoke(initial_state)
+        config = self._config_execucao(produto)
+        try:
+            result = self.workflow.invoke(self._estado_inicial(produto), config)
+        finally:
+            self._liberar_checkpoints(config)
 
         # Converte resultado
         return self._converter_resultado_langgraph(result)
@@ -237,6 +480,28 @@ class FiscalAuditWorkflow:
             # Estado do produto
             produto_processado = produto
 
+            # Etapa 0: GTIN com correspondência exata dispensa os agentes
+            resultado_gtin = self._executar_gtin(produto_processado)
+            if resultado_gtin is not None:
+                logs_processamento.append(resultado_gtin)
+                gtin = resultado_gtin["resultado"]
+                produto_processado.ncm_sugerido = gtin["ncm"]
+                produto_processado.cest_sugerido = gtin["cest"]
+                produto_processado.confianca_ncm = gtin["confianca"]
+                produto_processado.justificativa_ncm = gtin["justificativa"]
+
+                fim = datetime.utcnow()
+                return {
+                    "produto_id": produto.produto_id,
+                    "status": "sucesso",
+                    "produto_processado": produto_processado,
+                    "requer_revisao": gtin["ncm_informado_divergente"],
+                    "confianca_media": gtin["confianca"],
+                    "logs_processamento": logs_processamento,
+                    "tempo_execucao": (fim - inicio).total_seconds(),
+                    "timestamp": fim.isoformat(),
+                }
+
             # Etapa 1: Enriquecimento
             if self.workflow_config["enable_enrichment"]:
                 resultado_enrich = self._executar_enriquecimento(produto_processado)
@@ -317,6 +582,33 @@ class FiscalAuditWorkflow:
             }
 
     # Nós do LangGraph
+    def _node_gtin(self, state: WorkflowState) -> WorkflowState:
+        """Nó de resolução exata por GTIN (antes do enriquecimento)"""
+
+        try:
+            resultado = self._executar_gtin(state["produto"])
+        except Exception as e:
+            # Índice indisponível não impede o fluxo normal dos agentes
+            logger.warning(f"⚠️ Consulta ao índice GTIN falhou: {e}")
+            return state
+
+        if resultado is None:
+            return state
+
+        gtin = resultado["resultado"]
+        state["ncm_sugerido"] = gtin["ncm"]
+        state["cest_sugerido"] = gtin["cest"]
+        state["confianca_ncm"] = gtin["confianca"]
+        state["confianca_cest"] = gtin["confianca"] if gtin["cest"] else None
+        state["justificativa_ncm"] = gtin["justificativa"]
+        state["justificativa_cest"] = gtin["justificativa"] if gtin["cest"] else None
+        # NCM declarado contradiz o índice: decide pelo GTIN, mas revisa
+        state["requer_revisao"] = gtin["ncm_informado_divergente"]
+        state["estado_atual"] = ProcessingState.GTIN_RESOLVIDO.value
+        state["logs_processamento"].append(resultado)
+
+        return state
+
     def _node_enriquecimento(self, state: WorkflowState) -> WorkflowState:
         """Nó de enriquecimento da descrição"""
 
@@ -469,6 +761,12 @@ class FiscalAuditWorkflow:
         return state
 
     # Funções de decisão para LangGraph
+    def _decide_after_gtin(self, state: WorkflowState) -> str:
+        """Decide próximo passo após a consulta ao índice GTIN"""
+        if state["estado_atual"] == ProcessingState.GTIN_RESOLVIDO.value:
+            return "finalizacao"
+        return "enriquecimento"
+
     def _decide_after_enrichment(self, state: WorkflowState) -> str:
         """Decide próximo passo após enriquecimento"""
         if state["estado_atual"] == ProcessingState.ERRO.value:
@@ -499,6 +797,51 @@ class FiscalAuditWorkflow:
             return "revisao"
         return "finalizacao"
 
+    @property
+    def gtin_index(self):
+        """Índice GTIN compartilhado (carregado na primeira consulta)"""
+        if self._gtin_index is None:
+            from ..tools.gtin_index import get_gtin_index
+
+            self._gtin_index = get_gtin_index()
+        return self._gtin_index
+
+    def _executar_gtin(self, produto: ProdutoEmpresa) -> Optional[Dict[str, Any]]:
+        """
+        Consulta o índice GTIN; None se o código estiver ausente, sem
+        correspondência ou abaixo da confiança mínima
+        """
+        gtin = getattr(produto, "codigo_barra", None)
+        if not gtin or not self.workflow_config["gtin_fast_path"]:
+            return None
+
+        match = self.gtin_index.lookup(gtin)
+        if (
+            match is None
+            or match.confidence < self.workflow_config["gtin_min_confidence"]
+        ):
+            return None
+
+        ncm_informado = "".join(
+            ch for ch in str(getattr(produto, "ncm", None) or "") if ch.isdigit()
+        )
+        return {
+            "etapa": "gtin",
+            "status": "sucesso",
+            "resultado": {
+                "ncm": match.ncm,
+                "cest": match.cest or None,
+                "confianca": match.confidence,
+                "justificativa": (
+                    f"GTIN {match.gtin} com correspondência exata ({match.source})"
+                ),
+                "fonte": match.source,
+                "ncm_informado_divergente": bool(ncm_informado)
+                and ncm_informado != match.ncm,
+            },
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+
     # Métodos de execução dos agentes (simulação)
     def _executar_enriquecimento(self, produto: ProdutoEmpresa) -> Dict[str, Any]:
         """Executa enriquecimento da descrição"""
@@ -3,16 +3,24 @@ Workflow Manager - Orquestrador Principal dos Workflows LangGraph
 Gerencia a seleção e execução dos workflows de confirmação e determinação
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Any, Callable, Dict, List, Optional, Union
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import asyncio
 from datetime import datetime
 
 from .base_workflow import WorkflowConfig
 from .confirmation_flow import ConfirmationFlow
 from .determination_flow import DeterminationFlow
+from ..core.batch_dedup import (
+    DedupGroup,
+    DedupReport,
+    dedup_key,
+    group_batch,
+    normalize_description,
+)
 from ..core.config import get_workflow_config
+from ..core.telemetry import StreamingStats
 
 
 class WorkflowType(Enum):
@@ -21,6 +29,11 @@ class WorkflowType(Enum):
     CONFIRMATION = "confirmation"
     DETERMINATION = "determination"
     HYBRID = "hybrid"
+    GTIN = "gtin"
+
+
+# Campos de entrada que podem conter o código de barras do produto
+GTIN_FIELDS = ("gtin", "codigo_barra", "codigo_barras")
 
 
 @dataclass
@@ -48,10 +61,23 @@ class WorkflowManager:
     - Consolidar resultados e métricas
     """
 
-    def __init__(self, config: Optional[WorkflowConfig] = None):
+    def __init__(
+        self,
+        config: Optional[WorkflowConfig] = None,
+        gtin_index=None,
+        retrieval_tools=None,
+    ):
         self.config = config or get_workflow_config()
         self.confirmation_flow = ConfirmationFlow(self.config)
         self.determination_flow = DeterminationFlow(self.config)
+        self._gtin_index = gtin_index
+        self.retrieval_tools = retrieval_tools
+        self.last_dedup_report: Optional[DedupReport] = None
+
+        # Busca semântica do bloco inteiro antes dos estágios de NCM
+        if retrieval_tools is not None:
+            for stage in ("ncm_validation", "ncm_determination"):
+                self.register_stage_hook(stage, self._prefetch_similar_products)
 
         # Estatísticas de execução
         self.execution_stats = {
@@ -59,10 +85,13 @@ class WorkflowManager:
             "confirmation_count": 0,
             "determination_count": 0,
             "hybrid_count": 0,
+            "gtin_count": 0,
             "manual_review_count": 0,
             "success_rate": 0.0,
             "average_confidence": 0.0,
         }
+        self.execution_time_stats = StreamingStats()
+        self.confidence_stats = StreamingStats()
 
     async def process_product(
         self,
@@ -84,6 +113,13 @@ class WorkflowManager:
         start_time = datetime.now()
 
         try:
+            # Resolução exata por GTIN antes de qualquer workflow
+            if not force_workflow:
+                gtin_result = self._resolve_by_gtin(produto_dados, start_time)
+                if gtin_result is not None:
+                    self._update_statistics(WorkflowType.GTIN, gtin_result)
+                    return gtin_result
+
             # Determinar tipo de workflow
             if force_workflow:
                 workflow_type = force_workflow
@@ -93,6 +129,11 @@ class WorkflowManager:
             # Preparar estado inicial
             initial_state = self._prepare_initial_state(produto_dados, empresa_id)
 
+            # Mesma busca semântica da execução em estágios (lote de um item):
+            # o modo de execução muda o custo, não o resultado
+            if self.retrieval_tools is not None:
+                await self._prefetch_similar_products([initial_state])
+
             # Executar workflow apropriado
             if workflow_type == WorkflowType.CONFIRMATION:
                 final_state = await self._execute_confirmation_workflow(initial_state)
@@ -117,15 +158,8 @@ class WorkflowManager:
         except Exception as e:
             execution_time = (datetime.now() - start_time).total_seconds()
 
-            return WorkflowResult(
-                workflow_type=force_workflow or WorkflowType.DETERMINATION,
-                status="ERROR",
-                final_result={},
-                confidence=0.0,
-                requires_review=True,
-                execution_time=execution_time,
-                audit_trail=[],
-                error=str(e),
+            return self._error_result(
+                e, execution_time, force_workflow or WorkflowType.DETERMINATION
             )
 
     async def process_batch(
@@ -133,6 +167,8 @@ class WorkflowManager:
         produtos_list: List[Dict[str, Any]],
         empresa_id: Optional[str] = None,
         max_concurrent: int = 5,
+        deduplicate: bool = False,
+        staged: Optional[bool] = None,
     ) -> List[WorkflowResult]:
         """
         Processa múltiplos produtos em lote com controle de concorrência
@@ -141,10 +177,35 @@ class WorkflowManager:
             produtos_list: Lista de produtos para classificar
             empresa_id: ID da empresa
             max_concurrent: Máximo de workflows concorrentes
+            deduplicate: Executa um workflow por grupo de produtos equivalentes
+                e replica o resultado (relatório em `last_dedup_report`)
+            staged: Executa o lote estágio a estágio em vez de um workflow
+                por produto (padrão: `config.staged_batch`)
 
         Returns:
-            Lista de resultados de workflow
+            Lista de resultados de workflow, na ordem de `produtos_list`
         """
+        if staged is None:
+            staged = getattr(self.config, "staged_batch", False)
+
+        if deduplicate:
+            groups, report = group_batch(
+                produtos_list,
+                self._dedup_key,
+                lambda produto: produto.get("id_agregados"),
+            )
+            self.last_dedup_report = report
+            results = await self.process_batch(
+                [produtos_list[group.representante] for group in groups],
+                empresa_id,
+                max_concurrent,
+                staged=staged,
+            )
+            return self._fan_out_results(produtos_list, groups, results)
+
+        if staged:
+            return await self._process_batch_staged(produtos_list, empresa_id)
+
         semaphore = asyncio.Semaphore(max_concurrent)
 
         async def process_single(produto_dados):
@@ -159,23 +220,311 @@ class WorkflowManager:
         processed_results = []
         for i, result in enumerate(results):
             if isinstance(result, Exception):
-                processed_results.append(
-                    WorkflowResult(
-                        workflow_type=WorkflowType.DETERMINATION,
-                        status="ERROR",
-                        final_result={},
-                        confidence=0.0,
-                        requires_review=True,
-                        execution_time=0.0,
-                        audit_trail=[],
-                        error=str(result),
-                    )
-                )
+                processed_results.append(self._error_result(result))
             else:
                 processed_results.append(result)
 
         return processed_results
 
+    async def _process_batch_staged(
+        self, produtos_list: List[Dict[str, Any]], empresa_id: Optional[str]
+    ) -> List[WorkflowResult]:
+        """
+        Executa o lote estágio a estágio, em blocos de `stage_batch_size`:
+        cada estágio roda para todos os produtos do bloco antes do próximo,
+        e os ganchos de lote (`register_stage_hook`) recebem o bloco inteiro.
+        Caminho por GTIN, escolha do workflow, fallback do híbrido e revisão
+        manual continuam decididos por produto.
+        """
+        size = max(1, getattr(self.config, "stage_batch_size", 64))
+
+        results = []
+        for start in range(0, len(produtos_list), size):
+            results.extend(
+                await self._process_block_staged(
+                    produtos_list[start : start + size], empresa_id
+                )
+            )
+        return results
+
+    async def _process_block_staged(
+        self, produtos: List[Dict[str, Any]], empresa_id: Optional[str]
+    ) -> List[WorkflowResult]:
+        """Processa um bloco do lote em estágios"""
+        start_time = datetime.now()
+        results: Dict[int, WorkflowResult] = {}
+        workflow_types: Dict[int, WorkflowType] = {}
+        states: Dict[int, Dict[str, Any]] = {}
+
+        for index, produto_dados in enumerate(produtos):
+            try:
+                gtin_result = self._resolve_by_gtin(produto_dados, start_time)
+                if gtin_result is not None:
+                    self._update_statistics(WorkflowType.GTIN, gtin_result)
+                    results[index] = gtin_result
+                    continue
+
+                workflow_types[index] = self._determine_workflow_type(produto_dados)
+                states[index] = self._prepare_initial_state(produto_dados, empresa_id)
+            except Exception as e:
+                results[index] = self._error_result(e)
+
+        # Confirmação: produtos CONFIRMATION e primeira tentativa dos HYBRID
+        confirmation_states: Dict[int, Dict[str, Any]] = {}
+        determination_states: Dict[int, Dict[str, Any]] = {}
+        for index, state in states.items():
+            workflow_type = workflow_types[index]
+            if workflow_type == WorkflowType.DETERMINATION:
+                determination_states[index] = state
+            elif workflow_type == WorkflowType.CONFIRMATION:
+                confirmation_states[index] = state
+            else:  # HYBRID: confirmação sobre uma cópia do estado
+                confirmation_states[index] = state.copy()
+
+        final_states = await self._run_flow_staged(
+            self.confirmation_flow, confirmation_states
+        )
+        for index, saida in list(final_states.items()):
+            if workflow_types[index] != WorkflowType.HYBRID:
+                continue
+
+            state = states[index]
+            if isinstance(saida, Exception):
+                state["hybrid_error"] = str(saida)
+            elif (
+                saida.get("status") == "CONFIRMADO"
+                and saida.get("final_confidence", 0.0)
+                >= self.config.confidence_threshold
+            ):
+                continue
+            else:
+                state["hybrid_confirmation_attempted"] = True
+                state["confirmation_result"] = saida.get("final_result", {})
+                if "semantic_matches" in saida:
+                    state["semantic_matches"] = saida["semantic_matches"]
+
+            del final_states[index]
+            determination_states[index] = state
+
+        determined = await self._run_flow_staged(
+            self.determination_flow, determination_states
+        )
+        for index, saida in determined.items():
+            if (
+                workflow_types[index] == WorkflowType.HYBRID
+                and not isinstance(saida, Exception)
+                and "hybrid_error" not in states[index]
+            ):
+                saida["workflow_type"] = "hybrid"
+            final_states[index] = saida
+
+        # Cada produto fica pronto quando o bloco termina
+        execution_time = (datetime.now() - start_time).total_seconds()
+        for index, saida in final_states.items():
+            if isinstance(saida, Exception):
+                results[index] = self._error_result(saida, execution_time)
+                continue
+
+            result = self._create_workflow_result(
+                workflow_types[index], saida, execution_time
+            )
+            self._update_statistics(workflow_types[index], result)
+            results[index] = result
+
+        return [results[index] for index in range(len(produtos))]
+
+    async def _run_flow_staged(
+        self, flow, states: Dict[int, Dict[str, Any]]
+    ) -> Dict[int, Union[Dict[str, Any], Exception]]:
+        """
+        Percorre os estágios do fluxo com todos os estados do bloco; um
+        produto que falha sai do bloco com a exceção no lugar do estado
+        """
+        active = dict(states)
+        failed: Dict[int, Exception] = {}
+
+        for stage in flow.STAGES:
+            if not active:
+                break
+
+            indices = list(active)
+            saidas = await flow.run_stage(stage, [active[index] for index in indices])
+            for index, saida in zip(indices, saidas):
+                if isinstance(saida, Exception):
+                    failed[index] = saida
+                    del active[index]
+                else:
+                    active[index] = saida
+
+        return {**active, **failed}
+
+    def register_stage_hook(self, stage: str, hook: Callable):
+        """
+        Registra um gancho de lote nos fluxos que possuem o estágio; só é
+        chamado na execução em estágios (`process_batch(staged=True)`)
+        """
+        flows = [
+            flow
+            for flow in (self.confirmation_flow, self.determination_flow)
+            if stage in flow.STAGES
+        ]
+        if not flows:
+            raise ValueError(f"Estágio desconhecido: {stage}")
+
+        for flow in flows:
+            flow.register_batch_hook(stage, hook)
+
+    async def _prefetch_similar_products(self, states: List[Dict[str, Any]]):
+        """
+        Busca semântica do bloco com uma única codificação das descrições;
+        o resultado fica em `state["semantic_matches"]`, lido pelos nós de NCM
+        """
+        # Híbridos já buscados na confirmação trazem os resultados no estado
+        pending = [state for state in states if "semantic_matches" not in state]
+        if not pending:
+            return
+
+        descricoes = [
+            state["produto_dados"].get("descricao_original") or "" for state in pending
+        ]
+        matches = await self.retrieval_tools.semantic_search_products_batch(descricoes)
+        for state, similares in zip(pending, matches):
+            state["semantic_matches"] = similares
+
+    def _error_result(
+        self,
+        error: Exception,
+        execution_time: float = 0.0,
+        workflow_type: WorkflowType = WorkflowType.DETERMINATION,
+    ) -> WorkflowResult:
+        """Resultado de erro que encaminha o produto para revisão"""
+        return WorkflowResult(
+            workflow_type=workflow_type,
+            status="ERROR",
+            final_result={},
+            confidence=0.0,
+            requires_review=True,
+            execution_time=execution_time,
+            audit_trail=[],
+            error=str(error),
+        )
+
+    def _dedup_key(self, produto_dados: Dict[str, Any]):
+        """
+        Descrição normalizada, GTIN, NCM/CEST informados, fabricante e o tipo
+        de workflow: produtos com a mesma chave seguem o mesmo caminho
+        """
+        gtin = next(
+            (produto_dados[field] for field in GTIN_FIELDS if produto_dados.get(field)),
+            None,
+        )
+        fabricante = produto_dados.get("fabricante") or produto_dados.get("laboratorio")
+        return dedup_key(
+            produto_dados.get("descricao_original"),
+            gtin,
+            produto_dados.get("ncm_informado"),
+            produto_dados.get("cest_informado"),
+        ) + (
+            normalize_description(fabricante),
+            self._determine_workflow_type(produto_dados).value,
+        )
+
+    def _fan_out_results(
+        self,
+        produtos_list: List[Dict[str, Any]],
+        groups: List[DedupGroup],
+        results: List[WorkflowResult],
+    ) -> List[WorkflowResult]:
+        """Replica o resultado de cada grupo para todos os seus produtos"""
+        by_index: Dict[int, WorkflowResult] = {}
+        for group, result in zip(groups, results):
+            by_index[group.representante] = result
+            representante = produtos_list[group.representante]
+
+            for index in group.membros:
+                produto = produtos_list[index]
+                entry = {
+                    "step": "deduplication",
+                    "message": (
+                        f"Resultado reaproveitado do produto "
+                        f"{representante.get('produto_id', group.representante)} "
+                        f"(grupo {group.group_id}, {len(group.indices)} produtos)"
+                    ),
+                    "produto_id": produto.get("produto_id", index),
+                    "timestamp": datetime.now().isoformat(),
+                }
+                by_index[index] = replace(
+                    result,
+                    final_result=dict(result.final_result),
+                    execution_time=0.0,
+                    audit_trail=[*result.audit_trail, entry],
+                )
+
+        return [by_index[index] for index in range(len(produtos_list))]
+
+    @property
+    def gtin_index(self):
+        """Índice GTIN compartilhado (carregado na primeira consulta)"""
+        if self._gtin_index is None:
+            from ..tools.gtin_index import get_gtin_index
+
+            self._gtin_index = get_gtin_index()
+        return self._gtin_index
+
+    def _resolve_by_gtin(
+        self, produto_dados: Dict[str, Any], start_time: datetime
+    ) -> Optional[WorkflowResult]:
+        """
+        Caminho rápido: GTIN válido com correspondência exata no índice
+        dispensa o workflow de agentes
+        """
+        if not self.config.gtin_fast_path:
+            return None
+
+        gtin = next(
+            (produto_dados[field] for field in GTIN_FIELDS if produto_dados.get(field)),
+            None,
+        )
+        if gtin is None:
+            return None
+
+        match = self.gtin_index.lookup(gtin)
+        if match is None or match.confidence < self.config.gtin_min_confidence:
+            return None
+
+        ncm_informado = "".join(
+            ch for ch in str(produto_dados.get("ncm_informado") or "") if ch.isdigit()
+        )
+        divergente = bool(ncm_informado) and ncm_informado != match.ncm
+        status = "CONFIRMADO" if ncm_informado and not divergente else "DETERMINADO"
+        justificativa = f"GTIN {match.gtin} com correspondência exata ({match.source})"
+
+        return WorkflowResult(
+            workflow_type=WorkflowType.GTIN,
+            status=status,
+            final_result={
+                "ncm_final": match.ncm,
+                "cest_final": match.cest or "",
+                "justificativa_ncm": justificativa,
+                "justificativa_cest": justificativa if match.cest else "",
+                "confidence": match.confidence,
+                "status": status,
+                "fonte": match.source,
+                "ncm_informado_divergente": divergente,
+            },
+            confidence=match.confidence,
+            # NCM declarado contradiz o índice: decide pelo GTIN, mas revisa
+            requires_review=divergente,
+            execution_time=(datetime.now() - start_time).total_seconds(),
+            audit_trail=[
+                {
+                    "step": "gtin_lookup",
+                    "message": f"{justificativa}: NCM {match.ncm}",
+                    "timestamp": datetime.now().isoformat(),
+                }
+            ],
+        )
+
     def _determine_workflow_type(self, produto_dados: Dict[str, Any]) -> WorkflowType:
         """
         Determina qual tipo de workflow usar baseado nos dados do produto
@@ -382,6 +731,8 @@ class WorkflowManager:
             self.execution_stats["confirmation_count"] += 1
         elif workflow_type == WorkflowType.DETERMINATION:
             self.execution_stats["determination_count"] += 1
+        elif workflow_type == WorkflowType.GTIN:
+            self.execution_stats["gtin_count"] += 1
         else:
             self.execution_stats["hybrid_count"] += 1
 
@@ -406,9 +757,17 @@ class WorkflowManager:
             current_avg * (total - 1) + result.confidence
         ) / total
 
+        # Distribuições em fluxo (memória constante)
+        self.execution_time_stats.add(result.execution_time)
+        self.confidence_stats.add(result.confidence)
+
     def get_statistics(self) -> Dict[str, Any]:
         """Retorna estatísticas de execução"""
-        return self.execution_stats.copy()
+        return {
+            **self.execution_stats,
+            "execution_time": self.execution_time_stats.to_dict(),
+            "confidence": self.confidence_stats.to_dict(),
+        }
 
     def reset_statistics(self):
         """Reseta estatísticas de execução"""
@@ -417,10 +776,13 @@ class WorkflowManager:
             "confirmation_count": 0,
             "determination_count": 0,
             "hybrid_count": 0,
+            "gtin_count": 0,
             "manual_review_count": 0,
             "success_rate": 0.0,
             "average_confidence": 0.0,
         }
+        self.execution_time_stats.reset()
+        self.confidence_stats.reset()
 
 
 # Instância global do workflow manager
@@ -456,6 +818,8 @@ async def classify_batch(
     produtos_list: List[Dict[str, Any]],
     empresa_id: Optional[str] = None,
     max_concurrent: int = 5,
+    deduplicate: bool = False,
+    staged: Optional[bool] = None,
 ) -> List[WorkflowResult]:
     """
     Função de conveniência para classificar múltiplos produtos
@@ -464,10 +828,16 @@ async def classify_batch(
         produtos_list: Lista de produtos
         empresa_id: ID da empresa
         max_concurrent: Máximo de workflows concorrentes
+        deduplicate: Classifica uma vez cada grupo de produtos equivalentes
+        staged: Executa o lote estágio a estágio
 
     Returns:
         Lista de resultados de classificação
     """
     return await workflow_manager.process_batch(
-        produtos_list, empresa_id, max_concurrent
+        produtos_list,
+        empresa_id,
+        max_concurrent,
+        deduplicate=deduplicate,
+        staged=staged,
     )